@@ -0,0 +1,283 @@
+"""
+Timing benchmarks for Gala.
+
+These are not part of the test suite: they print timings (and, for the
+integrators, accuracies) for comparing implementations locally. Run all of
+the benchmarks with::
+
+    python benchmarks/benchmarks.py
+
+or pass the names of the benchmarks to run (see ``--list``).
+"""
+
+# Standard library
+import argparse
+import time
+
+# Third-party
+import numpy as np
+
+BENCHMARKS = dict()
+
+
+def benchmark(func):
+    """Register a benchmark function, named without the ``bench_`` prefix."""
+    BENCHMARKS[func.__name__[len('bench_'):]] = func
+    return func
+
+
+def timeit(func, n=1):
+    """Return the mean wall time of ``n`` calls of ``func``, in seconds."""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - t0) / n
+
+
+@benchmark
+def bench_raw_overhead():
+    """Potential gradient with units vs. the unit-free .raw methods."""
+    from gala.potential import MilkyWayPotential
+
+    pot = MilkyWayPotential()
+    raw = pot.raw
+    n_calls = 1000
+
+    for n in [1, 10, 100, 1000]:
+        q = np.ascontiguousarray(np.random.uniform(-10, 10, size=(n, 3)))
+        q_T = np.ascontiguousarray(q.T)
+        out = np.zeros_like(q)
+
+        t_units = timeit(lambda: pot.gradient(q_T), n_calls)
+        t_raw = timeit(lambda: raw.gradient(q, out=out), n_calls)
+        print(f"N={n}: gradient() {t_units*1e6:.1f} us/call, "
+              f"raw.gradient() {t_raw*1e6:.1f} us/call")
+
+
+@benchmark
+def bench_tabulated_radial_profile():
+    """Orbit integration with exact vs. tabulated radial profiles."""
+    from gala._cconfig import GSL_ENABLED
+    from gala.potential import PowerLawCutoffPotential, StonePotential
+    from gala.units import galactic
+
+    pots = [StonePotential(m=1E11, r_c=0.1, r_h=10., units=galactic)]
+    if GSL_ENABLED:
+        pots.append(PowerLawCutoffPotential(m=1E10, alpha=1.8, r_c=2.,
+                                            units=galactic))
+
+    w0 = np.zeros((6, 128))
+    w0[0] = np.random.uniform(1, 20, size=w0.shape[1])
+    w0[4] = 0.1
+
+    for pot in pots:
+        tab = pot.tabulate_radial_profile()
+        for p in [pot, tab]:
+            dt = timeit(lambda: p.integrate_orbit(w0, dt=1., n_steps=10000))
+            print(f"{pot.__class__.__name__} (tabulated={p is tab}): "
+                  f"{dt:.2f} s")
+
+
+@benchmark
+def bench_set_parameters():
+    """Creating a new potential vs. updating the parameters in place."""
+    import astropy.units as u
+    from gala.potential import MilkyWayPotential
+
+    mw = MilkyWayPotential()
+    raw = mw.get_parameters_raw()
+    n = 1000
+
+    t_new = timeit(lambda: MilkyWayPotential(halo=dict(m=5.4E11*u.Msun)), n)
+    t_set = timeit(lambda: mw.set_parameters(halo=dict(m=5.4E11*u.Msun)), n)
+    t_raw = timeit(lambda: mw.set_parameters_raw(raw), n)
+    print(f"new potential: {t_new*1E6:.1f} us, set_parameters(): "
+          f"{t_set*1E6:.1f} us, set_parameters_raw(): {t_raw*1E6:.1f} us")
+
+
+@benchmark
+def bench_ensemble():
+    """A PotentialEnsemble vs. a loop over potentials."""
+    import astropy.units as u
+    from gala.potential import MilkyWayPotential, PotentialEnsemble
+
+    rng = np.random.default_rng(42)
+    xyz = rng.uniform(-10, 10, size=(3, 100))
+
+    mw = MilkyWayPotential()
+    halo_m = rng.uniform(4E11, 8E11, size=10000) * u.Msun
+
+    t_ens = timeit(lambda: PotentialEnsemble(
+        mw, dict(halo=dict(m=halo_m))).energy(xyz))
+
+    n = 100
+    t_loop = timeit(lambda: [MilkyWayPotential(halo=dict(m=m)).energy(xyz)
+                             for m in halo_m[:n]]) / n * len(halo_m)
+
+    print(f"ensemble: {t_ens:.3f} s, loop over potentials: {t_loop:.3f} s")
+
+
+@benchmark
+def bench_radial_profile():
+    """radial_profile() vs. separate energy, circular velocity, and mass."""
+    import astropy.units as u
+    from gala.potential import MilkyWayPotential
+
+    pot = MilkyWayPotential()
+    r = np.geomspace(0.1, 200, 1024) * u.kpc
+    xyz = np.zeros((3, len(r))) * u.kpc
+    xyz[0] = r
+
+    def separate():
+        pot.energy(xyz)
+        pot.circular_velocity(xyz)
+        pot.mass_enclosed(xyz)
+
+    t_prof = timeit(lambda: pot.radial_profile(r), 100)
+    t_sep = timeit(separate, 100)
+    print(f"radial_profile(): {t_prof*1E3:.2f} ms, energy(), "
+          f"circular_velocity(), mass_enclosed(): {t_sep*1E3:.2f} ms")
+
+
+@benchmark
+def bench_evaluate_on_grid():
+    """evaluate_on_grid() vs. energy() on a meshgrid of positions."""
+    from gala.potential import MilkyWayPotential
+
+    pot = MilkyWayPotential()
+    x = np.linspace(-20, 20, 256)
+
+    def mesh():
+        xyz = np.stack(np.meshgrid(x, x, x, indexing='ij'))
+        pot.energy(xyz)
+
+    t_grid = timeit(lambda: pot.evaluate_on_grid((x, x, x)))
+    t_mesh = timeit(mesh)
+    print(f"evaluate_on_grid(): {t_grid:.3f} s, meshgrid and energy(): "
+          f"{t_mesh:.3f} s")
+
+
+@benchmark
+def bench_dop853_independent_steps():
+    """DOP853 with a shared step size vs. independent steps per orbit."""
+    from gala.integrate.cyintegrators import dop853_integrate_hamiltonian
+    from gala.potential import Hamiltonian, HernquistPotential
+    from gala.units import galactic
+
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.1, units=galactic))
+
+    # a single orbit that plunges through the cusp sets the step size of all
+    # orbits when they are integrated as one system
+    rng = np.random.default_rng(42)
+    w0 = np.hstack((rng.uniform(10, 30, size=(200, 3)),
+                    rng.uniform(-0.1, 0.1, size=(200, 3))))
+    w0[0] = [0.01, 0, 0, 0, 0, 0.001]
+    t = np.linspace(0, 2000., 201)
+
+    for independent_steps in [False, True]:
+        dt = timeit(lambda: dop853_integrate_hamiltonian(
+            H, w0, t, independent_steps=independent_steps))
+        print(f"independent_steps={independent_steps}: {dt:.2f} s")
+
+
+@benchmark
+def bench_dop853_dense_output():
+    """DOP853 stopping at each output time vs. dense output."""
+    from gala.integrate.cyintegrators import dop853_integrate_hamiltonian
+    from gala.potential import Hamiltonian, MilkyWayPotential
+
+    H = Hamiltonian(MilkyWayPotential())
+
+    rng = np.random.default_rng(42)
+    w0 = np.hstack((rng.uniform(5, 15, size=(10, 3)),
+                    rng.uniform(-0.2, 0.2, size=(10, 3))))
+
+    # output times that are finely spaced compared to the natural step size
+    t = np.linspace(0, 5000., 10001)
+
+    for dense_output in [False, True]:
+        dt = timeit(lambda: dop853_integrate_hamiltonian(
+            H, w0, t, dense_output=dense_output))
+        print(f"dense_output={dense_output}: {dt:.3f} s")
+
+
+@benchmark
+def bench_symplectic_energy_error():
+    """Energy error vs. wall time of the symplectic integrators and DOP853."""
+    import gala.integrate as gi
+    from gala.integrate.cyintegrators import (dop853_integrate_hamiltonian,
+                                              leapfrog_integrate_hamiltonian,
+                                              symplectic_integrate_hamiltonian)
+    from gala.potential import Hamiltonian, MilkyWayPotential
+
+    # many orbits over a Hubble time in a Milky Way-like potential
+    H = Hamiltonian(MilkyWayPotential())
+    rng = np.random.default_rng(42)
+    w0 = np.zeros((100, 6))
+    w0[:, 0] = rng.uniform(5, 30, size=len(w0))
+    w0[:, 4] = rng.uniform(0.1, 0.25, size=len(w0))
+    w0[:, 5] = rng.uniform(0, 0.05, size=len(w0))
+    t_max = 13800.
+
+    def energy_error(w):
+        # the median over orbits of the maximum relative energy error
+        E = H.energy(np.moveaxis(w, -1, 0)).value
+        return np.median(np.abs(E / E[0] - 1).max(axis=0))
+
+    def run(func):
+        t0 = time.perf_counter()
+        _, w = func()
+        return time.perf_counter() - t0, energy_error(w)
+
+    print(f"{'Integrator':20s} {'setting':>12s} {'time [s]':>9s} "
+          f"{'dE/E':>8s}")
+    for Integrator in [gi.LeapfrogIntegrator, gi.ForestRuthIntegrator,
+                       gi.PEFRLIntegrator, gi.Yoshida6Integrator]:
+        for dt in [0.5, 1., 2., 4.]:
+            t = np.arange(0, t_max + dt/2, dt)
+            save_every = len(t) // 100
+            if Integrator == gi.LeapfrogIntegrator:
+                wall, dE = run(lambda: leapfrog_integrate_hamiltonian(
+                    H, w0, t, save_every=save_every))
+            else:
+                wall, dE = run(lambda: symplectic_integrate_hamiltonian(
+                    H, w0, t, Integrator.drift_coeffs, Integrator.kick_coeffs,
+                    save_every=save_every))
+            print(f"{Integrator.__name__:20s} {f'dt={dt:g} Myr':>12s} "
+                  f"{wall:9.2f} {dE:8.1e}")
+
+    # with looser tolerances, DOP853 stops on some of these orbits because it
+    # detects the problem as stiff
+    t = np.arange(0, t_max + 0.5, 1.)
+    for tol in [1E-8, 1E-10, 1E-12]:
+        wall, dE = run(lambda: dop853_integrate_hamiltonian(
+            H, w0, t, atol=tol, rtol=tol, independent_steps=True,
+            dense_output=True, save_every=len(t) // 100))
+        print(f"{'DOPRI853Integrator':20s} {f'tol={tol:.0e}':>12s} "
+              f"{wall:9.2f} {dE:8.1e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help='The benchmarks to run (default: all).')
+    parser.add_argument('--list', action='store_true',
+                        help='List the available benchmarks and exit.')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, func in BENCHMARKS.items():
+            print(f"{name}: {func.__doc__.strip()}")
+        return
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark '{name}'")
+
+    for name in args.names or BENCHMARKS:
+        print(f"--- {name}: {BENCHMARKS[name].__doc__.strip()}")
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,14 @@
 
 cdef extern from "extra_compile_macros.h":
     int USE_GSL
+    int USE_OPENMP
 
 if USE_GSL == 1:
     GSL_ENABLED = True
 else:
     GSL_ENABLED = False
+
+if USE_OPENMP == 1:
+    OPENMP_ENABLED = True
+else:
+    OPENMP_ENABLED = False
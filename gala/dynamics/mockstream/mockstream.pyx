@@ -55,7 +55,7 @@ cpdef mockstream_dop853(nbody, double[::1] time,
                         double[:, ::1] stream_w0, double[::1] stream_t1,
                         double tfinal, int[::1] nstream,
                         double atol=1E-10, double rtol=1E-10, int nmax=0,
-                        int progress=0):
+                        int progress=0, int dense_output=0):
     """
     Parameters
     ----------
@@ -66,6 +66,10 @@ cpdef mockstream_dop853(nbody, double[::1] time,
     nstream : numpy.ndarray (ntimes, )
         The number of stream particles to be integrated from this timestep.
         There should be no zero values.
+    dense_output : int (optional)
+        Interpolate the orbits of the massive bodies to the release times with
+        the dense output of the integrator, instead of ending the integration
+        steps at each release time.
 
     Notes
     -----
@@ -128,7 +132,7 @@ cpdef mockstream_dop853(nbody, double[::1] time,
                                      <FcnEqDiff> Fwrapper_direct_nbody,
                                      nbody_w0, time,
                                      ndim, nbodies, nbodies, args, ntimes,
-                                     atol, rtol, nmax, 0)
+                                     atol, rtol, nmax, 0, dense_output, 1)
 
     n = 0
     for i in range(ntimes):
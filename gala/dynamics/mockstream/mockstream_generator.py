@@ -108,7 +108,7 @@ class MockStreamGenerator:
             release_every=1, n_particles=1,
             output_every=None, output_filename=None,
             check_filesize=True, overwrite=False, progress=False,
-            **time_spec):
+            Integrator_kwargs=dict(), **time_spec):
         """Run the mock stream generator with the specified progenitor initial
         conditions.
 
@@ -166,6 +166,11 @@ class MockStreamGenerator:
             Overwrite the output file if it exists.
         progress : bool (optional)
             Print a very basic progress bar while computing the stream.
+        Integrator_kwargs : dict (optional)
+            Options for the integrator: ``atol``, ``rtol``, ``nmax``, and
+            ``dense_output`` (see
+            `~gala.potential.Hamiltonian.integrate_orbit`). ``dense_output``
+            only applies to the orbits of the massive bodies.
         **time_spec
             Specification of how long to integrate. Most commonly, this is a
             timestep ``dt`` and number of steps ``n_steps``, or a timestep
@@ -183,7 +188,8 @@ class MockStreamGenerator:
         t = parse_time_specification(units, **time_spec)
 
         prog_nbody = self._get_nbody(prog_w0, nbody)
-        nbody_orbits = prog_nbody.integrate_orbit(t=t)
+        nbody_orbits = prog_nbody.integrate_orbit(
+            t=t, Integrator_kwargs=Integrator_kwargs)
 
         # If the time stepping passed in is negative, assume this means that all
         # of the initial conditions are at *end time*, and we first need to
@@ -224,7 +230,7 @@ class MockStreamGenerator:
             raw_nbody, raw_stream = mockstream_dop853(
                 nbody0, orbit_t[all_nstream != 0], w0, unq_t1s, orbit_t[-1],
                 all_nstream[all_nstream != 0].astype('i4'),
-                progress=int(progress))
+                progress=int(progress), **Integrator_kwargs)
         else:  # store snapshots
             if output_filename is None:
                 raise ValueError("If output_every is specified, you must also "
@@ -234,7 +240,9 @@ class MockStreamGenerator:
                 nbody0, orbit_t, w0, all_nstream.astype('i4'),
                 output_every=output_every, output_filename=output_filename,
                 check_filesize=check_filesize, overwrite=overwrite,
-                progress=int(progress))
+                progress=int(progress),
+                **{k: v for k, v in Integrator_kwargs.items()
+                   if k != 'dense_output'})
 
         x_unit = units['length']
         v_unit = units['length'] / units['time']
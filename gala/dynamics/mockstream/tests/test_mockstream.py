@@ -75,7 +75,7 @@ def test_run():
     # With self-gravity
     gen = MockStreamGenerator(df=df, hamiltonian=H,
                               progenitor_potential=prog_pot)
-    stream2, _ = gen.run(w0, mass, dt=-1., n_steps=100)
+    stream2, prog2 = gen.run(w0, mass, dt=-1., n_steps=100)
     assert not u.allclose(stream1.xyz, stream2.xyz)
 
     # Skipping release steps:
@@ -91,6 +91,14 @@ def test_run():
                          release_every=1, n_particles=n_particles)
     assert stream3.shape[0] == 2 * n_particles.sum()
 
+    # Interpolating the progenitor orbit with the dense output:
+    gen = MockStreamGenerator(df=df, hamiltonian=H,
+                              progenitor_potential=prog_pot)
+    stream4, prog4 = gen.run(w0, mass, dt=-1., n_steps=100,
+                             Integrator_kwargs=dict(dense_output=True))
+    assert stream4.shape == stream2.shape
+    assert u.allclose(prog2.xyz, prog4.xyz, atol=1e-8*u.kpc)
+
     # TODO: add nbody test
 
 
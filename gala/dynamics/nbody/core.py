@@ -145,7 +145,7 @@ class DirectNBody:
         else:
             return "<{} bodies=1>".format(self.__class__.__name__)
 
-    def integrate_orbit(self, **time_spec):
+    def integrate_orbit(self, Integrator_kwargs=dict(), **time_spec):
         """
         Integrate the initial conditions in the combined external potential
         plus N-body forces.
@@ -154,6 +154,10 @@ class DirectNBody:
 
         Parameters
         ----------
+        Integrator_kwargs : dict (optional)
+            Options for the integrator: ``atol``, ``rtol``, ``nmax``, and
+            ``dense_output`` (see
+            `~gala.potential.Hamiltonian.integrate_orbit`).
         **time_spec
             Specification of how long to integrate. See documentation
             for `~gala.integrate.parse_time_specification`.
@@ -170,7 +174,8 @@ class DirectNBody:
 
         ws = direct_nbody_dop853(self._c_w0, t, self.H,
                                  self.particle_potentials,
-                                 save_all=self.save_all)
+                                 save_all=self.save_all,
+                                 **Integrator_kwargs)
 
         if self.save_all:
             pos = np.rollaxis(np.array(ws[..., :3]), axis=2)
@@ -20,8 +20,7 @@ from libc.math cimport sqrt
 from cpython.exc cimport PyErr_CheckSignals
 
 from ...potential import Hamiltonian
-from ...potential.potential.cpotential cimport (CPotentialWrapper,
-                                                MAX_N_COMPONENTS, CPotential)
+from ...potential.potential.cpotential cimport CPotentialWrapper, CPotential
 from ...potential.frame.cframe cimport CFrameWrapper
 from ...integrate.cyintegrators.dop853 cimport (dop853_helper,
                                                 dop853_helper_save_all)
@@ -41,7 +40,8 @@ cdef extern from "dopri/dop853.h":
 cpdef direct_nbody_dop853(double [:, ::1] w0, double[::1] t,
                           hamiltonian, list particle_potentials,
                           save_all=True,
-                          double atol=1E-10, double rtol=1E-10, int nmax=0):
+                          double atol=1E-10, double rtol=1E-10, int nmax=0,
+                          dense_output=False):
     """Integrate orbits from initial conditions ``w0`` over the time grid ``t``
     using direct N-body force calculation in the external potential provided via
     the ``hamiltonian`` argument.
@@ -53,6 +53,10 @@ cpdef direct_nbody_dop853(double [:, ::1] w0, double[::1] t,
     By default, this integration procedure stores the full time series of all
     orbits, but this may use a lot of memory. If you just want to store the
     final state of the orbits, pass ``save_all=False``.
+
+    The orbits are integrated with a single call to the integrator. With
+    ``dense_output=True``, the step size is not limited by the spacing of the
+    time grid, and the orbits are interpolated to the requested times.
     """
     cdef:
         unsigned nparticles = w0.shape[0]
@@ -91,13 +95,14 @@ cpdef direct_nbody_dop853(double [:, ::1] w0, double[::1] t,
                                        <FcnEqDiff> Fwrapper_direct_nbody,
                                        w0, t,
                                        ndim, nparticles, nparticles, args,
-                                       ntimes, atol, rtol, nmax, 0)
+                                       ntimes, atol, rtol, nmax, 0,
+                                       int(dense_output), 1)
     else:
         all_w = dop853_helper(&cp, &cf,
                               <FcnEqDiff> Fwrapper_direct_nbody,
                               w0, t,
                               ndim, nparticles, nparticles, args, ntimes,
-                              atol, rtol, nmax, 0)
+                              atol, rtol, nmax, 0, int(dense_output))
         all_w = np.array(all_w).reshape(nparticles, ndim)
 
     return all_w
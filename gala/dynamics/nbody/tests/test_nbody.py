@@ -159,3 +159,18 @@ class TestDirectNBody:
 
         assert u.allclose(orbits_static.xyz, orbits_static.xyz)
         assert u.allclose(orbits2.v_xyz, orbits2.v_xyz)
+
+    def test_directnbody_integrate_dense_output(self):
+        nbody = DirectNBody(self.w0,
+                            particle_potentials=self.particle_potentials,
+                            units=self.usys,
+                            external_potential=self.ext_pot)
+
+        orbits1 = nbody.integrate_orbit(dt=1*self.usys['time'],
+                                        t1=0, t2=1*u.Myr)
+        orbits2 = nbody.integrate_orbit(
+            dt=1*self.usys['time'], t1=0, t2=1*u.Myr,
+            Integrator_kwargs=dict(dense_output=True))
+
+        assert u.allclose(orbits1.xyz, orbits2.xyz, atol=1e-6*u.pc)
+        assert u.allclose(orbits1.v_xyz, orbits2.v_xyz, atol=1e-3*u.pc/u.Myr)
@@ -1,4 +1,5 @@
 from .pyintegrators.leapfrog import *
 from .pyintegrators.rk5 import *
 from .pyintegrators.dopri853 import *
+from .pyintegrators.symplectic import *
 from .timespec import *
@@ -8,6 +8,35 @@ from ..units import UnitSystem, DimensionlessUnitSystem
 
 __all__ = ["Integrator"]
 
+# The maximum number of values held in memory when the C integrators copy the
+# orbits in blocks to an output array that they can't write to directly
+_output_buffer_size = 2**22
+
+
+def _prepare_output_array(out, shape):
+    """
+    Validate an output array for the orbits computed by the C integrators
+    (e.g., a writable `numpy.memmap` or an ``h5py`` dataset), which must have
+    the shape ``shape``.
+
+    Returns the number of rows of a buffer in which to store the orbits before
+    copying them to ``out`` in blocks, or 0 if ``out`` is a writable,
+    C-contiguous array of doubles that the integrators can write to directly.
+    """
+    if tuple(out.shape) != tuple(shape):
+        raise ValueError("Shape of output array doesn't match expected shape "
+                         "of return array ({} vs {})".format(out.shape, shape))
+
+    if isinstance(out, np.ndarray):
+        if not out.flags.writeable:
+            raise TypeError("Output array must be writable.")
+
+        if out.dtype == np.float64 and out.flags.c_contiguous:
+            return 0
+
+    row_size = max(int(np.prod(shape[1:])), 1)
+    return max(1, min(shape[0], _output_buffer_size // row_size))
+
 
 class Integrator(object):
 
@@ -1,2 +1,5 @@
-from .dop853 import dop853_integrate_hamiltonian
-from .leapfrog import leapfrog_integrate_hamiltonian
+from .dop853 import (dop853_integrate_hamiltonian,
+                     dop853_integrate_hamiltonian_iter)
+from .leapfrog import (leapfrog_integrate_hamiltonian,
+                       leapfrog_integrate_hamiltonian_iter)
+from .symplectic import symplectic_integrate_hamiltonian
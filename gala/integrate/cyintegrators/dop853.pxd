@@ -13,6 +13,20 @@ cdef extern from "dopri/dop853.h":
                               CPotential *p, CFrame *fr, unsigned norbits,
                               unsigned nbody, void *args) nogil
 
+cdef int dop853_step_nogil(CPotential *cp, CFrame *cf, FcnEqDiff F,
+                           double *w, double t1, double t2, double dt0,
+                           int ndim, int norbits, int nbody, void *args,
+                           double atol, double rtol, int nmax) nogil
+
+cdef int dop853_integrate_nogil(CPotential *cp, CFrame *cf, FcnEqDiff F,
+                                double *w, double *t, int ntimes,
+                                double *out, int stride, double *h,
+                                int ndim, int norbits, int nbody, void *args,
+                                double atol, double rtol, int nmax,
+                                int dense_output, int save_every) nogil
+
+cdef int dop853_check_status(int res) except -1
+
 cdef void dop853_step(CPotential *cp, CFrame *cf, FcnEqDiff F,
                       double *w, double t1, double t2, double dt0,
                       int ndim, int norbits, int nbody, void *args,
@@ -21,13 +35,15 @@ cdef void dop853_step(CPotential *cp, CFrame *cf, FcnEqDiff F,
 cdef dop853_helper(CPotential *cp, CFrame *cf, FcnEqDiff F,
                    double[:,::1] w0, double[::1] t,
                    int ndim, int norbits, int nbody, void *args, int ntimes,
-                   double atol, double rtol, int nmax, int progress)
+                   double atol, double rtol, int nmax, int progress,
+                   int dense_output)
 
 cdef dop853_helper_save_all(CPotential *cp, CFrame *cf, FcnEqDiff F,
                             double[:,::1] w0, double[::1] t,
                             int ndim, int norbits, int nbody, void *args,
                             int ntimes, double atol, double rtol, int nmax,
-                            int progress)
+                            int progress, int dense_output, int save_every,
+                            out=*)
 
 # cpdef dop853_integrate_hamiltonian(hamiltonian, double[:,::1] w0, double[::1] t,
 #                                    double atol=?, double rtol=?, int nmax=?)
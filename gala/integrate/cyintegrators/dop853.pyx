@@ -11,6 +11,7 @@ import sys
 from libc.stdio cimport *
 from libc.stdlib cimport malloc, free
 from libc.string cimport strcpy
+from cython.parallel cimport prange
 
 # Third-party
 import numpy as np
@@ -18,6 +19,7 @@ cimport numpy as np
 np.import_array()
 
 from cpython.exc cimport PyErr_CheckSignals
+from ..core import _prepare_output_array
 from ...potential.potential.cpotential cimport CPotentialWrapper
 from ...potential.frame.cframe cimport CFrameWrapper
 
@@ -35,42 +37,184 @@ cdef extern from "dopri/dop853.h":
     ctypedef void (*FcnEqDiff)(unsigned n, double x, double *y, double *f,
                               CPotential *p, CFrame *fr, unsigned norbits,
                               unsigned nbody, void *args) nogil
-    ctypedef void (*SolTrait)(long nr, double xold, double x, double* y,
-                              unsigned n, int* irtrn)
+    ctypedef struct Dop853Context:
+        double hout
+        void *solout_args
+        double *tstop
+        unsigned ntstop
+
+    ctypedef void (*SolTrait)(Dop853Context *ctx, long nr, double xold,
+                              double x, double* y, unsigned n,
+                              int* irtrn) nogil
 
     # See dop853.h for full description of all input parameters
-    int dop853 (unsigned n, FcnEqDiff fn,
+    int dop853 (Dop853Context *ctx, unsigned n, FcnEqDiff fn,
                 CPotential *p, CFrame *fr, unsigned n_orbits, unsigned nbody,
                 void *args,
                 double x, double* y, double xend,
                 double* rtoler, double* atoler, int itoler, SolTrait solout,
                 int iout, FILE* fileout, double uround, double safe, double fac1,
                 double fac2, double beta, double hmax, double h, long nmax, int meth,
-                long nstiff, unsigned nrdens, unsigned* icont, unsigned licont)
+                long nstiff, unsigned nrdens, unsigned* icont, unsigned licont) nogil
+
+    double contd8 (Dop853Context *ctx, unsigned ii, double x) nogil
 
     void Fwrapper (unsigned ndim, double t, double *w, double *f,
-                   CPotential *p, CFrame *fr, unsigned norbits)
+                   CPotential *p, CFrame *fr, unsigned norbits,
+                   unsigned nbody, void *args) nogil
 
 cdef extern from "stdio.h":
     ctypedef struct FILE
     FILE *stdout
 
-cdef void solout(long nr, double xold, double x, double* y, unsigned n, int* irtrn):
+cdef void solout(Dop853Context *ctx, long nr, double xold, double x,
+                 double* y, unsigned n, int* irtrn) nogil:
     # TODO: see here for example in FORTRAN: http://www.unige.ch/~hairer/prog/nonstiff/dr_dop853.f
     pass
 
-cdef void dop853_step(CPotential *cp, CFrame *cf, FcnEqDiff F,
-                      double *w, double t1, double t2, double dt0,
-                      int ndim, int norbits, int nbody, void *args,
-                      double atol, double rtol, int nmax) except *:
-
-    cdef int res
+ctypedef struct OutputTimes:
+    double *t
+    int ntimes
+    int next
+    double *out
+    int stride
+    double sign
+    int interpolate
+    int save_every
+
+cdef void solout_times(Dop853Context *ctx, long nr, double xold, double x,
+                       double* y, unsigned n, int* irtrn) nogil:
+    """
+    Called after every accepted step: store the state at all output times
+    that were passed during the step, either by interpolating with the dense
+    output of the integrator or (if the steps end exactly at the output
+    times) by copying the current state. Only every ``save_every`` output
+    time is stored.
+    """
+    cdef:
+        OutputTimes *output = <OutputTimes *>ctx.solout_args
+        double *row
+        double tj
+        unsigned i
+
+    while output.next < output.ntimes:
+        tj = output.t[output.next]
+        if (tj - x) * output.sign > 0:
+            break
+
+        if output.next % output.save_every != 0:
+            output.next += 1
+            continue
+
+        row = output.out + (output.next // output.save_every) * output.stride
+        if tj == x or not output.interpolate:
+            for i in range(n):
+                row[i] = y[i]
+        else:
+            for i in range(n):
+                row[i] = contd8(ctx, i, tj)
+
+        output.next += 1
+
+cdef int dop853_integrate_nogil(CPotential *cp, CFrame *cf, FcnEqDiff F,
+                                double *w, double *t, int ntimes,
+                                double *out, int stride, double *h,
+                                int ndim, int norbits, int nbody, void *args,
+                                double atol, double rtol, int nmax,
+                                int dense_output, int save_every) nogil:
+    """
+    Integrate from t[0] to t[ntimes-1] with a single call to dop853(), and
+    return its status code. The state ``w`` is updated in place, and if
+    ``out`` is not NULL, the state at every ``save_every`` time t[j] is
+    stored in ``out + (j / save_every)*stride``.
+
+    By default, the steps are shortened to end exactly at each time t[j],
+    without restarting the integrator. With ``dense_output``, the step size
+    is only set by the tolerances and the state at each time is interpolated
+    with the dense output of the integrator.
+
+    The integration starts with the step size ``h[0]``, which is replaced
+    by the step size to use when continuing the integration. As when
+    restarting the integrator at each time, ``nmax`` is the maximum number of
+    steps between two consecutive times.
+    """
+    cdef:
+        Dop853Context ctx
+        OutputTimes output
+        unsigned n = ndim * norbits
+        unsigned i
+        int j, res, iout = 0
+        unsigned nrdens = 0
+
+    if ntimes < 2:
+        if out != NULL:
+            for i in range(n):
+                out[i] = w[i]
+        return 1
+
+    if nmax == 0:
+        nmax = 100000  # the default of dop853()
+
+    output.t = t
+    output.ntimes = ntimes
+    output.next = 0
+    output.out = out
+    output.stride = stride
+    output.sign = 1. if t[ntimes-1] >= t[0] else -1.
+    output.interpolate = dense_output
+    output.save_every = save_every
+    ctx.solout_args = &output
+
+    if dense_output:
+        ctx.tstop = NULL
+        if out != NULL:
+            iout = 2
+            nrdens = n
+    else:
+        ctx.tstop = t
+        ctx.ntstop = ntimes
+        if out != NULL:
+            iout = 1
+
+    res = dop853(&ctx, n, F,
+                 cp, cf, norbits, nbody, args, t[0], w, t[ntimes-1],
+                 &rtol, &atol, 0, solout_times, iout,
+                 NULL, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, h[0],
+                 <long>nmax * (ntimes - 1), 0, 1, nrdens, NULL, 0)
+    if res < 0:
+        return res
+
+    h[0] = ctx.hout
+    if out == NULL:
+        return res
+
+    # the last step can end a rounding error short of the final time
+    for j in range(output.next, ntimes):
+        if j % save_every == 0:
+            for i in range(n):
+                out[(j // save_every)*stride + i] = w[i]
+
+    return res
+
+cdef int dop853_step_nogil(CPotential *cp, CFrame *cf, FcnEqDiff F,
+                           double *w, double t1, double t2, double dt0,
+                           int ndim, int norbits, int nbody, void *args,
+                           double atol, double rtol, int nmax) nogil:
+    """
+    Integrate from t1 to t2 without the GIL, and return the status code of
+    dop853(). All of the state of the integrator is stored in a context on
+    the stack, so this can be called concurrently from multiple threads.
+    """
+    cdef Dop853Context ctx
+    ctx.solout_args = NULL
+    ctx.tstop = NULL
 
-    res = dop853(ndim*norbits, F,
-                 cp, cf, norbits, nbody, args, t1, w, t2,
-                 &rtol, &atol, 0, solout, 0,
-                 NULL, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, dt0, nmax, 0, 1, 0, NULL, 0);
+    return dop853(&ctx, ndim*norbits, F,
+                  cp, cf, norbits, nbody, args, t1, w, t2,
+                  &rtol, &atol, 0, solout, 0,
+                  NULL, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, dt0, nmax, 0, 1, 0, NULL, 0)
 
+cdef int dop853_check_status(int res) except -1:
     if res == -1:
         raise RuntimeError("Input is not consistent.")
     elif res == -2:
@@ -79,52 +223,88 @@ cdef void dop853_step(CPotential *cp, CFrame *cf, FcnEqDiff F,
         raise RuntimeError("Step size becomes too small.")
     elif res == -4:
         raise RuntimeError("The problem is probably stiff (interrupted).")
+    return 0
+
+cdef void dop853_step(CPotential *cp, CFrame *cf, FcnEqDiff F,
+                      double *w, double t1, double t2, double dt0,
+                      int ndim, int norbits, int nbody, void *args,
+                      double atol, double rtol, int nmax) except *:
+
+    cdef int res
+
+    with nogil:
+        res = dop853_step_nogil(cp, cf, F, w, t1, t2, dt0,
+                                ndim, norbits, nbody, args, atol, rtol, nmax)
+
+    dop853_check_status(res)
+
+cdef dop853_integrate(CPotential *cp, CFrame *cf, FcnEqDiff F,
+                      double *w, double[::1] t, double *out, int stride,
+                      int ndim, int norbits, int nbody, void *args,
+                      double atol, double rtol, int nmax, int progress,
+                      int dense_output, int save_every):
+    """
+    Integrate over the full array of times without restarting the integrator
+    (see ``dop853_integrate_nogil``). With progress reporting, the times are
+    split into 100 chunks and the integrator is restarted at the start of
+    each chunk, with the step size from the end of the previous chunk.
+    """
+
+    cdef:
+        int ntimes = t.shape[0]
+        int chunk = ntimes - 1
+        int start, stop, res
+        double h
+        double *chunk_out = NULL
+
+    if ntimes < 2:
+        return
+
+    # the step size is carried over between chunks
+    h = t[1] - t[0]
+    if progress == 1:
+        # chunks must start at a saved time
+        chunk = max(1, chunk // 100 // save_every) * save_every
+
+    for start in range(0, ntimes - 1, chunk):
+        stop = min(start + chunk, ntimes - 1)
+        if out != NULL:
+            chunk_out = out + (start // save_every) * stride
+
+        with nogil:
+            res = dop853_integrate_nogil(cp, cf, F, w, &t[start],
+                                         stop - start + 1, chunk_out, stride,
+                                         &h, ndim, norbits, nbody, args,
+                                         atol, rtol, nmax, dense_output,
+                                         save_every)
+        dop853_check_status(res)
+
+        PyErr_CheckSignals()
+
+        if progress == 1:
+            sys.stdout.write('\r')
+            sys.stdout.write(
+                f"Integrating orbits: {100 * stop / (ntimes - 1): 3.0f}%")
+            sys.stdout.flush()
 
 cdef dop853_helper(CPotential *cp, CFrame *cf, FcnEqDiff F,
                    double[:, ::1] w0, double[::1] t,
                    int ndim, int norbits, int nbody, void *args, int ntimes,
-                   double atol, double rtol, int nmax, int progress):
+                   double atol, double rtol, int nmax, int progress,
+                   int dense_output):
 
     cdef:
         int i, j
-        double dt0 = t[1] - t[0]
-
         double[::1] w = np.empty(ndim*norbits)
 
-        int prog_out = ntimes // 100
-
     # store initial conditions
     for i in range(norbits):
         for j in range(ndim):
             w[i*ndim + j] = w0[i, j]
 
-    if progress == 1:
-        for j in range(1, ntimes, 1):
-            dop853_step(cp, cf, F,
-                        &w[0], t[j-1], t[j], dt0,
-                        ndim, norbits, nbody, args,
-                        atol, rtol, nmax)
-
-            PyErr_CheckSignals()
-
-            if j % prog_out == 0:
-                sys.stdout.write('\r')
-                sys.stdout.write(
-                    f"Integrating orbits: {100 * j / ntimes: 3.0f}%")
-                sys.stdout.flush()
-
-        sys.stdout.write('\r')
-        sys.stdout.write(f"Integrating orbits: {100: 3.0f}%")
-        sys.stdout.flush()
-
-    else:
-        for j in range(1, ntimes, 1):
-            dop853_step(cp, cf, F,
-                        &w[0], t[j-1], t[j], dt0,
-                        ndim, norbits, nbody, args,
-                        atol, rtol, nmax)
-
-            PyErr_CheckSignals()
+    dop853_integrate(cp, cf, F, &w[0], t, NULL, 0,
+                     ndim, norbits, nbody, args, atol, rtol, nmax, progress,
+                     dense_output, 1)
 
     return w
 
@@ -132,16 +312,23 @@ cdef dop853_helper_save_all(CPotential *cp, CFrame *cf, FcnEqDiff F,
                             double[:, ::1] w0, double[::1] t,
                             int ndim, int norbits, int nbody, void *args,
                             int ntimes, double atol, double rtol, int nmax,
-                            int progress):
+                            int progress, int dense_output, int save_every,
+                            out=None):
+    """
+    Integrate and store the orbits at every ``save_every`` time, in a new
+    array or in ``out`` (which must be a writable, C-contiguous array of
+    doubles with the right shape).
+    """
 
     cdef:
-        int i, j, k
-        double dt0 = t[1] - t[0]
-
+        int i, k
         double[::1] w = np.empty(ndim*norbits)
-        double[:, :, ::1] all_w = np.empty((ntimes, norbits, ndim))
+        double[:, :, ::1] all_w
 
-        int prog_out = ntimes // 100
+    if out is None:
+        all_w = np.empty(((ntimes - 1) // save_every + 1, norbits, ndim))
+    else:
+        all_w = out
 
     # store initial conditions
     for i in range(norbits):
@@ -149,53 +336,133 @@ cdef dop853_helper_save_all(CPotential *cp, CFrame *cf, FcnEqDiff F,
             w[i*ndim + k] = w0[i, k]
             all_w[0, i, k] = w0[i, k]
 
-    if progress == 1:
-        for j in range(1, ntimes, 1):
-            dop853_step(cp, cf, F,
-                        &w[0], t[j-1], t[j], dt0, ndim, norbits, nbody, args,
-                        atol, rtol, nmax)
-
-            for k in range(ndim):
-                for i in range(norbits):
-                    all_w[j, i, k] = w[i*ndim + k]
-
-            PyErr_CheckSignals()
+    dop853_integrate(cp, cf, F, &w[0], t, &all_w[0, 0, 0], norbits*ndim,
+                     ndim, norbits, nbody, args, atol, rtol, nmax, progress,
+                     dense_output, save_every)
 
-            if j % prog_out == 0:
-                sys.stdout.write('\r')
-                sys.stdout.write(
-                    f"Integrating orbits: {100 * j / ntimes: 3.0f}%")
-                sys.stdout.flush()
+    return np.asarray(all_w)
 
-        sys.stdout.write('\r')
-        sys.stdout.write(f"Integrating orbits: {100: 3.0f}%")
-        sys.stdout.flush()
+cdef dop853_helper_save_all_independent(CPotential *cp, CFrame *cf,
+                                        FcnEqDiff F,
+                                        double[:, ::1] w0, double[::1] t,
+                                        int ndim, int norbits, int ntimes,
+                                        double atol, double rtol, int nmax,
+                                        int progress, int dense_output,
+                                        int save_every, int save_final_only,
+                                        int n_threads, out=None):
+    """
+    Integrate each orbit as a separate system, so that each orbit has its own
+    adaptive step size. Blocks of orbits are integrated in parallel without
+    the GIL, and the state of each orbit is written directly to the output
+    array (``out``, if specified, or a new array), or only the final state is
+    returned, with a single time, if ``save_final_only`` is set.
+    """
 
+    cdef:
+        int i, k, start, stop
+        int block_size = max(64, 4 * n_threads)
+        int nsaved = (ntimes - 1) // save_every + 1
+        int stride = norbits * ndim
+        double[::1] h
+
+        double[:, ::1] w = np.array(w0)
+        double[:, :, ::1] all_w
+        int[::1] status = np.zeros(norbits, dtype=np.int32)
+
+    if save_final_only:
+        all_w = np.empty((1, norbits, ndim))
     else:
-        for j in range(1, ntimes, 1):
-            dop853_step(cp, cf, F,
-                        &w[0], t[j-1], t[j], dt0, ndim, norbits, nbody, args,
-                        atol, rtol, nmax)
-
+        if out is None:
+            all_w = np.empty((nsaved, norbits, ndim))
+        else:
+            all_w = out
+        for i in range(norbits):
             for k in range(ndim):
-                for i in range(norbits):
-                    all_w[j, i, k] = w[i*ndim + k]
-
-            PyErr_CheckSignals()
+                all_w[0, i, k] = w0[i, k]
+
+    if ntimes < 2:
+        all_w[0, :, :] = w0
+        return np.asarray(all_w)
+    h = np.full(norbits, t[1] - t[0])
+
+    for start in range(0, norbits, block_size):
+        stop = min(start + block_size, norbits)
+
+        if save_final_only:
+            for i in prange(start, stop, nogil=True, schedule='dynamic',
+                            num_threads=n_threads):
+                status[i] = dop853_integrate_nogil(cp, cf, F, &w[i, 0], &t[0],
+                                                   ntimes, NULL, stride, &h[i],
+                                                   ndim, 1, 0, NULL,
+                                                   atol, rtol, nmax,
+                                                   dense_output, save_every)
+        else:
+            for i in prange(start, stop, nogil=True, schedule='dynamic',
+                            num_threads=n_threads):
+                status[i] = dop853_integrate_nogil(cp, cf, F, &w[i, 0], &t[0],
+                                                   ntimes, &all_w[0, i, 0],
+                                                   stride, &h[i], ndim, 1, 0,
+                                                   NULL, atol, rtol, nmax,
+                                                   dense_output, save_every)
+
+        for i in range(start, stop):
+            dop853_check_status(status[i])
+
+        PyErr_CheckSignals()
+
+        if progress == 1:
+            sys.stdout.write('\r')
+            sys.stdout.write(
+                f"Integrating orbits: {100 * stop / norbits: 3.0f}%")
+            sys.stdout.flush()
+
+    if save_final_only:
+        all_w[0, :, :] = w
 
     return np.asarray(all_w)
 
 cpdef dop853_integrate_hamiltonian(hamiltonian, double[:, ::1] w0, double[::1] t,
-                                   double atol=1E-10, double rtol=1E-10, int nmax=0, progress=False):
+                                   double atol=1E-10, double rtol=1E-10, int nmax=0, progress=False,
+                                   independent_steps=False, dense_output=False,
+                                   int save_every=1, save_final_only=False,
+                                   out=None):
     """
     CAUTION: Interpretation of axes is different here! We need the
     arrays to be C ordered and easy to iterate over, so here the
     axes are (norbits, ndim).
+
+    The orbits are integrated over the full array of times with a single call
+    to the integrator. By default, the steps are shortened to end exactly at
+    the requested times. With ``dense_output=True``, the step size is only set
+    by the tolerances, and the orbits are interpolated to the requested times
+    with the dense output of the integrator. This is much faster when the
+    times are finely spaced compared to the natural step size.
+
+    By default, all orbits are integrated as a single system of equations
+    with a shared step size. With ``independent_steps=True``, each orbit is
+    integrated with its own adaptive step size (in parallel, using the number
+    of threads set with `~gala.potential.set_num_threads`).
+
+    Only the orbits at every ``save_every`` time (i.e. at the times
+    ``t[::save_every]``) are stored, or only at the final time if
+    ``save_final_only=True``. The returned times are the times at which the
+    orbits are stored.
+
+    If ``out`` is specified, the orbits are written to it instead of a new
+    array, which is then returned. This can be any array-like object with
+    shape (nsaved, norbits, ndim) that supports assignment to slices, e.g., an
+    ``h5py`` dataset. Writable, C-contiguous arrays of doubles (e.g., a
+    `numpy.memmap`) are written to directly. Other arrays are written to in
+    blocks of times, and the integrator is restarted at the start of each
+    block with the step size(s) from the end of the previous block.
     """
 
     if not hamiltonian.c_enabled:
         raise TypeError("Input Hamiltonian object does not support C-level access.")
 
+    if save_every < 1:
+        raise ValueError("save_every must be a positive integer.")
+
     cdef:
         int i, j, k
         unsigned norbits = w0.shape[0]
@@ -209,10 +476,192 @@ cpdef dop853_integrate_hamiltonian(hamiltonian, double[:, ::1] w0, double[::1] t
         CPotential cp = (<CPotentialWrapper>(hamiltonian.potential.c_instance)).cpotential
         CFrame cf = (<CFrameWrapper>(hamiltonian.frame.c_instance)).cframe
 
+    if save_final_only:
+        t_saved = np.asarray(t)[ntimes-1:]
+    else:
+        t_saved = np.asarray(t)[::save_every]
+
+    if out is not None:
+        nbuf = _prepare_output_array(out, (len(t_saved), norbits, ndim))
+
+        if nbuf > 0 and not save_final_only:
+            dop853_integrate_buffered(hamiltonian, w0, t, out, nbuf, atol,
+                                      rtol, nmax, int(progress),
+                                      int(independent_steps),
+                                      int(dense_output), save_every)
+            return t_saved, out
+
+    if independent_steps:
+        from ...potential.potential.cpotential import get_num_threads
+        all_w = dop853_helper_save_all_independent(
+            &cp, &cf, <FcnEqDiff> Fwrapper, w0, t, ndim, norbits, ntimes,
+            atol, rtol, nmax, int(progress), int(dense_output),
+            save_every, int(save_final_only), get_num_threads(), out)
+
     # 0 below is for nbody - we ignore that in this test particle integration
-    all_w = dop853_helper_save_all(&cp, &cf, <FcnEqDiff> Fwrapper,
-                                   w0, t,
-                                   ndim, norbits, 0, args, ntimes,
-                                   atol, rtol, nmax, int(progress))
+    elif save_final_only:
+        all_w = dop853_helper(&cp, &cf, <FcnEqDiff> Fwrapper,
+                              w0, t,
+                              ndim, norbits, 0, args, ntimes,
+                              atol, rtol, nmax, int(progress),
+                              int(dense_output))
+        all_w = np.asarray(all_w).reshape(1, norbits, ndim)
+
+    else:
+        all_w = dop853_helper_save_all(&cp, &cf, <FcnEqDiff> Fwrapper,
+                                       w0, t,
+                                       ndim, norbits, 0, args, ntimes,
+                                       atol, rtol, nmax, int(progress),
+                                       int(dense_output), save_every, out)
+
+    if out is not None:
+        if save_final_only:
+            out[0:1] = all_w
+        return t_saved, out
+
+    return t_saved, np.asarray(all_w)
+
+cdef dop853_integrate_chunk(hamiltonian, double[:, ::1] w, double[::1] t,
+                            double[:, :, ::1] out, double[::1] h,
+                            double atol, double rtol, int nmax,
+                            int independent_steps, int dense_output,
+                            int n_threads, int save_every=1):
+    """
+    Integrate the orbits ``w`` in place from t[0] to t[ntimes-1], storing
+    the orbits at every ``save_every`` time in ``out``, starting with the
+    step size(s) ``h`` and replacing them with the step size(s) to continue
+    the integration.
+    """
+
+    cdef:
+        int i
+        int ntimes = t.shape[0]
+        int norbits = w.shape[0]
+        int ndim = w.shape[1]
+        int res
+        int[::1] status
+        void *args = NULL
+
+        CPotential cp = (<CPotentialWrapper>(hamiltonian.potential.c_instance)).cpotential
+        CFrame cf = (<CFrameWrapper>(hamiltonian.frame.c_instance)).cframe
+
+    if independent_steps:
+        status = np.zeros(norbits, dtype=np.int32)
+        for i in prange(norbits, nogil=True, schedule='dynamic',
+                        num_threads=n_threads):
+            status[i] = dop853_integrate_nogil(&cp, &cf, <FcnEqDiff> Fwrapper,
+                                               &w[i, 0], &t[0], ntimes,
+                                               &out[0, i, 0], norbits*ndim,
+                                               &h[i], ndim, 1, 0, NULL,
+                                               atol, rtol, nmax,
+                                               dense_output, save_every)
+
+        for i in range(norbits):
+            dop853_check_status(status[i])
+
+    else:
+        with nogil:
+            res = dop853_integrate_nogil(&cp, &cf, <FcnEqDiff> Fwrapper,
+                                         &w[0, 0], &t[0], ntimes,
+                                         &out[0, 0, 0], norbits*ndim, &h[0],
+                                         ndim, norbits, 0, args,
+                                         atol, rtol, nmax, dense_output,
+                                         save_every)
+        dop853_check_status(res)
+
+cdef dop853_integrate_buffered(hamiltonian, double[:, ::1] w0, double[::1] t,
+                               out, int nbuf, double atol, double rtol,
+                               int nmax, int progress, int independent_steps,
+                               int dense_output, int save_every):
+    """
+    Integrate the orbits in blocks of times, storing the orbits at every
+    ``save_every`` time of each block in a buffer with (at least) ``nbuf``
+    rows, which is then copied to ``out``. The integration of each block
+    starts with the step size(s) from the end of the previous block.
+    """
+
+    from ...potential.potential.cpotential import get_num_threads
+
+    cdef:
+        int ntimes = t.shape[0]
+        int start, stop, nrows
+        double[:, ::1] w = np.array(w0)
+        double[::1] h
+
+    # consecutive blocks overlap by one saved time
+    nbuf = max(nbuf, 2)
+    buf = np.empty((nbuf, w.shape[0], w.shape[1]))
+
+    if ntimes < 2:
+        out[0:1] = np.asarray(w0)[None]
+        return
+    h = np.full(w.shape[0] if independent_steps else 1, t[1] - t[0])
+
+    start = 0
+    while start < ntimes - 1:
+        stop = min(start + (nbuf - 1) * save_every, ntimes - 1)
+        dop853_integrate_chunk(hamiltonian, w, t[start:stop+1], buf, h,
+                               atol, rtol, nmax, independent_steps,
+                               dense_output, get_num_threads(), save_every)
+
+        nrows = (stop - start) // save_every + 1
+        out[start // save_every:start // save_every + nrows] = buf[:nrows]
+
+        PyErr_CheckSignals()
+
+        if progress == 1:
+            sys.stdout.write('\r')
+            sys.stdout.write(
+                f"Integrating orbits: {100 * stop / (ntimes - 1): 3.0f}%")
+            sys.stdout.flush()
+
+        start = stop
+
+def dop853_integrate_hamiltonian_iter(hamiltonian, double[:, ::1] w0,
+                                      double[::1] t, int chunk_steps=1000,
+                                      double atol=1E-10, double rtol=1E-10,
+                                      int nmax=0, independent_steps=False,
+                                      dense_output=False):
+    """
+    Integrate orbits as with ``dop853_integrate_hamiltonian()``, but yield
+    the times and the orbits in successive chunks of (at most)
+    ``chunk_steps`` times, so that the full orbits are never stored. The
+    integration of each chunk starts with the step size(s) from the end of
+    the previous chunk.
+
+    CAUTION: Interpretation of axes is different here! The orbits in each
+    chunk have axes (ntimes, norbits, ndim).
+    """
+
+    if not hamiltonian.c_enabled:
+        raise TypeError("Input Hamiltonian object does not support C-level access.")
+
+    if chunk_steps < 1:
+        raise ValueError("chunk_steps must be a positive integer.")
+
+    from ...potential.potential.cpotential import get_num_threads
+
+    t_arr = np.asarray(t)
+    ntimes = len(t_arr)
+    norbits = w0.shape[0]
+    w = np.array(w0)
+    h = np.full(norbits if independent_steps else 1,
+                t_arr[1] - t_arr[0] if ntimes > 1 else 0.)
+
+    for start in range(0, ntimes, chunk_steps):
+        stop = min(start + chunk_steps, ntimes)
+
+        # each chunk is integrated from the last time of the previous chunk
+        first = max(start - 1, 0)
+        chunk_w = np.empty((stop - first, ) + w.shape)
+        if stop - first < 2:
+            chunk_w[0] = w
+        else:
+            dop853_integrate_chunk(hamiltonian, w, t_arr[first:stop], chunk_w,
+                                   h, atol, rtol, nmax,
+                                   int(independent_steps), int(dense_output),
+                                   get_num_threads())
+
+        PyErr_CheckSignals()
 
-    return np.asarray(t), np.asarray(all_w)
+        yield t_arr[start:stop], chunk_w[start-first:]
@@ -7,52 +7,44 @@
 #include "dop853.h"
 
 
-static long      nfcn, nstep, naccpt, nrejct;
-static double    hout, xold, xout;
-static unsigned  nrds, *indir;
-static double    *yy1, *k1, *k2, *k3, *k4, *k5, *k6, *k7, *k8, *k9, *k10;
-static double    *rcont1, *rcont2, *rcont3, *rcont4;
-static double    *rcont5, *rcont6, *rcont7, *rcont8;
-
-
-long nfcnRead (void)
+long nfcnRead (Dop853Context *ctx)
 {
-  return nfcn;
+  return ctx->nfcn;
 
 } /* nfcnRead */
 
 
-long nstepRead (void)
+long nstepRead (Dop853Context *ctx)
 {
-  return nstep;
+  return ctx->nstep;
 
 } /* stepRead */
 
 
-long naccptRead (void)
+long naccptRead (Dop853Context *ctx)
 {
-  return naccpt;
+  return ctx->naccpt;
 
 } /* naccptRead */
 
 
-long nrejctRead (void)
+long nrejctRead (Dop853Context *ctx)
 {
-  return nrejct;
+  return ctx->nrejct;
 
 } /* nrejct */
 
 
-double hRead (void)
+double hRead (Dop853Context *ctx)
 {
-  return hout;
+  return ctx->hout;
 
 } /* hRead */
 
 
-double xRead (void)
+double xRead (Dop853Context *ctx)
 {
-  return xout;
+  return ctx->xout;
 
 } /* xRead */
 
@@ -155,17 +147,17 @@ static double hinit (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsig
 
 
 /* core integrator */
-static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigned norbits, unsigned nbody, void *args,
+static int dopcor (Dop853Context *ctx, unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigned norbits, unsigned nbody, void *args,
        double x, double* y, double xend,
 		   double hmax, double h, double* rtoler, double* atoler,
 		   int itoler, FILE* fileout, SolTrait solout, int iout,
 		   long nmax, double uround, int meth, long nstiff, double safe,
 		   double beta, double fac1, double fac2, unsigned* icont)
 {
-  double   facold, expo1, fac, facc1, facc2, fac11, posneg, xph;
+  double   facold, expo1, fac, facc1, facc2, fac11, posneg, xph, hsave;
   double   atoli, rtoli, hlamb, err, sk, hnew, yd0, ydiff, bspl;
   double   stnum, stden, sqr, err2, erri, deno;
-  int      iasti, iord, irtrn, reject, last, nonsti;
+  int      iasti, iord, irtrn, reject, last, nonsti, clipped;
   unsigned i, j;
   double   c2, c3, c4, c5, c6, c7, c8, c9, c10, c11, c14, c15, c16;
   double   b1, b6, b7, b8, b9, b10, b11, b12, bhh1, bhh2, bhh3;
@@ -182,6 +174,13 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
   double   d51, d56, d57, d58, d59, d510, d511, d512, d513, d514, d515, d516;
   double   d61, d66, d67, d68, d69, d610, d611, d612, d613, d614, d615, d616;
   double   d71, d76, d77, d78, d79, d710, d711, d712, d713, d714, d715, d716;
+  double   *yy1 = ctx->yy1, *k1 = ctx->k1, *k2 = ctx->k2, *k3 = ctx->k3;
+  double   *k4 = ctx->k4, *k5 = ctx->k5, *k6 = ctx->k6, *k7 = ctx->k7;
+  double   *k8 = ctx->k8, *k9 = ctx->k9, *k10 = ctx->k10;
+  double   *rcont1 = ctx->rcont1, *rcont2 = ctx->rcont2, *rcont3 = ctx->rcont3;
+  double   *rcont4 = ctx->rcont4, *rcont5 = ctx->rcont5, *rcont6 = ctx->rcont6;
+  double   *rcont7 = ctx->rcont7, *rcont8 = ctx->rcont8;
+  unsigned nrds = ctx->nrds;
 
   /* initialisations */
   switch (meth)
@@ -375,16 +374,16 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
   iord = 8;
   if (h == 0.0)
     h = hinit (n, fcn, p, fr, norbits, nbody, args, x, y, posneg, k1, k2, k3, iord, hmax, atoler, rtoler, itoler);
-  nfcn += 2;
+  ctx->nfcn += 2;
   reject = 0;
-  xold = x;
+  ctx->xold = x;
 
   if (iout)
   {
     irtrn = 1;
-    hout = 1.0;
-    xout = x;
-    solout (naccpt+1, xold, x, y, n, &irtrn);
+    ctx->hout = 1.0;
+    ctx->xout = x;
+    solout (ctx, ctx->naccpt+1, ctx->xold, x, y, n, &irtrn);
     if (irtrn < 0)
     {
       if (fileout)
@@ -396,12 +395,12 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
   /* basic integration step */
   while (1)
   {
-    if (nstep > nmax)
+    if (ctx->nstep > nmax)
     {
       if (fileout)
 	fprintf (fileout, "Exit of dop853 at x = %.16e, more than nmax = %li are needed\r\n", x, nmax);
-      xout = x;
-      hout = h;
+      ctx->xout = x;
+      ctx->hout = h;
       return -2;
     }
 
@@ -409,8 +408,8 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
     {
       if (fileout)
 	fprintf (fileout, "Exit of dop853 at x = %.16e, step size too small h = %.16e\r\n", x, h);
-      xout = x;
-      hout = h;
+      ctx->xout = x;
+      ctx->hout = h;
       return -3;
     }
 
@@ -420,7 +419,26 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
       last = 1;
     }
 
-    nstep++;
+    /* end the step at the next stopping time before xend, if it is passed */
+    clipped = 0;
+    hsave = h;
+    if (ctx->tstop)
+    {
+      while ((ctx->itstop < ctx->ntstop) &&
+	     ((ctx->tstop[ctx->itstop] - x) * posneg <= 0.0))
+	ctx->itstop++;
+
+      if ((ctx->itstop < ctx->ntstop) &&
+	  ((ctx->tstop[ctx->itstop] - xend) * posneg < 0.0) &&
+	  ((x + 1.01*h - ctx->tstop[ctx->itstop]) * posneg > 0.0))
+      {
+	h = ctx->tstop[ctx->itstop] - x;
+	clipped = 1;
+	last = 0;
+      }
+    }
+
+    ctx->nstep++;
 
     /* the twelve stages */
     for (i = 0; i < n; i++)
@@ -458,12 +476,14 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
 			  a117*k7[i] + a118*k8[i] + a119*k9[i] + a1110*k10[i]);
     fcn (n, x+c11*h, yy1, k2, p, fr, norbits, nbody, args);
     xph = x + h;
+    if (clipped)
+      xph = ctx->tstop[ctx->itstop];
     for (i = 0; i < n; i++)
       yy1[i] = y[i] + h * (a121*k1[i] + a124*k4[i] + a125*k5[i] + a126*k6[i] +
 			  a127*k7[i] + a128*k8[i] + a129*k9[i] +
 			  a1210*k10[i] + a1211*k2[i]);
     fcn (n, xph, yy1, k3, p, fr, norbits, nbody, args);
-    nfcn += 11;
+    ctx->nfcn += 11;
     for (i = 0; i < n; i++)
     {
       k4[i] = b1*k1[i] + b6*k6[i] + b7*k7[i] + b8*k8[i] + b9*k9[i] +
@@ -516,12 +536,12 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
       /* step accepted */
 
       facold = max_d (err, 1.0E-4);
-      naccpt++;
+      ctx->naccpt++;
       fcn (n, xph, k5, k4, p, fr, norbits, nbody, args);
-      nfcn++;
+      ctx->nfcn++;
 
       /* stiffness detection */
-      if (!(naccpt % nstiff) || (iasti > 0))
+      if (!(ctx->naccpt % nstiff) || (iasti > 0))
       {
 	stnum = 0.0;
 	stden = 0.0;
@@ -543,8 +563,8 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
 	      fprintf (fileout, "The problem seems to become stiff at x = %.16e\r\n", x);
 	    else
 	    {
-	      xout = x;
-	      hout = h;
+	      ctx->xout = x;
+	      ctx->hout = h;
 	      return -4;
 	    }
 	}
@@ -614,7 +634,7 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
 			      a169*k9[i] + a1613*k4[i] + a1614*k10[i] +
 			      a1615*k2[i]);
 	fcn (n, x+c16*h, yy1, k3, p, fr, norbits, nbody, args);
-	nfcn += 3;
+	ctx->nfcn += 3;
 
 	/* final preparation */
 	if (nrds == n)
@@ -646,14 +666,14 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
 
       memcpy (k1, k4, n * sizeof(double));
       memcpy (y, k5, n * sizeof(double));
-      xold = x;
+      ctx->xold = x;
       x = xph;
 
       if (iout)
       {
-	hout = h;
-	xout = x;
-	solout (naccpt+1, xold, x, y, n, &irtrn);
+	ctx->hout = h;
+	ctx->xout = x;
+	solout (ctx, ctx->naccpt+1, ctx->xold, x, y, n, &irtrn);
 	if (irtrn < 0)
 	{
 	  if (fileout)
@@ -665,11 +685,14 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
       /* normal exit */
       if (last)
       {
-	hout=hnew;
-	xout = x;
+	ctx->hout=hnew;
+	ctx->xout = x;
 	return 1;
       }
 
+      /* keep the step size from before the step was shortened */
+      if (clipped && (fabs(hnew) >= fabs(h)) && (fabs(hnew) < fabs(hsave)))
+	hnew = hsave;
       if (fabs(hnew) > hmax)
 	hnew = posneg * hmax;
       if (reject)
@@ -682,8 +705,8 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
       /* step rejected */
       hnew = h / min_d (facc1, fac11/safe);
       reject = 1;
-      if (naccpt >= 1)
-	nrejct=nrejct + 1;
+      if (ctx->naccpt >= 1)
+	ctx->nrejct=ctx->nrejct + 1;
       last = 0;
     }
 
@@ -695,7 +718,7 @@ static int dopcor (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigne
 
 /* front-end */
 int dop853
- (unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigned norbits, unsigned nbody, void *args,
+ (Dop853Context *ctx, unsigned n, FcnEqDiff fcn, CPotential *p, CFrame *fr, unsigned norbits, unsigned nbody, void *args,
   double x, double* y, double xend, double* rtoler,
   double* atoler, int itoler, SolTrait solout, int iout, FILE* fileout, double uround,
   double safe, double fac1, double fac2, double beta, double hmax, double h,
@@ -705,9 +728,11 @@ int dop853
   unsigned  i;
 
   /* initialisations */
-  nfcn = nstep = naccpt = nrejct = arret = 0;
-  rcont1 = rcont2 = rcont3 = rcont4 = rcont5 = rcont6 = rcont7 = rcont8 = NULL;
-  indir = NULL;
+  ctx->nfcn = ctx->nstep = ctx->naccpt = ctx->nrejct = arret = 0;
+  ctx->rcont1 = ctx->rcont2 = ctx->rcont3 = ctx->rcont4 = ctx->rcont5 = ctx->rcont6 = ctx->rcont7 = ctx->rcont8 = NULL;
+  ctx->indir = NULL;
+  ctx->nrds = 0;
+  ctx->itstop = 0;
 
   /* n, the dimension of the system */
   if (n == UINT_MAX)
@@ -761,19 +786,19 @@ int dop853
   else if (nrdens)
   {
     /* is there enough memory to allocate rcont12345678&indir ? */
-    rcont1 = (double*) malloc (nrdens*sizeof(double));
-    rcont2 = (double*) malloc (nrdens*sizeof(double));
-    rcont3 = (double*) malloc (nrdens*sizeof(double));
-    rcont4 = (double*) malloc (nrdens*sizeof(double));
-    rcont5 = (double*) malloc (nrdens*sizeof(double));
-    rcont6 = (double*) malloc (nrdens*sizeof(double));
-    rcont7 = (double*) malloc (nrdens*sizeof(double));
-    rcont8 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont1 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont2 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont3 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont4 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont5 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont6 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont7 = (double*) malloc (nrdens*sizeof(double));
+    ctx->rcont8 = (double*) malloc (nrdens*sizeof(double));
     if (nrdens < n)
-      indir = (unsigned*) malloc (n*sizeof(unsigned));
+      ctx->indir = (unsigned*) malloc (n*sizeof(unsigned));
 
-    if (!rcont1 || !rcont2 || !rcont3 || !rcont4 || !rcont5 ||
-	!rcont6 || !rcont7 || !rcont8 || (!indir && (nrdens < n)))
+    if (!ctx->rcont1 || !ctx->rcont2 || !ctx->rcont3 || !ctx->rcont4 || !ctx->rcont5 ||
+	!ctx->rcont6 || !ctx->rcont7 || !ctx->rcont8 || (!ctx->indir && (nrdens < n)))
     {
       if (fileout)
 	fprintf (fileout, "Not enough free memory for rcont12345678&indir\r\n");
@@ -785,7 +810,7 @@ int dop853
     {
       if (icont && fileout)
 	fprintf (fileout, "Warning : when nrdens = n there is no need allocating memory for icont\r\n");
-      nrds = n;
+      ctx->nrds = n;
     }
     else if (licont < nrdens)
     {
@@ -797,11 +822,11 @@ int dop853
     {
       if ((iout < 2) && fileout)
 	fprintf (fileout, "Warning : put iout = 2 for dense output\r\n");
-      nrds = nrdens;
+      ctx->nrds = nrdens;
       for (i = 0; i < n; i++)
-	indir[i] = UINT_MAX;
+	ctx->indir[i] = UINT_MAX;
       for (i = 0; i < nrdens; i++)
-	indir[icont[i]] = i;
+	ctx->indir[icont[i]] = i;
     }
   }
 
@@ -848,19 +873,19 @@ int dop853
     hmax = xend - x;
 
   /* is there enough free memory for the method ? */
-  yy1 = (double*) malloc (n*sizeof(double));
-  k1 = (double*) malloc (n*sizeof(double));
-  k2 = (double*) malloc (n*sizeof(double));
-  k3 = (double*) malloc (n*sizeof(double));
-  k4 = (double*) malloc (n*sizeof(double));
-  k5 = (double*) malloc (n*sizeof(double));
-  k6 = (double*) malloc (n*sizeof(double));
-  k7 = (double*) malloc (n*sizeof(double));
-  k8 = (double*) malloc (n*sizeof(double));
-  k9 = (double*) malloc (n*sizeof(double));
-  k10 = (double*) malloc (n*sizeof(double));
-
-  if (!yy1 || !k1 || !k2 || !k3 || !k4 || !k5 || !k6 || !k7 || !k8 || !k9 || !k10)
+  ctx->yy1 = (double*) malloc (n*sizeof(double));
+  ctx->k1 = (double*) malloc (n*sizeof(double));
+  ctx->k2 = (double*) malloc (n*sizeof(double));
+  ctx->k3 = (double*) malloc (n*sizeof(double));
+  ctx->k4 = (double*) malloc (n*sizeof(double));
+  ctx->k5 = (double*) malloc (n*sizeof(double));
+  ctx->k6 = (double*) malloc (n*sizeof(double));
+  ctx->k7 = (double*) malloc (n*sizeof(double));
+  ctx->k8 = (double*) malloc (n*sizeof(double));
+  ctx->k9 = (double*) malloc (n*sizeof(double));
+  ctx->k10 = (double*) malloc (n*sizeof(double));
+
+  if (!ctx->yy1 || !ctx->k1 || !ctx->k2 || !ctx->k3 || !ctx->k4 || !ctx->k5 || !ctx->k6 || !ctx->k7 || !ctx->k8 || !ctx->k9 || !ctx->k10)
   {
     if (fileout)
       fprintf (fileout, "Not enough free memory for the method\r\n");
@@ -870,76 +895,76 @@ int dop853
   /* when a failure has occured, we return -1 */
   if (arret)
   {
-    if (k10)
-      free (k10);
-    if (k9)
-      free (k9);
-    if (k8)
-      free (k8);
-    if (k7)
-      free (k7);
-    if (k6)
-      free (k6);
-    if (k5)
-      free (k5);
-    if (k4)
-      free (k4);
-    if (k3)
-      free (k3);
-    if (k2)
-      free (k2);
-    if (k1)
-      free (k1);
-    if (yy1)
-      free (yy1);
-    if (indir)
-      free (indir);
-    if (rcont8)
-      free (rcont8);
-    if (rcont7)
-      free (rcont7);
-    if (rcont6)
-      free (rcont6);
-    if (rcont5)
-      free (rcont5);
-    if (rcont4)
-      free (rcont4);
-    if (rcont3)
-      free (rcont3);
-    if (rcont2)
-      free (rcont2);
-    if (rcont1)
-      free (rcont1);
+    if (ctx->k10)
+      free (ctx->k10);
+    if (ctx->k9)
+      free (ctx->k9);
+    if (ctx->k8)
+      free (ctx->k8);
+    if (ctx->k7)
+      free (ctx->k7);
+    if (ctx->k6)
+      free (ctx->k6);
+    if (ctx->k5)
+      free (ctx->k5);
+    if (ctx->k4)
+      free (ctx->k4);
+    if (ctx->k3)
+      free (ctx->k3);
+    if (ctx->k2)
+      free (ctx->k2);
+    if (ctx->k1)
+      free (ctx->k1);
+    if (ctx->yy1)
+      free (ctx->yy1);
+    if (ctx->indir)
+      free (ctx->indir);
+    if (ctx->rcont8)
+      free (ctx->rcont8);
+    if (ctx->rcont7)
+      free (ctx->rcont7);
+    if (ctx->rcont6)
+      free (ctx->rcont6);
+    if (ctx->rcont5)
+      free (ctx->rcont5);
+    if (ctx->rcont4)
+      free (ctx->rcont4);
+    if (ctx->rcont3)
+      free (ctx->rcont3);
+    if (ctx->rcont2)
+      free (ctx->rcont2);
+    if (ctx->rcont1)
+      free (ctx->rcont1);
 
     return -1;
   }
   else
   {
-    idid = dopcor (n, fcn, p, fr, norbits, nbody, args, x, y, xend, hmax, h, rtoler, atoler, itoler, fileout,
+    idid = dopcor (ctx, n, fcn, p, fr, norbits, nbody, args, x, y, xend, hmax, h, rtoler, atoler, itoler, fileout,
 		   solout, iout, nmax, uround, meth, nstiff, safe, beta, fac1, fac2, icont);
-    free (k10);
-    free (k9);
-    free (k8);
-    free (k7);
-    free (k6);
-    free (k5);    /* reverse order freeing too increase chances */
-    free (k4);    /* of efficient dynamic memory managing       */
-    free (k3);
-    free (k2);
-    free (k1);
-    free (yy1);
-    if (indir)
-      free (indir);
-    if (rcont8)
+    free (ctx->k10);
+    free (ctx->k9);
+    free (ctx->k8);
+    free (ctx->k7);
+    free (ctx->k6);
+    free (ctx->k5);    /* reverse order freeing too increase chances */
+    free (ctx->k4);    /* of efficient dynamic memory managing       */
+    free (ctx->k3);
+    free (ctx->k2);
+    free (ctx->k1);
+    free (ctx->yy1);
+    if (ctx->indir)
+      free (ctx->indir);
+    if (ctx->rcont8)
     {
-      free (rcont8);
-      free (rcont7);
-      free (rcont6);
-      free (rcont5);
-      free (rcont4);
-      free (rcont3);
-      free (rcont2);
-      free (rcont1);
+      free (ctx->rcont8);
+      free (ctx->rcont7);
+      free (ctx->rcont6);
+      free (ctx->rcont5);
+      free (ctx->rcont4);
+      free (ctx->rcont3);
+      free (ctx->rcont2);
+      free (ctx->rcont1);
     }
 
     return idid;
@@ -949,17 +974,17 @@ int dop853
 
 
 /* dense output function */
-double contd8 (unsigned ii, double x)
+double contd8 (Dop853Context *ctx, unsigned ii, double x)
 {
   unsigned i, j;
   double   s, s1;
 
   i = UINT_MAX;
 
-  if (!indir)
+  if (!ctx->indir)
     i = ii;
   else
-    i = indir[ii];
+    i = ctx->indir[ii];
 
   if (i == UINT_MAX)
   {
@@ -967,11 +992,11 @@ double contd8 (unsigned ii, double x)
     return 0.0;
   }
 
-  s = (x - xold) / hout;
+  s = (x - ctx->xold) / ctx->hout;
   s1 = 1.0 - s;
 
-  return rcont1[i]+s*(rcont2[i]+s1*(rcont3[i]+s*(rcont4[i]+s1*(rcont5[i]+
-	 s*(rcont6[i]+s1*(rcont7[i]+s*rcont8[i]))))));
+  return ctx->rcont1[i]+s*(ctx->rcont2[i]+s1*(ctx->rcont3[i]+s*(ctx->rcont4[i]+s1*(ctx->rcont5[i]+
+	 s*(ctx->rcont6[i]+s1*(ctx->rcont7[i]+s*ctx->rcont8[i]))))));
 
 } /* contd8 */
 
@@ -981,13 +1006,8 @@ void Fwrapper (unsigned full_ndim, double t, double *w, double *f,
                void *args) {
     /* na can be ignored here - used in nbody wrapper below */
 
-    int i;
-    unsigned ndim = full_ndim / norbits; // phase-space dimensionality
-
-    for (i=0; i < norbits; i++) {
-        // call gradient function
-        hamiltonian_gradient(p, fr, t, &w[i*ndim], &f[i*ndim]);
-    }
+    // evaluate all orbits at once so batched potential kernels can be used
+    hamiltonian_gradient_batch(p, fr, t, w, norbits, f);
 }
 
 void Fwrapper_direct_nbody (unsigned full_ndim, double t, double *w, double *f,
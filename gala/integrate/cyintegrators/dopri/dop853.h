@@ -35,11 +35,22 @@ dedicated functions; the variable names have been kept to maintain a kind
 of reading compatibility between the C and FORTRAN codes; adaptation made by
 J.Colinge (COLINGE@DIVSUN.UNIGE.CH).
 
+Remarks about this version : all of the integrator state (the statistical
+variables, the method stages, and the dense output coefficients) is stored in
+a Dop853Context struct that is passed to dop853() and to the functions below,
+instead of in static variables, so that independent integrations can run
+concurrently (e.g., in different threads). The context is allocated by the
+caller, for example on the stack. If ctx->tstop is not NULL, it must point to
+an array of ctx->ntstop times (in the direction of the integration) at which
+steps are forced to end exactly, without restarting the integrator.
+
 
 
 INPUT PARAMETERS
 ----------------
 
+ctx      A pointer to the context used to store the state of the integrator.
+
 n        Dimension of the system (n < UINT_MAX).
 
 fcn      A pointer the the function definig the differential equation, this
@@ -72,16 +83,18 @@ solout   A pointer to the output function called during integration.
 	 pass a pointer equal to NULL. solout must must have the following
 	 prototype
 
-	   solout (long nr, double xold, double x, double* y, unsigned n, int* irtrn)
+	   solout (Dop853Context *ctx, long nr, double xold, double x, double* y,
+		   unsigned n, int* irtrn)
 
 	 where y is the solution the at nr-th grid point x, xold is the
 	 previous grid point and irtrn serves to interrupt the integration
-	 (if set to a negative value).
+	 (if set to a negative value). ctx is the context of the integration,
+	 and ctx->solout_args may be used to pass data to solout.
 
 	 Continuous output : during the calls to solout, a continuous solution
 	 for the interval (xold,x) is available through the function
 
-	   contd8(i,s)
+	   contd8(ctx,i,s)
 
 	 which provides an approximation to the i-th component of the solution
 	 at the point s (s must lie in the interval (xold,x)).
@@ -164,7 +177,8 @@ dopri5 returns the following values
 	-4 : the problem is probably stff (interrupted).
 
 
-Several functions provide access to different values :
+Several functions provide access to different values (all of these take the
+context of the integration as their only argument) :
 
 xRead   x value for which the solution has been computed (x=xend after
 	successful return).
@@ -191,10 +205,25 @@ typedef void (*FcnEqDiff)(unsigned n, double x, double *y, double *f,
                           CPotential *p, CFrame *fr, unsigned norbits,
                           unsigned nbody, void *args);
 
-typedef void (*SolTrait)(long nr, double xold, double x, double* y, unsigned n, int* irtrn);
+/* the state of an integration: passed to all of the functions below */
+typedef struct {
+  long      nfcn, nstep, naccpt, nrejct;
+  double    hout, xold, xout;
+  unsigned  nrds, *indir;
+  double    *yy1, *k1, *k2, *k3, *k4, *k5, *k6, *k7, *k8, *k9, *k10;
+  double    *rcont1, *rcont2, *rcont3, *rcont4;
+  double    *rcont5, *rcont6, *rcont7, *rcont8;
+  void      *solout_args; /* data for the solout function (set by caller) */
+  double    *tstop;       /* times at which steps must end (set by caller) */
+  unsigned  ntstop, itstop;
+} Dop853Context;
+
+typedef void (*SolTrait)(Dop853Context *ctx, long nr, double xold, double x,
+                         double* y, unsigned n, int* irtrn);
 
 extern int dop853
- (unsigned n,      /* dimension of the system <= UINT_MAX-1*/
+ (Dop853Context *ctx, /* state of the integration */
+  unsigned n,      /* dimension of the system <= UINT_MAX-1*/
   FcnEqDiff fcn,   /* function computing the value of f(x,y) */
   CPotential *p,   /* ADDED BY ADRN: parameters for gradient function */
   CFrame *fr,       /* ADDED BY ADRN: reference frame */
@@ -226,16 +255,17 @@ extern int dop853
  );
 
 extern double contd8
- (unsigned ii,     /* index of desired component */
+ (Dop853Context *ctx, /* state of the integration */
+  unsigned ii,     /* index of desired component */
   double x         /* approximation at x */
  );
 
-extern long nfcnRead (void);   /* encapsulation of statistical data */
-extern long nstepRead (void);
-extern long naccptRead (void);
-extern long nrejctRead (void);
-extern double hRead (void);
-extern double xRead (void);
+extern long nfcnRead (Dop853Context *ctx);   /* encapsulation of statistical data */
+extern long nstepRead (Dop853Context *ctx);
+extern long naccptRead (Dop853Context *ctx);
+extern long nrejctRead (Dop853Context *ctx);
+extern double hRead (Dop853Context *ctx);
+extern double xRead (Dop853Context *ctx);
 
 /* ADDED BY APW */
 extern void Fwrapper (unsigned ndim, double t, double *w, double *f,
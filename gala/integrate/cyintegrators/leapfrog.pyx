@@ -12,7 +12,10 @@ import numpy as np
 cimport numpy as np
 np.import_array()
 
+from cpython.exc cimport PyErr_CheckSignals
+
 # Project
+from ..core import _prepare_output_array
 from ...potential.potential.cpotential cimport CPotentialWrapper
 from ...potential.frame import StaticFrame
 
@@ -52,13 +55,7 @@ cdef void c_leapfrog_step(CPotential *p, int half_ndim, double t, double dt,
         v_jm1[k] = v_jm1_2[k] - grad[k] * dt/2.
         v_jm1_2[k] = v_jm1_2[k] - grad[k] * dt
 
-cpdef leapfrog_integrate_hamiltonian(hamiltonian, double [:, ::1] w0, double[::1] t):
-    """
-    CAUTION: Interpretation of axes is different here! We need the
-    arrays to be C ordered and easy to iterate over, so here the
-    axes are (norbits, ndim).
-    """
-
+cdef _check_hamiltonian(hamiltonian):
     if not hamiltonian.c_enabled:
         raise TypeError("Input Hamiltonian object does not support C-level access.")
 
@@ -67,6 +64,32 @@ cpdef leapfrog_integrate_hamiltonian(hamiltonian, double [:, ::1] w0, double[::1
                         "for StaticFrame, not {}."
                         .format(hamiltonian.frame.__class__.__name__))
 
+cpdef leapfrog_integrate_hamiltonian(hamiltonian, double [:, ::1] w0, double[::1] t,
+                                     int save_every=1, save_final_only=False,
+                                     out=None):
+    """
+    CAUTION: Interpretation of axes is different here! We need the
+    arrays to be C ordered and easy to iterate over, so here the
+    axes are (norbits, ndim).
+
+    Only the orbits at every ``save_every`` time (i.e. at the times
+    ``t[::save_every]``) are stored, or only at the final time if
+    ``save_final_only=True``. The returned times are the times at which the
+    orbits are stored.
+
+    If ``out`` is specified, the orbits are written to it instead of a new
+    array, which is then returned. This can be any array-like object with
+    shape (nsaved, norbits, ndim) that supports assignment to slices, e.g., an
+    ``h5py`` dataset. Writable, C-contiguous arrays of doubles (e.g., a
+    `numpy.memmap`) are written to directly, and other arrays are written to
+    in blocks of times.
+    """
+
+    _check_hamiltonian(hamiltonian)
+
+    if save_every < 1:
+        raise ValueError("save_every must be a positive integer.")
+
     cdef:
         # temporary scalars
         int i, j, k
@@ -80,32 +103,158 @@ cpdef leapfrog_integrate_hamiltonian(hamiltonian, double [:, ::1] w0, double[::1
         # temporary array containers
         double[::1] grad = np.zeros(half_ndim)
         double[:, ::1] v_jm1_2 = np.zeros((n, half_ndim))
+        double[:, ::1] w = np.array(w0)
 
         # return arrays
-        double[:, :, ::1] all_w = np.zeros((ntimes, n, ndim))
+        int save_final = int(save_final_only)
+        int nbuf = 0
+        int row0, j0, j1, nrows
+        double[:, :, ::1] all_w
 
         # whoa, so many dots
         CPotential cp = (<CPotentialWrapper>(hamiltonian.potential.c_instance)).cpotential
 
+    if save_final:
+        t_saved = np.asarray(t)[ntimes-1:]
+    else:
+        t_saved = np.asarray(t)[::save_every]
+    shape = (len(t_saved), n, ndim)
+
+    if out is None:
+        all_w = np.zeros(shape)
+    else:
+        nbuf = _prepare_output_array(out, shape)
+        if nbuf == 0:
+            all_w = out
+        else:
+            # the orbits are stored in a buffer and copied to out in blocks
+            all_w = np.zeros((nbuf, n, ndim))
+
     # save initial conditions
-    all_w[0, :, :] = w0.copy()
+    if not save_final:
+        all_w[0, :, :] = w0
+
+    # first initialize the velocities so they are evolved by a
+    #   half step relative to the positions
+    for i in range(n):
+        c_init_velocity(&cp, half_ndim, t[0], dt,
+                        &w[i, 0], &w[i, half_ndim], &v_jm1_2[i, 0], &grad[0])
+
+    # the time steps are split into blocks that fill the buffer
+    row0 = 0
+    j0 = 1
+    while j0 < ntimes:
+        if save_final or nbuf == 0:
+            j1 = ntimes
+        else:
+            j1 = min(ntimes, (row0 + nbuf) * save_every)
+
+        with nogil:
+            for j in range(j0, j1, 1):
+                for i in range(n):
+                    for k in range(half_ndim):
+                        grad[k] = 0.
+
+                    c_leapfrog_step(&cp, half_ndim, t[j], dt,
+                                    &w[i, 0], &w[i, half_ndim], &v_jm1_2[i, 0], &grad[0])
+
+                if not save_final and j % save_every == 0:
+                    for i in range(n):
+                        for k in range(ndim):
+                            all_w[j // save_every - row0, i, k] = w[i, k]
+
+        if nbuf > 0 and not save_final:
+            nrows = (j1 - 1) // save_every - row0 + 1
+            out[row0:row0+nrows] = np.asarray(all_w[:nrows])
+            row0 += nbuf
+
+        PyErr_CheckSignals()
+        j0 = j1
+
+    if save_final:
+        all_w[0, :, :] = w
+        if nbuf > 0:
+            out[0:1] = np.asarray(all_w)
+
+    if out is not None:
+        return t_saved, out
+
+    return t_saved, np.asarray(all_w)
+
+cdef leapfrog_integrate_chunk(hamiltonian, double[:, ::1] w,
+                              double[:, ::1] v_jm1_2, double[::1] t,
+                              double dt, double[:, :, ::1] out, int first):
+    """
+    Step the orbits ``w`` (with half-step velocities ``v_jm1_2``) in place
+    to each time t[j] for j >= first, and store the orbits at all times in
+    ``out``.
+    """
+
+    cdef:
+        int i, j, k
+        int n = w.shape[0]
+        int ndim = w.shape[1]
+        int half_ndim = ndim // 2
+        int ntimes = t.shape[0]
+        double[::1] grad = np.zeros(half_ndim)
+
+        CPotential cp = (<CPotentialWrapper>(hamiltonian.potential.c_instance)).cpotential
 
     with nogil:
-        # first initialize the velocities so they are evolved by a
-        #   half step relative to the positions
-        for i in range(n):
-            c_init_velocity(&cp, half_ndim, t[0], dt,
-                            &all_w[0, i, 0], &all_w[0, i, half_ndim], &v_jm1_2[i, 0], &grad[0])
+        for j in range(ntimes):
+            if j >= first:
+                for i in range(n):
+                    for k in range(half_ndim):
+                        grad[k] = 0.
+
+                    c_leapfrog_step(&cp, half_ndim, t[j], dt,
+                                    &w[i, 0], &w[i, half_ndim], &v_jm1_2[i, 0], &grad[0])
 
-        for j in range(1, ntimes, 1):
             for i in range(n):
-                for k in range(half_ndim):
-                    all_w[j, i, k] = all_w[j-1, i, k]
+                for k in range(ndim):
+                    out[j, i, k] = w[i, k]
+
+def leapfrog_integrate_hamiltonian_iter(hamiltonian, double [:, ::1] w0,
+                                        double[::1] t, int chunk_steps=1000):
+    """
+    Integrate orbits as with ``leapfrog_integrate_hamiltonian()``, but yield
+    the times and the orbits in successive chunks of (at most)
+    ``chunk_steps`` times, so that the full orbits are never stored. The
+    half-step velocities are carried over between chunks, so the chunks are
+    identical to the corresponding parts of a full integration.
+
+    CAUTION: Interpretation of axes is different here! The orbits in each
+    chunk have axes (ntimes, norbits, ndim).
+    """
+
+    _check_hamiltonian(hamiltonian)
+
+    if chunk_steps < 1:
+        raise ValueError("chunk_steps must be a positive integer.")
+
+    cdef:
+        int i
+        int n = w0.shape[0]
+        int half_ndim = w0.shape[1] // 2
+        double dt = t[1] - t[0]
+        double[::1] grad = np.zeros(half_ndim)
+        double[:, ::1] w = np.array(w0)
+        double[:, ::1] v_jm1_2 = np.zeros((n, half_ndim))
+        CPotential cp = (<CPotentialWrapper>(hamiltonian.potential.c_instance)).cpotential
+
+    # first initialize the velocities so they are evolved by a
+    #   half step relative to the positions
+    for i in range(n):
+        c_init_velocity(&cp, half_ndim, t[0], dt,
+                        &w[i, 0], &w[i, half_ndim], &v_jm1_2[i, 0], &grad[0])
 
-                for k in range(half_ndim):
-                    grad[k] = 0.
+    t_arr = np.asarray(t)
+    for start in range(0, len(t_arr), chunk_steps):
+        t_chunk = t_arr[start:start+chunk_steps]
+        chunk_w = np.empty((len(t_chunk), n, w0.shape[1]))
 
-                c_leapfrog_step(&cp, half_ndim, t[j], dt,
-                                &all_w[j, i, 0], &all_w[j, i, half_ndim], &v_jm1_2[i, 0], &grad[0])
+        # the first time of the first chunk is the initial conditions
+        leapfrog_integrate_chunk(hamiltonian, w, v_jm1_2, t_chunk, dt,
+                                 chunk_w, 1 if start == 0 else 0)
 
-    return np.asarray(t), np.asarray(all_w)
+        yield t_chunk, chunk_w
@@ -0,0 +1,171 @@
+# cython: boundscheck=False
+# cython: nonecheck=False
+# cython: cdivision=True
+# cython: wraparound=False
+# cython: profile=False
+# cython: language_level=3
+
+""" Higher-order symplectic (composition) integration in Cython. """
+
+# Third-party
+import numpy as np
+cimport numpy as np
+np.import_array()
+
+from cpython.exc cimport PyErr_CheckSignals
+
+# Project
+from ..core import _prepare_output_array
+from ...potential.potential.cpotential cimport CPotentialWrapper
+from ...potential.frame import StaticFrame
+
+cdef extern from "potential/src/cpotential.h":
+    ctypedef struct CPotential:
+        pass
+
+cdef extern from "potential/src/cpotential.h":
+    void c_gradient(CPotential *p, double t, double *q, double *grad) nogil
+
+cdef void c_composition_step(CPotential *p, int half_ndim, double t, double dt,
+                             double *drift, double *kick, int n_kicks,
+                             double *x, double *v, double *grad) nogil:
+    """
+    Take one step with a composition of drifts of the positions (with
+    coefficients ``drift``, with n_kicks+1 elements) and kicks of the
+    velocities (with coefficients ``kick``, with n_kicks elements).
+    """
+    cdef int s, k
+
+    for s in range(n_kicks):
+        for k in range(half_ndim):
+            x[k] = x[k] + drift[s] * v[k] * dt
+        t = t + drift[s] * dt
+
+        for k in range(half_ndim):
+            grad[k] = 0.
+        c_gradient(p, t, x, grad)
+
+        for k in range(half_ndim):
+            v[k] = v[k] - kick[s] * grad[k] * dt  # acceleration is minus gradient
+
+    for k in range(half_ndim):
+        x[k] = x[k] + drift[n_kicks] * v[k] * dt
+
+cpdef symplectic_integrate_hamiltonian(hamiltonian, double[:, ::1] w0,
+                                       double[::1] t, drift_coeffs,
+                                       kick_coeffs, int save_every=1,
+                                       save_final_only=False, out=None):
+    """
+    CAUTION: Interpretation of axes is different here! We need the
+    arrays to be C ordered and easy to iterate over, so here the
+    axes are (norbits, ndim).
+
+    Integrate with a symplectic composition method with the given drift and
+    kick coefficients (see
+    `~gala.integrate.SymplecticCompositionIntegrator`), e.g.,
+    ``ForestRuthIntegrator.drift_coeffs`` and
+    ``ForestRuthIntegrator.kick_coeffs``. The arguments ``save_every``,
+    ``save_final_only``, and ``out`` are as for
+    ``leapfrog_integrate_hamiltonian()``.
+    """
+
+    if not hamiltonian.c_enabled:
+        raise TypeError("Input Hamiltonian object does not support C-level access.")
+
+    if not isinstance(hamiltonian.frame, StaticFrame):
+        raise TypeError("Symplectic integration is currently only supported "
+                        "for StaticFrame, not {}."
+                        .format(hamiltonian.frame.__class__.__name__))
+
+    if save_every < 1:
+        raise ValueError("save_every must be a positive integer.")
+
+    cdef:
+        # temporary scalars
+        int i, j, k
+        int n = w0.shape[0]
+        int ndim = w0.shape[1]
+        int half_ndim = ndim // 2
+
+        int ntimes = len(t)
+        double dt = t[1]-t[0] if ntimes > 1 else 0.
+
+        double[::1] drift = np.array(drift_coeffs, dtype=np.float64)
+        double[::1] kick = np.array(kick_coeffs, dtype=np.float64)
+        int n_kicks = kick.shape[0]
+
+        # temporary array containers
+        double[::1] grad = np.zeros(half_ndim)
+        double[:, ::1] w = np.array(w0)
+
+        # return arrays
+        int save_final = int(save_final_only)
+        int nbuf = 0
+        int row0, j0, j1, nrows
+        double[:, :, ::1] all_w
+
+        # whoa, so many dots
+        CPotential cp = (<CPotentialWrapper>(hamiltonian.potential.c_instance)).cpotential
+
+    if drift.shape[0] != n_kicks + 1:
+        raise ValueError("There must be one more drift coefficient than kick "
+                         "coefficients.")
+
+    if save_final:
+        t_saved = np.asarray(t)[ntimes-1:]
+    else:
+        t_saved = np.asarray(t)[::save_every]
+    shape = (len(t_saved), n, ndim)
+
+    if out is None:
+        all_w = np.zeros(shape)
+    else:
+        nbuf = _prepare_output_array(out, shape)
+        if nbuf == 0:
+            all_w = out
+        else:
+            # the orbits are stored in a buffer and copied to out in blocks
+            all_w = np.zeros((nbuf, n, ndim))
+
+    # save initial conditions
+    if not save_final:
+        all_w[0, :, :] = w0
+
+    # the time steps are split into blocks that fill the buffer
+    row0 = 0
+    j0 = 1
+    while j0 < ntimes:
+        if save_final or nbuf == 0:
+            j1 = ntimes
+        else:
+            j1 = min(ntimes, (row0 + nbuf) * save_every)
+
+        with nogil:
+            for j in range(j0, j1, 1):
+                for i in range(n):
+                    c_composition_step(&cp, half_ndim, t[j-1], dt,
+                                       &drift[0], &kick[0], n_kicks,
+                                       &w[i, 0], &w[i, half_ndim], &grad[0])
+
+                if not save_final and j % save_every == 0:
+                    for i in range(n):
+                        for k in range(ndim):
+                            all_w[j // save_every - row0, i, k] = w[i, k]
+
+        if nbuf > 0 and not save_final:
+            nrows = (j1 - 1) // save_every - row0 + 1
+            out[row0:row0+nrows] = np.asarray(all_w[:nrows])
+            row0 += nbuf
+
+        PyErr_CheckSignals()
+        j0 = j1
+
+    if save_final:
+        all_w[0, :, :] = w
+        if nbuf > 0:
+            out[0:1] = np.asarray(all_w)
+
+    if out is not None:
+        return t_saved, out
+
+    return t_saved, np.asarray(all_w)
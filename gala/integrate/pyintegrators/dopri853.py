@@ -33,51 +33,65 @@ class DOPRI853Integrator(Integrator):
         integrand function.
     progress : bool (optional)
         Display a progress bar during integration.
+    independent_steps : bool (optional)
+        By default, all orbits are integrated as a single system of equations,
+        so the step size is set by the orbit that needs the smallest steps. If
+        ``True``, each orbit is integrated separately with its own adaptive
+        step size.
 
     """
 
     def __init__(self, func, func_args=(), func_units=None, progress=False,
-                 **kwargs):
+                 independent_steps=False, **kwargs):
         super(DOPRI853Integrator, self).__init__(func, func_args, func_units,
                                                  progress=progress)
+        self.independent_steps = bool(independent_steps)
         self._ode_kwargs = kwargs
 
-    def run(self, w0, mmap=None, **time_spec):
-
-        # generate the array of times
-        times = parse_time_specification(self._func_units, **time_spec)
-        n_steps = len(times)-1
-
-        w0, arr_w0, ws = self._prepare_ws(w0, mmap, n_steps)
-        _size_1d = 2*self.ndim*self.norbits
+    def _integrate(self, arr_w0, times, ws):
+        norbits = arr_w0.shape[1]
+        _size_1d = 2*self.ndim*norbits
 
         # need this to do resizing, and to handle func_args because there is some
         #   issue with the args stuff in scipy...
         def func_wrapper(t, x):
-            _x = x.reshape((2*self.ndim, self.norbits))
+            _x = x.reshape((2*self.ndim, norbits))
             val = self.F(t, _x, *self._func_args)
             return val.reshape((_size_1d,))
 
         self._ode = ode(func_wrapper, jac=None)
         self._ode = self._ode.set_integrator('dop853', **self._ode_kwargs)
 
-        # create the return arrays
-        ws[:, 0] = arr_w0
-
-        # make 1D
-        arr_w0 = arr_w0.reshape((_size_1d,))
-
         # set the initial conditions
-        self._ode.set_initial_value(arr_w0, times[0])
+        self._ode.set_initial_value(arr_w0.reshape((_size_1d,)), times[0])
 
         # Integrate the ODE(s) across each delta_t timestep
         range_ = self._get_range_func()
-        for k in range_(1, n_steps+1):
+        for k in range_(1, len(times)):
             self._ode.integrate(times[k])
             outy = self._ode.y
-            ws[:, k] = outy.reshape(2*self.ndim, self.norbits)
+            ws[:, k] = outy.reshape(2*self.ndim, norbits)
 
             if not self._ode.successful():
                 raise RuntimeError("ODE integration failed!")
 
+    def run(self, w0, mmap=None, **time_spec):
+
+        # generate the array of times
+        times = parse_time_specification(self._func_units, **time_spec)
+        n_steps = len(times)-1
+
+        w0, arr_w0, ws = self._prepare_ws(w0, mmap, n_steps)
+
+        # create the return arrays
+        ws[:, 0] = arr_w0
+
+        if self.independent_steps:
+            # integrate each orbit as a separate system of equations, writing
+            # into a view of the return array
+            for i in range(self.norbits):
+                self._integrate(arr_w0[:, i:i+1], times, ws[..., i:i+1])
+        else:
+            self._integrate(arr_w0, times, ws)
+
         return self._handle_output(w0, times, ws)
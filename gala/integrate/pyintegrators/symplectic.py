@@ -0,0 +1,170 @@
+""" Higher-order symplectic integration with composition methods. """
+
+# Third-party
+import numpy as np
+
+# Project
+from ..core import Integrator
+from ..timespec import parse_time_specification
+
+__all__ = ["SymplecticCompositionIntegrator", "ForestRuthIntegrator",
+           "PEFRLIntegrator", "Yoshida6Integrator"]
+
+
+class SymplecticCompositionIntegrator(Integrator):
+    r"""
+    Base class for symplectic integrators that compose drifts of the
+    positions and kicks of the velocities.
+
+    Each step of size :math:`h` alternates drifts and kicks, starting and
+    ending with a drift:
+
+    .. math::
+
+        x &\leftarrow x + c_s\,h\,v\\
+        v &\leftarrow v + d_s\,h\,a(x)
+
+    for :math:`s = 0, ..., m-1`, followed by a final drift with coefficient
+    :math:`c_m`. The drift and kick coefficients are set by the subclasses
+    with the class attributes ``drift_coeffs`` (with :math:`m+1` elements)
+    and ``kick_coeffs`` (with :math:`m` elements). Each step requires
+    :math:`m` evaluations of the acceleration, and the positions and
+    velocities are synchronized at the end of each step.
+
+    As with `~gala.integrate.LeapfrogIntegrator`, these integrators are only
+    symplectic for separable Hamiltonians, i.e. the acceleration must only
+    depend on the positions (and time).
+
+    Parameters
+    ----------
+    func : func
+        A callable object that computes the phase-space time derivatives
+        at a time and point in phase space.
+    func_args : tuple (optional)
+        Any extra arguments for the derivative function.
+    func_units : `~gala.units.UnitSystem` (optional)
+        If using units, this is the unit system assumed by the
+        integrand function.
+
+    """
+
+    drift_coeffs = None
+    kick_coeffs = None
+
+    def step(self, t, x, v, dt):
+        """
+        Step forward the positions and velocities by the given timestep.
+
+        Parameters
+        ----------
+        t : numeric
+            The time at the start of the step.
+        x : array_like
+            The positions.
+        v : array_like
+            The velocities.
+        dt : numeric
+            The timestep to move forward.
+        """
+
+        for c, d in zip(self.drift_coeffs, self.kick_coeffs):
+            x = x + c * v * dt
+            t = t + c * dt
+
+            F = self.F(t, np.vstack((x, v)), *self._func_args)
+            v = v + d * F[self.ndim:] * dt
+
+        x = x + self.drift_coeffs[-1] * v * dt
+
+        return x, v
+
+    def run(self, w0, mmap=None, **time_spec):
+
+        # generate the array of times
+        times = parse_time_specification(self._func_units, **time_spec)
+        n_steps = len(times) - 1
+        dt = times[1] - times[0]
+
+        w0_obj, w0, ws = self._prepare_ws(w0, mmap, n_steps)
+        x = w0[:self.ndim]
+        v = w0[self.ndim:]
+
+        ws[:, 0] = w0
+        range_ = self._get_range_func()
+        for ii in range_(1, n_steps+1):
+            x, v = self.step(times[ii-1], x, v, dt)
+            ws[:self.ndim, ii, :] = x
+            ws[self.ndim:, ii, :] = v
+
+        return self._handle_output(w0_obj, times, ws)
+
+
+_theta = 1 / (2 - 2**(1/3))
+
+
+class ForestRuthIntegrator(SymplecticCompositionIntegrator):
+    """
+    The 4th-order symplectic integrator of Forest & Ruth (1990), with three
+    evaluations of the acceleration per step.
+
+    .. seealso::
+
+        - Forest & Ruth (1990), Physica D, 43, 105
+        - Omelyan, Mryglod & Folk (2002), Comput. Phys. Commun., 146, 188
+
+    See `~gala.integrate.SymplecticCompositionIntegrator` for the parameters.
+    """
+
+    drift_coeffs = np.array([_theta / 2, (1 - _theta) / 2,
+                             (1 - _theta) / 2, _theta / 2])
+    kick_coeffs = np.array([_theta, 1 - 2 * _theta, _theta])
+
+
+_xi = 0.1786178958448091
+_lambda = -0.2123418310626054
+_chi = -0.06626458266981849
+
+
+class PEFRLIntegrator(SymplecticCompositionIntegrator):
+    """
+    The 4th-order "position extended Forest-Ruth like" symplectic integrator
+    of Omelyan, Mryglod & Folk (2002), with four evaluations of the
+    acceleration per step. The error is typically much smaller than for
+    `~gala.integrate.ForestRuthIntegrator`, even at the same number of
+    evaluations of the acceleration.
+
+    .. seealso::
+
+        - Omelyan, Mryglod & Folk (2002), Comput. Phys. Commun., 146, 188
+
+    See `~gala.integrate.SymplecticCompositionIntegrator` for the parameters.
+    """
+
+    drift_coeffs = np.array([_xi, _chi, 1 - 2 * (_chi + _xi), _chi, _xi])
+    kick_coeffs = np.array([(1 - 2 * _lambda) / 2, _lambda, _lambda,
+                            (1 - 2 * _lambda) / 2])
+
+
+# the weights of the leapfrog steps (solution A of Yoshida 1990)
+_w = np.array([-1.17767998417887100695, 0.235573213359358133684,
+               0.784513610477557263819])
+_yoshida6_weights = np.concatenate((_w[::-1], [1 - 2 * _w.sum()], _w))
+
+
+class Yoshida6Integrator(SymplecticCompositionIntegrator):
+    """
+    The 6th-order symplectic integrator of Yoshida (1990), composed of seven
+    leapfrog steps, with seven evaluations of the acceleration per step.
+
+    .. seealso::
+
+        - Yoshida (1990), Phys. Lett. A, 150, 262
+
+    See `~gala.integrate.SymplecticCompositionIntegrator` for the parameters.
+    """
+
+    drift_coeffs = np.concatenate(([_yoshida6_weights[0] / 2],
+                                   (_yoshida6_weights[:-1] +
+                                    _yoshida6_weights[1:]) / 2,
+                                   [_yoshida6_weights[-1] / 2]))
+    kick_coeffs = _yoshida6_weights
@@ -19,6 +19,15 @@ def get_extensions():
     cfg['sources'].append('gala/potential/potential/src/cpotential.c')
     exts.append(Extension('gala.integrate.cyintegrators.leapfrog', **cfg))
 
+    cfg = defaultdict(list)
+    cfg['include_dirs'].append(np.get_include())
+    cfg['include_dirs'].append(mac_incl_path)
+    cfg['include_dirs'].append('gala/potential')
+    cfg['extra_compile_args'].append('--std=gnu99')
+    cfg['sources'].append('gala/integrate/cyintegrators/symplectic.pyx')
+    cfg['sources'].append('gala/potential/potential/src/cpotential.c')
+    exts.append(Extension('gala.integrate.cyintegrators.symplectic', **cfg))
+
     cfg = defaultdict(list)
     cfg['include_dirs'].append(np.get_include())
     cfg['include_dirs'].append(mac_incl_path)
@@ -3,6 +3,7 @@
 """
 
 # Standard library
+import os
 import time
 
 # Third-party
@@ -11,11 +12,18 @@ import pytest
 
 # Project
 from ..pyintegrators.leapfrog import LeapfrogIntegrator
-from ..cyintegrators.leapfrog import leapfrog_integrate_hamiltonian
+from ..cyintegrators.leapfrog import (leapfrog_integrate_hamiltonian,
+                                      leapfrog_integrate_hamiltonian_iter)
 from ..pyintegrators.dopri853 import DOPRI853Integrator
-from ..cyintegrators.dop853 import dop853_integrate_hamiltonian
+from ..pyintegrators.symplectic import (ForestRuthIntegrator, PEFRLIntegrator,
+                                        Yoshida6Integrator)
+from ..cyintegrators.symplectic import symplectic_integrate_hamiltonian
+from ..cyintegrators.dop853 import (dop853_integrate_hamiltonian,
+                                    dop853_integrate_hamiltonian_iter)
+from .. import core
 from ...potential import Hamiltonian, HernquistPotential
 from ...units import galactic
+from ...tests.optional_deps import HAS_H5PY
 
 integrator_list = [LeapfrogIntegrator, DOPRI853Integrator]
 func_list = [leapfrog_integrate_hamiltonian, dop853_integrate_hamiltonian]
@@ -54,6 +62,72 @@ def test_compare_to_py(Integrator, integrate_func):
     assert np.allclose(cy_t, py_t)
 
 
+@pytest.mark.parametrize("Integrator", [ForestRuthIntegrator, PEFRLIntegrator,
+                                        Yoshida6Integrator])
+def test_symplectic_compare_to_py(Integrator):
+    p = HernquistPotential(m=1E11, c=0.5, units=galactic)
+    H = Hamiltonian(potential=p)
+
+    def F(t, w):
+        w_T = np.ascontiguousarray(w.T)
+        return H._gradient(w_T, np.array([0.])).T
+
+    cy_w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                      [10., 0., 0., 0., 0.2, 0.],
+                      [0., 10., 0., 0., 0., 0.2]])
+    py_w0 = np.ascontiguousarray(cy_w0.T)
+
+    n_steps = 256
+    dt = 2.
+    t = np.linspace(0, dt*n_steps, n_steps+1)
+
+    cy_t, cy_w = symplectic_integrate_hamiltonian(
+        H, cy_w0, t, Integrator.drift_coeffs, Integrator.kick_coeffs)
+    cy_w = np.rollaxis(cy_w, -1)
+
+    integrator = Integrator(F)
+    orbit = integrator.run(py_w0, dt=dt, n_steps=n_steps)
+
+    assert orbit.w().shape == cy_w.shape
+    assert np.allclose(cy_w, orbit.w(), rtol=1E-12, atol=1E-12)
+    assert np.allclose(cy_t, orbit.t.value)
+
+    t_sub, w_sub = symplectic_integrate_hamiltonian(
+        H, cy_w0, t, Integrator.drift_coeffs, Integrator.kick_coeffs,
+        save_every=10)
+    assert np.array_equal(t_sub, t[::10])
+    assert np.array_equal(np.rollaxis(w_sub, -1), cy_w[:, ::10])
+
+    with pytest.raises(ValueError):
+        symplectic_integrate_hamiltonian(H, cy_w0, t, [0.5, 0.5], [0.5, 0.5])
+
+
+@pytest.mark.parametrize(("Integrator", "order"),
+                         [(LeapfrogIntegrator, 2),
+                          (ForestRuthIntegrator, 4),
+                          (PEFRLIntegrator, 4),
+                          (Yoshida6Integrator, 6)])
+def test_symplectic_order(Integrator, order):
+    # the energy error of the C implementations scales as dt^order
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.array([[10., 0., 0., 0., 0.15, 0.02],
+                   [0., 12., 0., -0.15, 0., 0.03]])
+
+    dE = []
+    for dt in [4., 2., 1.]:
+        t = np.arange(0, 2000. + dt/2, dt)
+        if Integrator == LeapfrogIntegrator:
+            _, w = leapfrog_integrate_hamiltonian(H, w0, t)
+        else:
+            _, w = symplectic_integrate_hamiltonian(
+                H, w0, t, Integrator.drift_coeffs, Integrator.kick_coeffs)
+        E = H.energy(np.rollaxis(w, -1)).value
+        dE.append(np.abs(E / E[0] - 1).max(axis=0))
+
+    measured = np.log2(np.array(dE[:-1]) / np.array(dE[1:]))
+    assert np.allclose(measured, order, atol=0.2)
+
+
 # TODO: move this to only run if a flag like --remote-data is passed, like
 # --speed-scaling or something?
 @pytest.mark.skipif(True, reason="Slow test - mainly for plotting locally")
@@ -105,3 +179,188 @@ def test_scaling(tmpdir, Integrator, integrate_func):
     # pl.tight_layout()
     # # pl.show()
     # pl.savefig(os.path.join(tmpdir, "integrate-scaling.png"), dpi=300)
+
+
+def test_dop853_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from ...potential import MilkyWayPotential
+
+    H = Hamiltonian(MilkyWayPotential())
+    t = np.linspace(0, 1000., 1001)
+
+    rng = np.random.default_rng(42)
+    w0s = [np.ascontiguousarray(
+        np.hstack((rng.uniform(5, 15, size=(4, 3)),
+                   rng.uniform(-0.2, 0.2, size=(4, 3)))))
+           for i in range(8)]
+
+    serial = [dop853_integrate_hamiltonian(H, w0, t)[1] for w0 in w0s]
+
+    # the integrator state is not shared, so concurrent integrations give
+    # identical results
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = list(pool.map(
+            lambda w0: dop853_integrate_hamiltonian(H, w0, t)[1], w0s))
+
+    for w1, w2 in zip(serial, threaded):
+        assert np.array_equal(w1, w2)
+
+
+def test_dop853_independent_steps():
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+
+    w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                   [10., 0., 0., 0., 0.2, 0.],
+                   [0.1, 0., 0., 0., 0.01, 0.]])
+    t = np.linspace(0, 1000., 101)
+
+    _, w = dop853_integrate_hamiltonian(H, w0, t, independent_steps=True)
+    assert w.shape == (101, 3, 6)
+
+    # each orbit is integrated as if it were integrated on its own
+    for i in range(len(w0)):
+        _, w_i = dop853_integrate_hamiltonian(
+            H, np.ascontiguousarray(w0[i:i+1]), t)
+        assert np.array_equal(w[:, i], w_i[:, 0])
+
+    orbit = H.integrate_orbit(w0.T, t=t, Integrator=DOPRI853Integrator,
+                              Integrator_kwargs=dict(independent_steps=True))
+    assert np.array_equal(orbit.w(galactic), np.moveaxis(w, -1, 0))
+
+
+@pytest.mark.parametrize("dense_output", [False, True])
+def test_dop853_output_times(dense_output):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+
+    w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                   [10., 0., 0., 0., 0.2, 0.]])
+
+    # unevenly spaced output times, integrating forwards and backwards
+    rng = np.random.default_rng(42)
+    t = np.sort(rng.uniform(0, 500., size=64))
+    t[0] = 0.
+
+    for tt in [t, -t]:
+        _, w = dop853_integrate_hamiltonian(H, w0, tt,
+                                            dense_output=dense_output)
+        assert w.shape == (len(tt), 2, 6)
+        assert np.array_equal(w[0], w0)
+
+        # compare to integrating to each output time separately
+        for j in [1, 17, 40, len(tt)-1]:
+            _, w_j = dop853_integrate_hamiltonian(H, w0, tt[[0, j]])
+            assert np.allclose(w[j], w_j[-1], rtol=1E-8, atol=1E-10)
+
+
+@pytest.mark.parametrize("independent_steps", [False, True])
+@pytest.mark.parametrize("dense_output", [False, True])
+def test_dop853_save_every(independent_steps, dense_output):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+
+    w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                   [10., 0., 0., 0., 0.2, 0.]])
+    t = np.linspace(0, 500., 101)
+    kw = dict(independent_steps=independent_steps, dense_output=dense_output)
+
+    _, w = dop853_integrate_hamiltonian(H, w0, t, **kw)
+
+    t_sub, w_sub = dop853_integrate_hamiltonian(H, w0, t, save_every=3, **kw)
+    assert np.array_equal(t_sub, t[::3])
+    assert np.array_equal(w_sub, w[::3])
+
+    t_final, w_final = dop853_integrate_hamiltonian(
+        H, w0, t, save_final_only=True, **kw)
+    assert np.array_equal(t_final, t[-1:])
+    assert w_final.shape == (1, 2, 6)
+    assert np.allclose(w_final[0], w[-1], rtol=1E-12, atol=1E-12)
+
+    with pytest.raises(ValueError):
+        dop853_integrate_hamiltonian(H, w0, t, save_every=0)
+
+
+@pytest.mark.parametrize(("integrate_func", "iter_func"),
+                         [(leapfrog_integrate_hamiltonian,
+                           leapfrog_integrate_hamiltonian_iter),
+                          (dop853_integrate_hamiltonian,
+                           dop853_integrate_hamiltonian_iter)])
+def test_integrate_iter(integrate_func, iter_func):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+
+    w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                   [10., 0., 0., 0., 0.2, 0.]])
+    t = np.linspace(0, 500., 101)
+
+    _, w = integrate_func(H, w0, t)
+
+    chunks = list(iter_func(H, w0, t, chunk_steps=25))
+    assert len(chunks) == 5
+    assert np.array_equal(np.concatenate([c[0] for c in chunks]), t)
+
+    # the integrator state is carried over between the chunks
+    assert np.array_equal(np.concatenate([c[1] for c in chunks]), w)
+
+    with pytest.raises(ValueError):
+        next(iter_func(H, w0, t, chunk_steps=0))
+
+
+@pytest.mark.parametrize("integrate_func", func_list)
+@pytest.mark.parametrize("save_every", [1, 4])
+def test_integrate_out(tmpdir, monkeypatch, integrate_func, save_every):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+
+    w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                   [10., 0., 0., 0., 0.2, 0.]])
+    t = np.linspace(0, 500., 101)
+
+    t_saved, w = integrate_func(H, w0, t, save_every=save_every)
+
+    filename = os.path.join(str(tmpdir), "test_out.dat")
+    mmap = np.memmap(filename, mode='w+', dtype=np.float64,
+                     shape=w.shape)
+    t_out, out = integrate_func(H, w0, t, save_every=save_every, out=mmap)
+    assert out is mmap
+    assert np.array_equal(t_out, t_saved)
+    assert np.array_equal(mmap, w)
+
+    # an output array that can't be written to directly is written to in
+    # blocks of times
+    monkeypatch.setattr(core, '_output_buffer_size', 5 * 2 * 6)
+    out = np.zeros(w.shape, dtype=np.float32)
+    integrate_func(H, w0, t, save_every=save_every, out=out)
+    assert np.allclose(out, w, rtol=1E-6)
+
+    _, final = integrate_func(H, w0, t, save_final_only=True)
+    out = np.zeros(final.shape, dtype=np.float32)
+    integrate_func(H, w0, t, save_final_only=True, out=out)
+    assert np.allclose(out, final, rtol=1E-6)
+
+    with pytest.raises(ValueError):
+        integrate_func(H, w0, t, out=np.zeros((10, 2, 6)))
+
+    mmap = np.memmap(filename, mode='r', dtype=np.float64,
+                     shape=w.shape)
+    with pytest.raises(TypeError):
+        integrate_func(H, w0, t, save_every=save_every, out=mmap)
+
+
+@pytest.mark.skipif(not HAS_H5PY, reason='h5py required for this test')
+@pytest.mark.parametrize("independent_steps", [False, True])
+def test_dop853_out_h5py(tmpdir, monkeypatch, independent_steps):
+    import h5py
+
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+
+    w0 = np.array([[0., 10., 0., 0.2, 0., 0.],
+                   [10., 0., 0., 0., 0.2, 0.]])
+    t = np.linspace(0, 500., 101)
+
+    _, w = dop853_integrate_hamiltonian(H, w0, t,
+                                        independent_steps=independent_steps)
+
+    monkeypatch.setattr(core, '_output_buffer_size', 7 * 2 * 6)
+    filename = os.path.join(str(tmpdir), "test_out.hdf5")
+    with h5py.File(filename, 'w') as f:
+        dset = f.create_dataset('w', shape=w.shape, dtype='f8')
+        dop853_integrate_hamiltonian(H, w0, t, out=dset,
+                                     independent_steps=independent_steps)
+        assert np.allclose(dset[:], w, rtol=1E-10, atol=1E-10)
@@ -8,11 +8,14 @@ import pytest
 import numpy as np
 
 # Project
-from .. import LeapfrogIntegrator, RK5Integrator, DOPRI853Integrator
+from .. import (LeapfrogIntegrator, RK5Integrator, DOPRI853Integrator,
+                ForestRuthIntegrator, PEFRLIntegrator, Yoshida6Integrator)
 from gala.tests.optional_deps import HAS_TQDM
 
 # Integrators to test
-integrator_list = [RK5Integrator, DOPRI853Integrator, LeapfrogIntegrator]
+symplectic_list = [ForestRuthIntegrator, PEFRLIntegrator, Yoshida6Integrator]
+integrator_list = [RK5Integrator, DOPRI853Integrator,
+                   LeapfrogIntegrator] + symplectic_list
 
 # Gradient functions:
 def sho_F(t, w, T): # noqa
@@ -62,6 +65,9 @@ def test_sho_forward_backward(Integrator):
     if Integrator == LeapfrogIntegrator:
         dt = 1E-4
         n_steps = int(1E4)
+    elif Integrator in symplectic_list:
+        dt = 5E-3
+        n_steps = 200
 
     forw = integrator.run([0., 1.], dt=dt, n_steps=n_steps)
     back = integrator.run([0., 1.], dt=-dt, n_steps=n_steps)
@@ -101,6 +107,39 @@ def test_point_mass_multiple(Integrator):
     _ = integrator.run(w0, dt=1E-3, n_steps=1E4)
 
 
+@pytest.mark.parametrize(("Integrator", "order"),
+                         [(LeapfrogIntegrator, 2),
+                          (ForestRuthIntegrator, 4),
+                          (PEFRLIntegrator, 4),
+                          (Yoshida6Integrator, 6)])
+def test_symplectic_order(Integrator, order):
+    # the energy error of a symplectic integrator is bounded and scales as
+    # dt^order
+    def energy_error(dt):
+        integrator = Integrator(ptmass_F)
+        orbit = integrator.run([1., 0., 0., 1.2], dt=dt, n_steps=int(20 / dt))
+        x, y, px, py = orbit.w()
+        E = 0.5 * (px**2 + py**2) - 1 / np.sqrt(x**2 + y**2)
+        return np.abs(E / E[0] - 1).max()
+
+    ratio = energy_error(0.04) / energy_error(0.02)
+    assert 0.7 * 2**order < ratio < 1.3 * 2**order
+
+
+def test_dopri853_independent_steps():
+    w0 = np.array([[1.0, 0.0, 0.0, 1.],
+                   [0.8, 0.0, 0.0, 1.1],
+                   [2., 1.0, -1.0, 1.1]]).T
+
+    integrator = DOPRI853Integrator(ptmass_F, independent_steps=True)
+    orbit = integrator.run(w0, dt=1E-2, n_steps=100)
+
+    for i in range(w0.shape[1]):
+        integrator = DOPRI853Integrator(ptmass_F)
+        orbit_i = integrator.run(w0[:, i:i+1], dt=1E-2, n_steps=100)
+        assert np.allclose(orbit.xyz[..., i].value, orbit_i.xyz.value)
+
+
 @pytest.mark.parametrize("Integrator", integrator_list)
 def test_driven_pendulum(Integrator):
     integrator = Integrator(forced_sho_F, func_args=(0.07, 0.75))
@@ -52,6 +52,8 @@ cdef class StaticFrameWrapper(CFrameWrapper):
     def __init__(self):
         cdef CFrame cf
 
+        self._params = np.array([], dtype=np.float64)
+
         cf.energy = <energyfunc>(static_frame_hamiltonian)
         cf.gradient = <gradientfunc>(static_frame_gradient)
         cf.hessian = <hessianfunc>(static_frame_hessian)
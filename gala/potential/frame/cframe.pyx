@@ -81,6 +81,9 @@ cdef class CFrameWrapper:
 
         return np.array(d2H)
 
+    def __reduce__(self):
+        return (self.__class__, tuple(np.array(self._params)))
+
 
 class CFrameBase(FrameBase):
     Wrapper = None
@@ -1,5 +1,9 @@
+# Standard library
+import pickle
+
 # Third-party
 import astropy.units as u
+import numpy as np
 import pytest
 
 # Project
@@ -23,6 +27,11 @@ class TestStaticFrame(object):
         fr2 = StaticFrame()
         assert fr1 != fr2
 
+    def test_pickle(self):
+        fr = StaticFrame(galactic)
+        fr2 = pickle.loads(pickle.dumps(fr))
+        assert fr2 == fr
+
 
 class TestConstantRotatingFrame(object):
 
@@ -61,3 +70,14 @@ class TestConstantRotatingFrame(object):
 
         st_fr = StaticFrame(DimensionlessUnitSystem())
         assert st_fr != fr1
+
+    @pytest.mark.parametrize("Omega", [[-13., 1., 40.]*u.km/u.s/u.kpc,
+                                       40.*u.km/u.s/u.kpc])
+    def test_pickle(self, Omega):
+        fr = ConstantRotatingFrame(Omega=Omega, units=galactic)
+        fr2 = pickle.loads(pickle.dumps(fr))
+        assert fr2 == fr
+
+        w = np.random.random((4, 2*fr.ndim))
+        t = np.array([0.])
+        assert np.array_equal(fr2._gradient(w, t), fr._gradient(w, t))
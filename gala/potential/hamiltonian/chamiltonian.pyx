@@ -11,7 +11,8 @@ import astropy.units as u
 from ..common import CommonBase
 from ..potential import PotentialBase, CPotentialBase
 from ..frame import FrameBase, CFrameBase, StaticFrame
-from ...integrate import LeapfrogIntegrator, DOPRI853Integrator
+from ...integrate import (LeapfrogIntegrator, DOPRI853Integrator,
+                          SymplecticCompositionIntegrator)
 from ...dynamics import PhaseSpacePosition, Orbit
 
 __all__ = ["Hamiltonian"]
@@ -97,6 +98,20 @@ class Hamiltonian(CommonBase):
 
         return dH
 
+    def _energy_and_gradient(self, w, t):
+        q = np.ascontiguousarray(w[:, :self._pot_ndim])
+        pot_E, pot_grad = self.potential._energy_and_gradient(q, t=t)
+
+        dH = np.zeros_like(w)
+
+        # extra terms from the frame
+        dH += self.frame._gradient(w, t=t)
+        dH[:, self._pot_ndim:] += pot_grad
+        for i in range(self._pot_ndim):
+            dH[:, self._pot_ndim+i] = -dH[:, self._pot_ndim+i]
+
+        return pot_E + self.frame._energy(w, t=t), dH
+
     def _hessian(self, w, t):
         raise NotImplementedError()
 
@@ -152,6 +167,37 @@ class Hamiltonian(CommonBase):
         # ret_unit = self.units['length'] / self.units['time']**2
         return self._gradient(w, t=t).T.reshape(orig_shape)
 
+    def energy_and_gradient(self, w, t=0.):
+        """
+        Compute the energy (the value of the Hamiltonian) and the gradient of
+        the Hamiltonian at the given phase-space position(s) in a single pass.
+
+        Parameters
+        ----------
+        w : `~gala.dynamics.PhaseSpacePosition`, array_like
+            The phase-space position to compute the value of the Hamiltonian.
+            If the input object has no units (i.e. is an `~numpy.ndarray`), it
+            is assumed to be in the same unit system as the potential class.
+
+        Returns
+        -------
+        H : `~astropy.units.Quantity`
+            Energy per unit mass or value of the Hamiltonian. If the input
+            phase-space position has shape ``w.shape``, the output energy
+            will have shape ``w.shape[1:]``.
+        grad : `~numpy.ndarray`
+            The gradient of the Hamiltonian (see
+            `~gala.potential.Hamiltonian.gradient`). Will have the same shape
+            as the input phase-space position, ``w``.
+        """
+        w = self._remove_units_prepare_shape(w)
+        orig_shape, w = self._get_c_valid_arr(w)
+        t = self._validate_prepare_time(t, w)
+
+        H, dH = self._energy_and_gradient(w, t=t)
+        return (H.T.reshape(orig_shape[1:]) * self.units['energy'] / self.units['mass'],
+                dH.T.reshape(orig_shape))
+
     def hessian(self, w, t=0.):
         """
         Compute the Hessian of the Hamiltonian at the given phase-space position(s).
@@ -244,7 +290,8 @@ class Hamiltonian(CommonBase):
 
     def integrate_orbit(self, w0, Integrator=None,
                         Integrator_kwargs=dict(), cython_if_possible=True,
-                        **time_spec):
+                        save_every=1, save_final_only=False, out=None,
+                        n_workers=None, pool='thread', **time_spec):
         """
         Integrate an orbit in the current potential using the integrator class
         provided. Uses same time specification as `Integrator.run()` -- see
@@ -257,14 +304,48 @@ class Hamiltonian(CommonBase):
         Integrator : `~gala.integrate.Integrator` (optional)
             Integrator class to use. By default, uses
             `~gala.integrate.LeapfrogIntegrator` if the frame is static and
-            `~gala.integrate.DOPRI853Integrator` else.
+            `~gala.integrate.DOPRI853Integrator` else. In Cython mode, the
+            higher-order symplectic integrators (subclasses of
+            `~gala.integrate.SymplecticCompositionIntegrator`) are also
+            supported.
         Integrator_kwargs : dict (optional)
             Any extra keyword argumets to pass to the integrator class
-            when initializing. Only works in non-Cython mode.
+            when initializing. In Cython mode, only ``atol``, ``rtol``,
+            ``nmax``, ``progress``, ``independent_steps``, and
+            ``dense_output`` are used by `~gala.integrate.DOPRI853Integrator`.
         cython_if_possible : bool (optional)
             If there is a Cython version of the integrator implemented,
             and the potential object has a C instance, using Cython
             will be *much* faster.
+        save_every : int (optional)
+            Only store the orbits at every ``save_every`` time step (i.e. at
+            the times ``t[::save_every]``). In Cython mode, this reduces the
+            memory used by the integration.
+        save_final_only : bool (optional)
+            Only return the final phase-space positions of the orbits. In
+            Cython mode, the orbits are then not stored during the
+            integration.
+        out : array_like (optional)
+            An array to write the orbits to instead of returning them, e.g., a
+            writable `numpy.memmap` or an ``h5py`` dataset, with shape
+            ``(ntimes, norbits, 2*ndim)`` (note the order of the axes), where
+            ``ntimes`` is the number of stored times and ``norbits`` is 1 for
+            a single orbit. In Cython mode, the orbits are written to ``out``
+            directly if it is a writable, C-contiguous array of doubles, and
+            in blocks of time steps otherwise, so that the full orbits are
+            never stored in memory.
+        n_workers : int (optional)
+            In Cython mode, split the orbits into chunks and integrate them in
+            parallel with this many workers.
+        pool : str (optional)
+            The kind of pool of workers used if ``n_workers > 1``: either
+            ``'thread'`` (the default, the C integrators run without the GIL)
+            or ``'process'``. With a pool of processes, the orbits are written
+            to shared memory, so they are never pickled, and ``out`` is not
+            supported. The processes are not forked from the current process
+            (so scripts must be importable, e.g., with an
+            ``if __name__ == '__main__':`` guard), and each uses a single
+            OpenMP thread.
         **time_spec
             Specification of how long to integrate. Most commonly, this is a
             timestep ``dt`` and number of steps ``n_steps``, or a timestep
@@ -274,10 +355,124 @@ class Hamiltonian(CommonBase):
 
         Returns
         -------
-        orbit : `~gala.dynamics.Orbit`
+        orbit : `~gala.dynamics.Orbit`, `~gala.dynamics.PhaseSpacePosition`
+            The orbits, or the final phase-space positions if
+            ``save_final_only=True``. If ``out`` is specified, ``out`` is
+            returned instead.
 
         """
 
+        Integrator, arr_w0 = self._prepare_integration(w0, Integrator)
+
+        if self.c_enabled and cython_if_possible:
+            # array of times
+            from ...integrate.timespec import parse_time_specification
+            t = np.ascontiguousarray(parse_time_specification(self.units, **time_spec))
+
+            if n_workers is not None and n_workers > 1:
+                from .parallel import integrate_parallel
+                t, w = integrate_parallel(self, arr_w0, t, Integrator,
+                                          Integrator_kwargs, save_every,
+                                          save_final_only, out, n_workers,
+                                          pool)
+            else:
+                t, w = self._integrate_c(arr_w0, t, Integrator,
+                                         Integrator_kwargs, save_every,
+                                         save_final_only, out)
+
+            if out is not None:
+                return out
+
+            # because shape is different from normal integrator return
+            w = np.rollaxis(w, -1)
+            if w.shape[-1] == 1:
+                w = w[..., 0]
+
+        elif n_workers is not None and n_workers > 1:
+            raise ValueError("Parallel integration with n_workers > 1 is "
+                             "only supported with the Cython integrators.")
+
+        else:
+            def F(t, w):
+                # TODO: these Transposes are shitty and probably make it much slower?
+                w_T = np.ascontiguousarray(w.T)
+                return self._gradient(w_T, t=np.array([t])).T
+            integrator = Integrator(F, func_units=self.units, **Integrator_kwargs)
+            orbit = integrator.run(arr_w0.T, **time_spec)
+            orbit.potential = self.potential
+            orbit.frame = self.frame
+
+            if save_final_only:
+                orbit = orbit[-1:]
+            else:
+                orbit = orbit[::save_every]
+
+            if out is not None:
+                from ...integrate.core import _prepare_output_array
+
+                w = orbit.w(self.units)
+                if w.ndim == 2:
+                    w = w[..., None]
+                w = np.transpose(w, (1, 2, 0))
+
+                _prepare_output_array(out, w.shape)
+                out[...] = w
+                return out
+
+            if save_final_only:
+                return orbit[-1]
+            return orbit
+
+        try:
+            tunit = self.units['time']
+        except (TypeError, AttributeError):
+            tunit = u.dimensionless_unscaled
+        orbit = Orbit.from_w(w=w, units=self.units, t=t*tunit,
+                             hamiltonian=self)
+
+        if save_final_only:
+            return orbit[-1]
+        return orbit
+
+    def _integrate_c(self, arr_w0, t, Integrator, Integrator_kwargs,
+                     save_every, save_final_only, out):
+        """
+        Integrate the orbits with the C implementation of the integrator,
+        and return the times and the orbits (with axes (ntimes, norbits,
+        ndim)).
+        """
+        if Integrator == LeapfrogIntegrator:
+            from ...integrate.cyintegrators import leapfrog_integrate_hamiltonian
+            return leapfrog_integrate_hamiltonian(
+                self, arr_w0, t, save_every=save_every,
+                save_final_only=save_final_only, out=out)
+
+        elif Integrator == DOPRI853Integrator:
+            from ...integrate.cyintegrators import dop853_integrate_hamiltonian
+            return dop853_integrate_hamiltonian(self, arr_w0, t,
+                                                Integrator_kwargs.get('atol', 1E-10),
+                                                Integrator_kwargs.get('rtol', 1E-10),
+                                                Integrator_kwargs.get('nmax', 0),
+                                                Integrator_kwargs.get('progress', False),
+                                                Integrator_kwargs.get('independent_steps', False),
+                                                Integrator_kwargs.get('dense_output', False),
+                                                save_every, save_final_only, out)
+
+        elif (isinstance(Integrator, type) and
+                issubclass(Integrator, SymplecticCompositionIntegrator)):
+            from ...integrate.cyintegrators import symplectic_integrate_hamiltonian
+            return symplectic_integrate_hamiltonian(
+                self, arr_w0, t, Integrator.drift_coeffs,
+                Integrator.kick_coeffs, save_every=save_every,
+                save_final_only=save_final_only, out=out)
+
+        raise ValueError("Cython integration not supported for '{}'".format(Integrator))
+
+    def _prepare_integration(self, w0, Integrator):
+        """
+        Choose the default integrator and convert the initial conditions to a
+        C-contiguous array with shape ``(norbits, ndim)``.
+        """
         if Integrator is None and isinstance(self.frame, StaticFrame):
             Integrator = LeapfrogIntegrator
         elif Integrator is None:
@@ -286,63 +481,160 @@ class Hamiltonian(CommonBase):
             # use the Integrator provided
             pass
 
-        if (Integrator == LeapfrogIntegrator and
-                not isinstance(self.frame, StaticFrame)):
-            warnings.warn("Using leapfrog integration with non-static frames "
-                          "can lead to wildly incorrect orbits. It is "
-                          "recommended that you use DOPRI853Integrator "
-                          "instead.", RuntimeWarning)
+        symplectic = (Integrator == LeapfrogIntegrator or
+                      (isinstance(Integrator, type) and
+                       issubclass(Integrator, SymplecticCompositionIntegrator)))
+        if symplectic and not isinstance(self.frame, StaticFrame):
+            warnings.warn("Using leapfrog or other symplectic integration with "
+                          "non-static frames can lead to wildly incorrect "
+                          "orbits. It is recommended that you use "
+                          "DOPRI853Integrator instead.", RuntimeWarning)
 
         if not isinstance(w0, PhaseSpacePosition):
             w0 = np.asarray(w0)
             ndim = w0.shape[0]//2
             w0 = PhaseSpacePosition(pos=w0[:ndim], vel=w0[ndim:])
 
-        ndim = w0.ndim
         arr_w0 = w0.w(self.units)
         arr_w0 = self._remove_units_prepare_shape(arr_w0)
         orig_shape, arr_w0 = self._get_c_valid_arr(arr_w0)
 
-        if self.c_enabled and cython_if_possible:
-            # array of times
-            from ...integrate.timespec import parse_time_specification
-            t = np.ascontiguousarray(parse_time_specification(self.units, **time_spec))
+        return Integrator, arr_w0
+
+    def _symplectic_iter(self, arr_w0, t, Integrator, chunk_steps):
+        """
+        Yield chunks of orbits integrated with the C implementation of a
+        symplectic composition integrator. The positions and velocities are
+        synchronized at the end of each step, so each chunk is integrated from
+        the last time of the previous chunk.
+        """
+        from ...integrate.cyintegrators import symplectic_integrate_hamiltonian
+
+        if chunk_steps < 1:
+            raise ValueError("chunk_steps must be a positive integer.")
+
+        w = arr_w0
+        for start in range(0, len(t), chunk_steps):
+            stop = min(start + chunk_steps, len(t))
+            first = max(start - 1, 0)
+            t_chunk, all_w = symplectic_integrate_hamiltonian(
+                self, w, t[first:stop], Integrator.drift_coeffs,
+                Integrator.kick_coeffs)
+            w = np.ascontiguousarray(all_w[-1])
+            yield t_chunk[start-first:], all_w[start-first:]
+
+    def integrate_orbit_iter(self, w0, Integrator=None,
+                             Integrator_kwargs=dict(), cython_if_possible=True,
+                             chunk_steps=1000, **time_spec):
+        """
+        Integrate orbits in the current potential, and yield the orbits in
+        successive chunks of time steps, so that the full orbits are never
+        stored in memory (e.g., to accumulate time-averaged quantities over
+        very long integrations).
+
+        In Cython mode, the state of the integrator is carried over between
+        chunks: the leapfrog half-step velocities (so the chunks are identical
+        to the corresponding parts of an orbit from
+        `~gala.potential.Hamiltonian.integrate_orbit`, as they are for the
+        other symplectic integrators), and the step size of the DOP853
+        integrator. Otherwise, the integrator is restarted from the end of the
+        previous chunk.
 
+        Parameters
+        ----------
+        w0 : `~gala.dynamics.PhaseSpacePosition`, array_like
+            Initial conditions.
+        Integrator : `~gala.integrate.Integrator` (optional)
+            Integrator class to use (see
+            `~gala.potential.Hamiltonian.integrate_orbit`).
+        Integrator_kwargs : dict (optional)
+            Any extra keyword argumets to pass to the integrator class
+            when initializing. In Cython mode, only ``atol``, ``rtol``,
+            ``nmax``, ``independent_steps``, and ``dense_output`` are used by
+            `~gala.integrate.DOPRI853Integrator`.
+        cython_if_possible : bool (optional)
+            If there is a Cython version of the integrator implemented,
+            and the potential object has a C instance, using Cython
+            will be *much* faster.
+        chunk_steps : int (optional)
+            The (maximum) number of times in each chunk.
+        **time_spec
+            Specification of how long to integrate. See documentation for
+            `~gala.integrate.parse_time_specification`.
+
+        Yields
+        ------
+        orbit : `~gala.dynamics.Orbit`
+            The orbits at (at most) ``chunk_steps`` successive times.
+
+        """
+        Integrator, arr_w0 = self._prepare_integration(w0, Integrator)
+
+        from ...integrate.timespec import parse_time_specification
+        t = np.ascontiguousarray(parse_time_specification(self.units, **time_spec))
+
+        try:
+            tunit = self.units['time']
+        except (TypeError, AttributeError):
+            tunit = u.dimensionless_unscaled
+
+        if self.c_enabled and cython_if_possible:
             if Integrator == LeapfrogIntegrator:
-                from ...integrate.cyintegrators import leapfrog_integrate_hamiltonian
-                t, w = leapfrog_integrate_hamiltonian(self, arr_w0, t)
+                from ...integrate.cyintegrators import leapfrog_integrate_hamiltonian_iter
+                chunks = leapfrog_integrate_hamiltonian_iter(self, arr_w0, t,
+                                                             chunk_steps)
 
             elif Integrator == DOPRI853Integrator:
-                from ...integrate.cyintegrators import dop853_integrate_hamiltonian
-                t, w = dop853_integrate_hamiltonian(self, arr_w0, t,
-                                                   Integrator_kwargs.get('atol', 1E-10),
-                                                   Integrator_kwargs.get('rtol', 1E-10),
-                                                   Integrator_kwargs.get('nmax', 0),
-                                                   Integrator_kwargs.get('progress', False))
+                from ...integrate.cyintegrators import dop853_integrate_hamiltonian_iter
+                chunks = dop853_integrate_hamiltonian_iter(
+                    self, arr_w0, t, chunk_steps,
+                    Integrator_kwargs.get('atol', 1E-10),
+                    Integrator_kwargs.get('rtol', 1E-10),
+                    Integrator_kwargs.get('nmax', 0),
+                    Integrator_kwargs.get('independent_steps', False),
+                    Integrator_kwargs.get('dense_output', False))
+
+            elif issubclass(Integrator, SymplecticCompositionIntegrator):
+                chunks = self._symplectic_iter(arr_w0, t, Integrator,
+                                               chunk_steps)
+
             else:
                 raise ValueError("Cython integration not supported for '{}'".format(Integrator))
 
-            # because shape is different from normal integrator return
-            w = np.rollaxis(w, -1)
-            if w.shape[-1] == 1:
-                w = w[..., 0]
+            for t_chunk, w in chunks:
+                # because shape is different from normal integrator return
+                w = np.rollaxis(w, -1)
+                if w.shape[-1] == 1:
+                    w = w[..., 0]
+
+                yield Orbit.from_w(w=w, units=self.units, t=t_chunk*tunit,
+                                   hamiltonian=self)
 
         else:
+            if chunk_steps < 1:
+                raise ValueError("chunk_steps must be a positive integer.")
+
             def F(t, w):
-                # TODO: these Transposes are shitty and probably make it much slower?
                 w_T = np.ascontiguousarray(w.T)
                 return self._gradient(w_T, t=np.array([t])).T
             integrator = Integrator(F, func_units=self.units, **Integrator_kwargs)
-            orbit = integrator.run(arr_w0.T, **time_spec)
-            orbit.potential = self.potential
-            orbit.frame = self.frame
-            return orbit
 
-        try:
-            tunit = self.units['time']
-        except (TypeError, AttributeError):
-            tunit = u.dimensionless_unscaled
-        return Orbit.from_w(w=w, units=self.units, t=t*tunit, hamiltonian=self)
+            w = arr_w0.T
+            for start in range(0, len(t), chunk_steps):
+                stop = min(start + chunk_steps, len(t))
+
+                # each chunk is integrated from the last time of the previous
+                # chunk, and the integrators need at least two times (for a
+                # first chunk with a single time)
+                first = max(start - 1, 0)
+                end = max(stop, min(first + 2, len(t)))
+                orbit = integrator.run(w, t=t[first:end])
+                w = orbit.w(self.units)[:, stop-1-first]
+
+                orbit = orbit[start-first:stop-first]
+                orbit.potential = self.potential
+                orbit.frame = self.frame
+                yield orbit
 
     # def save(self, f):
     #     """
@@ -0,0 +1,172 @@
+""" Parallel orbit integration with a pool of threads or processes. """
+
+# Standard library
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+
+# Third-party
+import numpy as np
+
+__all__ = ['integrate_parallel']
+
+# the arguments shared by all chunks of orbits, set once in each process
+_worker_args = None
+
+
+class _OrbitSlice:
+    """
+    The orbits ``start:stop`` of an output array with axes (ntimes, norbits,
+    ndim), which the C integrators write to in blocks of times.
+    """
+
+    def __init__(self, out, start, stop):
+        self.out = out
+        self.start = start
+        self.stop = stop
+        self.shape = (out.shape[0], stop - start, out.shape[2])
+
+    def __setitem__(self, key, value):
+        self.out[key, self.start:self.stop] = value
+
+
+def _init_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+    # the workers already run in parallel, so each uses a single OpenMP thread
+    from ..potential.cpotential import set_num_threads
+    set_num_threads(1)
+
+
+def _mp_context():
+    """
+    The multiprocessing context for the pool of processes. Forked processes
+    can deadlock if the parent process has already used OpenMP (e.g., with
+    `~gala.potential.set_num_threads`), so the workers are started from a
+    fresh process instead.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _integrate_chunk(w0, shape, offset):
+    """
+    Integrate a chunk of orbits in a worker process, and write the orbits to
+    the shared memory block, starting ``offset`` bytes from its start.
+    """
+    (hamiltonian, t, Integrator, Integrator_kwargs,
+     save_every, save_final_only, shm_name) = _worker_args
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float64, buffer=shm.buf,
+                         offset=offset)
+        hamiltonian._integrate_c(w0, t, Integrator, Integrator_kwargs,
+                                 save_every, save_final_only, out)
+        del out
+    finally:
+        shm.close()
+
+
+def integrate_parallel(hamiltonian, w0, t, Integrator, Integrator_kwargs,
+                       save_every, save_final_only, out, n_workers,
+                       pool='thread'):
+    """
+    Integrate orbits with the C implementation of the integrator, splitting
+    the initial conditions ``w0`` (with axes (norbits, ndim)) into chunks
+    that are integrated in parallel with a pool of ``n_workers`` threads or
+    processes.
+
+    The orbits of each chunk are written directly to their own contiguous
+    block of a single output array, which is in shared memory for a pool of
+    processes. The orbits are then returned as for the serial integration,
+    with axes (ntimes, norbits, ndim), or written to ``out``.
+    """
+    if pool not in ['thread', 'process']:
+        raise ValueError("Invalid pool '{}': must be 'thread' or 'process'."
+                         .format(pool))
+
+    if pool == 'process' and out is not None:
+        raise ValueError("Writing the orbits to an output array is not "
+                         "supported with a pool of processes.")
+
+    norbits, ndim = w0.shape
+    if save_final_only:
+        t_saved = t[-1:]
+    else:
+        t_saved = t[::save_every]
+    nsaved = len(t_saved)
+
+    if out is not None:
+        from ...integrate.core import _prepare_output_array
+        _prepare_output_array(out, (nsaved, norbits, ndim))
+
+    # the progress of the individual chunks is not reported
+    Integrator_kwargs = {k: v for k, v in Integrator_kwargs.items()
+                         if k != 'progress'}
+
+    # use a few chunks per worker to balance the load
+    n_chunks = max(1, min(norbits, 4 * n_workers))
+    bounds = np.linspace(0, norbits, n_chunks + 1).astype(int)
+    chunks = [(i, j) for i, j in zip(bounds[:-1], bounds[1:]) if j > i]
+
+    # offsets of the chunks in the output array, in numbers of values
+    offsets = [nsaved * i * ndim for i, _ in chunks]
+    size = nsaved * norbits * ndim
+
+    def gather(buf):
+        return np.concatenate([buf[offset:offset + nsaved*(j-i)*ndim]
+                               .reshape(nsaved, j-i, ndim)
+                               for (i, j), offset in zip(chunks, offsets)],
+                              axis=1)
+
+    if pool == 'thread':
+        buf = np.empty(size)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = []
+            for (i, j), offset in zip(chunks, offsets):
+                if out is not None:
+                    chunk_out = _OrbitSlice(out, i, j)
+                else:
+                    chunk_out = buf[offset:offset + nsaved*(j-i)*ndim]
+                    chunk_out = chunk_out.reshape(nsaved, j-i, ndim)
+
+                futures.append(executor.submit(
+                    hamiltonian._integrate_c, w0[i:j], t, Integrator,
+                    Integrator_kwargs, save_every, save_final_only,
+                    chunk_out))
+
+            for future in futures:
+                future.result()
+
+        if out is not None:
+            return t_saved, out
+        return t_saved, gather(buf)
+
+    shm = shared_memory.SharedMemory(create=True, size=8 * max(size, 1))
+    try:
+        initargs = (hamiltonian, t, Integrator, Integrator_kwargs,
+                    save_every, save_final_only, shm.name)
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 mp_context=_mp_context(),
+                                 initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            futures = [executor.submit(_integrate_chunk,
+                                       np.ascontiguousarray(w0[i:j]),
+                                       (nsaved, j-i, ndim), 8 * offset)
+                       for (i, j), offset in zip(chunks, offsets)]
+
+            for future in futures:
+                future.result()
+
+        buf = np.ndarray(size, dtype=np.float64, buffer=shm.buf)
+        w = gather(buf)
+        del buf
+
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return t_saved, w
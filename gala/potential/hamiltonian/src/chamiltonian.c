@@ -33,6 +33,47 @@ void hamiltonian_gradient(CPotential *p, CFrame *fr, double t, double *qp, doubl
     }
 }
 
+void hamiltonian_gradient_batch(CPotential *p, CFrame *fr, double t, double *w,
+                                int n_points, double *dH) {
+    /*
+        Same as hamiltonian_gradient(), but for a contiguous block of
+        phase-space positions with shape (n_points, 2*n_dim). The positions
+        are gathered so the potential gradient can use the batched kernels.
+    */
+    int i, j, k, n, start;
+    int n_dim = p->n_dim;
+    double q[C_BATCH_SIZE * n_dim];
+    double grad[C_BATCH_SIZE * n_dim];
+
+    for (start=0; start < n_points; start+=C_BATCH_SIZE) {
+        n = n_points - start;
+        if (n > C_BATCH_SIZE)
+            n = C_BATCH_SIZE;
+
+        for (k=0; k < n; k++) {
+            for (j=0; j < n_dim; j++)
+                q[k*n_dim + j] = w[(start+k)*2*n_dim + j];
+        }
+
+        // potential gradient has to be first
+        c_gradient_batch(p, t, &q[0], n, &grad[0]);
+
+        for (k=0; k < n; k++) {
+            i = (start+k) * 2*n_dim;
+            for (j=0; j < n_dim; j++) {
+                dH[i + j] = 0.;
+                dH[i + n_dim + j] = grad[k*n_dim + j];
+            }
+
+            (fr->gradient)(t, (fr->parameters), &w[i], n_dim, &dH[i]);
+
+            for (j=n_dim; j < 2*n_dim; j++) {
+                dH[i + j] = -dH[i + j]; // pdot = -dH/dq
+            }
+        }
+    }
+}
+
 void hamiltonian_hessian(CPotential *p, CFrame *fr, double t, double *qp, double *d2H) {
     int i;
 
@@ -3,4 +3,5 @@
 
 extern double hamiltonian_value(CPotential *p, CFrame *fr, double t, double *q);
 extern void hamiltonian_gradient(CPotential *p, CFrame *fr, double t, double *q, double *grad);
+extern void hamiltonian_gradient_batch(CPotential *p, CFrame *fr, double t, double *w, int n_points, double *grad);
 extern void hamiltonian_hessian(CPotential *p, CFrame *fr, double t, double *q, double *hess);
@@ -115,6 +115,19 @@ class _TestBase(object):
             self.obj.gradient(arr, t=t)
             self.obj.gradient(arr, t=0.1*self.obj.units['time'])
 
+    def test_energy_and_gradient(self):
+        for arr, eshp, gshp in zip(self.w0s, self.energy_return_shapes,
+                                   self.gradient_return_shapes):
+            if self.E_unit.is_equivalent(u.one) and hasattr(arr, 'pos') and \
+                    not arr.xyz.unit.is_equivalent(u.one):
+                continue
+
+            E, grad = self.obj.energy_and_gradient(arr, t=0.1)
+            assert E.shape == eshp
+            assert grad.shape == gshp
+            assert u.allclose(E, self.obj.energy(arr, t=0.1))
+            assert np.allclose(grad, self.obj.gradient(arr, t=0.1))
+
     def test_hessian(self):
         for arr, shp in zip(self.w0s, self.hessian_return_shapes):
             if self.E_unit.is_equivalent(u.one) and hasattr(arr, 'pos') and \
@@ -1,10 +1,17 @@
+# Standard library
+import os
+
 # Third-party
 import astropy.units as u
+import numpy as np
 import pytest
 
 # Project
 from .. import Hamiltonian
-from ...potential.builtin import KeplerPotential
+from ...potential.builtin import KeplerPotential, HernquistPotential
+from ....dynamics import Orbit, PhaseSpacePosition
+from ....integrate import (LeapfrogIntegrator, DOPRI853Integrator,
+                           PEFRLIntegrator)
 from ...frame.builtin import StaticFrame, ConstantRotatingFrame
 from ....units import solarsystem, galactic
 
@@ -35,3 +42,182 @@ def test_init():
     f = ConstantRotatingFrame(Omega=1./u.yr, units=solarsystem)
     with pytest.raises(ValueError):
         H = Hamiltonian(potential=p, frame=f)
+
+
+@pytest.mark.parametrize("Integrator", [LeapfrogIntegrator,
+                                        DOPRI853Integrator,
+                                        PEFRLIntegrator])
+@pytest.mark.parametrize("cython_if_possible", [True, False])
+def test_integrate_orbit_save(Integrator, cython_if_possible):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.array([[10., 8.], [0, 1.], [0, 0.5],
+                   [0, 0.05], [0.15, 0.2], [0, 0.001]])
+    kw = dict(dt=1., n_steps=100, Integrator=Integrator,
+              cython_if_possible=cython_if_possible)
+
+    orbit = H.integrate_orbit(w0, **kw)
+
+    sub = H.integrate_orbit(w0, save_every=7, **kw)
+    assert isinstance(sub, Orbit)
+    assert sub.shape == (15, 2)
+    assert u.allclose(sub.t, orbit.t[::7])
+    assert u.allclose(sub.xyz, orbit.xyz[:, ::7], rtol=1e-10)
+    assert u.allclose(sub.v_xyz, orbit.v_xyz[:, ::7], rtol=1e-10)
+
+    final = H.integrate_orbit(w0, save_final_only=True, **kw)
+    assert isinstance(final, PhaseSpacePosition)
+    assert final.shape == (2, )
+    assert u.allclose(final.xyz, orbit[-1].xyz, rtol=1e-10)
+    assert u.allclose(final.v_xyz, orbit[-1].v_xyz, rtol=1e-10)
+
+    # a single orbit
+    final = H.integrate_orbit(w0[:, 0], save_final_only=True, **kw)
+    assert final.shape == ()
+    assert u.allclose(final.xyz, orbit[-1, 0].xyz, rtol=1e-10)
+
+
+@pytest.mark.parametrize("Integrator", [LeapfrogIntegrator,
+                                        DOPRI853Integrator])
+@pytest.mark.parametrize("cython_if_possible", [True, False])
+def test_integrate_orbit_out(tmpdir, Integrator, cython_if_possible):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.array([[10., 8.], [0, 1.], [0, 0.5],
+                   [0, 0.05], [0.15, 0.2], [0, 0.001]])
+    kw = dict(dt=1., n_steps=100, Integrator=Integrator,
+              cython_if_possible=cython_if_possible)
+
+    orbit = H.integrate_orbit(w0, save_every=5, **kw)
+
+    filename = os.path.join(str(tmpdir), "test_out.dat")
+    mmap = np.memmap(filename, mode='w+', dtype=np.float64,
+                     shape=(21, 2, 6))
+    out = H.integrate_orbit(w0, save_every=5, out=mmap, **kw)
+    assert out is mmap
+    assert np.allclose(np.moveaxis(mmap, -1, 0), orbit.w(galactic),
+                       rtol=1e-10)
+
+    # a single orbit
+    mmap = np.memmap(filename, mode='w+', dtype=np.float64,
+                     shape=(1, 1, 6))
+    H.integrate_orbit(w0[:, 0], save_final_only=True, out=mmap, **kw)
+    assert np.allclose(mmap[0, 0], orbit[-1, 0].w(galactic)[:, 0], rtol=1e-10)
+
+    with pytest.raises(ValueError):
+        H.integrate_orbit(w0, out=mmap, **kw)
+
+
+@pytest.mark.parametrize(("Integrator", "Integrator_kwargs"),
+                         [(LeapfrogIntegrator, dict()),
+                          (DOPRI853Integrator, dict()),
+                          (DOPRI853Integrator, dict(independent_steps=True))])
+@pytest.mark.parametrize("pool", ['thread', 'process'])
+def test_integrate_orbit_parallel(Integrator, Integrator_kwargs, pool):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.random.RandomState(42).uniform(1, 10, size=(6, 11))
+    w0[3:] *= 0.02
+    kw = dict(dt=1., n_steps=100, Integrator=Integrator,
+              Integrator_kwargs=Integrator_kwargs)
+
+    orbit = H.integrate_orbit(w0, **kw)
+    par_orbit = H.integrate_orbit(w0, n_workers=2, pool=pool, **kw)
+    assert par_orbit.shape == orbit.shape
+    assert u.allclose(par_orbit.t, orbit.t)
+
+    if Integrator == DOPRI853Integrator and not Integrator_kwargs:
+        # the step size is shared by the orbits of each chunk
+        assert u.allclose(par_orbit.xyz, orbit.xyz, atol=1e-6*u.kpc)
+    else:
+        assert np.array_equal(par_orbit.xyz.value, orbit.xyz.value)
+        assert np.array_equal(par_orbit.v_xyz.value, orbit.v_xyz.value)
+
+    final = H.integrate_orbit(w0, n_workers=3, pool=pool,
+                              save_final_only=True, **kw)
+    assert final.shape == (11, )
+    assert u.allclose(final.xyz, par_orbit[-1].xyz, atol=1e-6*u.kpc)
+
+
+def test_integrate_orbit_parallel_after_openmp():
+    # a pool of forked processes deadlocks after OpenMP has been used in the
+    # parent process
+    from ...potential.cpotential import get_num_threads, set_num_threads
+    from ..parallel import _mp_context
+
+    assert _mp_context().get_start_method() != 'fork'
+
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.random.RandomState(42).uniform(1, 10, size=(6, 11))
+    w0[3:] *= 0.02
+    kw = dict(dt=1., n_steps=100, Integrator=DOPRI853Integrator,
+              Integrator_kwargs=dict(independent_steps=True))
+
+    n_threads = get_num_threads()
+    set_num_threads(4)
+    try:
+        orbit = H.integrate_orbit(w0, **kw)
+        par_orbit = H.integrate_orbit(w0, n_workers=2, pool='process', **kw)
+    finally:
+        set_num_threads(n_threads)
+
+    assert np.array_equal(par_orbit.xyz.value, orbit.xyz.value)
+
+
+def test_integrate_orbit_parallel_errors():
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.array([[10., 8.], [0, 1.], [0, 0.5],
+                   [0, 0.05], [0.15, 0.2], [0, 0.001]])
+    kw = dict(dt=1., n_steps=100, n_workers=2)
+
+    with pytest.raises(ValueError):
+        H.integrate_orbit(w0, pool='mpi', **kw)
+
+    with pytest.raises(ValueError):
+        H.integrate_orbit(w0, pool='process', out=np.zeros((101, 2, 6)), **kw)
+
+    with pytest.raises(ValueError):
+        H.integrate_orbit(w0, cython_if_possible=False, **kw)
+
+    # the chunks are written to out in blocks of times
+    out = np.zeros((101, 2, 6))
+    H.integrate_orbit(w0, out=out, **kw)
+    assert np.array_equal(np.moveaxis(out, -1, 0),
+                          H.integrate_orbit(w0, dt=1., n_steps=100).w(galactic))
+
+
+@pytest.mark.parametrize("Integrator", [LeapfrogIntegrator,
+                                        DOPRI853Integrator,
+                                        PEFRLIntegrator])
+@pytest.mark.parametrize("cython_if_possible", [True, False])
+def test_integrate_orbit_iter(Integrator, cython_if_possible):
+    H = Hamiltonian(HernquistPotential(m=1E11, c=0.5, units=galactic))
+    w0 = np.array([[10., 8.], [0, 1.], [0, 0.5],
+                   [0, 0.05], [0.15, 0.2], [0, 0.001]])
+    kw = dict(dt=1., n_steps=100, Integrator=Integrator,
+              cython_if_possible=cython_if_possible)
+
+    orbit = H.integrate_orbit(w0, **kw)
+
+    chunks = list(H.integrate_orbit_iter(w0, chunk_steps=30, **kw))
+    assert [c.shape for c in chunks] == [(30, 2), (30, 2), (30, 2), (11, 2)]
+    assert all(isinstance(c, Orbit) for c in chunks)
+    assert chunks[0].hamiltonian == H
+
+    t = np.concatenate([c.t.value for c in chunks])
+    xyz = np.concatenate([c.xyz.value for c in chunks], axis=1)
+    v_xyz = np.concatenate([c.v_xyz.value for c in chunks], axis=1)
+    assert np.array_equal(t, orbit.t.value)
+    assert np.allclose(xyz, orbit.xyz.value, rtol=1e-10)
+    assert np.allclose(v_xyz, orbit.v_xyz.value, rtol=1e-10)
+
+    # chunks with a single time
+    chunks = list(H.integrate_orbit_iter(w0, chunk_steps=1, **kw))
+    assert [c.shape for c in chunks] == [(1, 2)] * 101
+    xyz = np.concatenate([c.xyz.value for c in chunks], axis=1)
+    assert np.allclose(xyz, orbit.xyz.value, rtol=1e-10)
+
+    # a single orbit
+    chunks = list(H.integrate_orbit_iter(w0[:, 0], chunk_steps=30, **kw))
+    assert chunks[-1].shape == (11, )
+    assert u.allclose(chunks[-1][-1].xyz, orbit[-1, 0].xyz, rtol=1e-10)
+
+    with pytest.raises(ValueError):
+        next(H.integrate_orbit_iter(w0, chunk_steps=0, **kw))
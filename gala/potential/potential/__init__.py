@@ -1,6 +1,7 @@
 from .core import *
 from .cpotential import *
 from .ccompositepotential import *
+from .ensemble import *
 from .builtin import *
 from .io import *
 from .util import *
@@ -76,6 +76,68 @@ void kepler_gradient(double t, double *pars, double *q, int n_dim, double *grad)
     grad[2] = grad[2] + fac*q[2];
 }
 
+double kepler_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+    */
+    double R, fac;
+    R = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+    fac = pars[0] * pars[1] / (R*R*R);
+
+    grad[0] = grad[0] + fac*q[0];
+    grad[1] = grad[1] + fac*q[1];
+    grad[2] = grad[2] + fac*q[2];
+
+    return -pars[0] * pars[1] / R;
+}
+
+void kepler_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+    */
+    int k;
+    double *qk;
+    double R;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2]);
+        pot[k] = pot[k] + -pars[0] * pars[1] / R;
+    }
+}
+
+void kepler_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+    */
+    int k;
+    double *qk;
+    double R, fac;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2]);
+        fac = pars[0] * pars[1] / (R*R*R);
+
+        grad[k*n_dim + 0] = grad[k*n_dim + 0] + fac*qk[0];
+        grad[k*n_dim + 1] = grad[k*n_dim + 1] + fac*qk[1];
+        grad[k*n_dim + 2] = grad[k*n_dim + 2] + fac*qk[2];
+    }
+}
+
+double kepler_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+    */
+    double GM = pars[0] * pars[1];
+
+    *dPhi_dr = GM / (r*r);
+    *d2Phi_dr2 = -2 * GM / (r*r*r);
+    return -GM / r;
+}
+
 double kepler_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -155,6 +217,77 @@ void isochrone_gradient(double t, double *pars, double *q, int n_dim, double *gr
     grad[2] = grad[2] + fac*q[2];
 }
 
+double isochrone_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (core scale)
+    */
+    double sqrt_r2_b2, fac, denom;
+    sqrt_r2_b2 = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2] + pars[2]*pars[2]);
+    denom = sqrt_r2_b2 * (sqrt_r2_b2 + pars[2])*(sqrt_r2_b2 + pars[2]);
+    fac = pars[0] * pars[1] / denom;
+
+    grad[0] = grad[0] + fac*q[0];
+    grad[1] = grad[1] + fac*q[1];
+    grad[2] = grad[2] + fac*q[2];
+
+    return -pars[0] * pars[1] / (sqrt_r2_b2 + pars[2]);
+}
+
+void isochrone_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (core scale)
+    */
+    int k;
+    double *qk;
+    double R2;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R2 = qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2];
+        pot[k] = pot[k] + -pars[0] * pars[1] / (sqrt(R2 + pars[2]*pars[2]) + pars[2]);
+    }
+}
+
+void isochrone_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (core scale)
+    */
+    int k;
+    double *qk;
+    double sqrt_r2_b2, fac, denom;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        sqrt_r2_b2 = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2] + pars[2]*pars[2]);
+        denom = sqrt_r2_b2 * (sqrt_r2_b2 + pars[2])*(sqrt_r2_b2 + pars[2]);
+        fac = pars[0] * pars[1] / denom;
+
+        grad[k*n_dim + 0] = grad[k*n_dim + 0] + fac*qk[0];
+        grad[k*n_dim + 1] = grad[k*n_dim + 1] + fac*qk[1];
+        grad[k*n_dim + 2] = grad[k*n_dim + 2] + fac*qk[2];
+    }
+}
+
+double isochrone_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (core scale)
+    */
+    double GM = pars[0] * pars[1];
+    double b = pars[2];
+    double s = sqrt(r*r + b*b);
+    double bs = b + s;
+
+    *dPhi_dr = GM * r / (s * bs*bs);
+    *d2Phi_dr2 = GM * (b*b * bs / s - 2*r*r) / (s*s * bs*bs*bs);
+    return -GM / bs;
+}
+
 double isochrone_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -241,6 +374,73 @@ void hernquist_gradient(double t, double *pars, double *q, int n_dim, double *gr
     grad[2] = grad[2] + fac*q[2];
 }
 
+double hernquist_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - c (length scale)
+    */
+    double R, fac;
+    R = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+    fac = pars[0] * pars[1] / ((R + pars[2]) * (R + pars[2]) * R);
+
+    grad[0] = grad[0] + fac*q[0];
+    grad[1] = grad[1] + fac*q[1];
+    grad[2] = grad[2] + fac*q[2];
+
+    return -pars[0] * pars[1] / (R + pars[2]);
+}
+
+void hernquist_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - c (length scale)
+    */
+    int k;
+    double *qk;
+    double R;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2]);
+        pot[k] = pot[k] + -pars[0] * pars[1] / (R + pars[2]);
+    }
+}
+
+void hernquist_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - c (length scale)
+    */
+    int k;
+    double *qk;
+    double R, fac;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2]);
+        fac = pars[0] * pars[1] / ((R + pars[2]) * (R + pars[2]) * R);
+
+        grad[k*n_dim + 0] = grad[k*n_dim + 0] + fac*qk[0];
+        grad[k*n_dim + 1] = grad[k*n_dim + 1] + fac*qk[1];
+        grad[k*n_dim + 2] = grad[k*n_dim + 2] + fac*qk[2];
+    }
+}
+
+double hernquist_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - c (length scale)
+    */
+    double GM = pars[0] * pars[1];
+    double rc = r + pars[2];
+
+    *dPhi_dr = GM / (rc*rc);
+    *d2Phi_dr2 = -2 * GM / (rc*rc*rc);
+    return -GM / rc;
+}
+
 double hernquist_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -324,6 +524,76 @@ void plummer_gradient(double t, double *pars, double *q, int n_dim, double *grad
     grad[2] = grad[2] + fac*q[2];
 }
 
+double plummer_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (length scale)
+    */
+    double R2b, sqrt_R2b, fac;
+    R2b = q[0]*q[0] + q[1]*q[1] + q[2]*q[2] + pars[2]*pars[2];
+    sqrt_R2b = sqrt(R2b);
+    fac = pars[0] * pars[1] / sqrt_R2b / R2b;
+
+    grad[0] = grad[0] + fac*q[0];
+    grad[1] = grad[1] + fac*q[1];
+    grad[2] = grad[2] + fac*q[2];
+
+    return -pars[0]*pars[1] / sqrt_R2b;
+}
+
+void plummer_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (length scale)
+    */
+    int k;
+    double *qk;
+    double R2;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R2 = qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2];
+        pot[k] = pot[k] + -pars[0]*pars[1] / sqrt(R2 + pars[2]*pars[2]);
+    }
+}
+
+void plummer_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (length scale)
+    */
+    int k;
+    double *qk;
+    double R2b, fac;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        R2b = qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2] + pars[2]*pars[2];
+        fac = pars[0] * pars[1] / sqrt(R2b) / R2b;
+
+        grad[k*n_dim + 0] = grad[k*n_dim + 0] + fac*qk[0];
+        grad[k*n_dim + 1] = grad[k*n_dim + 1] + fac*qk[1];
+        grad[k*n_dim + 2] = grad[k*n_dim + 2] + fac*qk[2];
+    }
+}
+
+double plummer_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - b (length scale)
+    */
+    double GM = pars[0] * pars[1];
+    double b2 = pars[2] * pars[2];
+    double s2 = r*r + b2;
+    double s = sqrt(s2);
+
+    *dPhi_dr = GM * r / (s2 * s);
+    *d2Phi_dr2 = GM * (b2 - 2*r*r) / (s2 * s2 * s);
+    return -GM / s;
+}
+
 double plummer_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -399,6 +669,38 @@ void jaffe_gradient(double t, double *pars, double *q, int n_dim, double *grad){
     grad[2] = grad[2] + fac*q[2]/R;
 }
 
+double jaffe_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - c (length scale)
+    */
+    double R, fac;
+    R = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+    fac = pars[0] * pars[1] / pars[2] * (pars[2] / (R * (pars[2] + R)));
+
+    grad[0] = grad[0] + fac*q[0]/R;
+    grad[1] = grad[1] + fac*q[1]/R;
+    grad[2] = grad[2] + fac*q[2]/R;
+
+    return -pars[0] * pars[1] / pars[2] * log(1 + pars[2]/R);
+}
+
+double jaffe_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - c (length scale)
+    */
+    double GM = pars[0] * pars[1];
+    double c = pars[2];
+    double rc = r + c;
+
+    *dPhi_dr = GM / (r * rc);
+    *d2Phi_dr2 = -GM * (c + 2*r) / (r*r * rc*rc);
+    return -GM / c * log(1 + c/r);
+}
+
 double jaffe_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -708,6 +1010,26 @@ void stone_gradient(double t, double *pars, double *q, int n_dim, double *grad)
     grad[2] = grad[2] + dphi_dr*q[2]/r;
 }
 
+double stone_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - M (total mass)
+            - r_c (core radius)
+            - r_h (halo radius)
+    */
+    double u_c, u_h, fac;
+
+    u_c = r / pars[2];
+    u_h = r / pars[3];
+    fac = 2*pars[0]*pars[1] / M_PI / (pars[2] - pars[3]);
+
+    *dPhi_dr = fac / (r*r) * (pars[2]*atan(u_c) - pars[3]*atan(u_h));
+    *d2Phi_dr2 = -2 * (*dPhi_dr) / r +
+        fac / (r*r) * (1 / (1 + u_c*u_c) - 1 / (1 + u_h*u_h));
+    return fac * (atan(u_h)/u_h - atan(u_c)/u_c +
+                  0.5*log((r*r + pars[3]*pars[3])/(r*r + pars[2]*pars[2])));
+}
+
 double stone_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -854,6 +1176,80 @@ void sphericalnfw_gradient(double t, double *pars, double *q, int n_dim, double
     grad[2] = grad[2] + fac*q[2];
 }
 
+double sphericalnfw_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - r_s (scale radius)
+    */
+    double fac, u, v_h2, log_1u;
+    v_h2 = pars[0] * pars[1] / pars[2];
+
+    u = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]) / pars[2];
+    log_1u = log(1 + u);
+    fac = v_h2 / (u*u*u) / (pars[2]*pars[2]) * (log_1u - u/(1+u));
+
+    grad[0] = grad[0] + fac*q[0];
+    grad[1] = grad[1] + fac*q[1];
+    grad[2] = grad[2] + fac*q[2];
+
+    return -v_h2 * log_1u / u;
+}
+
+void sphericalnfw_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - r_s (scale radius)
+    */
+    int k;
+    double *qk;
+    double u, v_h2;
+    v_h2 = -pars[0] * pars[1] / pars[2];
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        u = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2]) / pars[2];
+        pot[k] = pot[k] + v_h2 * log(1 + u) / u;
+    }
+}
+
+void sphericalnfw_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - r_s (scale radius)
+    */
+    int k;
+    double *qk;
+    double fac, u, v_h2;
+    v_h2 = pars[0] * pars[1] / pars[2];
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        u = sqrt(qk[0]*qk[0] + qk[1]*qk[1] + qk[2]*qk[2]) / pars[2];
+        fac = v_h2 / (u*u*u) / (pars[2]*pars[2]) * (log(1+u) - u/(1+u));
+
+        grad[k*n_dim + 0] = grad[k*n_dim + 0] + fac*qk[0];
+        grad[k*n_dim + 1] = grad[k*n_dim + 1] + fac*qk[1];
+        grad[k*n_dim + 2] = grad[k*n_dim + 2] + fac*qk[2];
+    }
+}
+
+double sphericalnfw_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - r_s (scale radius)
+    */
+    double GM = pars[0] * pars[1];
+    double rs = r + pars[2];
+    double log_1u = log(1 + r / pars[2]);
+
+    *dPhi_dr = GM * (log_1u / (r*r) - 1 / (r * rs));
+    *d2Phi_dr2 = GM * ((pars[2] + 2*r) / (r*r * rs*rs) + 1 / (r*r * rs) -
+                       2 * log_1u / (r*r*r));
+    return -GM * log_1u / r;
+}
+
 double sphericalnfw_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -1309,6 +1705,66 @@ void miyamotonagai_gradient(double t, double *pars, double *q, int n_dim, double
     grad[2] = grad[2] + fac*q[2] * (1. + pars[2] / sqrtz);
 }
 
+double miyamotonagai_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - a (length scale 1) TODO
+            - b (length scale 2) TODO
+    */
+    double sqrtz, zd, R2zd2, fac;
+
+    sqrtz = sqrt(q[2]*q[2] + pars[3]*pars[3]);
+    zd = pars[2] + sqrtz;
+    R2zd2 = q[0]*q[0] + q[1]*q[1] + zd*zd;
+    fac = pars[0]*pars[1] * pow(R2zd2, -1.5);
+
+    grad[0] = grad[0] + fac*q[0];
+    grad[1] = grad[1] + fac*q[1];
+    grad[2] = grad[2] + fac*q[2] * (1. + pars[2] / sqrtz);
+
+    return -pars[0] * pars[1] / sqrt(R2zd2);
+}
+
+void miyamotonagai_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - a (length scale 1) TODO
+            - b (length scale 2) TODO
+    */
+    int k;
+    double *qk;
+    double zd;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        zd = (pars[2] + sqrt(qk[2]*qk[2] + pars[3]*pars[3]));
+        pot[k] = pot[k] + -pars[0] * pars[1] / sqrt(qk[0]*qk[0] + qk[1]*qk[1] + zd*zd);
+    }
+}
+
+void miyamotonagai_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - m (mass scale)
+            - a (length scale 1) TODO
+            - b (length scale 2) TODO
+    */
+    int k;
+    double *qk;
+    double sqrtz, zd, fac;
+    for (k=0; k < n_points; k++) {
+        qk = &q[k*n_dim];
+        sqrtz = sqrt(qk[2]*qk[2] + pars[3]*pars[3]);
+        zd = pars[2] + sqrtz;
+        fac = pars[0]*pars[1] * pow(qk[0]*qk[0] + qk[1]*qk[1] + zd*zd, -1.5);
+
+        grad[k*n_dim + 0] = grad[k*n_dim + 0] + fac*qk[0];
+        grad[k*n_dim + 1] = grad[k*n_dim + 1] + fac*qk[1];
+        grad[k*n_dim + 2] = grad[k*n_dim + 2] + fac*qk[2] * (1. + pars[2] / sqrtz);
+    }
+}
+
 double miyamotonagai_density(double t, double *pars, double *q, int n_dim) {
     /*  pars:
             - G (Gravitational constant)
@@ -1560,6 +2016,34 @@ void logarithmic_gradient(double t, double *pars, double *q, int n_dim, double *
     grad[2] = grad[2] + az;
 }
 
+double logarithmic_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    /*  pars:
+            - G (Gravitational constant)
+            - v_c (velocity scale)
+            - r_h (length scale)
+            - q1
+            - q2
+            - q3
+    */
+    double x, y, z, ax, ay, az, fac, denom;
+
+    x = q[0]*cos(pars[6]) + q[1]*sin(pars[6]);
+    y = -q[0]*sin(pars[6]) + q[1]*cos(pars[6]);
+    z = q[2];
+
+    denom = (pars[2]*pars[2] + x*x/(pars[3]*pars[3]) + y*y/(pars[4]*pars[4]) + z*z/(pars[5]*pars[5]));
+    fac = pars[1]*pars[1] / denom;
+    ax = fac*x/(pars[3]*pars[3]);
+    ay = fac*y/(pars[4]*pars[4]);
+    az = fac*z/(pars[5]*pars[5]);
+
+    grad[0] = grad[0] + (ax*cos(pars[6]) - ay*sin(pars[6]));
+    grad[1] = grad[1] + (ax*sin(pars[6]) + ay*cos(pars[6]));
+    grad[2] = grad[2] + az;
+
+    return 0.5*pars[1]*pars[1] * log(denom);
+}
+
 void logarithmic_hessian(double t, double *pars, double *q, int n_dim,
                          double *hess) {
     /*  pars:
@@ -1887,3 +2371,429 @@ void longmuralibar_hessian(double t, double *pars, double *q, int n_dim,
     hess[7] = hess[7] + tmp_88;
     hess[8] = hess[8] + tmp_38*tmp_76*tmp_94 - tmp_40*tmp_77*tmp_94 + tmp_52*(tmp_14*tmp_92*tmp_96 - tmp_22*tmp_45*tmp_97 - tmp_28*tmp_78*tmp_98 + tmp_35*tmp_48*tmp_97 + tmp_89*tmp_95 - tmp_90*tmp_96 + tmp_91 - tmp_92*tmp_95 - tmp_93 + tmp_50*tmp_98/tmp_17);
 }
+
+/* ---------------------------------------------------------------------------
+    Interpolated potential
+
+    The potential is represented as a tricubic B-spline over a regular grid
+    in either Cartesian coordinates (x, y, z), or spherical coordinates
+    (ln r, theta, phi), where the azimuthal axis is periodic. The B-spline
+    coefficients are computed in Python (see InterpolatedPotential) and are
+    padded by one node on either side of each axis (and two nodes at the end
+    of the periodic axis).
+
+    pars:
+        - G (Gravitational constant)
+        - coordinate system (0 for Cartesian, 1 for spherical)
+        - n0, n1, n2 (number of grid nodes along each axis)
+        - a0, h0, a1, h1, a2, h2 (first node and node spacing along each axis)
+        - B-spline coefficients, C-ordered with shape (m0, m1, m2)
+*/
+void interp_bspline_weights(double s, double *w, double *dw, double *d2w) {
+    /* Cubic B-spline weights (and derivatives) of the four coefficients that
+       contribute at fractional position s within a grid cell */
+    double s2 = s*s;
+    double s3 = s2*s;
+    double r = 1. - s;
+
+    w[0] = r*r*r / 6.;
+    w[1] = (3*s3 - 6*s2 + 4) / 6.;
+    w[2] = (-3*s3 + 3*s2 + 3*s + 1) / 6.;
+    w[3] = s3 / 6.;
+
+    dw[0] = -r*r / 2.;
+    dw[1] = (3*s2 - 4*s) / 2.;
+    dw[2] = (-3*s2 + 2*s + 1) / 2.;
+    dw[3] = s2 / 2.;
+
+    d2w[0] = r;
+    d2w[1] = 3*s - 2;
+    d2w[2] = 1 - 3*s;
+    d2w[3] = s;
+}
+
+void interp_eval(double *pars, double *u, double *f, double *df, double *d2f) {
+    /* Evaluate the B-spline at grid coordinates u, storing the value in f, the
+       derivatives with respect to each coordinate in df, and (if not NULL) the
+       second derivatives with respect to each coordinate in d2f */
+    int i, j, k, m1, m2, periodic;
+    int idx[3];
+    double s, w[3][4], dw[3][4], d2w[3][4];
+    double *c, *coeff;
+
+    periodic = (pars[1] == 1);
+    m1 = (int)pars[3] + 2;
+    m2 = (int)pars[4] + 2 + periodic;
+    coeff = &pars[11];
+
+    for (i=0; i < 3; i++) {
+        int n = (int)pars[2+i];
+        s = (u[i] - pars[5+2*i]) / pars[6+2*i];
+
+        if (periodic && (i == 2)) {
+            s = fmod(s, n);
+            if (s < 0)
+                s = s + n;
+            idx[i] = (int)floor(s);
+            if (idx[i] > n-1)
+                idx[i] = n-1;
+        } else {
+            idx[i] = (int)floor(s);
+            if (idx[i] < 0)
+                idx[i] = 0;
+            else if (idx[i] > n-2)
+                idx[i] = n-2;
+        }
+
+        interp_bspline_weights(s - idx[i], w[i], dw[i], d2w[i]);
+    }
+
+    // contract the 4x4x4 block of coefficients one axis at a time, starting
+    // with the last axis. Note: the padded index of node idx - 1 is idx
+    *f = 0.;
+    for (i=0; i < 3; i++) {
+        df[i] = 0.;
+        if (d2f != NULL)
+            d2f[i] = 0.;
+    }
+
+    for (i=0; i < 4; i++) {
+        double A = 0., B = 0., C = 0., D = 0., E = 0.;
+
+        for (j=0; j < 4; j++) {
+            double a = 0., b = 0., d = 0.;
+
+            c = &coeff[((idx[0]+i)*m1 + idx[1]+j)*m2 + idx[2]];
+            for (k=0; k < 4; k++) {
+                a = a + c[k] * w[2][k];
+                b = b + c[k] * dw[2][k];
+                if (d2f != NULL)
+                    d = d + c[k] * d2w[2][k];
+            }
+
+            A = A + a * w[1][j];
+            B = B + a * dw[1][j];
+            C = C + b * w[1][j];
+            if (d2f != NULL) {
+                D = D + a * d2w[1][j];
+                E = E + d * w[1][j];
+            }
+        }
+
+        *f = *f + A * w[0][i];
+        df[0] = df[0] + A * dw[0][i];
+        df[1] = df[1] + B * w[0][i];
+        df[2] = df[2] + C * w[0][i];
+        if (d2f != NULL) {
+            d2f[0] = d2f[0] + A * d2w[0][i];
+            d2f[1] = d2f[1] + D * w[0][i];
+            d2f[2] = d2f[2] + E * w[0][i];
+        }
+    }
+
+    for (i=0; i < 3; i++) {
+        df[i] = df[i] / pars[6+2*i];
+        if (d2f != NULL)
+            d2f[i] = d2f[i] / (pars[6+2*i] * pars[6+2*i]);
+    }
+}
+
+int interp_in_grid(double *pars, int i, double u) {
+    /* Returns 1 if coordinate u is within the grid along axis i */
+    double s = (u - pars[5+2*i]) / pars[6+2*i];
+    double tol = 1E-10;
+    return (s >= -tol) && (s <= pars[2+i] - 1 + tol);
+}
+
+int interp_spherical(double *pars, double *q, double *u, double *r) {
+    /* Convert the Cartesian position q to grid coordinates u = (ln r, theta,
+       phi), and store the radius in r. Returns -1 or 1 if the radius is inside
+       or outside of the grid (in which case u[0] is set to the closest edge
+       of the grid), or 0 otherwise */
+    double ln_r;
+    double ln_r_max = pars[5] + pars[6]*(pars[2] - 1);
+
+    *r = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+
+    if (*r > 0)
+        u[1] = acos(q[2] / *r);
+    else
+        u[1] = 0.;
+    u[2] = atan2(q[1], q[0]);
+
+    ln_r = log(*r);
+    if (ln_r < pars[5]) {
+        u[0] = pars[5];
+        return -1;
+    } else if (ln_r > ln_r_max) {
+        u[0] = ln_r_max;
+        return 1;
+    }
+
+    u[0] = ln_r;
+    return 0;
+}
+
+double interp_value(double t, double *pars, double *q, int n_dim) {
+    /* Outside of a spherical grid, the potential falls off as 1/r beyond the
+       outermost radius, and is constant within the innermost radius. Outside
+       of a Cartesian grid, the potential is NaN */
+    double f, r, df[3], u[3];
+    int i;
+
+    if (pars[1] == 0) {
+        for (i=0; i < 3; i++) {
+            if (!interp_in_grid(pars, i, q[i]))
+                return NAN;
+        }
+        interp_eval(pars, q, &f, df, NULL);
+        return f;
+    }
+
+    if (interp_spherical(pars, q, u, &r) == 1) {
+        interp_eval(pars, u, &f, df, NULL);
+        return f * exp(u[0]) / r;
+    }
+
+    interp_eval(pars, u, &f, df, NULL);
+    return f;
+}
+
+double interp_value_gradient(double t, double *pars, double *q, int n_dim,
+                             double *grad) {
+    double f, r, R, r_fac, dPhi_dr, sintheta, costheta, sinphi, cosphi;
+    double df[3], u[3];
+    int i, region;
+
+    if (pars[1] == 0) {
+        for (i=0; i < 3; i++) {
+            if (!interp_in_grid(pars, i, q[i])) {
+                grad[0] = grad[0] + NAN;
+                grad[1] = grad[1] + NAN;
+                grad[2] = grad[2] + NAN;
+                return NAN;
+            }
+        }
+        interp_eval(pars, q, &f, df, NULL);
+        grad[0] = grad[0] + df[0];
+        grad[1] = grad[1] + df[1];
+        grad[2] = grad[2] + df[2];
+        return f;
+    }
+
+    region = interp_spherical(pars, q, u, &r);
+    interp_eval(pars, u, &f, df, NULL);
+
+    if (r == 0)
+        return f;
+
+    // df[0] is the derivative with respect to ln(r)
+    r_fac = 1.;
+    if (region == 1) {
+        r_fac = exp(u[0]) / r;
+        dPhi_dr = -r_fac * f / r;
+    } else if (region == -1) {
+        dPhi_dr = 0.;
+    } else {
+        dPhi_dr = df[0] / r;
+    }
+
+    R = sqrt(q[0]*q[0] + q[1]*q[1]);
+    sintheta = R / r;
+    costheta = q[2] / r;
+    sinphi = 0.;
+    cosphi = 1.;
+    if (R > 0) {
+        sinphi = q[1] / R;
+        cosphi = q[0] / R;
+    }
+
+    grad[0] = grad[0] + dPhi_dr*sintheta*cosphi + r_fac*df[1]*costheta*cosphi/r;
+    grad[1] = grad[1] + dPhi_dr*sintheta*sinphi + r_fac*df[1]*costheta*sinphi/r;
+    grad[2] = grad[2] + dPhi_dr*costheta - r_fac*df[1]*sintheta/r;
+
+    if (sintheta > 0) {
+        grad[0] = grad[0] - r_fac*df[2]*sinphi/(r*sintheta);
+        grad[1] = grad[1] + r_fac*df[2]*cosphi/(r*sintheta);
+    }
+
+    return r_fac * f;
+}
+
+void interp_gradient(double t, double *pars, double *q, int n_dim,
+                     double *grad) {
+    interp_value_gradient(t, pars, q, n_dim, grad);
+}
+
+double interp_density(double t, double *pars, double *q, int n_dim) {
+    /* The Laplacian of the interpolated potential divided by 4 pi G: this is
+       NaN outside of the grid */
+    double f, r, lap, sintheta, df[3], d2f[3], u[3];
+    int i;
+
+    if (pars[1] == 0) {
+        for (i=0; i < 3; i++) {
+            if (!interp_in_grid(pars, i, q[i]))
+                return NAN;
+        }
+        interp_eval(pars, q, &f, df, d2f);
+        lap = d2f[0] + d2f[1] + d2f[2];
+
+    } else {
+        if ((interp_spherical(pars, q, u, &r) != 0) || (r == 0))
+            return NAN;
+        interp_eval(pars, u, &f, df, d2f);
+
+        sintheta = sin(u[1]);
+        lap = df[0] + d2f[0] + d2f[1];
+        if (sintheta > 0)
+            lap = lap + cos(u[1])/sintheta*df[1] + d2f[2]/(sintheta*sintheta);
+        lap = lap / (r*r);
+    }
+
+    return lap / (4*M_PI*pars[0]);
+}
+
+/* ---------------------------------------------------------------------------
+    Tabulated radial profiles
+
+    Spherical potentials that are expensive to evaluate (e.g., that require
+    special functions) can instead be evaluated from a table of the potential
+    and its radial derivative at nodes that are evenly spaced in ln(r). Both
+    are interpolated with cubic Hermite polynomials in ln(r), using the first
+    and second radial derivatives at the nodes. The table is computed in
+    Python (see CPotentialBase.tabulate_radial_profile()) and is appended to
+    the parameters of the potential, so outside of the table, the exact
+    expressions for the potential are used instead.
+
+    table (starting at pars[offset]):
+        - n (number of nodes)
+        - ln(r) of the first node
+        - node spacing in ln(r)
+        - for each node: Phi, dPhi/dlnr, dPhi/dr, d(dPhi/dr)/dlnr
+*/
+static inline int radial_table_eval(double *table, double r, double *f,
+                                    double *dPhi_dr) {
+    /* Interpolate the potential and/or its radial derivative at radius r
+       (either output may be NULL): returns 0 if r is outside of the table */
+    int i;
+    double s, u, h00, h10, h01, h11;
+    double *node;
+
+    if (r <= 0)
+        return 0;
+
+    s = (log(r) - table[1]) / table[2];
+    if ((s < 0) || (s >= table[0] - 1))
+        return 0;
+
+    i = (int)s;
+    u = s - i;
+    node = table + 3 + 4*i;
+
+    h00 = (1 + 2*u) * (1 - u) * (1 - u);
+    h10 = table[2] * u * (1 - u) * (1 - u);
+    h01 = u * u * (3 - 2*u);
+    h11 = table[2] * u * u * (u - 1);
+
+    if (f != NULL)
+        *f = h00*node[0] + h10*node[1] + h01*node[4] + h11*node[5];
+    if (dPhi_dr != NULL)
+        *dPhi_dr = h00*node[2] + h10*node[3] + h01*node[6] + h11*node[7];
+    return 1;
+}
+
+static inline double radial_table_value(double t, double *pars, double *q,
+                                        int n_dim, int offset,
+                                        double (*value)(double, double*, double*, int)) {
+    double f;
+    double r = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+
+    if (radial_table_eval(pars + offset, r, &f, NULL))
+        return f;
+    return value(t, pars, q, n_dim);
+}
+
+static inline void radial_table_gradient(double t, double *pars, double *q,
+                                         int n_dim, double *grad, int offset,
+                                         void (*gradient)(double, double*, double*, int, double*)) {
+    double dPhi_dr;
+    double r = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+
+    if (radial_table_eval(pars + offset, r, NULL, &dPhi_dr)) {
+        grad[0] = grad[0] + dPhi_dr * q[0]/r;
+        grad[1] = grad[1] + dPhi_dr * q[1]/r;
+        grad[2] = grad[2] + dPhi_dr * q[2]/r;
+    } else {
+        gradient(t, pars, q, n_dim, grad);
+    }
+}
+
+static inline double radial_table_value_gradient(double t, double *pars, double *q,
+                                                 int n_dim, double *grad, int offset,
+                                                 double (*value)(double, double*, double*, int),
+                                                 void (*gradient)(double, double*, double*, int, double*)) {
+    double f, dPhi_dr;
+    double r = sqrt(q[0]*q[0] + q[1]*q[1] + q[2]*q[2]);
+
+    if (radial_table_eval(pars + offset, r, &f, &dPhi_dr)) {
+        grad[0] = grad[0] + dPhi_dr * q[0]/r;
+        grad[1] = grad[1] + dPhi_dr * q[1]/r;
+        grad[2] = grad[2] + dPhi_dr * q[2]/r;
+        return f;
+    }
+
+    gradient(t, pars, q, n_dim, grad);
+    return value(t, pars, q, n_dim);
+}
+
+/* The number of parameters (including G) of each potential, after which the
+   table starts */
+#define STONE_N_PARS 4
+#define SPHERICALNFW_N_PARS 6
+#define POWERLAWCUTOFF_N_PARS 4
+
+double stone_table_value(double t, double *pars, double *q, int n_dim) {
+    return radial_table_value(t, pars, q, n_dim, STONE_N_PARS, &stone_value);
+}
+
+void stone_table_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    radial_table_gradient(t, pars, q, n_dim, grad, STONE_N_PARS, &stone_gradient);
+}
+
+double stone_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    return radial_table_value_gradient(t, pars, q, n_dim, grad, STONE_N_PARS,
+                                       &stone_value, &stone_gradient);
+}
+
+double sphericalnfw_table_value(double t, double *pars, double *q, int n_dim) {
+    return radial_table_value(t, pars, q, n_dim, SPHERICALNFW_N_PARS,
+                              &sphericalnfw_value);
+}
+
+void sphericalnfw_table_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    radial_table_gradient(t, pars, q, n_dim, grad, SPHERICALNFW_N_PARS,
+                          &sphericalnfw_gradient);
+}
+
+double sphericalnfw_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    return radial_table_value_gradient(t, pars, q, n_dim, grad, SPHERICALNFW_N_PARS,
+                                       &sphericalnfw_value, &sphericalnfw_gradient);
+}
+
+#if USE_GSL == 1
+double powerlawcutoff_table_value(double t, double *pars, double *q, int n_dim) {
+    return radial_table_value(t, pars, q, n_dim, POWERLAWCUTOFF_N_PARS,
+                              &powerlawcutoff_value);
+}
+
+void powerlawcutoff_table_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    radial_table_gradient(t, pars, q, n_dim, grad, POWERLAWCUTOFF_N_PARS,
+                          &powerlawcutoff_gradient);
+}
+
+double powerlawcutoff_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) {
+    return radial_table_value_gradient(t, pars, q, n_dim, grad, POWERLAWCUTOFF_N_PARS,
+                                       &powerlawcutoff_value, &powerlawcutoff_gradient);
+}
+#endif
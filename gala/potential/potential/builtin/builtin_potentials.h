@@ -13,27 +13,45 @@ extern void henon_heiles_gradient(double t, double *pars, double *q, int n_dim,
 extern void henon_heiles_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
 extern double kepler_value(double t, double *pars, double *q, int n_dim);
+extern double kepler_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern double kepler_density(double t, double *pars, double *q, int n_dim);
 extern void kepler_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double kepler_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern void kepler_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+extern void kepler_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
 extern void kepler_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
 extern double isochrone_value(double t, double *pars, double *q, int n_dim);
 extern void isochrone_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double isochrone_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern void isochrone_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+extern void isochrone_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
+extern double isochrone_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern double isochrone_density(double t, double *pars, double *q, int n_dim);
 extern void isochrone_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
 extern double hernquist_value(double t, double *pars, double *q, int n_dim);
 extern void hernquist_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double hernquist_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern void hernquist_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+extern void hernquist_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
+extern double hernquist_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern double hernquist_density(double t, double *pars, double *q, int n_dim);
 extern void hernquist_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
 extern double plummer_value(double t, double *pars, double *q, int n_dim);
 extern void plummer_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double plummer_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern void plummer_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+extern void plummer_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
+extern double plummer_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern double plummer_density(double t, double *pars, double *q, int n_dim);
 extern void plummer_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
 extern double jaffe_value(double t, double *pars, double *q, int n_dim);
 extern void jaffe_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double jaffe_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double jaffe_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern double jaffe_density(double t, double *pars, double *q, int n_dim);
 extern void jaffe_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
@@ -44,11 +62,16 @@ extern void powerlawcutoff_hessian(double t, double *pars, double *q, int n_dim,
 
 extern double stone_value(double t, double *pars, double *q, int n_dim);
 extern void stone_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double stone_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern void stone_density(double t, double *pars, double *q, int n_dim);
 extern void stone_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
 extern double sphericalnfw_value(double t, double *pars, double *q, int n_dim);
 extern void sphericalnfw_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double sphericalnfw_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern void sphericalnfw_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+extern void sphericalnfw_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
+extern double sphericalnfw_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 extern double sphericalnfw_density(double t, double *pars, double *q, int n_dim);
 extern void sphericalnfw_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 
@@ -71,6 +94,9 @@ extern double kuzmin_density(double t, double *pars, double *q, int n_dim);
 
 extern double miyamotonagai_value(double t, double *pars, double *q, int n_dim);
 extern void miyamotonagai_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double miyamotonagai_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern void miyamotonagai_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+extern void miyamotonagai_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
 extern void miyamotonagai_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 extern double miyamotonagai_density(double t, double *pars, double *q, int n_dim);
 
@@ -80,6 +106,7 @@ extern double leesuto_density(double t, double *pars, double *q, int n_dim);
 
 extern double logarithmic_value(double t, double *pars, double *q, int n_dim);
 extern void logarithmic_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double logarithmic_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
 extern void logarithmic_hessian(double t, double *pars, double *q, int n_dim, double *hess);
 extern double logarithmic_density(double t, double *pars, double *q, int n_dim);
 
@@ -87,3 +114,18 @@ extern double longmuralibar_value(double t, double *pars, double *q, int n_dim);
 extern void longmuralibar_gradient(double t, double *pars, double *q, int n_dim, double *grad);
 extern double longmuralibar_density(double t, double *pars, double *q, int n_dim);
 extern void longmuralibar_hessian(double t, double *pars, double *q, int n_dim, double *hess);
+
+extern double interp_value(double t, double *pars, double *q, int n_dim);
+extern void interp_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double interp_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double interp_density(double t, double *pars, double *q, int n_dim);
+
+extern double stone_table_value(double t, double *pars, double *q, int n_dim);
+extern void stone_table_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double stone_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double sphericalnfw_table_value(double t, double *pars, double *q, int n_dim);
+extern void sphericalnfw_table_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double sphericalnfw_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double powerlawcutoff_table_value(double t, double *pars, double *q, int n_dim);
+extern void powerlawcutoff_table_gradient(double t, double *pars, double *q, int n_dim, double *grad);
+extern double powerlawcutoff_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad);
@@ -25,11 +25,13 @@ cimport numpy as np
 np.import_array()
 
 # Project
-from ..core import CompositePotential, _potential_docstring
+from ..core import CompositePotential, PotentialBase, _potential_docstring
 from ..util import format_doc, sympy_wrap
 from ..cpotential import CPotentialBase
 from ..cpotential cimport CPotential, CPotentialWrapper
 from ..cpotential cimport densityfunc, energyfunc, gradientfunc, hessianfunc
+from ..cpotential cimport valuegradientfunc, batchenergyfunc, batchgradientfunc
+from ..cpotential cimport radialfunc
 from ...common import PotentialParameter
 from ...frame.cframe cimport CFrameWrapper
 from ....units import dimensionless, DimensionlessUnitSystem
@@ -49,27 +51,45 @@ cdef extern from "potential/potential/builtin/builtin_potentials.h":
 
     double kepler_value(double t, double *pars, double *q, int n_dim) nogil
     void kepler_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double kepler_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    void kepler_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    void kepler_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
     double kepler_density(double t, double *pars, double *q, int n_dim) nogil
+    double kepler_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void kepler_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double isochrone_value(double t, double *pars, double *q, int n_dim) nogil
     void isochrone_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double isochrone_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    void isochrone_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    void isochrone_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
     double isochrone_density(double t, double *pars, double *q, int n_dim) nogil
+    double isochrone_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void isochrone_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double hernquist_value(double t, double *pars, double *q, int n_dim) nogil
     void hernquist_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double hernquist_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    void hernquist_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    void hernquist_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
     double hernquist_density(double t, double *pars, double *q, int n_dim) nogil
+    double hernquist_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void hernquist_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double plummer_value(double t, double *pars, double *q, int n_dim) nogil
     void plummer_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double plummer_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    void plummer_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    void plummer_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
     double plummer_density(double t, double *pars, double *q, int n_dim) nogil
+    double plummer_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void plummer_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double jaffe_value(double t, double *pars, double *q, int n_dim) nogil
     void jaffe_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double jaffe_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
     double jaffe_density(double t, double *pars, double *q, int n_dim) nogil
+    double jaffe_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void jaffe_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double powerlawcutoff_value(double t, double *pars, double *q, int n_dim) nogil
@@ -80,11 +100,16 @@ cdef extern from "potential/potential/builtin/builtin_potentials.h":
     double stone_value(double t, double *pars, double *q, int n_dim) nogil
     void stone_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
     double stone_density(double t, double *pars, double *q, int n_dim) nogil
+    double stone_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void stone_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double sphericalnfw_value(double t, double *pars, double *q, int n_dim) nogil
     void sphericalnfw_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double sphericalnfw_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    void sphericalnfw_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    void sphericalnfw_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
     double sphericalnfw_density(double t, double *pars, double *q, int n_dim) nogil
+    double sphericalnfw_radial(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
     void sphericalnfw_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
     double flattenednfw_value(double t, double *pars, double *q, int n_dim) nogil
@@ -106,6 +131,9 @@ cdef extern from "potential/potential/builtin/builtin_potentials.h":
 
     double miyamotonagai_value(double t, double *pars, double *q, int n_dim) nogil
     void miyamotonagai_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double miyamotonagai_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    void miyamotonagai_value_batch(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    void miyamotonagai_gradient_batch(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
     void miyamotonagai_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
     double miyamotonagai_density(double t, double *pars, double *q, int n_dim) nogil
 
@@ -115,6 +143,7 @@ cdef extern from "potential/potential/builtin/builtin_potentials.h":
 
     double logarithmic_value(double t, double *pars, double *q, int n_dim) nogil
     void logarithmic_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double logarithmic_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
     void logarithmic_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
     double logarithmic_density(double t, double *pars, double *q, int n_dim) nogil
 
@@ -123,12 +152,28 @@ cdef extern from "potential/potential/builtin/builtin_potentials.h":
     double longmuralibar_density(double t, double *pars, double *q, int n_dim) nogil
     void longmuralibar_hessian(double t, double *pars, double *q, int n_dim, double *hess) nogil
 
+    double interp_value(double t, double *pars, double *q, int n_dim) nogil
+    void interp_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double interp_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double interp_density(double t, double *pars, double *q, int n_dim) nogil
+
+    double stone_table_value(double t, double *pars, double *q, int n_dim) nogil
+    void stone_table_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double stone_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double sphericalnfw_table_value(double t, double *pars, double *q, int n_dim) nogil
+    void sphericalnfw_table_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double sphericalnfw_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double powerlawcutoff_table_value(double t, double *pars, double *q, int n_dim) nogil
+    void powerlawcutoff_table_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    double powerlawcutoff_table_value_gradient(double t, double *pars, double *q, int n_dim, double *grad) nogil
+
 __all__ = ['NullPotential', 'HenonHeilesPotential', # Misc. potentials
            'KeplerPotential', 'HernquistPotential', 'IsochronePotential', 'PlummerPotential',
            'JaffePotential', 'StonePotential', 'PowerLawCutoffPotential', # Spherical models
            'SatohPotential', 'KuzminPotential', 'MiyamotoNagaiPotential', # Disk models
            'NFWPotential', 'LeeSutoTriaxialNFWPotential', 'LogarithmicPotential',
            'LongMuraliBarPotential', # Triaxial models
+           'InterpolatedPotential', # Tabulated models
            ]
 
 # ============================================================================
@@ -177,6 +222,10 @@ cdef class KeplerWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(kepler_density)
         self.cpotential.gradient[0] = <gradientfunc>(kepler_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(kepler_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(kepler_value_gradient)
+        self.cpotential.batch_value[0] = <batchenergyfunc>(kepler_value_batch)
+        self.cpotential.batch_gradient[0] = <batchgradientfunc>(kepler_gradient_batch)
+        self.cpotential.radial[0] = <radialfunc>(kepler_radial)
 
 @format_doc(common_doc=_potential_docstring)
 class KeplerPotential(CPotentialBase):
@@ -211,6 +260,10 @@ cdef class IsochroneWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(isochrone_density)
         self.cpotential.gradient[0] = <gradientfunc>(isochrone_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(isochrone_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(isochrone_value_gradient)
+        self.cpotential.batch_value[0] = <batchenergyfunc>(isochrone_value_batch)
+        self.cpotential.batch_gradient[0] = <batchgradientfunc>(isochrone_gradient_batch)
+        self.cpotential.radial[0] = <radialfunc>(isochrone_radial)
 
 @format_doc(common_doc=_potential_docstring)
 class IsochronePotential(CPotentialBase):
@@ -287,6 +340,10 @@ cdef class HernquistWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(hernquist_density)
         self.cpotential.gradient[0] = <gradientfunc>(hernquist_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(hernquist_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(hernquist_value_gradient)
+        self.cpotential.batch_value[0] = <batchenergyfunc>(hernquist_value_batch)
+        self.cpotential.batch_gradient[0] = <batchgradientfunc>(hernquist_gradient_batch)
+        self.cpotential.radial[0] = <radialfunc>(hernquist_radial)
 
 @format_doc(common_doc=_potential_docstring)
 class HernquistPotential(CPotentialBase):
@@ -326,6 +383,10 @@ cdef class PlummerWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(plummer_density)
         self.cpotential.gradient[0] = <gradientfunc>(plummer_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(plummer_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(plummer_value_gradient)
+        self.cpotential.batch_value[0] = <batchenergyfunc>(plummer_value_batch)
+        self.cpotential.batch_gradient[0] = <batchgradientfunc>(plummer_gradient_batch)
+        self.cpotential.radial[0] = <radialfunc>(plummer_radial)
 
 @format_doc(common_doc=_potential_docstring)
 class PlummerPotential(CPotentialBase):
@@ -364,6 +425,8 @@ cdef class JaffeWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(jaffe_density)
         self.cpotential.gradient[0] = <gradientfunc>(jaffe_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(jaffe_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(jaffe_value_gradient)
+        self.cpotential.radial[0] = <radialfunc>(jaffe_radial)
 
 @format_doc(common_doc=_potential_docstring)
 class JaffePotential(CPotentialBase):
@@ -402,6 +465,15 @@ cdef class StoneWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(stone_density)
         self.cpotential.gradient[0] = <gradientfunc>(stone_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(stone_hessian)
+        self.cpotential.radial[0] = <radialfunc>(stone_radial)
+
+cdef class StoneTableWrapper(StoneWrapper):
+
+    def __init__(self, G, parameters, q0, R):
+        super().__init__(G, parameters, q0, R)
+        self.cpotential.value[0] = <energyfunc>(stone_table_value)
+        self.cpotential.gradient[0] = <gradientfunc>(stone_table_gradient)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(stone_table_value_gradient)
 
 @format_doc(common_doc=_potential_docstring)
 class StonePotential(CPotentialBase):
@@ -426,6 +498,7 @@ class StonePotential(CPotentialBase):
     r_h = PotentialParameter('r_h', physical_type='length')
 
     Wrapper = StoneWrapper
+    _RadialTableWrapper = StoneTableWrapper
 
     @myclassmethod
     @sympy_wrap
@@ -452,6 +525,16 @@ cdef class PowerLawCutoffWrapper(CPotentialWrapper):
             self.cpotential.gradient[0] = <gradientfunc>(powerlawcutoff_gradient)
             self.cpotential.hessian[0] = <hessianfunc>(powerlawcutoff_hessian)
 
+cdef class PowerLawCutoffTableWrapper(PowerLawCutoffWrapper):
+
+    def __init__(self, G, parameters, q0, R):
+        super().__init__(G, parameters, q0, R)
+
+        if USE_GSL == 1:
+            self.cpotential.value[0] = <energyfunc>(powerlawcutoff_table_value)
+            self.cpotential.gradient[0] = <gradientfunc>(powerlawcutoff_table_gradient)
+            self.cpotential.value_gradient[0] = <valuegradientfunc>(powerlawcutoff_table_value_gradient)
+
 @format_doc(common_doc=_potential_docstring)
 class PowerLawCutoffPotential(CPotentialBase, GSL_only=True):
     r"""
@@ -480,6 +563,7 @@ class PowerLawCutoffPotential(CPotentialBase, GSL_only=True):
     r_c = PotentialParameter('r_c', physical_type='length')
 
     Wrapper = PowerLawCutoffWrapper
+    _RadialTableWrapper = PowerLawCutoffTableWrapper
 
     @myclassmethod
     @sympy_wrap
@@ -599,6 +683,9 @@ cdef class MiyamotoNagaiWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(miyamotonagai_density)
         self.cpotential.gradient[0] = <gradientfunc>(miyamotonagai_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(miyamotonagai_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(miyamotonagai_value_gradient)
+        self.cpotential.batch_value[0] = <batchenergyfunc>(miyamotonagai_value_batch)
+        self.cpotential.batch_gradient[0] = <batchgradientfunc>(miyamotonagai_gradient_batch)
 
 @format_doc(common_doc=_potential_docstring)
 class MiyamotoNagaiPotential(CPotentialBase):
@@ -650,6 +737,20 @@ cdef class SphericalNFWWrapper(CPotentialWrapper):
         self.cpotential.density[0] = <densityfunc>(sphericalnfw_density)
         self.cpotential.gradient[0] = <gradientfunc>(sphericalnfw_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(sphericalnfw_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(sphericalnfw_value_gradient)
+        self.cpotential.batch_value[0] = <batchenergyfunc>(sphericalnfw_value_batch)
+        self.cpotential.batch_gradient[0] = <batchgradientfunc>(sphericalnfw_gradient_batch)
+        self.cpotential.radial[0] = <radialfunc>(sphericalnfw_radial)
+
+cdef class SphericalNFWTableWrapper(SphericalNFWWrapper):
+
+    def __init__(self, G, parameters, q0, R):
+        super().__init__(G, parameters, q0, R)
+        self.cpotential.value[0] = <energyfunc>(sphericalnfw_table_value)
+        self.cpotential.gradient[0] = <gradientfunc>(sphericalnfw_table_gradient)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(sphericalnfw_table_value_gradient)
+        self.cpotential.batch_value[0] = NULL
+        self.cpotential.batch_gradient[0] = NULL
 
 cdef class FlattenedNFWWrapper(CPotentialWrapper):
 
@@ -712,14 +813,30 @@ class NFWPotential(CPotentialBase):
         b = self.parameters['b']
         c = self.parameters['c']
 
+        # a tabulated radial profile is only supported for the spherical case
+        self.Wrapper, self._RadialTableWrapper = self._get_wrappers(a, b, c)
+
+    @staticmethod
+    def _get_wrappers(a, b, c):
+        # the wrapper classes for the spherical, flattened, or triaxial case
         if np.allclose([a, b, c], 1.):
-            self.Wrapper = SphericalNFWWrapper
+            return SphericalNFWWrapper, SphericalNFWTableWrapper
 
         elif np.allclose([a, b], 1.):
-            self.Wrapper = FlattenedNFWWrapper
+            return FlattenedNFWWrapper, None
 
         else:
-            self.Wrapper = TriaxialNFWWrapper
+            return TriaxialNFWWrapper, None
+
+    def _check_parameters_raw(self, values):
+        # the C implementation is different for spherical, flattened, or
+        # triaxial potentials
+        a, b, c = values[2:5]
+        if self._get_wrappers(a, b, c)[0] is not self.Wrapper:
+            raise ValueError("The axis ratios of an NFW potential cannot be "
+                             "updated in place if this changes whether the "
+                             "potential is spherical, flattened, or "
+                             "triaxial: create a new potential instead.")
 
     @myclassmethod
     @sympy_wrap
@@ -832,6 +949,7 @@ cdef class LogarithmicWrapper(CPotentialWrapper):
         self.cpotential.value[0] = <energyfunc>(logarithmic_value)
         self.cpotential.gradient[0] = <gradientfunc>(logarithmic_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(logarithmic_hessian)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(logarithmic_value_gradient)
         self.cpotential.density[0] = <energyfunc>(logarithmic_density)
 
 @format_doc(common_doc=_potential_docstring)
@@ -1011,3 +1129,271 @@ class NullPotential(CPotentialBase):
     {common_doc}
     """
     Wrapper = NullWrapper
+
+
+# ==============================================================================
+# Tabulated models
+#
+def _bspline_coefficients(values, periodic):
+    """
+    Compute the coefficients of the cubic B-spline that interpolates the input
+    values on a regular grid, one axis at a time. The coefficients are padded
+    by one node on either side of each axis, and by one more node at the end of
+    periodic axes. For non-periodic axes, the end conditions set the second
+    derivative of the spline to a finite-difference estimate from the values.
+    """
+    from scipy.linalg import solve_banded, solve_circulant
+
+    coeff = np.array(values, dtype=np.float64)
+    for axis, is_periodic in enumerate(periodic):
+        c = np.moveaxis(coeff, axis, 0)
+        shape = c.shape
+        n = shape[0]
+        f = c.reshape(n, -1)
+
+        if is_periodic:
+            col = np.zeros(n)
+            col[0] = 4/6.
+            col[1] = col[n-1] = 1/6.
+            x = solve_circulant(col, f)
+            x = np.concatenate((x[n-1:], x, x[:2]))
+
+        else:
+            # banded matrix with 2 sub- and super-diagonals: row i, column j
+            # is stored in ab[2 + i - j, j]
+            ab = np.zeros((5, n+2))
+            ab[1, 2:n+2] = 1/6.
+            ab[2, 1:n+1] = 4/6.
+            ab[3, 0:n] = 1/6.
+            ab[2, 0], ab[1, 1], ab[0, 2] = 1., -2., 1.
+            ab[4, n-1], ab[3, n], ab[2, n+1] = 1., -2., 1.
+
+            rhs = np.zeros((n+2, f.shape[1]))
+            rhs[1:n+1] = f
+            rhs[0] = 2*f[0] - 5*f[1] + 4*f[2] - f[3]
+            rhs[n+1] = 2*f[n-1] - 5*f[n-2] + 4*f[n-3] - f[n-4]
+            x = solve_banded((2, 2), ab, rhs)
+
+        coeff = np.moveaxis(x.reshape((x.shape[0], ) + shape[1:]), 0, axis)
+
+    return np.ascontiguousarray(coeff)
+
+
+cdef class InterpolatedWrapper(CPotentialWrapper):
+
+    def __init__(self, G, parameters, q0, R):
+        self.init([G] + list(parameters),
+                  np.ascontiguousarray(q0),
+                  np.ascontiguousarray(R))
+        self.cpotential.value[0] = <energyfunc>(interp_value)
+        self.cpotential.density[0] = <densityfunc>(interp_density)
+        self.cpotential.gradient[0] = <gradientfunc>(interp_gradient)
+        self.cpotential.value_gradient[0] = <valuegradientfunc>(interp_value_gradient)
+
+@format_doc(common_doc=_potential_docstring)
+class InterpolatedPotential(CPotentialBase):
+    r"""
+    InterpolatedPotential(values, extent, units=None, origin=None, R=None)
+
+    A potential interpolated from values tabulated on a regular grid, either in
+    Cartesian coordinates or in spherical coordinates. The potential is
+    evaluated in C with tricubic B-spline interpolation, so the gradient is
+    continuous. This is useful as a fast surrogate for potentials that are
+    expensive to evaluate. See `InterpolatedPotential.from_potential` to
+    create an interpolated version of any other potential.
+
+    The grid is specified by the ``extent`` parameter. For a Cartesian grid,
+    this is ``[x_min, x_max, y_min, y_max, z_min, z_max]``, and the nodes are
+    evenly spaced along each axis. The potential is NaN outside of a Cartesian
+    grid. For a spherical grid, this is ``[r_min, r_max]``: the nodes are
+    evenly spaced in ``log(r)`` between these radii, in :math:`\theta` on
+    :math:`[0, \pi]`, and in :math:`\phi` on :math:`[0, 2\pi)`. Beyond
+    ``r_max``, the potential falls off as :math:`1/r` (from its value at
+    ``r_max``), and within ``r_min`` it is constant in radius.
+
+    The density is computed from the Laplacian of the interpolated potential,
+    and is NaN outside of the grid.
+
+    Parameters
+    ----------
+    values : :class:`~astropy.units.Quantity`, array_like [energy per unit mass]
+        The values of the potential at the grid nodes, as a 3D array with shape
+        ``(n_x, n_y, n_z)`` or ``(n_r, n_theta, n_phi)``. There must be at
+        least 4 nodes along each axis.
+    extent : :class:`~astropy.units.Quantity`, array_like [length]
+        The bounds of the grid (see above).
+    {common_doc}
+    """
+    values = PotentialParameter('values', physical_type='specific energy')
+    extent = PotentialParameter('extent', physical_type='length')
+
+    Wrapper = InterpolatedWrapper
+
+    # only the B-spline coefficients are needed in C, so the tabulated values
+    # are not also copied to the C parameter array
+    _python_only_parameters = ('values', 'extent')
+
+    def __init__(self, *args, units=None, origin=None, R=None, **kwargs):
+        PotentialBase.__init__(
+            self,
+            *args,
+            units=units,
+            origin=origin,
+            R=R,
+            **kwargs)
+
+        values = np.asarray(self.parameters['values'].value)
+        extent = np.atleast_1d(self.parameters['extent'].value)
+
+        if values.ndim != 3 or min(values.shape) < 4:
+            raise ValueError("The tabulated potential values must be a 3D "
+                             "array with at least 4 nodes along each axis, "
+                             f"not an array with shape {values.shape}")
+
+        if len(extent) == 6:
+            self.coordinates = 'cartesian'
+            lo = extent[0::2]
+            hi = extent[1::2]
+            periodic = [False, False, False]
+            if np.any(hi <= lo):
+                raise ValueError("Invalid grid extent: the maximum value along "
+                                 "each axis must be larger than the minimum.")
+            grid = np.stack((lo, (hi - lo) / (np.array(values.shape) - 1)),
+                            axis=1)
+
+        elif len(extent) == 2:
+            self.coordinates = 'spherical'
+            periodic = [False, False, True]
+            if extent[0] <= 0 or extent[1] <= extent[0]:
+                raise ValueError("Invalid grid extent: the radial bounds must "
+                                 "satisfy 0 < r_min < r_max.")
+            ln_r = np.log(extent)
+            grid = np.array([
+                [ln_r[0], (ln_r[1] - ln_r[0]) / (values.shape[0] - 1)],
+                [0., np.pi / (values.shape[1] - 1)],
+                [0., 2*np.pi / values.shape[2]]])
+
+        else:
+            raise ValueError("The grid extent must have 6 elements for a "
+                             "Cartesian grid, or 2 elements for a spherical "
+                             f"grid, not {len(extent)}")
+
+        # the estimated interpolation error, when created from a potential
+        self.error_estimate = None
+
+        self._setup_wrapper({
+            'coordinates': 0 if self.coordinates == 'cartesian' else 1,
+            'shape': values.shape,
+            'grid': grid,
+            'coeff': _bspline_coefficients(values, periodic)})
+
+    def _check_parameters_raw(self, values):
+        raise NotImplementedError("The parameters of an interpolated potential "
+                                  "cannot be updated in place: create a new "
+                                  "potential instead.")
+
+    @staticmethod
+    def from_potential(potential, grid, coordinates='cartesian', t=0.,
+                       n_test=1024, random_state=None):
+        r"""
+        from_potential(potential, grid, coordinates='cartesian', t=0., n_test=1024, random_state=None)
+
+        Tabulate a potential on a grid and create an interpolated version of
+        it. The interpolation error is estimated by comparing the two
+        potentials at ``n_test`` random positions within the grid: the maximum
+        fractional errors in the energy and the gradient are stored in a
+        dictionary as the ``error_estimate`` attribute of the new potential.
+
+        Parameters
+        ----------
+        potential : `~gala.potential.PotentialBase`
+            The potential to interpolate.
+        grid : iterable
+            For a Cartesian grid, a tuple of three 1D arrays with the evenly
+            spaced ``x``, ``y``, and ``z`` node positions. For a spherical grid,
+            a tuple ``(r, n_theta, n_phi)`` of a 1D array of radii that are
+            evenly spaced in ``log(r)`` (e.g., from `numpy.geomspace`), and the
+            number of nodes in :math:`\theta` and :math:`\phi`.
+        coordinates : str (optional)
+            Either ``'cartesian'`` or ``'spherical'``.
+        t : :class:`~astropy.units.Quantity`, numeric (optional)
+            The time at which to tabulate the potential.
+        n_test : int (optional)
+            The number of random positions used to estimate the error.
+        random_state : `~numpy.random.RandomState` (optional)
+            The random number generator used to draw the test positions.
+        """
+        if random_state is None:
+            random_state = np.random.RandomState()
+
+        usys = potential.units
+
+        def _to_value(x):
+            if hasattr(x, 'unit'):
+                return x.decompose(usys).value
+            return np.asarray(x, dtype=np.float64)
+
+        if coordinates == 'cartesian':
+            axes = [_to_value(x) for x in grid]
+            if len(axes) != 3:
+                raise ValueError("A Cartesian grid must be specified with "
+                                 "three arrays of node positions.")
+            for x in axes:
+                if len(x) < 4 or not np.allclose(np.diff(x), x[1] - x[0]):
+                    raise ValueError("The grid nodes must be evenly spaced, "
+                                     "with at least 4 nodes along each axis.")
+
+            xyz = np.stack(np.meshgrid(*axes, indexing='ij'))
+            extent = [[x.min(), x.max()] for x in axes]
+
+            test_xyz = np.array([random_state.uniform(x.min(), x.max(), n_test)
+                                 for x in axes])
+
+        elif coordinates == 'spherical':
+            r, n_theta, n_phi = grid
+            r = _to_value(r)
+            if len(r) < 4 or not np.allclose(np.diff(np.log(r)),
+                                             np.log(r[1] / r[0])):
+                raise ValueError("The radial grid nodes must be evenly spaced "
+                                 "in log(r), with at least 4 nodes.")
+
+            theta = np.linspace(0, np.pi, int(n_theta))
+            phi = np.linspace(0, 2*np.pi, int(n_phi), endpoint=False)
+            r, theta, phi = np.meshgrid(r, theta, phi, indexing='ij')
+            xyz = np.stack((r * np.sin(theta) * np.cos(phi),
+                            r * np.sin(theta) * np.sin(phi),
+                            r * np.cos(theta)))
+            extent = [r.min(), r.max()]
+
+            test_r = np.exp(random_state.uniform(*np.log(extent), n_test))
+            test_xyz = random_state.normal(size=(3, n_test))
+            test_xyz = test_r * test_xyz / np.linalg.norm(test_xyz, axis=0)
+
+        else:
+            raise ValueError("Invalid coordinate system '{}': must be "
+                             "'cartesian' or 'spherical'".format(coordinates))
+
+        values = potential.energy(xyz.reshape(3, -1), t=t)
+        values = values.reshape(xyz.shape[1:])
+        if not np.all(np.isfinite(values)):
+            raise ValueError("The potential is not finite at all grid nodes: "
+                             "make sure the grid does not include any "
+                             "singular points of the potential (e.g., the "
+                             "origin for a point mass).")
+
+        interp = InterpolatedPotential(values=values,
+                                       extent=np.ravel(extent) * usys['length'],
+                                       units=usys)
+
+        E = potential.energy(test_xyz, t=t).decompose(usys).value
+        E_interp = interp.energy(test_xyz).decompose(usys).value
+        grad = potential.gradient(test_xyz, t=t).decompose(usys).value
+        grad_interp = interp.gradient(test_xyz).decompose(usys).value
+
+        interp.error_estimate = {
+            'energy': np.max(np.abs(E_interp - E) / np.abs(E)),
+            'gradient': np.max(np.linalg.norm(grad_interp - grad, axis=0) /
+                               np.linalg.norm(grad, axis=0))
+        }
+
+        return interp
@@ -5,6 +5,9 @@
 # cython: profile=False
 # cython: language_level=3
 
+# Standard library
+from contextlib import contextmanager
+
 # Third-party
 import numpy as np
 cimport numpy as np
@@ -25,39 +28,62 @@ cdef class CCompositePotentialWrapper(CPotentialWrapper):
 
     def __init__(self, list potentials):
         cdef:
-            CPotential cp
-            CPotential tmp_cp
-            int i
+            CPotential *tmp_cp
+            int i, n_components
             CPotentialWrapper[::1] _cpotential_arr
 
         self._potentials = potentials
         _cpotential_arr = np.array(potentials)
 
         n_components = len(potentials)
-        self._n_params = np.zeros(n_components, dtype=np.int32)
+        self._n_params = np.zeros(max(n_components, 1), dtype=np.int32)
         for i in range(n_components):
             self._n_params[i] = _cpotential_arr[i]._n_params[0]
 
-        cp.n_components = n_components
-        cp.n_params = &(self._n_params[0])
-        cp.n_dim = 0
+        # the component arrays are sized to the number of components
+        self._allocate(n_components)
+        self.cpotential.n_params = &(self._n_params[0])
+        self.cpotential.n_dim = 0
+        self.cpotential.null = 0
 
         for i in range(n_components):
-            tmp_cp = _cpotential_arr[i].cpotential
-            cp.parameters[i] = &(_cpotential_arr[i]._params[0])
-            cp.q0[i] = &(_cpotential_arr[i]._q0[0])
-            cp.R[i] = &(_cpotential_arr[i]._R[0])
-            cp.value[i] = tmp_cp.value[0]
-            cp.density[i] = tmp_cp.density[0]
-            cp.gradient[i] = tmp_cp.gradient[0]
-            cp.hessian[i] = tmp_cp.hessian[0]
-
-            if cp.n_dim == 0:
-                cp.n_dim = tmp_cp.n_dim
-            elif cp.n_dim != tmp_cp.n_dim:
+            tmp_cp = &(_cpotential_arr[i].cpotential)
+            self.cpotential.parameters[i] = &(_cpotential_arr[i]._params[0])
+            self.cpotential.q0[i] = &(_cpotential_arr[i]._q0[0])
+            self.cpotential.R[i] = &(_cpotential_arr[i]._R[0])
+            self.cpotential.tracks[i] = tmp_cp.tracks[0]
+            self.cpotential.origin_tracks[i] = tmp_cp.origin_tracks[0]
+            self.cpotential.value[i] = tmp_cp.value[0]
+            self.cpotential.density[i] = tmp_cp.density[0]
+            self.cpotential.gradient[i] = tmp_cp.gradient[0]
+            self.cpotential.hessian[i] = tmp_cp.hessian[0]
+            self.cpotential.value_gradient[i] = tmp_cp.value_gradient[0]
+            self.cpotential.batch_value[i] = tmp_cp.batch_value[0]
+            self.cpotential.batch_gradient[i] = tmp_cp.batch_gradient[0]
+            self.cpotential.radial[i] = tmp_cp.radial[0]
+
+            if self.cpotential.n_dim == 0:
+                self.cpotential.n_dim = tmp_cp.n_dim
+            elif self.cpotential.n_dim != tmp_cp.n_dim:
                 raise ValueError("Input potentials must have same number of coordinate dimensions")
 
-        self.cpotential = cp
+        self.compile()
+
+    def compile(self):
+        """
+        Build the execution plan used to evaluate the potential in C. This
+        drops null components, records which components need to be shifted or
+        rotated, and groups components that share an origin and rotation.
+        """
+        cdef:
+            int i
+            int[::1] skip = np.zeros(max(len(self._potentials), 1),
+                                     dtype=np.int32)
+
+        for i in range(len(self._potentials)):
+            skip[i] = (<CPotentialWrapper>self._potentials[i]).cpotential.null
+
+        self._compile(&skip[0])
 
     def __reduce__(self):
         return (self.__class__, (list(self._potentials),))
@@ -66,7 +92,88 @@ cdef class CCompositePotentialWrapper(CPotentialWrapper):
 class CCompositePotential(CompositePotential, CPotentialBase):
 
     def __init__(self, **potentials):
-        CompositePotential.__init__(self, **potentials)
+        # defer building the C instance until all components are added
+        self._n_deferred = 1
+        try:
+            CompositePotential.__init__(self, **potentials)
+        finally:
+            self._n_deferred = 0
+
+        if len(self) > 0:
+            self._reset_c_instance()
+
+    @classmethod
+    def from_components(cls, components):
+        """
+        Create a composite potential from many components at once.
+
+        This is much faster than adding components one at a time for
+        composite potentials with many components, because the underlying
+        C representation is only built once.
+
+        Parameters
+        ----------
+        components : dict, list
+            Either a dictionary (or list of ``(name, potential)`` pairs) of
+            potential components, or a list of potential objects. In the
+            latter case, the components are named by their index in the list,
+            e.g., ``'0'``, ``'1'``, etc.
+
+        Examples
+        --------
+
+            >>> from gala.potential import CCompositePotential, HernquistPotential
+            >>> from gala.units import galactic
+            >>> pots = [HernquistPotential(m=1E8, c=0.1, origin=[x, 0, 0.],
+            ...                            units=galactic)
+            ...         for x in range(8)]
+            >>> pot = CCompositePotential.from_components(pots)
+            >>> len(pot)
+            8
+        """
+        if isinstance(components, dict):
+            components = components.items()
+
+        obj = cls()
+        with obj.batch_update():
+            for i, item in enumerate(components):
+                if isinstance(item, tuple):
+                    name, potential = item
+                else:
+                    name, potential = str(i), item
+                obj[name] = potential
+        return obj
+
+    @contextmanager
+    def batch_update(self):
+        """
+        A context manager that defers rebuilding the C representation of the
+        potential until all changes are made.
+
+        By default, the C representation is rebuilt every time a component is
+        added, so adding ``n`` components one at a time scales as ``n^2``.
+        Inside this context, it is instead rebuilt once on exit.
+
+        Examples
+        --------
+
+            >>> from gala.potential import CCompositePotential, KeplerPotential
+            >>> from gala.units import galactic
+            >>> pot = CCompositePotential()
+            >>> with pot.batch_update():
+            ...     for i in range(8):
+            ...         pot[str(i)] = KeplerPotential(m=1E8, origin=[i, 0, 0.],
+            ...                                       units=galactic)
+            >>> len(pot)
+            8
+        """
+        self._n_deferred += 1
+        try:
+            yield self
+        finally:
+            self._n_deferred -= 1
+            if self._n_deferred == 0 and len(self) > 0:
+                self._reset_c_instance()
 
     def _reset_c_instance(self):
         self._potential_list = []
@@ -75,17 +182,90 @@ class CCompositePotential(CompositePotential, CPotentialBase):
         self.G = p.G
         self.c_instance = CCompositePotentialWrapper(self._potential_list)
 
+    def get_parameters_raw(self):
+        """
+        get_parameters_raw()
+
+        Return the values of the parameters of all components as a 1D array,
+        in the order of the components (see
+        `~gala.potential.CPotentialBase.get_parameters_raw`).
+
+        Returns
+        -------
+        values : `~numpy.ndarray`
+        """
+        return np.concatenate([np.zeros(0)] +
+                              [p.get_parameters_raw() for p in self.values()])
+
+    def set_parameters_raw(self, values):
+        """
+        set_parameters_raw(values)
+
+        Update the values of the parameters of all components in place, in
+        the layout returned by `get_parameters_raw` (see
+        `~gala.potential.CPotentialBase.set_parameters_raw`).
+
+        Parameters
+        ----------
+        values : array_like
+            The new values of the parameters, as a 1D array.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        sizes = [p._raw_parameter_slice[1] for p in self.values()]
+        if values.shape != (sum(sizes), ):
+            raise ValueError(f"Expected an array of {sum(sizes)} parameter "
+                             "values, but got an array with shape "
+                             f"{values.shape}")
+
+        # the C representation of this potential points to the parameter
+        # arrays of the components, so these are updated in place
+        start = 0
+        for p, size in zip(self.values(), sizes):
+            p.set_parameters_raw(values[start:start+size])
+            start += size
+
+    def set_parameters(self, **values):
+        """
+        set_parameters(**values)
+
+        Update the values of some parameters of the components in place.
+
+        Parameters
+        ----------
+        **values
+            For each component to update, a dictionary of the new values of
+            its parameters (see
+            `~gala.potential.CPotentialBase.set_parameters`).
+
+        Examples
+        --------
+
+            >>> import astropy.units as u
+            >>> from gala.potential import MilkyWayPotential
+            >>> pot = MilkyWayPotential()
+            >>> pot.set_parameters(halo=dict(m=6E11*u.Msun))
+            >>> pot['halo'].parameters['m']
+            <Quantity 6.e+11 solMass>
+        """
+        for name in values:
+            if name not in self:
+                raise ValueError(f"Invalid component '{name}'")
+
+        for name, component_values in values.items():
+            self[name].set_parameters(**component_values)
+
     def __setitem__(self, *args, **kwargs):
         CompositePotential.__setitem__(self, *args, **kwargs)
-        self._reset_c_instance()
+        if not self._n_deferred:
+            self._reset_c_instance()
 
     def __setstate__(self, state):
         # when rebuilding from a pickle, temporarily release lock
         self.lock = False
         self._units = None
-        for name, potential in state:
-            self[name] = potential
-        self._reset_c_instance()
+        with self.batch_update():
+            for name, potential in state:
+                self[name] = potential
         self.lock = True
 
     def __reduce__(self):
@@ -27,6 +27,154 @@ from ...units import DimensionlessUnitSystem
 __all__ = ["PotentialBase", "CompositePotential"]
 
 
+class _RawPotentialMethods:
+    """
+    Unit-free evaluation of a potential, accessed through the ``.raw``
+    attribute of a potential instance.
+
+    These methods skip the unit handling and the shape normalization done by
+    the corresponding potential methods (e.g.,
+    `~gala.potential.potential.PotentialBase.gradient`). Positions must be
+    passed in as arrays with shape ``(N, ndim)`` (note: this is the transpose
+    of what the other potential methods expect) in the unit system of the
+    potential, and values are returned as bare `~numpy.ndarray` objects in the
+    same unit system. C-ordered, float64 arrays are used without copying.
+
+    Parameters
+    ----------
+    potential : `~gala.potential.potential.PotentialBase`
+    """
+
+    def __init__(self, potential):
+        self._potential = potential
+
+    def _prepare(self, q, t):
+        q = np.ascontiguousarray(q, dtype=np.float64)
+        if q.ndim != 2 or q.shape[1] != self._potential.ndim:
+            raise ValueError(
+                f"Input position array must have shape (N, "
+                f"{self._potential.ndim}), but got shape {q.shape}")
+
+        t = np.ascontiguousarray(t, dtype=np.float64).reshape(-1)
+        if t.shape[0] != 1 and t.shape[0] != q.shape[0]:
+            raise ValueError("If passing in an array of times, it must have a "
+                             "shape compatible with the input position(s).")
+
+        return q, t
+
+    def _store(self, val, out):
+        if out is None:
+            return val
+        out[...] = val
+        return out
+
+    def energy(self, q, t=0., out=None):
+        """
+        Compute the potential energy at the given position(s).
+
+        Parameters
+        ----------
+        q : array_like
+            Positions with shape ``(N, ndim)``.
+        t : numeric, array_like (optional)
+            The time, or an array of times with shape ``(N,)``.
+        out : `~numpy.ndarray` (optional)
+            An array with shape ``(N,)`` to store the output in.
+
+        Returns
+        -------
+        E : `~numpy.ndarray`
+            The potential energy with shape ``(N,)``.
+        """
+        q, t = self._prepare(q, t)
+        return self._store(self._potential._energy(q, t=t), out)
+
+    def gradient(self, q, t=0., out=None):
+        """
+        Compute the gradient of the potential at the given position(s).
+
+        Parameters
+        ----------
+        q : array_like
+            Positions with shape ``(N, ndim)``.
+        t : numeric, array_like (optional)
+            The time, or an array of times with shape ``(N,)``.
+        out : `~numpy.ndarray` (optional)
+            An array with shape ``(N, ndim)`` to store the output in.
+
+        Returns
+        -------
+        grad : `~numpy.ndarray`
+            The gradient of the potential with shape ``(N, ndim)``.
+        """
+        q, t = self._prepare(q, t)
+        return self._store(self._potential._gradient(q, t=t), out)
+
+    def density(self, q, t=0., out=None):
+        """
+        Compute the density at the given position(s).
+
+        Parameters
+        ----------
+        q : array_like
+            Positions with shape ``(N, ndim)``.
+        t : numeric, array_like (optional)
+            The time, or an array of times with shape ``(N,)``.
+        out : `~numpy.ndarray` (optional)
+            An array with shape ``(N,)`` to store the output in.
+
+        Returns
+        -------
+        dens : `~numpy.ndarray`
+            The density with shape ``(N,)``.
+        """
+        q, t = self._prepare(q, t)
+        return self._store(self._potential._density(q, t=t), out)
+
+    def hessian(self, q, t=0., out=None):
+        """
+        Compute the Hessian of the potential at the given position(s).
+
+        Parameters
+        ----------
+        q : array_like
+            Positions with shape ``(N, ndim)``.
+        t : numeric, array_like (optional)
+            The time, or an array of times with shape ``(N,)``.
+        out : `~numpy.ndarray` (optional)
+            An array with shape ``(N, ndim, ndim)`` to store the output in.
+
+        Returns
+        -------
+        hess : `~numpy.ndarray`
+            The Hessian matrix for each position, with shape
+            ``(N, ndim, ndim)``.
+        """
+        q, t = self._prepare(q, t)
+        return self._store(self._potential._hessian(q, t=t), out)
+
+    def energy_and_gradient(self, q, t=0.):
+        """
+        Compute the potential energy and gradient at the given position(s).
+
+        Parameters
+        ----------
+        q : array_like
+            Positions with shape ``(N, ndim)``.
+        t : numeric, array_like (optional)
+            The time, or an array of times with shape ``(N,)``.
+
+        Returns
+        -------
+        E : `~numpy.ndarray`
+            The potential energy with shape ``(N,)``.
+        grad : `~numpy.ndarray`
+            The gradient of the potential with shape ``(N, ndim)``.
+        """
+        q, t = self._prepare(q, t)
+        return self._potential._energy_and_gradient(q, t=t)
+
+
 class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
     """
     A baseclass for defining pure-Python gravitational potentials.
@@ -39,6 +187,9 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
     """
     ndim = 3
 
+    # the class used for the unit-free .raw methods
+    _RawMethods = _RawPotentialMethods
+
     def __init__(self, *args, units=None, origin=None, R=None, **kwargs):
 
         if self._GSL_only:
@@ -139,6 +290,10 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
     def _hessian(self, q, t=0.):
         raise NotImplementedError("This Potential has no implemented Hessian.")
 
+    def _energy_and_gradient(self, q, t=0.):
+        # subclasses can override this to compute both in a single pass
+        return self._energy(q, t=t), self._gradient(q, t=t)
+
     ###########################################################################
     # Utility methods
     #
@@ -226,6 +381,41 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
         uu = self.units['acceleration']
         return (self._gradient(q, t=t).T.reshape(orig_shape) * ret_unit).to(uu)
 
+    def energy_and_gradient(self, q, t=0.):
+        """
+        Compute the potential energy and the gradient of the potential at the
+        given position(s). For potentials implemented in C, this evaluates
+        both in a single pass, which is faster than calling
+        `~gala.potential.PotentialBase.energy` and
+        `~gala.potential.PotentialBase.gradient` separately.
+
+        Parameters
+        ----------
+        q : `~gala.dynamics.PhaseSpacePosition`, `~astropy.units.Quantity`, array_like
+            The position to compute the value of the potential. If the
+            input position object has no units (i.e. is an `~numpy.ndarray`),
+            it is assumed to be in the same unit system as the potential.
+
+        Returns
+        -------
+        E : `~astropy.units.Quantity`
+            The potential energy per unit mass or value of the potential.
+        grad : `~astropy.units.Quantity`
+            The gradient of the potential. Will have the same shape as
+            the input position.
+        """
+        q = self._remove_units_prepare_shape(q)
+        orig_shape, q = self._get_c_valid_arr(q)
+        t = self._validate_prepare_time(t, q)
+
+        E, grad = self._energy_and_gradient(q, t=t)
+
+        E_unit = self.units['energy'] / self.units['mass']
+        grad_unit = self.units['length'] / self.units['time']**2
+        uu = self.units['acceleration']
+        return (E.T.reshape(orig_shape[1:]) * E_unit,
+                (grad.T.reshape(orig_shape) * grad_unit).to(uu))
+
     def density(self, q, t=0.):
         """
         Compute the density value at the given position(s).
@@ -414,6 +604,115 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
     ###########################################################################
     # Convenience methods that do fancy things
     #
+    def evaluate_on_grid(self, grid, quantity='energy', t=0., n_threads=None,
+                         out=None, filename=None):
+        """
+        Evaluate the energy or density on a regular grid of positions.
+
+        The grid is the tensor product of the coordinate values along each
+        dimension, and the full array of grid positions is never created. For
+        potentials implemented in C, blocks of grid points are evaluated in
+        parallel (see `~gala.potential.set_num_threads`). The values for large
+        (e.g., 3D) grids can be written directly to a memory-mapped array.
+
+        Parameters
+        ----------
+        grid : tuple
+            Coordinate values or a single slice value for each dimension.
+            Should be a tuple of 1D arrays or numbers. Values without units are
+            assumed to be in the unit system of the potential.
+        quantity : str (optional)
+            Either ``'energy'`` or ``'density'``.
+        t : numeric, `~astropy.units.Quantity` (optional)
+            The time.
+        n_threads : int (optional)
+            The number of threads to use for potentials implemented in C.
+            Defaults to the value set with `~gala.potential.set_num_threads`.
+        out : `~numpy.ndarray` (optional)
+            A C-contiguous, float64 array to store the values in (e.g., a
+            `~numpy.memmap`), with the same shape as the output.
+        filename : str (optional)
+            Store the values in a memory-mapped ``.npy`` file with this name,
+            which can later be loaded with
+            ``numpy.load(filename, mmap_mode='r')``.
+
+        Returns
+        -------
+        values : `~astropy.units.Quantity`
+            The values on the grid, with one axis for each dimension with an
+            array of coordinate values (in the order of ``grid``). If ``out``
+            or ``filename`` is specified, this is a view of the output array.
+
+        Examples
+        --------
+
+            >>> import numpy as np
+            >>> from gala.potential import HernquistPotential
+            >>> from gala.units import galactic
+            >>> pot = HernquistPotential(m=1E10, c=1., units=galactic)
+            >>> x = np.linspace(-10, 10, 128)
+            >>> pot.evaluate_on_grid((x, x, 0.)).shape
+            (128, 128)
+        """
+        if quantity == 'energy':
+            unit = self.units['energy'] / self.units['mass']
+        elif quantity == 'density':
+            unit = self.units['mass'] / self.units['length']**3
+        else:
+            raise ValueError(f"Invalid quantity '{quantity}'")
+
+        if len(grid) != self.ndim:
+            raise ValueError(f"The grid must specify coordinate values for "
+                             f"each of the {self.ndim} dimensions.")
+
+        axes = []
+        shape = []
+        for g in grid:
+            g = np.array(self._remove_units(g), dtype=np.float64)
+            if g.ndim > 1:
+                raise ValueError("The grid values along each dimension must be "
+                                 "a 1D array or a number.")
+            elif g.ndim == 1:
+                shape.append(len(g))
+            axes.append(np.atleast_1d(g))
+        shape = tuple(shape)
+
+        if out is not None and filename is not None:
+            raise ValueError("Only one of out or filename may be specified.")
+
+        if filename is not None:
+            out = np.lib.format.open_memmap(filename, mode='w+',
+                                            dtype=np.float64, shape=shape)
+        elif out is None:
+            out = np.zeros(shape)
+
+        if (out.shape != shape or out.dtype != np.float64 or
+                not out.flags['C_CONTIGUOUS']):
+            raise ValueError(f"The output array must be a C-contiguous, "
+                             f"float64 array with shape {shape}")
+
+        t = self._validate_prepare_time(self._remove_units(t),
+                                        np.zeros((1, self.ndim)))
+
+        self._evaluate_on_grid(axes, quantity, t, out.reshape(-1), n_threads)
+        if isinstance(out, np.memmap):
+            out.flush()
+
+        return u.Quantity(out, unit, copy=False)
+
+    def _evaluate_on_grid(self, axes, quantity, t, out, n_threads):
+        # evaluate chunks of the grid, only creating the positions for each
+        # chunk. Subclasses implemented in C override this
+        func = self._energy if quantity == 'energy' else self._density
+        shape = [len(ax) for ax in axes]
+
+        chunk_size = 65536
+        for i in range(0, len(out), chunk_size):
+            idx = np.unravel_index(
+                np.arange(i, min(i + chunk_size, len(out))), shape)
+            q = np.stack([ax[j] for ax, j in zip(axes, idx)], axis=1)
+            out[i:i + len(q)] = func(q, t=t)
+
     def plot_contours(self, grid, filled=True, ax=None, labels=None,
                       subplots_kw=dict(), **kwargs):
         """
@@ -477,41 +776,23 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
         if ndim == 1:
             # 1D curve
             x1 = _grids[0][1]
-            r = np.zeros((len(_grids) + len(_slices), len(x1)))
-            r[_grids[0][0]] = x1
-
-            for ii, slc in _slices:
-                r[ii] = slc
-
-            Z = self.energy(r*self.units['length']).value
+            Z = self.evaluate_on_grid(grid, quantity='energy').value
             ax.plot(x1, Z, **kwargs)
 
             if labels is not None:
                 ax.set_xlabel(labels[0])
                 ax.set_ylabel("potential")
         else:
-            # 2D contours
+            # 2D contours: the grid values have shape (len(x1), len(x2))
             x1, x2 = np.meshgrid(_grids[0][1], _grids[1][1])
-            shp = x1.shape
-            x1, x2 = x1.ravel(), x2.ravel()
-
-            r = np.zeros((len(_grids) + len(_slices), len(x1)))
-            r[_grids[0][0]] = x1
-            r[_grids[1][0]] = x2
-
-            for ii, slc in _slices:
-                r[ii] = slc
-
-            Z = self.energy(r*self.units['length']).value
+            Z = self.evaluate_on_grid(grid, quantity='energy').value.T
 
             # make default colormap not suck
             cmap = kwargs.pop('cmap', cm.Blues)
             if filled:
-                ax.contourf(x1.reshape(shp), x2.reshape(shp), Z.reshape(shp),
-                            cmap=cmap, **kwargs)
+                ax.contourf(x1, x2, Z, cmap=cmap, **kwargs)
             else:
-                ax.contour(x1.reshape(shp), x2.reshape(shp), Z.reshape(shp),
-                           cmap=cmap, **kwargs)
+                ax.contour(x1, x2, Z, cmap=cmap, **kwargs)
 
             if labels is not None:
                 ax.set_xlabel(labels[0])
@@ -584,41 +865,23 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
         if ndim == 1:
             # 1D curve
             x1 = _grids[0][1]
-            r = np.zeros((len(_grids) + len(_slices), len(x1)))
-            r[_grids[0][0]] = x1
-
-            for ii, slc in _slices:
-                r[ii] = slc
-
-            Z = self.density(r*self.units['length']).value
+            Z = self.evaluate_on_grid(grid, quantity='density').value
             ax.plot(x1, Z, **kwargs)
 
             if labels is not None:
                 ax.set_xlabel(labels[0])
                 ax.set_ylabel("potential")
         else:
-            # 2D contours
+            # 2D contours: the grid values have shape (len(x1), len(x2))
             x1, x2 = np.meshgrid(_grids[0][1], _grids[1][1])
-            shp = x1.shape
-            x1, x2 = x1.ravel(), x2.ravel()
-
-            r = np.zeros((len(_grids) + len(_slices), len(x1)))
-            r[_grids[0][0]] = x1
-            r[_grids[1][0]] = x2
-
-            for ii, slc in _slices:
-                r[ii] = slc
-
-            Z = self.density(r*self.units['length']).value
+            Z = self.evaluate_on_grid(grid, quantity='density').value.T
 
             # make default colormap not suck
             cmap = kwargs.pop('cmap', cm.Blues)
             if filled:
-                ax.contourf(x1.reshape(shp), x2.reshape(shp), Z.reshape(shp),
-                            cmap=cmap, **kwargs)
+                ax.contourf(x1, x2, Z, cmap=cmap, **kwargs)
             else:
-                ax.contour(x1.reshape(shp), x2.reshape(shp), Z.reshape(shp),
-                           cmap=cmap, **kwargs)
+                ax.contour(x1, x2, Z, cmap=cmap, **kwargs)
 
             # cs.cmap.set_under('w')
             # cs.cmap.set_over('k')
@@ -711,6 +974,22 @@ class PotentialBase(CommonBase, metaclass=abc.ABCMeta):
     def units(self):
         return self._units
 
+    @property
+    def raw(self):
+        """
+        Unit-free methods for fast evaluation of the potential.
+
+        The methods of this object (``energy``, ``gradient``, ``density``,
+        ``hessian``, and ``energy_and_gradient``) accept and return bare
+        `~numpy.ndarray` objects in the unit system of the potential, with
+        positions passed in with shape ``(N, ndim)``. Most methods also accept
+        an ``out`` array to store the output in. This avoids the overhead of
+        unit conversions and array copies, which can dominate the cost of
+        evaluating the potential at a small number of positions (e.g., inside
+        of an optimizer loop).
+        """
+        return self._RawMethods(self)
+
     def replace_units(self, units, copy=True):
         """Change the unit system of this potential.
 
@@ -885,6 +1164,11 @@ class CompositePotential(PotentialBase, OrderedDict):
     def _density(self, q, t=0.):
         return np.sum([p._density(q, t) for p in self.values()], axis=0)
 
+    def _energy_and_gradient(self, q, t=0.):
+        Es, grads = zip(*[p._energy_and_gradient(q, t)
+                          for p in self.values()])
+        return np.sum(Es, axis=0), np.sum(grads, axis=0)
+
     def __repr__(self):
         return "<CompositePotential {}>".format(",".join(self.keys()))
 
@@ -9,27 +9,48 @@ cdef extern from "src/funcdefs.h":
     ctypedef double (*energyfunc)(double t, double *pars, double *q) nogil
     ctypedef void (*gradientfunc)(double t, double *pars, double *q, double *grad) nogil
     ctypedef void (*hessianfunc)(double t, double *pars, double *q, double *hess) nogil
+    ctypedef double (*valuegradientfunc)(double t, double *pars, double *q, int n_dim, double *grad) nogil
+    ctypedef void (*batchenergyfunc)(double t, double *pars, double *q, int n_dim, int n_points, double *pot) nogil
+    ctypedef void (*batchgradientfunc)(double t, double *pars, double *q, int n_dim, int n_points, double *grad) nogil
+    ctypedef double (*radialfunc)(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2) nogil
 
 cdef extern from "potential/src/cpotential.h":
-    const int MAX_N_COMPONENTS
+    const int C_BATCH_SIZE
 
     ctypedef struct CPotential:
         int n_components
         int n_dim
         int null
-        densityfunc density[MAX_N_COMPONENTS]
-        energyfunc value[MAX_N_COMPONENTS]
-        gradientfunc gradient[MAX_N_COMPONENTS]
-        hessianfunc hessian[MAX_N_COMPONENTS]
-        int n_params[MAX_N_COMPONENTS]
-        double *parameters[MAX_N_COMPONENTS]
-        double *q0[MAX_N_COMPONENTS]
-        double *R[MAX_N_COMPONENTS]
+        densityfunc *density
+        energyfunc *value
+        gradientfunc *gradient
+        hessianfunc *hessian
+        valuegradientfunc *value_gradient
+        batchenergyfunc *batch_value
+        batchgradientfunc *batch_gradient
+        radialfunc *radial
+        int *n_params
+        double **parameters
+        double **q0
+        double **R
+        double **tracks
+        int max_track_params
+        double **origin_tracks
+
+    int allocate_cpotential(CPotential *p, int n_components) nogil
+    void free_cpotential(CPotential *p) nogil
+    int compile_cpotential(CPotential *p, int *skip) nogil
 
     double c_potential(CPotential *p, double t, double *q) nogil
     double c_density(CPotential *p, double t, double *q) nogil
     void c_gradient(CPotential *p, double t, double *q, double *grad) nogil
     void c_hessian(CPotential *p, double t, double *q, double *hess) nogil
+    double c_potential_gradient(CPotential *p, double t, double *q, double *grad) nogil
+
+    void c_potential_batch(CPotential *p, double t, double *q, int n_points, double *pot) nogil
+    void c_gradient_batch(CPotential *p, double t, double *q, int n_points, double *grad) nogil
+
+    double c_radial_derivatives(CPotential *p, double t, double *q, double *d2Phi_dr2, double *Phi) nogil
 
     double c_d_dr(CPotential *p, double t, double *q, double *epsilon) nogil
     double c_d2_dr2(CPotential *p, double t, double *q, double *epsilon) nogil
@@ -44,15 +65,21 @@ cdef class CPotentialWrapper:
     cdef list _potentials # HACK: for CCompositePotentialWrapper
     cdef double[::1] _q0
     cdef double[::1] _R
+    cdef double[::1] _tracks
+    cdef double[::1] _origin_tracks
 
+    cdef int _allocate(self, int n_components) except -1
+    cdef int _compile(self, int *skip) except -1
     cpdef init(self, list parameters, double[::1] q0, double[:, ::1] R,
                int n_dim=?)
 
-    cpdef energy(self, double[:,::1] q, double[::1] t)
-    cpdef density(self, double[:,::1] q, double[::1] t)
-    cpdef gradient(self, double[:,::1] q, double[::1] t)
-    cpdef hessian(self, double[:,::1] q, double[::1] t)
+    cpdef energy(self, double[:,::1] q, double[::1] t, int n_threads=?, double[::1] out=?)
+    cpdef density(self, double[:,::1] q, double[::1] t, int n_threads=?, double[::1] out=?)
+    cpdef gradient(self, double[:,::1] q, double[::1] t, int n_threads=?, double[:,::1] out=?)
+    cpdef hessian(self, double[:,::1] q, double[::1] t, int n_threads=?, double[:,:,::1] out=?)
+    cpdef energy_gradient(self, double[:,::1] q, double[::1] t, int n_threads=?)
 
-    cpdef d_dr(self, double[:,::1] q, double G, double[::1] t)
-    cpdef d2_dr2(self, double[:,::1] q, double G, double[::1] t)
-    cpdef mass_enclosed(self, double[:,::1] q, double G, double[::1] t)
+    cpdef d_dr(self, double[:,::1] q, double G, double[::1] t, int n_threads=?)
+    cpdef d2_dr2(self, double[:,::1] q, double G, double[::1] t, int n_threads=?)
+    cpdef mass_enclosed(self, double[:,::1] q, double G, double[::1] t, int n_threads=?)
+    cpdef radial_derivatives(self, double[:,::1] q, double[::1] t, int n_threads=?)
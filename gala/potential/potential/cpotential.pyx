@@ -10,8 +10,10 @@ import copy as pycopy
 import sys
 import warnings
 import uuid
+import weakref
 
 # Third-party
+import astropy.units as u
 import numpy as np
 cimport numpy as np
 np.import_array()
@@ -19,9 +21,13 @@ import cython
 cimport cython
 
 from libc.stdio cimport printf
+from libc.stdlib cimport malloc, free
+from libc.stdint cimport uintptr_t
+from cython.parallel cimport prange, parallel
 
 # Project
-from .core import PotentialBase, CompositePotential
+from .core import PotentialBase, CompositePotential, _RawPotentialMethods
+from ..common import PotentialParameter
 from ...util import atleast_2d
 from ...units import DimensionlessUnitSystem
 
@@ -29,7 +35,8 @@ cdef extern from "math.h":
     double sqrt(double x) nogil
     double fabs(double x) nogil
 
-__all__ = ['CPotentialBase']
+__all__ = ['CPotentialBase', 'CustomCPotential', 'get_num_threads',
+           'set_num_threads']
 
 cdef extern from "potential/builtin/builtin_potentials.h":
     double nan_density(double t, double *pars, double *q, int n_dim) nogil
@@ -42,6 +49,57 @@ cpdef _validate_pos_arr(double[:, ::1] arr):
         raise ValueError("Phase-space coordinate array must have 2 dimensions")
     return arr.shape[0], arr.shape[1]
 
+cdef int _validate_time_arr(double[::1] t, int n) except -1:
+    """
+    Returns the stride to use when indexing into the time array: 0 if a single
+    time is used for all positions, 1 if there is one time per position.
+    """
+    if t.shape[0] == 1:
+        return 0
+    elif t.shape[0] != n:
+        raise ValueError("If passing in an array of times, it must have a "
+                         "shape compatible with the input position(s).")
+    return 1
+
+# ----------------------------------------------------------------------------
+# Multithreading
+#
+# Default number of OpenMP threads used by the C potential evaluation methods
+cdef int _n_threads = 1
+
+def get_num_threads():
+    """
+    Return the default number of threads used when evaluating C-implemented
+    potentials (e.g., energy, gradient, density) at many positions.
+    """
+    return _n_threads
+
+def set_num_threads(n_threads):
+    """
+    Set the default number of threads used when evaluating C-implemented
+    potentials at many positions. Evaluation is parallelized over positions
+    with OpenMP, so the results are identical to serial evaluation.
+
+    Parameters
+    ----------
+    n_threads : int
+        The number of threads. Must be >= 1. If Gala was compiled without
+        OpenMP support, this setting has no effect.
+    """
+    global _n_threads
+    from ..._cconfig import OPENMP_ENABLED
+
+    n_threads = int(n_threads)
+    if n_threads < 1:
+        raise ValueError("The number of threads must be >= 1.")
+
+    if n_threads > 1 and not OPENMP_ENABLED:
+        warnings.warn("Gala was compiled without OpenMP support, so potential "
+                      "evaluation will run on a single thread.",
+                      RuntimeWarning)
+
+    _n_threads = n_threads
+
 cdef class CPotentialWrapper:
     """
     Wrapper class for C implementation of potentials. At the C layer, potentials
@@ -49,9 +107,77 @@ cdef class CPotentialWrapper:
     given potential. This provides a Cython wrapper around this C implementation.
     """
 
+    def __dealloc__(self):
+        free_cpotential(&(self.cpotential))
+
+    cdef int _allocate(self, int n_components) except -1:
+        # allocate the per-component arrays in the C struct, which are owned by
+        # (and freed with) this wrapper
+        if allocate_cpotential(&(self.cpotential), n_components) != 0:
+            raise MemoryError("Failed to allocate memory for the C potential "
+                              "with {} components".format(n_components))
+        return 0
+
+    cdef int _compile(self, int *skip) except -1:
+        # build the execution plan used to evaluate the potential, skipping
+        # any components flagged in skip (may be NULL)
+        if compile_cpotential(&(self.cpotential), skip) != 0:
+            raise MemoryError("Failed to allocate memory for the C potential "
+                              "execution plan")
+        return 0
+
+    def compile(self):
+        """
+        Build the execution plan used to evaluate the potential in C. This
+        records which components need to be shifted to a different origin or
+        rotated, so that these transformations are skipped when possible.
+
+        This is done automatically on initialization, but must be redone if
+        the origin or rotation matrix of the potential are modified in place.
+        """
+        self._compile(NULL)
+
+    def parameter_buffer(self):
+        """
+        Return a writeable view of the array of parameter values used in C,
+        which starts with the gravitational constant. Values written to this
+        array are used the next time the potential is evaluated.
+        """
+        return np.asarray(self._params)
+
+    def set_parameter_tracks(self, tracks):
+        """
+        Set the packed time-dependent parameter tracks of the potential, or
+        remove them if ``tracks`` is None. See
+        `CPotentialBase.with_parameter_tracks` for the public interface.
+        """
+        if tracks is None:
+            self._tracks = None
+            self.cpotential.tracks[0] = NULL
+        else:
+            self._tracks = np.array(tracks, dtype=np.float64)
+            self.cpotential.tracks[0] = &(self._tracks[0])
+        self.compile()
+
+    def set_origin_trajectory(self, trajectory):
+        """
+        Set the packed trajectory of the origin of the potential, or remove it
+        if ``trajectory`` is None. See
+        `CPotentialBase.with_origin_trajectory` for the public interface.
+        """
+        if trajectory is None:
+            self._origin_tracks = None
+            self.cpotential.origin_tracks[0] = NULL
+        else:
+            self._origin_tracks = np.array(trajectory, dtype=np.float64)
+            self.cpotential.origin_tracks[0] = &(self._origin_tracks[0])
+        self.compile()
+
     cpdef init(self, list parameters, double[::1] q0, double[:, ::1] R,
                int n_dim=3):
 
+        self._allocate(1)
+
         # save the array of parameters so it doesn't get garbage-collected
         self._params = np.array(parameters, dtype=np.float64)
 
@@ -78,6 +204,13 @@ cdef class CPotentialWrapper:
         self.cpotential.gradient[0] = <gradientfunc>(nan_gradient)
         self.cpotential.hessian[0] = <hessianfunc>(nan_hessian)
 
+        # fused and batched kernels are optional: if NULL, the value and
+        # gradient functions above are used
+        self.cpotential.value_gradient[0] = NULL
+        self.cpotential.batch_value[0] = NULL
+        self.cpotential.batch_gradient[0] = NULL
+        self.cpotential.radial[0] = NULL
+
         # set the origin of the potentials
         self._q0 = np.array(q0)
         assert len(self._q0) == n_dim
@@ -87,27 +220,59 @@ cdef class CPotentialWrapper:
         self._R = np.ascontiguousarray(np.array(R).ravel())
         self.cpotential.R[0] = &(self._R[0])
 
-    cpdef energy(self, double[:, ::1] q, double[::1] t):
+        # by default, the parameters are constant in time
+        self._tracks = None
+        self.cpotential.tracks[0] = NULL
+
+        # ...and the origin is fixed
+        self._origin_tracks = None
+        self.cpotential.origin_tracks[0] = NULL
+
+        self._compile(NULL)
+
+    cpdef energy(self, double[:, ::1] q, double[::1] t, int n_threads=0,
+                 double[::1] out=None):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
         axes are (norbits, ndim).
         """
-        cdef int n, ndim, i
+        cdef int n, ndim, i, b, n_blocks
         n, ndim = _validate_pos_arr(q)
 
-        cdef double [::1] pot = np.zeros(n)
+        cdef:
+            double[::1] pot
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
+
+        if out is None:
+            pot = np.zeros(n)
+        elif out.shape[0] != n:
+            raise ValueError("Output array has the wrong shape.")
+        else:
+            pot = out
+
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        if t_stride == 0:
+            # a single time: evaluate blocks of positions with batched kernels
+            n_blocks = (n + C_BATCH_SIZE - 1) // C_BATCH_SIZE
+            for b in prange(n_blocks, nogil=True, schedule='static',
+                            num_threads=n_threads):
+                i = b * C_BATCH_SIZE
+                c_potential_batch(cp, t[0], &q[i, 0],
+                                  min(C_BATCH_SIZE, n - i), &pot[i])
 
-        if len(t) == 1:
-            for i in range(n):
-                pot[i] = c_potential(&(self.cpotential), t[0], &q[i, 0])
         else:
-            for i in range(n):
-                pot[i] = c_potential(&(self.cpotential), t[i], &q[i, 0])
+            for i in prange(n, nogil=True, schedule='static',
+                            num_threads=n_threads):
+                pot[i] = c_potential(cp, t[i], &q[i, 0])
 
-        return np.array(pot)
+        return np.asarray(pot)
 
-    cpdef density(self, double[:, ::1] q, double[::1] t):
+    cpdef density(self, double[:, ::1] q, double[::1] t, int n_threads=0,
+                  double[::1] out=None):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
@@ -116,38 +281,70 @@ cdef class CPotentialWrapper:
         cdef int n, ndim, i
         n, ndim = _validate_pos_arr(q)
 
-        cdef double [::1] dens = np.zeros(n)
+        cdef:
+            double[::1] dens
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
 
-        if len(t) == 1:
-            for i in range(n):
-                dens[i] = c_density(&(self.cpotential), t[0], &q[i, 0])
+        if out is None:
+            dens = np.zeros(n)
+        elif out.shape[0] != n:
+            raise ValueError("Output array has the wrong shape.")
         else:
-            for i in range(n):
-                dens[i] = c_density(&(self.cpotential), t[i], &q[i, 0])
+            dens = out
 
-        return np.array(dens)
+        if n_threads < 1:
+            n_threads = _n_threads
 
-    cpdef gradient(self, double[:, ::1] q, double[::1] t):
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            dens[i] = c_density(cp, t[i * t_stride], &q[i, 0])
+
+        return np.asarray(dens)
+
+    cpdef gradient(self, double[:, ::1] q, double[::1] t, int n_threads=0,
+                   double[:, ::1] out=None):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
         axes are (norbits, ndim).
         """
-        cdef int n, ndim, i
+        cdef int n, ndim, i, b, n_blocks
         n, ndim = _validate_pos_arr(q)
 
-        cdef double[:, ::1] grad = np.zeros((n, ndim))
+        cdef:
+            double[:, ::1] grad
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
+
+        if out is None:
+            grad = np.zeros((n, ndim))
+        elif out.shape[0] != n or out.shape[1] != ndim:
+            raise ValueError("Output array has the wrong shape.")
+        else:
+            grad = out
+
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        if t_stride == 0:
+            # a single time: evaluate blocks of positions with batched kernels
+            n_blocks = (n + C_BATCH_SIZE - 1) // C_BATCH_SIZE
+            for b in prange(n_blocks, nogil=True, schedule='static',
+                            num_threads=n_threads):
+                i = b * C_BATCH_SIZE
+                c_gradient_batch(cp, t[0], &q[i, 0],
+                                 min(C_BATCH_SIZE, n - i), &grad[i, 0])
 
-        if len(t) == 1:
-            for i in range(n):
-                c_gradient(&(self.cpotential), t[0], &q[i, 0], &grad[i, 0])
         else:
-            for i in range(n):
-                c_gradient(&(self.cpotential), t[i], &q[i, 0], &grad[i, 0])
+            for i in prange(n, nogil=True, schedule='static',
+                            num_threads=n_threads):
+                c_gradient(cp, t[i], &q[i, 0], &grad[i, 0])
 
-        return np.array(grad)
+        return np.asarray(grad)
 
-    cpdef hessian(self, double[:, ::1] q, double[::1] t):
+    cpdef hessian(self, double[:, ::1] q, double[::1] t, int n_threads=0,
+                  double[:, :, ::1] out=None):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
@@ -156,21 +353,59 @@ cdef class CPotentialWrapper:
         cdef int n, ndim, i
         n, ndim = _validate_pos_arr(q)
 
-        cdef double[:, :, ::1] hess = np.zeros((n, ndim, ndim))
+        cdef:
+            double[:, :, ::1] hess
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
 
-        if len(t) == 1:
-            for i in range(n):
-                c_hessian(&(self.cpotential), t[0], &q[i, 0], &hess[i, 0, 0])
+        if out is None:
+            hess = np.zeros((n, ndim, ndim))
+        elif (out.shape[0] != n or out.shape[1] != ndim or
+                out.shape[2] != ndim):
+            raise ValueError("Output array has the wrong shape.")
         else:
-            for i in range(n):
-                c_hessian(&(self.cpotential), t[i], &q[i, 0], &hess[i, 0, 0])
+            hess = out
 
-        return np.array(hess)
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            c_hessian(cp, t[i * t_stride], &q[i, 0], &hess[i, 0, 0])
+
+        return np.asarray(hess)
+
+    cpdef energy_gradient(self, double[:, ::1] q, double[::1] t,
+                          int n_threads=0):
+        """
+        CAUTION: Interpretation of axes is different here! We need the
+        arrays to be C ordered and easy to iterate over, so here the
+        axes are (norbits, ndim).
+        """
+        cdef int n, ndim, i
+        n, ndim = _validate_pos_arr(q)
+
+        cdef:
+            double [::1] pot = np.zeros(n)
+            double[:, ::1] grad = np.zeros((n, ndim))
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
+
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            pot[i] = c_potential_gradient(cp, t[i * t_stride], &q[i, 0],
+                                          &grad[i, 0])
+
+        return np.asarray(pot), np.asarray(grad)
 
     # ------------------------------------------------------------------------
     # Other functionality
     #
-    cpdef d_dr(self, double[:, ::1] q, double G, double[::1] t):
+    cpdef d_dr(self, double[:, ::1] q, double G, double[::1] t,
+               int n_threads=0):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
@@ -179,19 +414,23 @@ cdef class CPotentialWrapper:
         cdef int n, ndim, i
         n, ndim = _validate_pos_arr(q)
 
-        cdef double [::1] dr = np.zeros(n, dtype=np.float64)
-        cdef double [::1] epsilon = np.zeros(ndim, dtype=np.float64)
+        cdef:
+            double [::1] dr = np.zeros(n, dtype=np.float64)
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
 
-        if len(t) == 1:
-            for i in range(n):
-                dr[i] = c_d_dr(&(self.cpotential), t[0], &q[i, 0], &epsilon[0])
-        else:
-            for i in range(n):
-                dr[i] = c_d_dr(&(self.cpotential), t[i], &q[i, 0], &epsilon[0])
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            dr[i] = c_radial_derivatives(cp, t[i * t_stride], &q[i, 0],
+                                         NULL, NULL)
 
         return np.array(dr)
 
-    cpdef d2_dr2(self, double[:, ::1] q, double G, double[::1] t):
+    cpdef d2_dr2(self, double[:, ::1] q, double G, double[::1] t,
+                 int n_threads=0):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
@@ -200,19 +439,22 @@ cdef class CPotentialWrapper:
         cdef int n, ndim, i
         n, ndim = _validate_pos_arr(q)
 
-        cdef double [::1] dr2 = np.zeros(n, dtype=np.float64)
-        cdef double [::1] epsilon = np.zeros(ndim, dtype=np.float64)
+        cdef:
+            double [::1] dr2 = np.zeros(n, dtype=np.float64)
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
 
-        if len(t) == 1:
-            for i in range(n):
-                dr2[i] = c_d2_dr2(&(self.cpotential), t[0], &q[i, 0], &epsilon[0])
-        else:
-            for i in range(n):
-                dr2[i] = c_d2_dr2(&(self.cpotential), t[i], &q[i, 0], &epsilon[0])
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            c_radial_derivatives(cp, t[i * t_stride], &q[i, 0], &dr2[i], NULL)
 
         return np.array(dr2)
 
-    cpdef mass_enclosed(self, double[:, ::1] q, double G, double[::1] t):
+    cpdef mass_enclosed(self, double[:, ::1] q, double G, double[::1] t,
+                        int n_threads=0):
         """
         CAUTION: Interpretation of axes is different here! We need the
         arrays to be C ordered and easy to iterate over, so here the
@@ -221,35 +463,318 @@ cdef class CPotentialWrapper:
         cdef int n, ndim, i
         n, ndim = _validate_pos_arr(q)
 
-        cdef double [::1] mass = np.zeros(n, dtype=np.float64)
-        cdef double [::1] epsilon = np.zeros(ndim, dtype=np.float64)
+        cdef:
+            double [::1] mass = np.zeros(n, dtype=np.float64)
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
 
-        if len(t) == 1:
-            for i in range(n):
-                mass[i] = c_mass_enclosed(&(self.cpotential), t[0], &q[i, 0], G, &epsilon[0])
-        else:
-            for i in range(n):
-                mass[i] = c_mass_enclosed(&(self.cpotential), t[i], &q[i, 0], G, &epsilon[0])
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            mass[i] = c_mass_enclosed(cp, t[i * t_stride], &q[i, 0], G, NULL)
 
         return np.array(mass)
 
+    cpdef radial_derivatives(self, double[:, ::1] q, double[::1] t,
+                             int n_threads=0):
+        """
+        Compute the value of the potential and its first and second
+        derivatives along the radial direction at each position, returned as
+        an array with shape (norbits, 3).
+
+        CAUTION: Interpretation of axes is different here! We need the
+        arrays to be C ordered and easy to iterate over, so here the
+        axes are (norbits, ndim).
+        """
+        cdef int n, ndim, i
+        n, ndim = _validate_pos_arr(q)
+
+        cdef:
+            double [:, ::1] out = np.zeros((n, 3), dtype=np.float64)
+            CPotential *cp = &(self.cpotential)
+            int t_stride = _validate_time_arr(t, n)
+
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        for i in prange(n, nogil=True, schedule='static',
+                        num_threads=n_threads):
+            out[i, 1] = c_radial_derivatives(cp, t[i * t_stride], &q[i, 0],
+                                             &out[i, 2], &out[i, 0])
+
+        return np.asarray(out)
+
+    def grid(self, str quantity, double[::1] nodes, int[::1] shape,
+             double t, double[::1] out, int n_threads=0):
+        """
+        Evaluate the energy or density on the tensor-product grid of the
+        coordinate values along each dimension, concatenated in ``nodes``
+        (``shape`` contains the number of values along each dimension). The
+        values are written to the flattened, C-ordered output array ``out``.
+
+        The positions are generated in blocks by each thread, so the full
+        array of grid positions is never created.
+        """
+        cdef:
+            int ndim = self.cpotential.n_dim
+            int k, kk, j, m, mode
+            Py_ssize_t n = out.shape[0]
+            Py_ssize_t n_blocks, b, i0, idx
+            int[::1] starts
+            double *pos
+            CPotential *cp = &(self.cpotential)
+
+        if shape.shape[0] != ndim:
+            raise ValueError(f"Expected the number of grid values along each "
+                             f"of the {ndim} dimensions.")
+
+        if np.prod(np.asarray(shape), dtype=np.int64) != n:
+            raise ValueError("Output array has the wrong shape.")
+
+        starts = np.concatenate(([0], np.cumsum(shape)[:ndim-1])).astype(
+            np.int32)
+        if np.sum(shape) != nodes.shape[0]:
+            raise ValueError("The number of grid values does not match the "
+                             "shape of the grid.")
+
+        if quantity == 'energy':
+            mode = 0
+        elif quantity == 'density':
+            mode = 1
+        else:
+            raise ValueError(f"Invalid quantity '{quantity}'")
+
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        n_blocks = (n + C_BATCH_SIZE - 1) // C_BATCH_SIZE
+        if n_blocks > 0:
+            with nogil, parallel(num_threads=n_threads):
+                pos = <double *>malloc(C_BATCH_SIZE * ndim * sizeof(double))
+
+                for b in prange(n_blocks, schedule='static'):
+                    i0 = b * C_BATCH_SIZE
+                    m = C_BATCH_SIZE
+                    if n - i0 < m:
+                        m = n - i0
+
+                    # unravel the (C-ordered) index of each grid point
+                    for j in range(m):
+                        idx = i0 + j
+                        for k in range(ndim):
+                            kk = ndim - 1 - k
+                            pos[j*ndim + kk] = nodes[starts[kk] +
+                                                     idx % shape[kk]]
+                            idx = idx // shape[kk]
+
+                    if mode == 0:
+                        c_potential_batch(cp, t, pos, m, &out[i0])
+                    else:
+                        for j in range(m):
+                            out[i0 + j] = c_density(cp, t, &pos[j*ndim])
+
+                free(pos)
+
+        return np.asarray(out)
+
+    # ------------------------------------------------------------------------
+    # Evaluation over many sets of parameters (see PotentialEnsemble)
+    #
+    def parameter_buffers(self):
+        """
+        Return a list of the C parameter arrays of each component (for simple
+        potentials, a list containing only `parameter_buffer()`).
+        """
+        if self._potentials is None:
+            return [self.parameter_buffer()]
+        return [(<CPotentialWrapper>p).parameter_buffer()
+                for p in self._potentials]
+
+    def ensemble(self, str quantity, double[:, ::1] q, double t,
+                 double[:, ::1] parameters, int[::1] offsets,
+                 int n_threads=0):
+        """
+        Evaluate the energy, gradient, or density at the positions ``q`` for
+        each row of ``parameters``, which contains the (concatenated) C
+        parameter arrays of all components, with the parameters of component
+        ``k`` starting at ``offsets[k]``.
+
+        CAUTION: Interpretation of axes is different here! We need the
+        arrays to be C ordered and easy to iterate over, so here the
+        axes are (norbits, ndim).
+        """
+        cdef int n, ndim, i, k, s, mode
+        n, ndim = _validate_pos_arr(q)
+
+        cdef:
+            int n_sets = parameters.shape[0]
+            int n_components = self.cpotential.n_components
+            double[:, ::1] values = None
+            double[:, :, ::1] grad = None
+            CPotential *cp = &(self.cpotential)
+            CPotential *local
+            double **local_pars
+
+        if offsets.shape[0] != n_components:
+            raise ValueError("Expected one parameter offset per component.")
+
+        if quantity == 'energy':
+            mode = 0
+            values = np.zeros((n_sets, n))
+        elif quantity == 'gradient':
+            mode = 1
+            grad = np.zeros((n_sets, n, ndim))
+        elif quantity == 'density':
+            mode = 2
+            values = np.zeros((n_sets, n))
+        else:
+            raise ValueError(f"Invalid quantity '{quantity}'")
+
+        if n_threads < 1:
+            n_threads = _n_threads
+
+        if n > 0:
+            # each thread evaluates a shallow copy of the C potential, with its
+            # own array of pointers to the parameters of the components
+            with nogil, parallel(num_threads=n_threads):
+                local = <CPotential *>malloc(sizeof(CPotential))
+                local_pars = <double **>malloc(n_components * sizeof(double *))
+                local[0] = cp[0]
+                local.parameters = local_pars
+
+                for s in prange(n_sets, schedule='static'):
+                    for k in range(n_components):
+                        local_pars[k] = &parameters[s, offsets[k]]
+
+                    if mode == 0:
+                        c_potential_batch(local, t, &q[0, 0], n,
+                                          &values[s, 0])
+                    elif mode == 1:
+                        c_gradient_batch(local, t, &q[0, 0], n,
+                                         &grad[s, 0, 0])
+                    else:
+                        for i in range(n):
+                            values[s, i] = c_density(local, t, &q[i, 0])
+
+                free(local_pars)
+                free(local)
+
+        if mode == 1:
+            return np.asarray(grad)
+        return np.asarray(values)
+
     # For pickling in Python 2
     def __reduce__(self):
+        tracks = None
+        if self._tracks is not None:
+            tracks = np.array(self._tracks)
+
+        trajectory = None
+        if self._origin_tracks is not None:
+            trajectory = np.array(self._origin_tracks)
+
         return (self.__class__,
                 (self._params[0], list(self._params[1:]),
                  np.array(self._q0),
                  np.array(self._R).reshape(self.cpotential.n_dim,
-                                           self.cpotential.n_dim)))
+                                           self.cpotential.n_dim)),
+                (tracks, trajectory))
+
+    def __setstate__(self, state):
+        tracks, trajectory = state
+        if tracks is not None:
+            self.set_parameter_tracks(tracks)
+        if trajectory is not None:
+            self.set_origin_trajectory(trajectory)
+
+cdef class CFunctionPointerWrapper(CPotentialWrapper):
+    """
+    Wrapper class for potentials implemented by C functions that are loaded
+    at runtime (e.g., from a shared library compiled on the fly). The
+    addresses of the functions are taken from the ``_function_addresses``
+    attribute, which subclasses must define as a dict with (any of) the keys
+    ``'value'``, ``'gradient'``, ``'density'``, and ``'hessian'``. The functions
+    must have the same signatures as the builtin potential functions (see
+    ``src/funcdefs.h``), and the gradient and Hessian functions must add to
+    the output array.
+    """
+
+    def __init__(self, G, parameters, q0, R):
+        q0 = np.ascontiguousarray(q0)
+        self.init([G] + list(parameters),
+                  q0,
+                  np.ascontiguousarray(R),
+                  n_dim=len(q0))
+
+        addresses = self._function_addresses
+        if addresses.get('value'):
+            self.cpotential.value[0] = \
+                <energyfunc><uintptr_t>addresses['value']
+        if addresses.get('gradient'):
+            self.cpotential.gradient[0] = \
+                <gradientfunc><uintptr_t>addresses['gradient']
+        if addresses.get('density'):
+            self.cpotential.density[0] = \
+                <densityfunc><uintptr_t>addresses['density']
+        if addresses.get('hessian'):
+            self.cpotential.hessian[0] = \
+                <hessianfunc><uintptr_t>addresses['hessian']
 
 # ----------------------------------------------------------------------------
 
 # TODO: docstrings are now fucked for energy, gradient, etc.
 
+class _CRawPotentialMethods(_RawPotentialMethods):
+    """
+    Unit-free evaluation of a potential implemented in C. This calls the C
+    wrapper directly, which writes into the output array (if provided).
+    """
+
+    def energy(self, q, t=0., out=None):
+        q, t = self._prepare(q, t)
+        E = self._potential.c_instance.energy(q, t, out=out)
+        return E if out is None else out
+
+    def gradient(self, q, t=0., out=None):
+        q, t = self._prepare(q, t)
+        grad = self._potential.c_instance.gradient(q, t, out=out)
+        return grad if out is None else out
+
+    def density(self, q, t=0., out=None):
+        q, t = self._prepare(q, t)
+        dens = self._potential.c_instance.density(q, t, out=out)
+        return dens if out is None else out
+
+    def hessian(self, q, t=0., out=None):
+        q, t = self._prepare(q, t)
+        hess = self._potential.c_instance.hessian(q, t, out=out)
+        return hess if out is None else out
+
+    def energy_and_gradient(self, q, t=0.):
+        q, t = self._prepare(q, t)
+        return self._potential.c_instance.energy_gradient(q, t)
+
+
 class CPotentialBase(PotentialBase):
     """
     A baseclass for defining gravitational potentials implemented in C.
     """
     Wrapper = None
+    _RawMethods = _CRawPotentialMethods
+
+    # any extra keyword arguments passed to the wrapper class
+    _wrapper_kwargs = {}
+
+    # the names of any parameters that are not copied to the C parameter
+    # array, because the C implementation only uses C-only parameters derived
+    # from them (see _setup_wrapper())
+    _python_only_parameters = ()
+
+    # the wrapper class used for a tabulated radial profile (see
+    # tabulate_radial_profile()), for spherical potentials that support it
+    _RadialTableWrapper = None
 
     def __init__(self, *args, units=None, origin=None, R=None, **kwargs):
         super().__init__(*args,
@@ -271,9 +796,24 @@ class CPotentialBase(PotentialBase):
         for k, v in c_only_parameters.items():
             arrs.append(np.atleast_1d(v).ravel())
 
+        # the index of each parameter in the C parameter array, which starts
+        # with G and the C-only parameters, and its (unraveled) size
+        self._c_parameter_index = dict()
+        start = 1 + sum([len(arr) for arr in arrs])
+        first = start
+
         # to support array parameters, but they get unraveled
-        arrs = arrs + [np.atleast_1d(v.value).ravel()
-                       for v in self.parameters.values()]
+        for k, v in self.parameters.items():
+            if k in self._python_only_parameters:
+                continue
+            arr = np.atleast_1d(v.value).ravel()
+            arrs.append(arr)
+            self._c_parameter_index[k] = (start, len(arr))
+            start += len(arr)
+
+        # the slice of the C parameter array with the parameter values (see
+        # set_parameters_raw())
+        self._raw_parameter_slice = (first, start - first)
 
         if len(arrs) > 0:
             self.c_parameters = np.concatenate(arrs)
@@ -285,7 +825,8 @@ class CPotentialBase(PotentialBase):
         else:
             self._R = self.R
         self.c_instance = self.Wrapper(self.G, self.c_parameters,
-                                       q0=self.origin, R=self._R)
+                                       q0=self.origin, R=self._R,
+                                       **self._wrapper_kwargs)
 
     def _energy(self, q, t):
         return self.c_instance.energy(q, t=t)
@@ -299,6 +840,20 @@ class CPotentialBase(PotentialBase):
     def _hessian(self, q, t):
         return self.c_instance.hessian(q, t=t)
 
+    def _energy_and_gradient(self, q, t):
+        return self.c_instance.energy_gradient(q, t=t)
+
+    def _evaluate_on_grid(self, axes, quantity, t, out, n_threads):
+        if len(t) != 1:
+            raise ValueError("Grids can only be evaluated at a single time.")
+
+        if n_threads is None:
+            n_threads = 0
+
+        shape = np.array([len(ax) for ax in axes], dtype=np.int32)
+        return self.c_instance.grid(quantity, np.concatenate(axes), shape,
+                                    t[0], out, n_threads=n_threads)
+
     # ----------------------------------------------------------
     # Overwrite the Python potential method to use Cython method
     def mass_enclosed(self, q, t=0.):
@@ -306,7 +861,9 @@ class CPotentialBase(PotentialBase):
         mass_enclosed(q, t)
 
         Estimate the mass enclosed within the given position by assuming the potential
-        is spherical. This is not so good!
+        is spherical. This uses the analytic radial derivative of spherical
+        potentials, or the projection of the gradient along the radial
+        direction otherwise.
 
         Parameters
         ----------
@@ -329,6 +886,548 @@ class CPotentialBase(PotentialBase):
 
         return sgn * menc.reshape(orig_shape[1:]) * self.units['mass']
 
+    def circular_velocity(self, q, t=0.):
+        """
+        circular_velocity(q, t=0)
+
+        Estimate the circular velocity at the given position assuming the
+        potential is spherical.
+
+        Parameters
+        ----------
+        q : array_like, numeric
+            Position(s) to estimate the circular velocity.
+
+        Returns
+        -------
+        vcirc : `~astropy.units.Quantity`
+            Circular velocity at the given position(s). If the input position
+            has shape ``q.shape``, the output energy will have shape
+            ``q.shape[1:]``.
+        """
+        q = self._remove_units_prepare_shape(q)
+        orig_shape, q = self._get_c_valid_arr(q)
+        t = self._validate_prepare_time(t, q)
+
+        r = np.sqrt(np.sum(q**2, axis=1))
+        dPhi_dr = self.c_instance.d_dr(q, self.G, t=t)
+        vc = np.sqrt(r * np.abs(dPhi_dr)).reshape(orig_shape[1:])
+        return self.units.decompose(
+            vc * self.units['length'] / self.units['time'])
+
+    def radial_profile(self, r, t=0., direction=None):
+        """
+        radial_profile(r, t=0, direction=None)
+
+        Compute the potential, its first and second radial derivatives, the
+        circular velocity, and the enclosed mass on a grid of radii in a
+        single pass in C.
+
+        The radial derivatives are analytic for spherical potentials (and
+        composite potentials of spherical components that are not shifted from
+        the origin). For other potentials, the first derivative is the
+        projection of the gradient along the radial direction, and the second
+        derivative is estimated with finite differences. As with
+        `circular_velocity` and `mass_enclosed`, the circular velocity and
+        enclosed mass assume that the potential is spherical.
+
+        Parameters
+        ----------
+        r : `~astropy.units.Quantity`, array_like
+            A 1D array of radii.
+        t : numeric, `~astropy.units.Quantity` (optional)
+            The time.
+        direction : array_like (optional)
+            The direction from the origin along which to evaluate the
+            profile. Defaults to the x axis.
+
+        Returns
+        -------
+        profile : `~astropy.table.QTable`
+            A table with columns ``r``, ``Phi``, ``dPhi_dr``, ``d2Phi_dr2``,
+            ``v_circ``, and ``m_enc``.
+
+        Examples
+        --------
+
+            >>> import astropy.units as u
+            >>> from gala.potential import HernquistPotential
+            >>> from gala.units import galactic
+            >>> pot = HernquistPotential(m=1E11, c=5., units=galactic)
+            >>> prof = pot.radial_profile([1., 10., 100.] * u.kpc)
+            >>> prof['m_enc'] # doctest: +FLOAT_CMP
+            <Quantity [2.77777778e+09, 4.44444444e+10, 9.07029478e+10] solMass>
+        """
+        from astropy.table import QTable
+
+        r = np.atleast_1d(self._remove_units(r)).astype(np.float64)
+        if r.ndim != 1:
+            raise ValueError("The radii must be a 1D array.")
+
+        if direction is None:
+            direction = np.zeros(self.ndim)
+            direction[0] = 1.
+        direction = np.array(direction, dtype=np.float64)
+        if direction.shape != (self.ndim, ):
+            raise ValueError(f"The direction must have shape ({self.ndim}, )")
+        direction = direction / np.sqrt(np.sum(direction**2))
+
+        q = np.ascontiguousarray(r[:, None] * direction[None])
+        t = self._validate_prepare_time(t, q)
+        derivs = self.c_instance.radial_derivatives(q, t=t)
+
+        units = self.units
+        Phi = derivs[:, 0] * units['energy'] / units['mass']
+        dPhi_dr = derivs[:, 1] * units['length'] / units['time']**2
+        d2Phi_dr2 = derivs[:, 2] / units['time']**2
+        v_circ = np.sqrt(r * np.abs(derivs[:, 1]))
+        m_enc = np.abs(r**2 * derivs[:, 1] / self.G)
+        if 'm' in self.parameters and self.parameters['m'] < 0:
+            m_enc = -m_enc
+
+        profile = QTable()
+        profile['r'] = r * units['length']
+        profile['Phi'] = Phi
+        profile['dPhi_dr'] = dPhi_dr.to(units['acceleration'])
+        profile['d2Phi_dr2'] = d2Phi_dr2
+        profile['v_circ'] = units.decompose(
+            v_circ * units['length'] / units['time'])
+        profile['m_enc'] = m_enc * units['mass']
+        return profile
+
+    def get_parameters_raw(self):
+        """
+        get_parameters_raw()
+
+        Return the values of all parameters of the potential as a 1D array.
+
+        The values are in the unit system of the potential, in the order of
+        the ``parameters`` dictionary (array-valued parameters are
+        flattened). This is the layout expected by `set_parameters_raw`.
+        Parameters that are not stored in the C implementation (e.g., the
+        tabulated values of an `~gala.potential.InterpolatedPotential`) are
+        not included.
+
+        Returns
+        -------
+        values : `~numpy.ndarray`
+        """
+        start, size = self._raw_parameter_slice
+        return np.array(self.c_instance.parameter_buffer()[start:start+size])
+
+    def set_parameters_raw(self, values):
+        """
+        set_parameters_raw(values)
+
+        Update the values of all parameters of the potential in place.
+
+        This writes the values directly into the parameter array used by the
+        C implementation, so it is much faster than creating a new potential
+        (e.g., in the inner loop of an optimizer or MCMC sampler). The values
+        must be in the unit system of the potential, in the layout returned by
+        `get_parameters_raw`. Only the length of the input array is validated.
+        Parameters with time-dependent tracks (see `with_parameter_tracks`)
+        still follow their tracks.
+
+        Parameters
+        ----------
+        values : array_like
+            The new values of the parameters, as a 1D array.
+
+        Examples
+        --------
+
+            >>> from gala.potential import HernquistPotential
+            >>> from gala.units import galactic
+            >>> pot = HernquistPotential(m=1E10, c=1., units=galactic)
+            >>> pot.get_parameters_raw()
+            array([1.e+10, 1.e+00])
+            >>> pot.set_parameters_raw([2E10, 1.5])
+            >>> pot.parameters['m']
+            <Quantity 2.e+10 solMass>
+        """
+        values = np.asarray(values, dtype=np.float64)
+        start, size = self._raw_parameter_slice
+        if values.shape != (size, ):
+            raise ValueError(f"Expected an array of {size} parameter values, "
+                             f"but got an array with shape {values.shape}")
+
+        if type(self.c_instance) is not self.Wrapper:
+            raise ValueError("The parameters of potentials with a tabulated "
+                             "radial profile cannot be updated in place.")
+
+        self._check_parameters_raw(values)
+        self.c_instance.parameter_buffer()[start:start+size] = values
+
+        # keep the parameter quantities in sync with the C parameters
+        for name, (i, n) in self._c_parameter_index.items():
+            par = self.parameters[name]
+            self.parameters[name] = u.Quantity(
+                values[i-start:i-start+n].reshape(par.shape), par.unit)
+
+    def set_parameters(self, **values):
+        """
+        set_parameters(**values)
+
+        Update the values of some parameters of the potential in place.
+
+        This is a slower but safer (e.g., unit-aware) version of
+        `set_parameters_raw`: the values are validated and converted to the
+        unit system of the potential. Array-valued parameters must keep the
+        same shape.
+
+        Parameters
+        ----------
+        **values
+            The new values of the parameters, by name.
+
+        Examples
+        --------
+
+            >>> import astropy.units as u
+            >>> from gala.potential import HernquistPotential
+            >>> from gala.units import galactic
+            >>> pot = HernquistPotential(m=1E10, c=1., units=galactic)
+            >>> pot.set_parameters(c=500*u.pc)
+            >>> pot.parameters['c']
+            <Quantity 0.5 kpc>
+        """
+        for name in values:
+            if name not in self.parameters:
+                raise ValueError(f"Invalid parameter '{name}' for potential "
+                                 f"class {self.__class__.__name__}")
+
+            if name in self._python_only_parameters:
+                raise NotImplementedError(
+                    f"Parameter '{name}' of potential class "
+                    f"{self.__class__.__name__} cannot be updated in place: "
+                    "create a new potential instead.")
+
+        values = self._prepare_parameters(values, self.units)
+
+        start, _ = self._raw_parameter_slice
+        raw = self.get_parameters_raw()
+        for name, value in values.items():
+            shape = self.parameters[name].shape
+            if value.shape != shape:
+                raise ValueError(f"The value of parameter '{name}' must have "
+                                 f"shape {shape}, not {value.shape}")
+
+            i, n = self._c_parameter_index[name]
+            raw[i-start:i-start+n] = np.ravel(value.value)
+
+        self.set_parameters_raw(raw)
+
+    def _check_parameters_raw(self, values):
+        # subclasses can override this to raise an error if the C
+        # implementation cannot be updated in place with the input values
+        pass
+
+    def tabulate_radial_profile(self, r_min=1E-2, r_max=1E3, tol=1E-8,
+                                max_nodes=65536):
+        """
+        tabulate_radial_profile(r_min=1E-2, r_max=1E3, tol=1E-8, max_nodes=65536)
+
+        Return a copy of this potential that evaluates the energy and gradient
+        from a lookup table of the radial profile, rather than from the
+        (possibly expensive) exact expressions. This is only supported for
+        some spherical potentials.
+
+        The potential and its radial derivative are tabulated at nodes evenly
+        spaced in ``log(r)``, and are interpolated with cubic Hermite
+        polynomials. The number of nodes is doubled until the maximum
+        fractional error of both quantities (measured halfway between nodes)
+        is below ``tol``. The exact expressions are still used outside of
+        ``[r_min, r_max]``, and for the density and Hessian. The table is not
+        preserved by ``replace_units()`` or when saving the potential to a
+        file.
+
+        Parameters
+        ----------
+        r_min : :class:`~astropy.units.Quantity`, numeric (optional)
+            The inner radius of the table.
+        r_max : :class:`~astropy.units.Quantity`, numeric (optional)
+            The outer radius of the table.
+        tol : float (optional)
+            The maximum fractional interpolation error.
+        max_nodes : int (optional)
+            The maximum number of nodes in the table.
+
+        Returns
+        -------
+        pot : `~gala.potential.CPotentialBase`
+            A copy of this potential that uses the tabulated profile.
+        """
+        if self._RadialTableWrapper is None:
+            raise NotImplementedError("A tabulated radial profile is not "
+                                      "supported for potential class "
+                                      f"{self.__class__.__name__}")
+
+        if getattr(self, '_parameter_tracks', None):
+            raise ValueError("A tabulated radial profile is not supported for "
+                             "potentials with time-dependent parameters.")
+
+        ln_r_min, ln_r_max = np.log([self._remove_units(r_min),
+                                     self._remove_units(r_max)])
+        if not ln_r_max > ln_r_min:
+            raise ValueError("The radial bounds of the table must satisfy "
+                             "0 < r_min < r_max.")
+
+        # tabulate the exact profile, ignoring any origin trajectory
+        exact = self.Wrapper(self.G, self.c_parameters, q0=self.origin,
+                             R=self._R, **self._wrapper_kwargs)
+
+        t = np.array([0.])
+        n = 64
+        while True:
+            if n > max_nodes:
+                raise ValueError("Failed to reach a fractional interpolation "
+                                 f"error of {tol} with {max_nodes} nodes: "
+                                 "increase max_nodes or the tolerance.")
+
+            # the nodes of the table, with the midpoints between them
+            ln_r = np.linspace(ln_r_min, ln_r_max, 2*n - 1)
+            h = 2 * (ln_r[1] - ln_r[0])
+            r = np.exp(ln_r)
+            q = np.zeros((len(r), 3))
+            q[:, 0] = r
+            q = np.ascontiguousarray(q + self.origin[None])
+
+            Phi = exact.energy(q, t)
+            dPhi_dr = exact.gradient(q, t)[:, 0]
+            d2Phi_dr2 = (4*np.pi*self.G * exact.density(q, t) -
+                         2 * dPhi_dr / r)
+
+            # derivatives with respect to log(r) of each interpolated quantity
+            f = np.stack((Phi, dPhi_dr))
+            df = np.stack((r * dPhi_dr, r * d2Phi_dr2))
+
+            # cubic Hermite interpolation evaluated at the midpoints
+            f_mid = (0.5 * (f[:, :2*n-2:2] + f[:, 2::2]) +
+                     h / 8 * (df[:, :2*n-2:2] - df[:, 2::2]))
+            err = np.abs(f_mid - f[:, 1::2]) / np.abs(f[:, 1::2])
+            if np.all(np.isfinite(err)) and err.max() <= tol:
+                break
+
+            n = 2 * n
+
+        node_vals = np.stack((Phi, r * dPhi_dr, dPhi_dr, r * d2Phi_dr2),
+                             axis=1)[::2]
+        table = np.concatenate(([n, ln_r_min, h], node_vals.ravel()))
+
+        pot = pycopy.deepcopy(self)
+        pot.c_instance = self._RadialTableWrapper(
+            self.G, np.concatenate((self.c_parameters, table)),
+            q0=self.origin, R=self._R)
+        if getattr(self, '_origin_trajectory', None) is not None:
+            pot.c_instance.set_origin_trajectory(
+                pot._pack_origin_trajectory())
+        return pot
+
+    def with_parameter_tracks(self, t, interpolation='cubic', **tracks):
+        """
+        with_parameter_tracks(t, interpolation='cubic', **tracks)
+
+        Return a copy of this potential with time-dependent parameters.
+
+        Each parameter passed in as a keyword argument is given a value at
+        each of the times ``t`` (the knots), and is interpolated between these
+        in C whenever the potential is evaluated. This means that potentials
+        with, e.g., a growing mass can be used with the C integrators. Outside
+        of the time range of the knots, the parameter values are held
+        constant at the first or last value. The ``parameters`` attribute of
+        the potential still contains the original (constant) values.
+
+        Tracks can be added to more than one parameter by passing several
+        keyword arguments, or by calling this method again (e.g., to use
+        different knots for different parameters). Parameter tracks are
+        preserved by ``replace_units()`` and pickling, but not when saving the
+        potential to a file.
+
+        Parameters
+        ----------
+        t : :class:`~astropy.units.Quantity`, array_like
+            The times of the knots. These must be strictly increasing.
+        interpolation : str (optional)
+            The interpolation scheme, either ``'cubic'`` (a cubic spline) or
+            ``'linear'``.
+        **tracks
+            The values of each parameter at the knots, with shape
+            ``(len(t),) + parameter.shape``.
+
+        Returns
+        -------
+        pot : `~gala.potential.CPotentialBase`
+            A copy of this potential with time-dependent parameters.
+
+        Examples
+        --------
+
+            >>> import astropy.units as u
+            >>> from gala.potential import HernquistPotential
+            >>> from gala.units import galactic
+            >>> pot = HernquistPotential(m=1E10*u.Msun, c=1*u.kpc,
+            ...                          units=galactic)
+            >>> pot = pot.with_parameter_tracks(t=[0, 1, 2]*u.Gyr,
+            ...                                 m=[1E10, 2E10, 4E10]*u.Msun)
+            >>> pot.energy([1, 0, 0.]*u.kpc, t=1*u.Gyr) # doctest: +FLOAT_CMP
+            <Quantity [-0.04498502] kpc2 / Myr2>
+        """
+        if isinstance(self, CompositePotential):
+            raise NotImplementedError("Parameter tracks must be added to the "
+                                      "components of a composite potential.")
+
+        if type(self.c_instance) is not self.Wrapper:
+            raise ValueError("Parameter tracks are not supported for "
+                             "potentials with a tabulated radial profile.")
+
+        if interpolation not in ['cubic', 'linear']:
+            raise ValueError(f"Invalid interpolation '{interpolation}': must "
+                             "be 'cubic' or 'linear'")
+
+        t = np.atleast_1d(self._remove_units(t)).astype(np.float64)
+        if t.ndim != 1 or len(t) < 2 or np.any(np.diff(t) <= 0):
+            raise ValueError("The knot times must be a 1D, strictly "
+                             "increasing array with at least 2 elements.")
+
+        pot = pycopy.deepcopy(self)
+        pot._parameter_tracks = dict(getattr(self, '_parameter_tracks', {}))
+
+        for name, values in tracks.items():
+            if name not in self.parameters:
+                raise ValueError(f"Invalid parameter '{name}' for potential "
+                                 f"class {self.__class__.__name__}")
+
+            if name in self._python_only_parameters:
+                raise ValueError(f"Parameter '{name}' of potential class "
+                                 f"{self.__class__.__name__} does not support "
+                                 "parameter tracks.")
+
+            values = self._prepare_parameters({name: values}, self.units)
+            values = values[name]
+            shape = (len(t),) + self.parameters[name].shape
+            if values.shape != shape:
+                raise ValueError(f"The values of parameter '{name}' must have "
+                                 f"shape {shape}, not {values.shape}")
+
+            pot._parameter_tracks[name] = (t * self.units['time'], values,
+                                           interpolation)
+
+        pot.c_instance.set_parameter_tracks(pot._pack_parameter_tracks())
+        return pot
+
+    def _pack_parameter_tracks(self):
+        # pack the parameter tracks into the format used in C: see
+        # component_parameters() in src/cpotential.c
+        from scipy.interpolate import CubicSpline
+
+        if len(self.c_parameters) + 1 > 4096:
+            raise ValueError("Parameter tracks are only supported for "
+                             "potentials with at most 4096 parameter values.")
+
+        packed = []
+        n_tracks = 0
+        for name, (t, values, interpolation) in self._parameter_tracks.items():
+            t = t.decompose(self.units).value
+            values = values.decompose(self.units).value.reshape(len(t), -1)
+            start, size = self._c_parameter_index[name]
+
+            for j in range(size):
+                y = values[:, j]
+                if interpolation == 'cubic':
+                    coeff = CubicSpline(t, y).c.T
+                else:
+                    coeff = np.zeros((len(t) - 1, 4))
+                    coeff[:, 2] = np.diff(y) / np.diff(t)
+                    coeff[:, 3] = y[:len(t) - 1]
+
+                packed.append([start + j, len(t)])
+                packed.append(t)
+                packed.append(coeff.ravel())
+                n_tracks += 1
+
+        return np.concatenate([[n_tracks]] + packed)
+
+    def with_origin_trajectory(self, orbit):
+        """
+        with_origin_trajectory(orbit)
+
+        Return a copy of this potential whose origin moves along a trajectory.
+
+        The trajectory is specified by an `~gala.dynamics.Orbit` (e.g., the
+        orbit of a satellite galaxy). The origin of the potential is
+        interpolated in C between the positions of the orbit with cubic
+        Hermite polynomials that match both the positions and velocities at
+        each time. This is useful for, e.g., integrating the orbits of test
+        particles in the field of a perturber on a known orbit without the
+        overhead of a direct N-body integration. Outside of the time range of
+        the orbit, the origin is held fixed at the first or last position.
+        The ``origin`` attribute of the potential still contains the original
+        (fixed) origin. The trajectory is preserved by ``replace_units()`` and
+        pickling, but not when saving the potential to a file.
+
+        Parameters
+        ----------
+        orbit : `~gala.dynamics.Orbit`
+            A single orbit with times, which sets the trajectory of the origin.
+
+        Returns
+        -------
+        pot : `~gala.potential.CPotentialBase`
+            A copy of this potential with a moving origin.
+        """
+        from ...dynamics import Orbit
+
+        if isinstance(self, CompositePotential):
+            raise NotImplementedError("An origin trajectory must be added to "
+                                      "the components of a composite "
+                                      "potential.")
+
+        if not isinstance(orbit, Orbit):
+            raise TypeError("The origin trajectory must be specified as an "
+                            f"Orbit instance, not {type(orbit)}")
+
+        if orbit.t is None or orbit.norbits != 1:
+            raise ValueError("The origin trajectory must be a single orbit "
+                             "with times.")
+
+        if orbit.ndim != self.ndim:
+            raise ValueError(f"The origin trajectory has {orbit.ndim} "
+                             f"dimensions, but the potential has {self.ndim}.")
+
+        t = np.atleast_1d(self._remove_units(orbit.t))
+        if len(t) < 2 or not (np.all(np.diff(t) > 0) or
+                              np.all(np.diff(t) < 0)):
+            raise ValueError("The times of the origin trajectory must be "
+                             "strictly monotonic, with at least 2 elements.")
+
+        pot = pycopy.deepcopy(self)
+        pot._origin_trajectory = Orbit(pos=orbit.cartesian.xyz,
+                                       vel=orbit.cartesian.v_xyz,
+                                       t=orbit.t)
+        pot.c_instance.set_origin_trajectory(pot._pack_origin_trajectory())
+        return pot
+
+    def _pack_origin_trajectory(self):
+        # pack the origin trajectory into the format used in C: see
+        # component_origin() in src/cpotential.c
+        from scipy.interpolate import CubicHermiteSpline
+
+        orbit = self._origin_trajectory
+        t = self._remove_units(orbit.t)
+        x = self._remove_units(orbit.xyz).T
+        v = self._remove_units(orbit.v_xyz).T
+
+        # orbits integrated backwards in time have decreasing times
+        if t[0] > t[len(t) - 1]:
+            t = np.flip(t)
+            x = np.flip(x, axis=0)
+            v = np.flip(v, axis=0)
+
+        # coefficients with shape (n_dim, n_knots - 1, 4)
+        coeff = np.transpose(CubicHermiteSpline(t, x, v).c, (2, 1, 0))
+        return np.concatenate(([len(t)], t, coeff.ravel()))
+
     def __add__(self, other):
         """
         If all components are Cython, return a CCompositePotential.
@@ -396,5 +1495,225 @@ class CPotentialBase(PotentialBase):
             raise ValueError("Cannot replace a dimensionless unit system with "
                              "a unit system with physical units, or vice versa")
 
+        pot = self._new_with_units(units)
+
+        for name, (t, values, interp) in getattr(self, '_parameter_tracks',
+                                                 {}).items():
+            pot = pot.with_parameter_tracks(t, interpolation=interp,
+                                            **{name: values})
+
+        if getattr(self, '_origin_trajectory', None) is not None:
+            pot = pot.with_origin_trajectory(self._origin_trajectory)
+
+        return pot
+
+    def _new_with_units(self, units):
+        # a new instance of this potential with the same parameters, used by
+        # replace_units()
         return self.__class__(**self.parameters, units=units,
                               R=self.R, origin=self.origin)
+
+
+# C functions passed to CustomCPotential, by address: each entry is a list
+# [function, count], where count is the number of wrapper instances that use
+# the function, so that the functions are not garbage-collected while they may
+# still be called
+_custom_functions = dict()
+
+
+def _function_address(func):
+    # the address of a C function passed to CustomCPotential
+    import ctypes
+
+    if func is None:
+        return None
+
+    elif hasattr(func, 'address'):  # e.g., a numba cfunc
+        address = func.address
+
+    elif isinstance(func, ctypes._CFuncPtr):
+        address = ctypes.cast(func, ctypes.c_void_p).value
+
+    else:
+        address = func
+
+    if not isinstance(address, (int, np.integer)) or address == 0:
+        raise TypeError("C functions must be passed in as an integer address, "
+                        "a ctypes function pointer, or an object with an "
+                        f"'address' attribute (e.g., a numba cfunc), not {func}")
+
+    return int(address)
+
+
+def _register_functions(functions):
+    """
+    Add the C functions (a dict with values as passed to CustomCPotential) to
+    the registry, and return their addresses.
+    """
+    addresses = dict()
+    for name, func in functions.items():
+        address = _function_address(func)
+        addresses[name] = address
+        if address is None:
+            continue
+
+        entry = _custom_functions.get(address)
+        if entry is None:
+            _custom_functions[address] = [func, 1]
+        else:
+            entry[1] += 1
+            # never replace a function object with its integer address
+            if isinstance(entry[0], (int, np.integer)):
+                entry[0] = func
+
+    return addresses
+
+
+def _release_functions(addresses):
+    # remove the C functions from the registry once they are no longer used
+    for address in addresses.values():
+        if address is None:
+            continue
+
+        entry = _custom_functions[address]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _custom_functions[address]
+
+
+class CustomCWrapper(CFunctionPointerWrapper):
+    """
+    Wrapper class for `CustomCPotential`. The C functions (as passed to
+    `CustomCPotential`) are kept in the registry of functions for as long as
+    the wrapper exists.
+    """
+
+    def __init__(self, G, parameters, q0, R, functions):
+        self._functions = functions
+        self._function_addresses = _register_functions(functions)
+        weakref.finalize(self, _release_functions, self._function_addresses)
+        super().__init__(G, parameters, q0, R)
+
+    def __reduce__(self):
+        cls, args, state = super().__reduce__()
+        return cls, args + (self._functions, ), state
+
+
+class CustomCPotential(CPotentialBase):
+    r"""
+    CustomCPotential(pars=[], value, gradient, density=None, hessian=None, ndim=3, units=None, origin=None, R=None)
+
+    A potential implemented by user-supplied C functions.
+
+    The functions must have the same signatures as the functions that
+    implement the builtin potentials (see ``gala/potential/src/funcdefs.h``)::
+
+        double value(double t, double *pars, double *q, int n_dim);
+        void gradient(double t, double *pars, double *q, int n_dim,
+                      double *grad);
+        double density(double t, double *pars, double *q, int n_dim);
+        void hessian(double t, double *pars, double *q, int n_dim,
+                     double *hess);
+
+    where ``pars[0]`` is the gravitational constant in the unit system of the
+    potential, followed by the values in ``pars``. The gradient and Hessian
+    functions must *add* their values to the (row-major) output arrays, and
+    must be thread-safe. The functions can be passed in as integer
+    addresses, ``ctypes`` function pointers, or objects with an ``address``
+    attribute (e.g., the output of ``numba.cfunc``). Potentials with these
+    functions can be used with the C integrators, so orbits are integrated at
+    compiled speed.
+
+    The function objects (e.g., ``ctypes`` callbacks) are kept alive for as
+    long as the potential, or any potential created from it, exists. Note that
+    because the functions are specified by their address in memory, these
+    potentials cannot be pickled or saved to a file. The parameter
+    values are dimensionless, so they are not converted by
+    ``replace_units()`` (only the value of ``G`` changes).
+
+    Parameters
+    ----------
+    pars : array_like (optional)
+        The (dimensionless) parameter values passed to the C functions.
+    value : int, callable
+        The C function that computes the value of the potential.
+    gradient : int, callable
+        The C function that computes the gradient of the potential.
+    density : int, callable (optional)
+        The C function that computes the density.
+    hessian : int, callable (optional)
+        The C function that computes the Hessian of the potential.
+    ndim : int (optional)
+        The number of coordinate dimensions.
+    units : `~gala.units.UnitSystem` (optional)
+        Set of non-reducable units that specify (at minimum) the
+        length, mass, time, and angle units.
+    origin : `~astropy.units.Quantity` (optional)
+    R : `~scipy.spatial.transform.Rotation`, array_like (optional)
+
+    Examples
+    --------
+    With `numba <https://numba.pydata.org/>`_, a potential can be written in
+    Python and compiled to a C function, e.g., a harmonic oscillator
+    :math:`\Phi = \frac{1}{2}\,k\,(x^2 + y^2 + z^2)`::
+
+        >>> import numba  # doctest: +SKIP
+        >>> from numba import types
+        >>> sig = types.double(types.double, types.CPointer(types.double),
+        ...                    types.CPointer(types.double), types.intc)
+        >>> @numba.cfunc(sig)  # doctest: +SKIP
+        ... def value(t, pars, q, n_dim):
+        ...     return 0.5 * pars[1] * (q[0]**2 + q[1]**2 + q[2]**2)
+        >>> sig = types.void(types.double, types.CPointer(types.double),
+        ...                  types.CPointer(types.double), types.intc,
+        ...                  types.CPointer(types.double))
+        >>> @numba.cfunc(sig)  # doctest: +SKIP
+        ... def gradient(t, pars, q, n_dim, grad):
+        ...     for i in range(3):
+        ...         grad[i] += pars[1] * q[i]
+        >>> pot = CustomCPotential([1.], value=value,
+        ...                        gradient=gradient)  # doctest: +SKIP
+    """
+    Wrapper = CustomCWrapper
+
+    pars = PotentialParameter('pars', physical_type='dimensionless',
+                              default=[])
+
+    def __init__(self, *args, value, gradient, density=None, hessian=None,
+                 ndim=3, units=None, origin=None, R=None, **kwargs):
+        self.ndim = int(ndim)
+
+        # the functions as passed in (not their addresses), so that they are
+        # kept alive by the wrapper and any new instances
+        self._functions = dict(value=value, gradient=gradient,
+                               density=density, hessian=hessian)
+        for func in self._functions.values():
+            _function_address(func)
+
+        PotentialBase.__init__(self, *args, units=units, origin=origin, R=R,
+                               **kwargs)
+
+        if self.parameters['pars'].ndim != 1:
+            raise ValueError("The parameters must be a 1D array.")
+
+        self._wrapper_kwargs = dict(functions=self._functions)
+        self._setup_wrapper()
+
+    def _new_with_units(self, units):
+        return self.__class__(**self._functions,
+                              pars=self.parameters['pars'], ndim=self.ndim,
+                              units=units, R=self.R, origin=self.origin)
+
+    def __reduce__(self):
+        raise TypeError("CustomCPotential instances cannot be pickled, as "
+                        "they point to C functions in memory.")
+
+    def __deepcopy__(self, memo):
+        # __reduce__() is disabled, so copy the attributes explicitly
+        pot = self.__class__.__new__(self.__class__)
+        memo[id(self)] = pot
+        # the C functions are shared, not copied
+        memo[id(self._functions)] = self._functions
+        for k, v in self.__dict__.items():
+            pot.__dict__[k] = pycopy.deepcopy(v, memo)
+        return pot
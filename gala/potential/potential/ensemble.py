@@ -0,0 +1,358 @@
+# Standard library
+import copy
+
+# Third-party
+import numpy as np
+
+# Project
+from .cpotential import CPotentialBase
+from .ccompositepotential import CCompositePotential
+
+__all__ = ['PotentialEnsemble', 'evaluate_over_parameters']
+
+
+class PotentialEnsemble:
+    """
+    A set of copies of a C-implemented potential that only differ in the
+    values of their parameters.
+
+    The energy, gradient, and density of all members of the ensemble are
+    evaluated in a single (multithreaded) loop in C, which is much faster than
+    creating a potential object for each set of parameters (e.g., when
+    marginalizing over posterior samples of the parameters of a potential
+    model).
+
+    Parameters
+    ----------
+    potential : `~gala.potential.CPotentialBase`
+        A template potential. The parameters that are not specified in
+        ``parameters`` are fixed to their values for this potential, as are
+        the unit system, origin, rotation, and any time-dependent tracks.
+    parameters : array_like, dict
+        Either a 2D array with shape ``(n_sets, n_parameters)``, where each row
+        contains values of all parameters in the unit system of the potential
+        and in the layout returned by
+        `~gala.potential.CPotentialBase.get_parameters_raw`, or a dictionary
+        of parameter values, each with an extra leading axis of length
+        ``n_sets``. For composite potentials, the dictionary should contain a
+        dictionary of parameter values for each component to vary.
+
+    Examples
+    --------
+
+        >>> import astropy.units as u
+        >>> from gala.potential import HernquistPotential, PotentialEnsemble
+        >>> from gala.units import galactic
+        >>> pot = HernquistPotential(m=1E10, c=1., units=galactic)
+        >>> ens = PotentialEnsemble(pot, dict(m=[1E10, 2E10, 4E10]*u.Msun))
+        >>> xyz = [[1., 2.], [0, 0], [0, 0]] * u.kpc
+        >>> ens.energy(xyz).shape
+        (3, 2)
+    """
+
+    def __init__(self, potential, parameters):
+        if not isinstance(potential, CPotentialBase):
+            raise TypeError("A potential ensemble requires a C-implemented "
+                            "potential, not {}".format(type(potential)))
+
+        if isinstance(potential, CCompositePotential):
+            components = list(potential.values())
+        else:
+            components = [potential]
+
+        for p in components:
+            if isinstance(p, CCompositePotential):
+                raise TypeError("Nested composite potentials are not "
+                                "supported.")
+
+            if type(p.c_instance) is not p.Wrapper:
+                raise ValueError("Potentials with a tabulated radial profile "
+                                 "cannot be used in a potential ensemble.")
+
+        self.potential = potential
+        self._components = components
+
+        if isinstance(parameters, dict):
+            raw = self._parse_parameter_dict(parameters)
+        else:
+            raw = np.array(parameters, dtype=np.float64)
+
+        n_raw = sum([p._raw_parameter_slice[1] for p in components])
+        if raw.ndim != 2 or raw.shape[1] != n_raw:
+            raise ValueError("Expected an array of parameter values with shape "
+                             f"(n_sets, {n_raw}), but got an array with shape "
+                             f"{raw.shape}")
+
+        # pack the C parameter arrays of all components for each set
+        buffers = potential.c_instance.parameter_buffers()
+        sizes = [len(buf) for buf in buffers]
+        self._offsets = np.cumsum([0] + sizes[:-1]).astype(np.int32)
+        self._table = np.tile(np.concatenate(buffers), (raw.shape[0], 1))
+
+        start = 0
+        for p, offset in zip(components, self._offsets):
+            first, size = p._raw_parameter_slice
+            values = raw[:, start:start+size]
+
+            # only validate the values if the class may reject some of them
+            if (type(p)._check_parameters_raw is not
+                    CPotentialBase._check_parameters_raw):
+                for row in values:
+                    p._check_parameters_raw(row)
+
+            self._table[:, offset+first:offset+first+size] = values
+            start += size
+
+        self._raw = raw
+
+    def _parse_parameter_dict(self, parameters):
+        if isinstance(self.potential, CCompositePotential):
+            for name in parameters:
+                if name not in self.potential:
+                    raise ValueError(f"Invalid component '{name}'")
+            per_component = [parameters.get(name, dict())
+                             for name in self.potential.keys()]
+        else:
+            per_component = [parameters]
+
+        n_sets = None
+        columns = []
+        for p, values in zip(self._components, per_component):
+            for name in values:
+                if name not in p.parameters:
+                    raise ValueError(f"Invalid parameter '{name}' for "
+                                     "potential class "
+                                     f"{p.__class__.__name__}")
+
+            values = p._prepare_parameters(values, p.units)
+
+            start, _ = p._raw_parameter_slice
+            for name, value in values.items():
+                shape = p.parameters[name].shape
+                value = value.value
+                if value.ndim == 0 or value.shape[1:] != shape:
+                    raise ValueError(f"The values of parameter '{name}' must "
+                                     f"have shape (n_sets, ) + {shape}, not "
+                                     f"{value.shape}")
+
+                if n_sets is None:
+                    n_sets = value.shape[0]
+                elif value.shape[0] != n_sets:
+                    raise ValueError("All parameters must have the same "
+                                     "number of sets of values.")
+
+                i, n = p._c_parameter_index[name]
+                columns.append((p, i - start, n, value.reshape(n_sets, n)))
+
+        if n_sets is None:
+            raise ValueError("No parameter values specified.")
+
+        raw = np.tile(self.potential.get_parameters_raw(), (n_sets, 1))
+        comp_start = dict()
+        start = 0
+        for p in self._components:
+            comp_start[id(p)] = start
+            start += p._raw_parameter_slice[1]
+
+        for p, i, n, value in columns:
+            i = comp_start[id(p)] + i
+            raw[:, i:i+n] = value
+
+        return raw
+
+    def __len__(self):
+        return self._raw.shape[0]
+
+    @property
+    def parameters_raw(self):
+        """
+        The values of the parameters of each member of the ensemble, as an
+        array with shape ``(n_sets, n_parameters)`` (see
+        `~gala.potential.CPotentialBase.get_parameters_raw`).
+        """
+        return self._raw.copy()
+
+    def __getitem__(self, i):
+        """
+        Return a copy of the template potential with the parameters of member
+        ``i`` of the ensemble.
+        """
+        pot = copy.deepcopy(self.potential)
+        pot.set_parameters_raw(self._raw[i])
+        return pot
+
+    def _evaluate(self, quantity, q, t, n_threads):
+        pot = self.potential
+        q = pot._remove_units_prepare_shape(q)
+        orig_shape, q = pot._get_c_valid_arr(q)
+
+        t = pot._validate_prepare_time(t, q)
+        if len(t) != 1:
+            raise ValueError("Potential ensembles can only be evaluated at a "
+                             "single time.")
+
+        if n_threads is None:
+            n_threads = 0
+
+        val = pot.c_instance.ensemble(quantity, q, t[0], self._table,
+                                      self._offsets, n_threads=n_threads)
+        return orig_shape, val
+
+    def energy(self, q, t=0., n_threads=None):
+        """
+        Compute the potential energy at the given position(s) for each member
+        of the ensemble.
+
+        Parameters
+        ----------
+        q : `~gala.dynamics.PhaseSpacePosition`, `~astropy.units.Quantity`, array_like
+            The position to compute the value of the potential. If the
+            input position object has no units (i.e. is an `~numpy.ndarray`),
+            it is assumed to be in the same unit system as the potential.
+        t : numeric, `~astropy.units.Quantity` (optional)
+            The time.
+        n_threads : int (optional)
+            The number of threads to use. Defaults to the value set with
+            `~gala.potential.set_num_threads`.
+
+        Returns
+        -------
+        E : `~astropy.units.Quantity`
+            The potential energy, with an extra leading axis with one element
+            per member of the ensemble.
+        """
+        orig_shape, E = self._evaluate('energy', q, t, n_threads)
+        units = self.potential.units
+        return (E.reshape((len(self), ) + orig_shape[1:]) *
+                units['energy'] / units['mass'])
+
+    def gradient(self, q, t=0., n_threads=None):
+        """
+        Compute the gradient of the potential at the given position(s) for
+        each member of the ensemble.
+
+        Parameters
+        ----------
+        q : `~gala.dynamics.PhaseSpacePosition`, `~astropy.units.Quantity`, array_like
+            The position to compute the value of the potential. If the
+            input position object has no units (i.e. is an `~numpy.ndarray`),
+            it is assumed to be in the same unit system as the potential.
+        t : numeric, `~astropy.units.Quantity` (optional)
+            The time.
+        n_threads : int (optional)
+            The number of threads to use. Defaults to the value set with
+            `~gala.potential.set_num_threads`.
+
+        Returns
+        -------
+        grad : `~astropy.units.Quantity`
+            The gradient of the potential, with an extra leading axis with one
+            element per member of the ensemble.
+        """
+        orig_shape, grad = self._evaluate('gradient', q, t, n_threads)
+        units = self.potential.units
+        grad = np.transpose(grad, (0, 2, 1)).reshape((len(self), ) + orig_shape)
+        return (grad * units['length'] / units['time']**2).to(
+            units['acceleration'])
+
+    def density(self, q, t=0., n_threads=None):
+        """
+        Compute the density at the given position(s) for each member of the
+        ensemble.
+
+        Parameters
+        ----------
+        q : `~gala.dynamics.PhaseSpacePosition`, `~astropy.units.Quantity`, array_like
+            The position to compute the value of the potential. If the
+            input position object has no units (i.e. is an `~numpy.ndarray`),
+            it is assumed to be in the same unit system as the potential.
+        t : numeric, `~astropy.units.Quantity` (optional)
+            The time.
+        n_threads : int (optional)
+            The number of threads to use. Defaults to the value set with
+            `~gala.potential.set_num_threads`.
+
+        Returns
+        -------
+        dens : `~astropy.units.Quantity`
+            The density, with an extra leading axis with one element per
+            member of the ensemble.
+        """
+        orig_shape, dens = self._evaluate('density', q, t, n_threads)
+        units = self.potential.units
+        return (dens.reshape((len(self), ) + orig_shape[1:]) *
+                units['mass'] / units['length']**3).to(units['mass density'])
+
+    def integrate_orbit(self, w0, **kwargs):
+        """
+        Integrate orbits from the same initial conditions in each member of
+        the ensemble.
+
+        The parameters of a single copy of the template potential are updated
+        in place for each member (see
+        `~gala.potential.CPotentialBase.set_parameters_raw`), so no potential
+        objects are created.
+
+        Parameters
+        ----------
+        w0 : `~gala.dynamics.PhaseSpacePosition`, array_like
+            Initial conditions.
+        **kwargs
+            Passed to `~gala.potential.Hamiltonian.integrate_orbit`, e.g., the
+            integrator and the time specification.
+
+        Returns
+        -------
+        orbits : list
+            A list of `~gala.dynamics.Orbit` objects, one per member of the
+            ensemble.
+        """
+        from ..hamiltonian import Hamiltonian
+
+        pot = copy.deepcopy(self.potential)
+        H = Hamiltonian(pot)
+
+        orbits = []
+        for values in self._raw:
+            pot.set_parameters_raw(values)
+            orbits.append(H.integrate_orbit(w0, **kwargs))
+
+        return orbits
+
+
+def evaluate_over_parameters(potential, parameters, q, t=0.,
+                             quantity='energy', n_threads=None):
+    """
+    Evaluate a quantity at the given position(s) for many sets of parameters
+    of a C-implemented potential.
+
+    This is a shorthand for creating a `~gala.potential.PotentialEnsemble` and
+    calling its ``energy()``, ``gradient()``, or ``density()`` method.
+
+    Parameters
+    ----------
+    potential : `~gala.potential.CPotentialBase`
+        A template potential (see `~gala.potential.PotentialEnsemble`).
+    parameters : array_like, dict
+        The sets of parameter values (see `~gala.potential.PotentialEnsemble`).
+    q : `~gala.dynamics.PhaseSpacePosition`, `~astropy.units.Quantity`, array_like
+        The position(s).
+    t : numeric, `~astropy.units.Quantity` (optional)
+        The time.
+    quantity : str (optional)
+        One of ``'energy'``, ``'gradient'``, or ``'density'``.
+    n_threads : int (optional)
+        The number of threads to use. Defaults to the value set with
+        `~gala.potential.set_num_threads`.
+
+    Returns
+    -------
+    val : `~astropy.units.Quantity`
+        The values, with an extra leading axis with one element per set of
+        parameters.
+    """
+    if quantity not in ['energy', 'gradient', 'density']:
+        raise ValueError(f"Invalid quantity '{quantity}'")
+
+    ensemble = PotentialEnsemble(potential, parameters)
+    return getattr(ensemble, quantity)(q, t=t, n_threads=n_threads)
@@ -1,7 +1,83 @@
 #include <math.h>
+#include <stddef.h>
+#include <stdlib.h>
 #include "cpotential.h"
 
 
+void free_cpotential(CPotential *p) {
+    free(p->density);
+    free(p->value);
+    free(p->gradient);
+    free(p->hessian);
+    free(p->value_gradient);
+    free(p->batch_value);
+    free(p->batch_gradient);
+    free(p->radial);
+    free(p->parameters);
+    free(p->q0);
+    free(p->R);
+    free(p->tracks);
+    free(p->origin_tracks);
+    free(p->plan);
+
+    p->density = NULL;
+    p->value = NULL;
+    p->gradient = NULL;
+    p->hessian = NULL;
+    p->value_gradient = NULL;
+    p->batch_value = NULL;
+    p->batch_gradient = NULL;
+    p->radial = NULL;
+    p->parameters = NULL;
+    p->q0 = NULL;
+    p->R = NULL;
+    p->tracks = NULL;
+    p->origin_tracks = NULL;
+    p->plan = NULL;
+    p->n_steps = 0;
+    p->max_track_params = 0;
+}
+
+
+int allocate_cpotential(CPotential *p, int n_components) {
+    /*
+        Allocate (zero-initialized) per-component arrays for n_components
+        components, releasing any arrays that were previously allocated.
+        Returns 0 on success, or -1 if the memory could not be allocated.
+    */
+    int n = n_components > 0 ? n_components : 1;
+
+    free_cpotential(p);
+
+    p->density = calloc(n, sizeof(densityfunc));
+    p->value = calloc(n, sizeof(energyfunc));
+    p->gradient = calloc(n, sizeof(gradientfunc));
+    p->hessian = calloc(n, sizeof(hessianfunc));
+    p->value_gradient = calloc(n, sizeof(valuegradientfunc));
+    p->batch_value = calloc(n, sizeof(batchenergyfunc));
+    p->batch_gradient = calloc(n, sizeof(batchgradientfunc));
+    p->radial = calloc(n, sizeof(radialfunc));
+    p->parameters = calloc(n, sizeof(double *));
+    p->q0 = calloc(n, sizeof(double *));
+    p->R = calloc(n, sizeof(double *));
+    p->tracks = calloc(n, sizeof(double *));
+    p->origin_tracks = calloc(n, sizeof(double *));
+
+    if ((p->density == NULL) || (p->value == NULL) ||
+            (p->gradient == NULL) || (p->hessian == NULL) ||
+            (p->value_gradient == NULL) || (p->batch_value == NULL) ||
+            (p->batch_gradient == NULL) || (p->radial == NULL) ||
+            (p->parameters == NULL) || (p->q0 == NULL) || (p->R == NULL) ||
+            (p->tracks == NULL) || (p->origin_tracks == NULL)) {
+        free_cpotential(p);
+        return -1;
+    }
+
+    p->n_components = n_components;
+    return 0;
+}
+
+
 void apply_rotate(double *q_in, double *R, int n_dim, int transpose,
                   double *q_out) {
     // NOTE: elsewhere, we enforce that rotation matrix only works for
@@ -46,17 +122,309 @@ void apply_shift_rotate(double *q_in, double *q0, double *R, int n_dim,
 }
 
 
+static int transform_flags(double *q0, double *R, int n_dim) {
+    // Returns the CPOT_SHIFT and CPOT_ROTATE flags needed to shift to origin
+    // q0 and rotate by R (0 if this is a no-op)
+    int j, k;
+    int flags = 0;
+
+    for (j=0; j < n_dim; j++) {
+        if (q0[j] != 0.) {
+            flags = flags | CPOT_SHIFT;
+            break;
+        }
+    }
+
+    // apply_rotate() only uses the rotation matrix for 2D and 3D
+    if ((n_dim == 2) || (n_dim == 3)) {
+        for (j=0; j < n_dim*n_dim; j++) {
+            k = j / n_dim;
+            if (R[j] != (double)(k*n_dim + k == j)) {
+                flags = flags | CPOT_ROTATE;
+                break;
+            }
+        }
+    }
+
+    return flags;
+}
+
+
+static int same_frame(CPotential *p, int i1, int i2) {
+    // Returns 1 if components i1 and i2 have the same origin and rotation
+    int j;
+    int n_dim = p->n_dim;
+
+    // moving origins are interpolated separately for each component
+    if (((p->origin_tracks)[i1] != NULL) || ((p->origin_tracks)[i2] != NULL))
+        return 0;
+
+    for (j=0; j < n_dim; j++) {
+        if ((p->q0)[i1][j] != (p->q0)[i2][j])
+            return 0;
+    }
+
+    if ((n_dim == 2) || (n_dim == 3)) {
+        for (j=0; j < n_dim*n_dim; j++) {
+            if ((p->R)[i1][j] != (p->R)[i2][j])
+                return 0;
+        }
+    }
+
+    return 1;
+}
+
+
+int compile_cpotential(CPotential *p, int *skip) {
+    /*
+        Build the execution plan used by the evaluation functions below. This
+        records whether each component needs to be shifted and/or rotated,
+        drops any components flagged in skip (which may be NULL), and orders
+        the components so that those that share an origin and rotation are
+        evaluated one after another. Returns 0 on success, or -1 if the memory
+        could not be allocated.
+    */
+    int i, k, flags;
+    int n = 0;
+    int size = p->n_components > 0 ? p->n_components : 1;
+    int *added;
+    CPotentialStep *plan;
+
+    free(p->plan);
+    p->plan = NULL;
+    p->n_steps = 0;
+
+    plan = malloc(size * sizeof(CPotentialStep));
+    added = calloc(size, sizeof(int));
+    if ((plan == NULL) || (added == NULL)) {
+        free(plan);
+        free(added);
+        return -1;
+    }
+
+    for (i=0; i < p->n_components; i++) {
+        if (added[i] || ((skip != NULL) && skip[i]))
+            continue;
+
+        flags = transform_flags((p->q0)[i], (p->R)[i], p->n_dim);
+        if ((p->origin_tracks)[i] != NULL)
+            flags = flags | CPOT_SHIFT;
+
+        // add this component, followed by all later components in its frame
+        for (k=i; k < p->n_components; k++) {
+            if (added[k] || ((skip != NULL) && skip[k]))
+                continue;
+
+            if ((k != i) && !same_frame(p, i, k))
+                continue;
+
+            plan[n].index = k;
+            plan[n].flags = flags;
+            if ((k != i) && (flags != 0))
+                plan[n].flags = flags | CPOT_SAME_FRAME;
+            plan[n].q0 = (p->q0)[k];
+
+            added[k] = 1;
+            n++;
+        }
+    }
+
+    free(added);
+    p->plan = plan;
+    p->n_steps = n;
+
+    p->max_track_params = 0;
+    for (i=0; i < p->n_components; i++) {
+        if (((p->tracks)[i] != NULL) &&
+                ((p->n_params)[i] > p->max_track_params))
+            p->max_track_params = (p->n_params)[i];
+    }
+
+    return 0;
+}
+
+
+static int step_flags(CPotential *p, int k) {
+    /*
+        Returns the flags for step k of the execution plan. The origin pointer
+        of a component may be changed after the plan is compiled (e.g., to
+        follow a particle in direct N-body integration): such components are
+        always shifted and rotated.
+    */
+    CPotentialStep *s = &(p->plan)[k];
+
+    if ((p->q0)[s->index] != s->q0)
+        return CPOT_SHIFT | CPOT_ROTATE;
+
+    if ((s->flags & CPOT_SAME_FRAME) &&
+            ((p->q0)[(p->plan)[k-1].index] != (p->plan)[k-1].q0))
+        return s->flags & ~CPOT_SAME_FRAME;
+
+    return s->flags;
+}
+
+
+static int last_in_frame(CPotential *p, int k) {
+    // Returns 1 if step k is the last step of the plan in its frame
+    return (k == p->n_steps - 1) || !(step_flags(p, k+1) & CPOT_SAME_FRAME);
+}
+
+
+static int track_interval(double *knots, int n_knots, double *t) {
+    /*
+        Returns the index of the interval between the n_knots knots that
+        contains the time t. Outside of the knots, t is clamped to the first or
+        last knot, so that tracks are held constant.
+    */
+    int lo, hi, mid;
+
+    if (*t <= knots[0]) {
+        *t = knots[0];
+    } else if (*t >= knots[n_knots-1]) {
+        *t = knots[n_knots-1];
+    }
+
+    // binary search for the interval containing t
+    lo = 0;
+    hi = n_knots - 1;
+    while (hi - lo > 1) {
+        mid = (lo + hi) / 2;
+        if (*t < knots[mid])
+            hi = mid;
+        else
+            lo = mid;
+    }
+
+    return lo;
+}
+
+
+static double track_value(double *track, int n_knots, double t) {
+    /*
+        Evaluate a parameter track with n_knots knots at time t. The track
+        contains the knot times, followed by the four coefficients of the
+        cubic polynomial (in t - t_k, highest order first) in each interval.
+    */
+    int lo = track_interval(track, n_knots, &t);
+    double dt = t - track[lo];
+    double *c = &track[n_knots + 4*lo];
+
+    return ((c[0]*dt + c[1])*dt + c[2])*dt + c[3];
+}
+
+
+static double *component_parameters(CPotential *p, int i, double t,
+                                    double *pars_t) {
+    /*
+        Returns a pointer to the parameters of component i at time t. For
+        components with time-dependent parameters, these are copied into
+        pars_t (which must have space for max_track_params values), and the
+        tracked parameters are replaced by their interpolated values. The
+        packed tracks are stored as:
+            - the number of tracks
+            - for each track: the parameter index, the number of knots, and
+              the knots and coefficients (see track_value())
+    */
+    int j, n_tracks, n_knots;
+    double *track = (p->tracks)[i];
+
+    if (track == NULL)
+        return (p->parameters)[i];
+
+    for (j=0; j < (p->n_params)[i]; j++)
+        pars_t[j] = (p->parameters)[i][j];
+
+    n_tracks = (int)track[0];
+    track = track + 1;
+    for (j=0; j < n_tracks; j++) {
+        n_knots = (int)track[1];
+        pars_t[(int)track[0]] = track_value(&track[2], n_knots, t);
+        track = track + 2 + n_knots + 4*(n_knots - 1);
+    }
+
+    return pars_t;
+}
+
+
+static double *component_origin(CPotential *p, int i, double t,
+                                double *q0_t) {
+    /*
+        Returns a pointer to the origin of component i at time t. For
+        components with a moving origin, this is interpolated into q0_t (which
+        must have space for n_dim values). The packed origin trajectory is
+        stored as:
+            - the number of knots
+            - the knot times
+            - for each coordinate: the four coefficients of the cubic
+              polynomial in each interval (see track_value())
+        Outside of the knots, the origin is held fixed at the first or last
+        position.
+    */
+    int j, lo, n_knots;
+    double dt;
+    double *c;
+    double *track = (p->origin_tracks)[i];
+
+    if (track == NULL)
+        return (p->q0)[i];
+
+    n_knots = (int)track[0];
+    lo = track_interval(&track[1], n_knots, &t);
+    dt = t - track[1 + lo];
+
+    for (j=0; j < p->n_dim; j++) {
+        c = &track[1 + n_knots + 4*((n_knots - 1)*j + lo)];
+        q0_t[j] = ((c[0]*dt + c[1])*dt + c[2])*dt + c[3];
+    }
+
+    return q0_t;
+}
+
+
+static double *step_position(CPotential *p, int k, int flags, double *q0,
+                             double *qp, double *qp_trans) {
+    /*
+        Returns a pointer to the position qp in the frame of the component
+        evaluated at step k of the plan (with origin q0), stored in qp_trans if
+        a transformation is needed. For steps in the same frame as the previous
+        step, qp_trans already contains the transformed position.
+    */
+    int j;
+    int i = (p->plan)[k].index;
+
+    if (!(flags & (CPOT_SHIFT | CPOT_ROTATE)))
+        return qp;
+
+    if (!(flags & CPOT_SAME_FRAME)) {
+        if (flags & CPOT_ROTATE) {
+            for (j=0; j < p->n_dim; j++)
+                qp_trans[j] = 0.;
+            apply_shift_rotate(qp, q0, (p->R)[i], p->n_dim, 0, qp_trans);
+        } else {
+            for (j=0; j < p->n_dim; j++)
+                qp_trans[j] = qp[j] - q0[j];
+        }
+    }
+
+    return qp_trans;
+}
+
+
 double c_potential(CPotential *p, double t, double *qp) {
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
     double v = 0;
-    int i, j;
+    int i, k;
     double qp_trans[p->n_dim];
-
-    for (i=0; i < p->n_components; i++) {
-        for (j=0; j < p->n_dim; j++)
-            qp_trans[j] = 0.;
-        apply_shift_rotate(qp, (p->q0)[i], (p->R)[i], p->n_dim, 0,
-                           &qp_trans[0]);
-        v = v + (p->value)[i](t, (p->parameters)[i], &qp_trans[0], p->n_dim);
+    double *q;
+
+    for (k=0; k < p->n_steps; k++) {
+        i = (p->plan)[k].index;
+        pars = component_parameters(p, i, t, &pars_t[0]);
+        q0 = component_origin(p, i, t, &q0_t[0]);
+        q = step_position(p, k, step_flags(p, k), q0, qp, &qp_trans[0]);
+        v = v + (p->value)[i](t, pars, q, p->n_dim);
     }
 
     return v;
@@ -64,16 +432,20 @@ double c_potential(CPotential *p, double t, double *qp) {
 
 
 double c_density(CPotential *p, double t, double *qp) {
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
     double v = 0;
-    int i, j;
+    int i, k;
     double qp_trans[p->n_dim];
-
-    for (i=0; i < p->n_components; i++) {
-        for (j=0; j < p->n_dim; j++)
-            qp_trans[j] = 0.;
-        apply_shift_rotate(qp, (p->q0)[i], (p->R)[i], p->n_dim, 0,
-                           &qp_trans[0]);
-        v = v + (p->density)[i](t, (p->parameters)[i], &qp_trans[0], p->n_dim);
+    double *q;
+
+    for (k=0; k < p->n_steps; k++) {
+        i = (p->plan)[k].index;
+        pars = component_parameters(p, i, t, &pars_t[0]);
+        q0 = component_origin(p, i, t, &q0_t[0]);
+        q = step_position(p, k, step_flags(p, k), q0, qp, &qp_trans[0]);
+        v = v + (p->density)[i](t, pars, q, p->n_dim);
     }
 
     return v;
@@ -81,48 +453,236 @@ double c_density(CPotential *p, double t, double *qp) {
 
 
 void c_gradient(CPotential *p, double t, double *qp, double *grad) {
-    int i, j;
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
+    int i, j, k, flags;
     double qp_trans[p->n_dim];
     double tmp_grad[p->n_dim];
+    double *q;
+
+    for (j=0; j < p->n_dim; j++)
+        grad[j] = 0.;
+
+    for (k=0; k < p->n_steps; k++) {
+        i = (p->plan)[k].index;
+        pars = component_parameters(p, i, t, &pars_t[0]);
+        q0 = component_origin(p, i, t, &q0_t[0]);
+        flags = step_flags(p, k);
+        q = step_position(p, k, flags, q0, qp, &qp_trans[0]);
+
+        if (!(flags & CPOT_ROTATE)) {
+            // no rotation: accumulate straight into the output
+            (p->gradient)[i](t, pars, q, p->n_dim, grad);
+            continue;
+        }
+
+        // accumulate the gradient in the rotated frame, and only rotate back
+        // after the last component in this frame
+        if (!(flags & CPOT_SAME_FRAME)) {
+            for (j=0; j < p->n_dim; j++)
+                tmp_grad[j] = 0.;
+        }
+
+        (p->gradient)[i](t, pars, q, p->n_dim, &tmp_grad[0]);
 
-    for (i=0; i < p->n_dim; i++) {
-        grad[i] = 0.;
-        tmp_grad[i] = 0.;
-        qp_trans[i] = 0.;
+        if (last_in_frame(p, k))
+            apply_rotate(&tmp_grad[0], (p->R)[i], p->n_dim, 1, grad);
     }
+}
 
-    for (i=0; i < p->n_components; i++) {
-        for (j=0; j < p->n_dim; j++) {
-            tmp_grad[j] = 0.;
-            qp_trans[j] = 0.;
+
+double c_potential_gradient(CPotential *p, double t, double *qp, double *grad) {
+    /*
+        Compute the value of the potential and store the gradient in grad, so
+        that the shift/rotate and any terms shared by the value and gradient
+        kernels are only computed once.
+    */
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
+    double v = 0;
+    int i, j, k, flags;
+    double qp_trans[p->n_dim];
+    double tmp_grad[p->n_dim];
+    double *q, *g;
+
+    for (j=0; j < p->n_dim; j++)
+        grad[j] = 0.;
+
+    for (k=0; k < p->n_steps; k++) {
+        i = (p->plan)[k].index;
+        pars = component_parameters(p, i, t, &pars_t[0]);
+        q0 = component_origin(p, i, t, &q0_t[0]);
+        flags = step_flags(p, k);
+        q = step_position(p, k, flags, q0, qp, &qp_trans[0]);
+
+        if (!(flags & CPOT_ROTATE)) {
+            g = grad;
+        } else {
+            g = &tmp_grad[0];
+            if (!(flags & CPOT_SAME_FRAME)) {
+                for (j=0; j < p->n_dim; j++)
+                    tmp_grad[j] = 0.;
+            }
         }
 
-        apply_shift_rotate(qp, (p->q0)[i], (p->R)[i], p->n_dim, 0,
-                           &qp_trans[0]);
-        (p->gradient)[i](t, (p->parameters)[i], &qp_trans[0], p->n_dim,
-                         &tmp_grad[0]);
+        if ((p->value_gradient)[i] != NULL) {
+            v = v + (p->value_gradient)[i](t, pars, q, p->n_dim, g);
+        } else {
+            v = v + (p->value)[i](t, pars, q, p->n_dim);
+            (p->gradient)[i](t, pars, q, p->n_dim, g);
+        }
 
-        apply_rotate(&tmp_grad[0], (p->R)[i], p->n_dim, 1, &grad[0]);
+        if ((flags & CPOT_ROTATE) && last_in_frame(p, k))
+            apply_rotate(&tmp_grad[0], (p->R)[i], p->n_dim, 1, grad);
     }
+
+    return v;
 }
 
 
-void c_hessian(CPotential *p, double t, double *qp, double *hess) {
-    int i;
-    double qp_trans[p->n_dim];
+static double *step_positions(CPotential *p, int k, int flags, double *q0,
+                              double *qp, int n_points, double *qp_trans) {
+    /*
+        Same as step_position(), but for a contiguous block of n_points
+        positions with shape (n_points, n_dim).
+    */
+    int m;
+    int n_dim = p->n_dim;
+
+    if (!(flags & (CPOT_SHIFT | CPOT_ROTATE)))
+        return qp;
+
+    if (!(flags & CPOT_SAME_FRAME)) {
+        for (m=0; m < n_points; m++)
+            step_position(p, k, flags, q0, &qp[m*n_dim], &qp_trans[m*n_dim]);
+    }
+
+    return qp_trans;
+}
 
-    for (i=0; i < pow(p->n_dim,2); i++) {
-        hess[i] = 0.;
 
-        if (i < p->n_dim) {
-            qp_trans[i] = 0.;
+void c_potential_batch(CPotential *p, double t, double *qp, int n_points,
+                       double *pot) {
+    /*
+        Evaluate the potential at a contiguous block of positions with shape
+        (n_points, n_dim), in chunks of at most C_BATCH_SIZE points. Components
+        with a batched kernel are evaluated on the whole chunk at once;
+        otherwise, this falls back to the per-point kernel.
+    */
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
+    int i, k, m, n, start;
+    int n_dim = p->n_dim;
+    double qp_trans[C_BATCH_SIZE * n_dim];
+    double *qb;
+
+    for (m=0; m < n_points; m++)
+        pot[m] = 0.;
+
+    for (start=0; start < n_points; start+=C_BATCH_SIZE) {
+        n = n_points - start;
+        if (n > C_BATCH_SIZE)
+            n = C_BATCH_SIZE;
+
+        for (k=0; k < p->n_steps; k++) {
+            i = (p->plan)[k].index;
+            pars = component_parameters(p, i, t, &pars_t[0]);
+            q0 = component_origin(p, i, t, &q0_t[0]);
+            qb = step_positions(p, k, step_flags(p, k), q0,
+                                &qp[start*n_dim], n, &qp_trans[0]);
+
+            if ((p->batch_value)[i] != NULL) {
+                (p->batch_value)[i](t, pars, qb, n_dim, n, &pot[start]);
+            } else {
+                for (m=0; m < n; m++)
+                    pot[start+m] = pot[start+m] +
+                        (p->value)[i](t, pars, &qb[m*n_dim], n_dim);
+            }
         }
     }
+}
 
-    for (i=0; i < p->n_components; i++) {
-        apply_shift_rotate(qp, (p->q0)[i], (p->R)[i], p->n_dim, 0,
-                           &qp_trans[0]);
-        (p->hessian)[i](t, (p->parameters)[i], &qp_trans[0], p->n_dim, hess);
+
+void c_gradient_batch(CPotential *p, double t, double *qp, int n_points,
+                      double *grad) {
+    /*
+        Evaluate the gradient at a contiguous block of positions with shape
+        (n_points, n_dim) - see c_potential_batch().
+    */
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
+    int i, k, m, n, start, flags;
+    int n_dim = p->n_dim;
+    double qp_trans[C_BATCH_SIZE * n_dim];
+    double tmp_grad[C_BATCH_SIZE * n_dim];
+    double *qb, *gb;
+
+    for (m=0; m < n_points*n_dim; m++)
+        grad[m] = 0.;
+
+    for (start=0; start < n_points; start+=C_BATCH_SIZE) {
+        n = n_points - start;
+        if (n > C_BATCH_SIZE)
+            n = C_BATCH_SIZE;
+
+        for (k=0; k < p->n_steps; k++) {
+            i = (p->plan)[k].index;
+            pars = component_parameters(p, i, t, &pars_t[0]);
+            q0 = component_origin(p, i, t, &q0_t[0]);
+            flags = step_flags(p, k);
+            qb = step_positions(p, k, flags, q0, &qp[start*n_dim], n,
+                                &qp_trans[0]);
+
+            if (!(flags & CPOT_ROTATE)) {
+                // accumulate straight into the output array
+                gb = &grad[start*n_dim];
+            } else {
+                gb = &tmp_grad[0];
+                if (!(flags & CPOT_SAME_FRAME)) {
+                    for (m=0; m < n*n_dim; m++)
+                        tmp_grad[m] = 0.;
+                }
+            }
+
+            if ((p->batch_gradient)[i] != NULL) {
+                (p->batch_gradient)[i](t, pars, qb, n_dim, n, gb);
+            } else {
+                for (m=0; m < n; m++)
+                    (p->gradient)[i](t, pars, &qb[m*n_dim], n_dim,
+                                     &gb[m*n_dim]);
+            }
+
+            if ((flags & CPOT_ROTATE) && last_in_frame(p, k)) {
+                for (m=0; m < n; m++)
+                    apply_rotate(&tmp_grad[m*n_dim], (p->R)[i], n_dim, 1,
+                                 &grad[(start+m)*n_dim]);
+            }
+        }
+    }
+}
+
+
+void c_hessian(CPotential *p, double t, double *qp, double *hess) {
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double *pars, *q0;
+    int i, k;
+    double qp_trans[p->n_dim];
+    double *q;
+
+    for (i=0; i < pow(p->n_dim,2); i++)
+        hess[i] = 0.;
+
+    for (k=0; k < p->n_steps; k++) {
+        i = (p->plan)[k].index;
+        pars = component_parameters(p, i, t, &pars_t[0]);
+        q0 = component_origin(p, i, t, &q0_t[0]);
+        q = step_position(p, k, step_flags(p, k), q0, qp, &qp_trans[0]);
+        (p->hessian)[i](t, pars, q, p->n_dim, hess);
         // TODO: here - need to apply inverse rotation to the Hessian!
         // - Hessian calculation for potentials with rotations are disabled
     }
@@ -130,60 +690,142 @@ void c_hessian(CPotential *p, double t, double *qp, double *hess) {
 }
 
 
-double c_d_dr(CPotential *p, double t, double *qp, double *epsilon) {
-    double h, r, dPhi_dr;
-    int j;
-    double r2 = 0;
+static double step_radial_gradient(CPotential *p, int k, double t,
+                                   double *pars, double *q0, double *qp,
+                                   double *rhat, double *Phi) {
+    /*
+        Returns the derivative along the unit vector rhat of the potential of
+        the component evaluated at step k of the plan (with origin q0), at the
+        position qp. If Phi is not NULL, the value of the potential is added
+        to it.
+    */
+    int j, flags;
+    int i = (p->plan)[k].index;
+    double qp_trans[p->n_dim];
+    double grad[p->n_dim];
+    double grad_rot[p->n_dim];
+    double *q;
+    double *g = &grad[0];
+    double d = 0.;
+
+    // the position is always transformed, as it may differ from the position
+    // used for the previous step
+    flags = step_flags(p, k) & ~CPOT_SAME_FRAME;
+    q = step_position(p, k, flags, q0, qp, &qp_trans[0]);
+
+    for (j=0; j < p->n_dim; j++)
+        grad[j] = 0.;
+
+    if (Phi == NULL) {
+        (p->gradient)[i](t, pars, q, p->n_dim, &grad[0]);
+    } else if ((p->value_gradient)[i] != NULL) {
+        *Phi = *Phi + (p->value_gradient)[i](t, pars, q, p->n_dim, &grad[0]);
+    } else {
+        *Phi = *Phi + (p->value)[i](t, pars, q, p->n_dim);
+        (p->gradient)[i](t, pars, q, p->n_dim, &grad[0]);
+    }
 
-    for (j=0; j<p->n_dim; j++) {
-        r2 = r2 + qp[j]*qp[j];
+    if (flags & CPOT_ROTATE) {
+        for (j=0; j < p->n_dim; j++)
+            grad_rot[j] = 0.;
+        apply_rotate(&grad[0], (p->R)[i], p->n_dim, 1, &grad_rot[0]);
+        g = &grad_rot[0];
     }
 
-    // TODO: allow user to specify fractional step-size
-    h = 1E-4;
+    for (j=0; j < p->n_dim; j++)
+        d = d + g[j] * rhat[j];
 
-    // Step-size for estimating radial gradient of the potential
-    r = sqrt(r2);
+    return d;
+}
 
-    for (j=0; j < (p->n_dim); j++)
-        epsilon[j] = h * qp[j]/r + qp[j];
 
-    dPhi_dr = c_potential(p, t, epsilon);
+double c_radial_derivatives(CPotential *p, double t, double *qp,
+                            double *d2Phi_dr2, double *Phi) {
+    /*
+        Returns the derivative of the potential along the radial direction
+        qp/|qp|. If they are not NULL, the second radial derivative is stored
+        in d2Phi_dr2 and the value of the potential in Phi.
+
+        Components with a radial kernel (i.e. spherical potentials) that are
+        not shifted from the origin use the analytic derivatives. For other
+        components, the first derivative is the projection of the gradient,
+        and the second derivative is estimated with a central difference of
+        the projected gradient.
+    */
+    double pars_t[p->max_track_params + 1];
+    double q0_t[p->n_dim];
+    double rhat[p->n_dim];
+    double q_step[p->n_dim];
+    double *pars, *q0;
+    double r, h, v, d1, d2;
+    double dPhi_dr = 0.;
+    double r2 = 0.;
+    int i, j, k;
+
+    if (d2Phi_dr2 != NULL)
+        *d2Phi_dr2 = 0.;
+    if (Phi != NULL)
+        *Phi = 0.;
+
+    for (j=0; j < p->n_dim; j++)
+        r2 = r2 + qp[j]*qp[j];
+    r = sqrt(r2);
 
-    for (j=0; j < (p->n_dim); j++)
-        epsilon[j] = h * qp[j]/r - qp[j];
+    for (j=0; j < p->n_dim; j++)
+        rhat[j] = qp[j] / r;
+
+    // step size for the finite-difference second derivative
+    h = 1E-5 * r;
+
+    for (k=0; k < p->n_steps; k++) {
+        i = (p->plan)[k].index;
+        pars = component_parameters(p, i, t, &pars_t[0]);
+        q0 = component_origin(p, i, t, &q0_t[0]);
+
+        if (((p->radial)[i] != NULL) && !(step_flags(p, k) & CPOT_SHIFT)) {
+            // a rotation does not change the radius
+            v = (p->radial)[i](t, pars, r, &d1, &d2);
+            if (Phi != NULL)
+                *Phi = *Phi + v;
+            if (d2Phi_dr2 != NULL)
+                *d2Phi_dr2 = *d2Phi_dr2 + d2;
+            dPhi_dr = dPhi_dr + d1;
+            continue;
+        }
 
-    dPhi_dr = dPhi_dr - c_potential(p, t, epsilon);
+        dPhi_dr = dPhi_dr + step_radial_gradient(p, k, t, pars, q0, qp,
+                                                 &rhat[0], Phi);
 
-    return dPhi_dr / (2.*h);
-}
+        if (d2Phi_dr2 != NULL) {
+            for (j=0; j < p->n_dim; j++)
+                q_step[j] = qp[j] + h*rhat[j];
+            d2 = step_radial_gradient(p, k, t, pars, q0, &q_step[0],
+                                      &rhat[0], NULL);
 
+            for (j=0; j < p->n_dim; j++)
+                q_step[j] = qp[j] - h*rhat[j];
+            d2 = d2 - step_radial_gradient(p, k, t, pars, q0, &q_step[0],
+                                           &rhat[0], NULL);
 
-double c_d2_dr2(CPotential *p, double t, double *qp, double *epsilon) {
-    double h, r, d2Phi_dr2;
-    int j;
-    double r2 = 0;
-    for (j=0; j<p->n_dim; j++) {
-        r2 = r2 + qp[j]*qp[j];
+            *d2Phi_dr2 = *d2Phi_dr2 + d2 / (2*h);
+        }
     }
 
-    // TODO: allow user to specify fractional step-size
-    h = 1E-2;
-
-    // Step-size for estimating radial gradient of the potential
-    r = sqrt(r2);
+    return dPhi_dr;
+}
 
-    for (j=0; j < (p->n_dim); j++)
-        epsilon[j] = h * qp[j]/r + qp[j];
-    d2Phi_dr2 = c_potential(p, t, epsilon);
 
-    d2Phi_dr2 = d2Phi_dr2 - 2.*c_potential(p, t, qp);
+double c_d_dr(CPotential *p, double t, double *qp, double *epsilon) {
+    // Note: epsilon is no longer used, but is kept for backwards compatibility
+    return c_radial_derivatives(p, t, qp, NULL, NULL);
+}
 
-    for (j=0; j < (p->n_dim); j++)
-        epsilon[j] = h * qp[j]/r - qp[j];
-    d2Phi_dr2 = d2Phi_dr2 + c_potential(p, t, epsilon);
 
-    return d2Phi_dr2 / (h*h);
+double c_d2_dr2(CPotential *p, double t, double *qp, double *epsilon) {
+    // Note: epsilon is no longer used, but is kept for backwards compatibility
+    double d2Phi_dr2;
+    c_radial_derivatives(p, t, qp, &d2Phi_dr2, NULL);
+    return d2Phi_dr2;
 }
 
 
@@ -196,6 +838,6 @@ double c_mass_enclosed(CPotential *p, double t, double *qp, double G,
     for (j=0; j<p->n_dim; j++) {
         r2 = r2 + qp[j]*qp[j];
     }
-    dPhi_dr = c_d_dr(p, t, qp, epsilon);
+    dPhi_dr = c_radial_derivatives(p, t, qp, NULL, NULL);
     return fabs(r2 * dPhi_dr / G);
 }
@@ -1,12 +1,25 @@
 #include "src/funcdefs.h"
 
-#ifndef MAX_N_COMPONENTS_H
-    #define MAX_N_COMPONENTS_H
-    #define MAX_N_COMPONENTS 16
+#ifndef C_BATCH_SIZE_H
+    #define C_BATCH_SIZE_H
+    // maximum number of positions passed to a batched kernel in one call
+    #define C_BATCH_SIZE 64
 #endif
 
 #ifndef _CPotential_H
 #define _CPotential_H
+    // flags that specify the coordinate transformation needed to evaluate a
+    // step of a compiled execution plan (see compile_cpotential())
+    #define CPOT_SHIFT 1 // shift to the origin of the component
+    #define CPOT_ROTATE 2 // rotate into the frame of the component
+    #define CPOT_SAME_FRAME 4 // same origin and rotation as the previous step
+
+    typedef struct {
+        int index; // index of the component to evaluate
+        int flags; // bitwise OR of the CPOT_* flags above
+        double *q0; // the origin pointer of the component when compiled
+    } CPotentialStep;
+
     typedef struct _CPotential CPotential;
 
     struct _CPotential {
@@ -14,30 +27,78 @@
         int n_dim; // coordinate system dimensionality
         int null; // a short circuit: if null, can skip evaluation
 
+        // Arrays with one element per component, allocated on the heap by
+        // allocate_cpotential() and released by free_cpotential().
+
         // arrays of pointers to each of the function types above
-        densityfunc density[MAX_N_COMPONENTS];
-        energyfunc value[MAX_N_COMPONENTS];
-        gradientfunc gradient[MAX_N_COMPONENTS];
-        hessianfunc hessian[MAX_N_COMPONENTS];
+        densityfunc *density;
+        energyfunc *value;
+        gradientfunc *gradient;
+        hessianfunc *hessian;
+
+        // optional fused value + gradient: NULL if not implemented
+        valuegradientfunc *value_gradient;
+
+        // optional batched versions of the above: NULL if not implemented
+        batchenergyfunc *batch_value;
+        batchgradientfunc *batch_gradient;
+
+        // optional radial kernel for spherical potentials: NULL if not
+        // implemented (see c_radial_derivatives())
+        radialfunc *radial;
+
+        // array containing the number of parameters in each component. Note:
+        // this is not allocated by allocate_cpotential(), as it points to
+        // memory owned by the Cython wrapper class
+        int *n_params;
 
-        // array containing the number of parameters in each component
-        int n_params[MAX_N_COMPONENTS];
+        // array of pointers to the parameter arrays
+        double **parameters;
 
-        // pointer to array of pointers to the parameter arrays
-        double *parameters[MAX_N_COMPONENTS];
+        // array of pointers containing the origin coordinates
+        double **q0;
 
-        // pointer to array of pointers containing the origin coordinates
-        double *q0[MAX_N_COMPONENTS];
+        // array of pointers containing rotation matrix elements
+        double **R;
 
-        // pointer to array of pointers containing rotation matrix elements
-        double *R[MAX_N_COMPONENTS];
+        // array of pointers to the packed time-dependent parameter tracks of
+        // each component (see component_parameters()), or NULL for components
+        // with constant parameters. Note: the tracks point to memory owned by
+        // the Cython wrapper class
+        double **tracks;
+
+        // the largest number of parameters of a component with tracks (set
+        // by compile_cpotential())
+        int max_track_params;
+
+        // array of pointers to the packed origin trajectory of each component
+        // (see component_origin()), or NULL for components with a fixed
+        // origin. Note: the trajectories point to memory owned by the Cython
+        // wrapper class
+        double **origin_tracks;
+
+        // compiled execution plan: the components to evaluate, in order. Null
+        // components are dropped, and components that share an origin and
+        // rotation are adjacent so the transformed position can be reused
+        int n_steps;
+        CPotentialStep *plan;
     };
 #endif
 
+extern int allocate_cpotential(CPotential *p, int n_components);
+extern void free_cpotential(CPotential *p);
+extern int compile_cpotential(CPotential *p, int *skip);
+
 extern double c_potential(CPotential *p, double t, double *q);
 extern double c_density(CPotential *p, double t, double *q);
 extern void c_gradient(CPotential *p, double t, double *q, double *grad);
 extern void c_hessian(CPotential *p, double t, double *q, double *hess);
+extern double c_potential_gradient(CPotential *p, double t, double *q, double *grad);
+
+extern void c_potential_batch(CPotential *p, double t, double *q, int n_points, double *pot);
+extern void c_gradient_batch(CPotential *p, double t, double *q, int n_points, double *grad);
+
+extern double c_radial_derivatives(CPotential *p, double t, double *qp, double *d2Phi_dr2, double *Phi);
 
 // TODO: err, what about reference frames...
 extern double c_d_dr(CPotential *p, double t, double *q, double *epsilon);
@@ -118,6 +118,38 @@ class PotentialTestBase:
             g = self.potential.gradient(arr[:self.ndim],
                                         t=t*self.potential.units['time'])
 
+    def test_energy_and_gradient(self):
+        for arr, eshp, gshp in zip(self.w0s, self._valu_return_shapes,
+                                   self._grad_return_shapes):
+            E, g = self.potential.energy_and_gradient(arr[:self.ndim], t=0.1)
+            assert E.shape == eshp
+            assert g.shape == gshp
+            assert u.allclose(E, self.potential.energy(arr[:self.ndim],
+                                                       t=0.1))
+            assert u.allclose(g, self.potential.gradient(arr[:self.ndim],
+                                                         t=0.1))
+
+    def test_raw(self):
+        q = np.ascontiguousarray(self.w0s[1][:self.ndim].T)
+        t = 0.1
+
+        E = self.potential.raw.energy(q, t=t)
+        assert np.allclose(E, self.potential.energy(q.T, t=t).value)
+
+        out = np.zeros_like(q)
+        grad = self.potential.raw.gradient(q, t=t, out=out)
+        assert grad is out
+        assert np.allclose(
+            grad, self.potential.gradient(q.T, t=t).decompose(
+                self.potential.units).value.T)
+
+        E2, grad2 = self.potential.raw.energy_and_gradient(q, t=t)
+        assert np.allclose(E2, E)
+        assert np.allclose(grad2, grad)
+
+        with pytest.raises(ValueError):
+            self.potential.raw.gradient(q.T)
+
     def test_hessian(self):
         for arr, shp in zip(self.w0s, self._hess_return_shapes):
             g = self.potential.hessian(arr[:self.ndim])
@@ -380,6 +380,76 @@ class TestLongMuraliBarRotationScipy(PotentialTestBase):
         pass
 
 
+class TestInterpolatedCartesian(PotentialTestBase):
+    potential = p.InterpolatedPotential.from_potential(
+        p.PlummerPotential(units=galactic, m=1.E11, b=2.),
+        grid=[np.linspace(-20, 20, 40)] * 3,
+        random_state=np.random.RandomState(42))
+    w0 = [8., 0., 0., 0., 0.2, 0.05]
+
+    @pytest.mark.skip(reason="to_sympy() not implemented")
+    def test_against_sympy(self):
+        pass
+
+    def test_error_estimate(self):
+        # the fractional gradient error is largest near the center
+        assert self.potential.error_estimate['energy'] < 5e-3
+        assert self.potential.error_estimate['gradient'] < 0.1
+
+    def test_c_parameters(self):
+        # only the grid description and the B-spline coefficients (with two
+        # extra nodes along each axis) are stored in the C parameter array
+        assert len(self.potential.c_parameters) == 1 + 3 + 6 + 42**3
+        assert len(self.potential.get_parameters_raw()) == 0
+
+    def test_outside_grid(self):
+        xyz = [[25., 0, 0], [0, 0, -30.]]
+        assert np.all(np.isnan(self.potential.energy(np.transpose(xyz))))
+        assert np.all(np.isnan(self.potential.gradient(np.transpose(xyz))))
+
+
+class TestInterpolatedSpherical(PotentialTestBase):
+    source = p.HernquistPotential(units=galactic, m=1.E11, c=1.)
+    potential = p.InterpolatedPotential.from_potential(
+        source, grid=(np.geomspace(0.01, 100, 64), 17, 16),
+        coordinates='spherical', random_state=np.random.RandomState(42))
+    w0 = [8., 0., 0., 0., 0.2, 0.05]
+
+    @pytest.mark.skip(reason="to_sympy() not implemented")
+    def test_against_sympy(self):
+        pass
+
+    def test_error_estimate(self):
+        assert self.potential.error_estimate['energy'] < 1e-4
+        assert self.potential.error_estimate['gradient'] < 1e-2
+
+    def test_outside_grid(self):
+        # the potential falls off as 1/r beyond the outermost grid node
+        E_max = self.potential.energy([100., 0, 0])
+        xyz = np.array([[200., 0, 0], [0, 0, -1000.]]).T
+        assert u.allclose(self.potential.energy(xyz),
+                          E_max * 100. / np.array([200., 1000.]))
+
+
+def test_interpolated_failures():
+    with pytest.raises(ValueError):
+        p.InterpolatedPotential(values=np.zeros((3, 8, 8)),
+                                extent=[0, 1, 0, 1, 0, 1])
+
+    with pytest.raises(ValueError):
+        p.InterpolatedPotential(values=np.zeros((8, 8, 8)),
+                                extent=[0, 1, 0, 1])
+
+    with pytest.raises(ValueError):
+        p.InterpolatedPotential(values=np.zeros((8, 8, 8)),
+                                extent=[0, 1, 1, 0, 0, 1])
+
+    pot = p.KeplerPotential(units=galactic, m=1E10)
+    with pytest.raises(ValueError):  # the grid includes the origin
+        p.InterpolatedPotential.from_potential(
+            pot, grid=[np.linspace(-1, 1, 9)] * 3)
+
+
 class TestComposite(CompositePotentialTestBase):
     p1 = p.LogarithmicPotential(units=galactic,
                                 v_c=0.17, r_h=10.,
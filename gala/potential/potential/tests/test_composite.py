@@ -113,6 +113,61 @@ def test_lock():
         p['herp'] = KeplerPotential(m=2.*u.Msun, units=solarsystem)
 
 
+def test_many_components():
+    # there used to be a hard limit of 16 components in a C composite potential
+    rng = np.random.default_rng(42)
+    pots = dict()
+    for i in range(128):
+        pots[f'h{i}'] = HernquistPotential(m=1e8, c=0.1, units=galactic,
+                                           origin=rng.uniform(-10, 10, 3))
+    p = CCompositePotential(**pots)
+    assert len(p) == 128
+
+    xyz = rng.uniform(-10, 10, size=(3, 16))
+    E = sum([pot.energy(xyz) for pot in pots.values()])
+    grad = sum([pot.gradient(xyz) for pot in pots.values()])
+    assert u.allclose(p.energy(xyz), E)
+    assert u.allclose(p.gradient(xyz), grad)
+
+    w0 = [5., 0, 0, 0, 0.1, 0]
+    orbit = p.integrate_orbit(w0, dt=0.1, n_steps=100,
+                              Integrator=DOPRI853Integrator)
+    assert np.all(np.isfinite(orbit.xyz))
+
+
+def test_batch_update():
+    rng = np.random.default_rng(42)
+    pots = [KeplerPotential(m=1e8, units=galactic,
+                            origin=rng.uniform(-10, 10, 3))
+            for i in range(2000)]
+
+    p1 = CCompositePotential.from_components(pots)
+    assert list(p1.keys()) == [str(i) for i in range(len(pots))]
+
+    p2 = CCompositePotential.from_components(
+        {f'h{i}': pot for i, pot in enumerate(pots)})
+    assert list(p2.keys())[:2] == ['h0', 'h1']
+
+    p3 = CCompositePotential()
+    with p3.batch_update():
+        for i, pot in enumerate(pots[:-1]):
+            p3[str(i)] = pot
+
+        # nested contexts only rebuild the C instance at the outermost exit
+        with p3.batch_update():
+            p3[str(len(pots) - 1)] = pots[-1]
+        assert not hasattr(p3, 'c_instance')
+    assert len(p3._potential_list) == len(pots)
+
+    xyz = rng.uniform(-10, 10, size=(3, 16))
+    assert np.array_equal(p1.energy(xyz).value, p2.energy(xyz).value)
+    assert np.array_equal(p1.gradient(xyz).value, p3.gradient(xyz).value)
+
+    # adding a component outside of the context rebuilds immediately
+    p3['extra'] = HernquistPotential(m=1e10, c=1., units=galactic)
+    assert len(p3._potential_list) == len(pots) + 1
+
+
 class MyPotential(PotentialBase):
     m = PotentialParameter('m', physical_type='mass')
     x0 = PotentialParameter('x0', physical_type='length')
@@ -96,6 +96,28 @@ def test_plot():
     # f.savefig(os.path.join(plot_path, "contour_xz.png"))
 
 
+def test_evaluate_on_grid():
+    p = MyPotential(m=1, x0=[1., 3., 0.], units=usys)
+    x = np.linspace(-10., 10., 16)
+    z = np.linspace(-5., 5., 8)
+
+    E = p.evaluate_on_grid((x, 1., z))
+    assert E.shape == (16, 8)
+
+    X, Z = np.meshgrid(x, z, indexing='ij')
+    xyz = np.stack((X, np.ones_like(X), Z))
+    assert u.allclose(E, p.energy(xyz))
+
+    with pytest.raises(ValueError):
+        p.evaluate_on_grid((x, z))
+
+    with pytest.raises(ValueError):
+        p.evaluate_on_grid((x, 1., z), quantity='derp')
+
+    with pytest.raises(ValueError):
+        p.evaluate_on_grid((x, 1., z), out=np.zeros((8, 16)))
+
+
 def test_composite():
     p1 = MyPotential(m=1., x0=[1., 0., 0.], units=usys)
     p2 = MyPotential(m=1., x0=[-1., 0., 0.], units=usys)
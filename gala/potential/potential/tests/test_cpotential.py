@@ -1,5 +1,12 @@
+# Standard library
+import pickle
+import sys
+import warnings
+
 # Third party
 import astropy.units as u
+import numpy as np
+import pytest
 
 # This package
 from ..builtin import HernquistPotential
@@ -19,3 +26,644 @@ def test_replace_units():
     assert p2.parameters['c'].unit == usys2['length']
     assert p.units == usys1
     assert p2.units == usys2
+
+
+def test_multithreaded_evaluation():
+    from ..cpotential import get_num_threads, set_num_threads
+    from ..builtin import NFWPotential, MiyamotoNagaiPotential
+    from ....units import galactic
+
+    pot = (HernquistPotential(m=1E10, c=1., units=galactic) +
+           MiyamotoNagaiPotential(m=5E10, a=3., b=0.3, units=galactic) +
+           NFWPotential(m=1E12, r_s=15., units=galactic))
+
+    rng = np.random.default_rng(42)
+    xyz = rng.uniform(-10, 10, size=(3, 1024))
+
+    n_threads = get_num_threads()
+    try:
+        set_num_threads(1)
+        E1 = pot.energy(xyz)
+        grad1 = pot.gradient(xyz)
+        dens1 = pot.density(xyz)
+        menc1 = pot.mass_enclosed(xyz)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            set_num_threads(4)
+
+        assert get_num_threads() == 4
+        assert np.array_equal(pot.energy(xyz).value, E1.value)
+        assert np.array_equal(pot.gradient(xyz).value, grad1.value)
+        assert np.array_equal(pot.density(xyz).value, dens1.value)
+        assert np.array_equal(pot.mass_enclosed(xyz).value, menc1.value)
+
+    finally:
+        set_num_threads(n_threads)
+
+    with pytest.raises(ValueError):
+        set_num_threads(0)
+
+
+def test_batched_evaluation():
+    from ..builtin import (NFWPotential, MiyamotoNagaiPotential,
+                           LogarithmicPotential)
+    from ..ccompositepotential import CCompositePotential
+    from ....units import galactic
+
+    R = np.array([[0., -1., 0.],
+                  [1., 0., 0.],
+                  [0., 0., 1.]])
+    pot = CCompositePotential()
+    pot['halo'] = NFWPotential(m=1E12, r_s=15., units=galactic)
+    pot['disk'] = MiyamotoNagaiPotential(m=5E10, a=3., b=0.3, units=galactic,
+                                         origin=[0.1, 0.2, 0.], R=R)
+    pot['bulge'] = HernquistPotential(m=1E10, c=1., units=galactic)
+    pot['log'] = LogarithmicPotential(v_c=0.1, r_h=1., q1=1., q2=0.9, q3=0.8,
+                                      units=galactic)
+
+    rng = np.random.default_rng(42)
+    # more positions than fit in a single block passed to the batched kernels
+    q = rng.uniform(-10, 10, size=(1000, 3))
+
+    # a single time uses the batched kernels, an array of times evaluates
+    # point-by-point: these should agree exactly
+    t1 = np.array([0.])
+    tn = np.zeros(len(q))
+    assert np.array_equal(pot.c_instance.energy(q, t1),
+                          pot.c_instance.energy(q, tn))
+    assert np.array_equal(pot.c_instance.gradient(q, t1),
+                          pot.c_instance.gradient(q, tn))
+
+
+def test_compiled_plan():
+    from ..builtin import (NullPotential, MiyamotoNagaiPotential,
+                           PlummerPotential)
+    from ..ccompositepotential import CCompositePotential
+    from ....units import galactic
+
+    R = np.array([[0., -1., 0.],
+                  [1., 0., 0.],
+                  [0., 0., 1.]])
+    origin = [0.1, 0.2, 0.3]
+
+    # interleave components that share an origin and rotation with components
+    # that are only shifted, null, or not transformed at all
+    pots = [
+        HernquistPotential(m=1E10, c=1., units=galactic),
+        MiyamotoNagaiPotential(m=5E10, a=3., b=0.3, units=galactic,
+                               origin=origin, R=R),
+        NullPotential(units=galactic),
+        PlummerPotential(m=1E10, b=1., units=galactic, origin=origin),
+        HernquistPotential(m=1E9, c=0.5, units=galactic, origin=origin, R=R),
+        PlummerPotential(m=1E9, b=0.5, units=galactic),
+        HernquistPotential(m=1E9, c=0.5, units=galactic, origin=origin)
+    ]
+    pot = CCompositePotential.from_components(pots)
+
+    rng = np.random.default_rng(42)
+    xyz = rng.uniform(-10, 10, size=(3, 128))
+
+    for name in ['energy', 'gradient', 'density']:
+        val = getattr(pot, name)(xyz)
+        expected = sum([getattr(p, name)(xyz) for p in pots])
+        assert u.allclose(val, expected)
+
+    E, grad = pot.energy_and_gradient(xyz)
+    assert u.allclose(E, pot.energy(xyz))
+    assert u.allclose(grad, pot.gradient(xyz))
+
+    # the Hessian is not supported for rotated potentials
+    pots = [pots[i] for i in [0, 2, 3, 5, 6]]
+    pot = CCompositePotential.from_components(pots)
+    assert u.allclose(pot.hessian(xyz), sum([p.hessian(xyz) for p in pots]))
+
+
+def test_tabulated_radial_profile():
+    from ..builtin import (NFWPotential, StonePotential,
+                           PowerLawCutoffPotential)
+    from ....units import galactic
+    from ...._cconfig import GSL_ENABLED
+
+    pots = [NFWPotential(m=1E12, r_s=15., units=galactic, origin=[1., 2., 3.]),
+            StonePotential(m=1E11, r_c=0.1, r_h=10., units=galactic)]
+    if GSL_ENABLED:
+        pots.append(PowerLawCutoffPotential(m=1E10, alpha=1.8, r_c=2.,
+                                            units=galactic))
+
+    rng = np.random.default_rng(42)
+    xyz = rng.normal(0, 10, size=(3, 1024))
+    # include positions outside of the table, which use the exact expressions
+    xyz[:, 0] = [2000., 0, 0]
+    xyz[:, 1] = [1.001, 2., 3.]
+
+    for pot in pots:
+        tab = pot.tabulate_radial_profile(tol=1E-8)
+        assert u.allclose(tab.energy(xyz), pot.energy(xyz), rtol=1E-7)
+        assert u.allclose(tab.gradient(xyz), pot.gradient(xyz), rtol=1E-7)
+        assert u.allclose(tab.density(xyz), pot.density(xyz))
+
+        E, grad = tab.energy_and_gradient(xyz)
+        assert np.array_equal(E.value, tab.energy(xyz).value)
+        assert np.array_equal(grad.value, tab.gradient(xyz).value)
+
+        tab2 = pickle.loads(pickle.dumps(tab))
+        assert np.array_equal(tab2.gradient(xyz).value,
+                              tab.gradient(xyz).value)
+
+    with pytest.raises(ValueError):
+        pots[0].tabulate_radial_profile(r_min=10., r_max=1.)
+
+    with pytest.raises(NotImplementedError):
+        HernquistPotential(m=1E10, c=1., units=galactic).tabulate_radial_profile()
+
+    with pytest.raises(NotImplementedError):
+        NFWPotential(m=1E12, r_s=15., c=0.8,
+                     units=galactic).tabulate_radial_profile()
+
+
+def test_parameter_tracks():
+    from ..builtin import MiyamotoNagaiPotential
+    from ..ccompositepotential import CCompositePotential
+    from ...hamiltonian import Hamiltonian
+    from ....integrate import LeapfrogIntegrator, DOPRI853Integrator
+    from ....units import galactic
+
+    pot = HernquistPotential(m=1E10, c=1., units=galactic)
+    t_knots = [0, 1, 2] * u.Gyr
+    m_knots = [1E10, 2E10, 4E10] * u.Msun
+    lin = pot.with_parameter_tracks(t_knots, interpolation='linear',
+                                    m=m_knots)
+    cub = pot.with_parameter_tracks(t_knots, m=m_knots)
+
+    xyz = np.array([[1., 2., 3.], [4., 5., 6.]]).T
+    for t, m in zip([-1., 0.5, 1.25, 2., 3.] * u.Gyr,
+                    [1E10, 1.5E10, 2.5E10, 4E10, 4E10]):
+        expected = HernquistPotential(m=m, c=1., units=galactic)
+        assert u.allclose(lin.energy(xyz, t=t), expected.energy(xyz))
+        assert u.allclose(lin.gradient(xyz, t=t), expected.gradient(xyz))
+
+    # the cubic spline passes through the knots
+    for t, m in zip(t_knots, m_knots):
+        expected = HernquistPotential(m=m, c=1., units=galactic)
+        assert u.allclose(cub.energy(xyz, t=t), expected.energy(xyz))
+
+    # an array of times, one per position
+    t = [0.5, 1.25] * u.Gyr
+    E = lin.energy(xyz, t=t)
+    for i in range(len(t)):
+        assert u.allclose(E[i], lin.energy(xyz[:, i], t=t[i])[0])
+
+    # composite potentials use the tracks of their components
+    disk = MiyamotoNagaiPotential(m=5E10, a=3., b=0.3, units=galactic)
+    disk = disk.with_parameter_tracks([0, 1000.], a=[3., 6.])
+    comp = CCompositePotential(bulge=lin, disk=disk)
+    E = comp.energy(xyz, t=500.)
+    assert u.allclose(E, lin.energy(xyz, t=500.) + disk.energy(xyz, t=500.))
+    assert u.allclose(
+        disk.energy(xyz, t=500.),
+        MiyamotoNagaiPotential(m=5E10, a=4.5, b=0.3,
+                               units=galactic).energy(xyz))
+
+    # the C integrators evaluate the parameters at each time
+    H = Hamiltonian(comp)
+    w0 = [8., 0, 0, 0, 0.2, 0.02]
+    for Integrator in [DOPRI853Integrator, LeapfrogIntegrator]:
+        orbit_cy = H.integrate_orbit(w0, dt=0.5, n_steps=2000,
+                                     Integrator=Integrator)
+        orbit_py = H.integrate_orbit(w0, dt=0.5, n_steps=2000,
+                                     Integrator=Integrator,
+                                     cython_if_possible=False)
+        assert u.allclose(orbit_cy.xyz, orbit_py.xyz)
+
+    # tracks are preserved by pickling and replacing the unit system
+    lin2 = pickle.loads(pickle.dumps(lin))
+    assert u.allclose(lin2.energy(xyz, t=1.25*u.Gyr),
+                      lin.energy(xyz, t=1.25*u.Gyr))
+    lin3 = lin.replace_units(UnitSystem([u.pc, u.Myr, u.Msun, u.radian]))
+    assert u.allclose(lin3.energy(xyz*u.kpc, t=1.25*u.Gyr),
+                      lin.energy(xyz*u.kpc, t=1.25*u.Gyr))
+
+    # adding a track to another parameter keeps the existing tracks
+    lin4 = lin.with_parameter_tracks([0, 1.] * u.Gyr, c=[1., 1.] * u.kpc)
+    assert u.allclose(lin4.energy(xyz, t=1.25*u.Gyr),
+                      lin.energy(xyz, t=1.25*u.Gyr))
+
+    with pytest.raises(ValueError):
+        pot.with_parameter_tracks(t_knots, derp=m_knots)
+
+    with pytest.raises(ValueError):
+        pot.with_parameter_tracks(t_knots, m=m_knots[:2])
+
+    with pytest.raises(ValueError):
+        pot.with_parameter_tracks(t_knots[::-1], m=m_knots)
+
+    with pytest.raises(NotImplementedError):
+        comp.with_parameter_tracks(t_knots, m=m_knots)
+
+
+def test_origin_trajectory():
+    from ..builtin import NFWPotential
+    from ..ccompositepotential import CCompositePotential
+    from ...hamiltonian import Hamiltonian
+    from ....dynamics import PhaseSpacePosition, combine
+    from ....dynamics.nbody import DirectNBody
+    from ....integrate import LeapfrogIntegrator, DOPRI853Integrator
+    from ....units import galactic
+
+    mw = NFWPotential(m=1E12, r_s=15., units=galactic)
+    pert = HernquistPotential(m=1E11, c=5., units=galactic)
+    w0_pert = PhaseSpacePosition(pos=[50., 0, 0] * u.kpc,
+                                 vel=[0, 150., 20] * u.km/u.s)
+    orbit = Hamiltonian(mw).integrate_orbit(w0_pert, dt=1., n_steps=1000,
+                                            Integrator=DOPRI853Integrator)
+    moving = pert.with_origin_trajectory(orbit)
+
+    # at the times of the orbit, the origin is the position on the orbit
+    xyz = np.array([[10., 5., 3.], [60., 2., 1.]]).T
+    for i in [0, 333, 1000]:
+        static = HernquistPotential(m=1E11, c=5., units=galactic,
+                                    origin=orbit.xyz[:, i])
+        t = orbit.t[i]
+        assert u.allclose(moving.energy(xyz, t=t), static.energy(xyz))
+        assert u.allclose(moving.gradient(xyz, t=t), static.gradient(xyz))
+
+    # the origin is held fixed outside of the time range of the orbit
+    static = HernquistPotential(m=1E11, c=5., units=galactic,
+                                origin=orbit.xyz[:, 1000])
+    assert u.allclose(moving.energy(xyz, t=2000.), static.energy(xyz))
+
+    # ...and orbits integrated backwards in time are supported
+    orbit_b = Hamiltonian(mw).integrate_orbit(w0_pert, dt=-1., n_steps=100)
+    moving_b = pert.with_origin_trajectory(orbit_b)
+    static = HernquistPotential(m=1E11, c=5., units=galactic,
+                                origin=orbit_b.xyz[:, 50])
+    assert u.allclose(moving_b.energy(xyz, t=orbit_b.t[50]),
+                      static.energy(xyz))
+
+    # test particle orbits match a direct N-body integration with a massless
+    # test particle
+    w0 = PhaseSpacePosition(pos=[20., 0, 0] * u.kpc,
+                            vel=[0, 180., 0] * u.km/u.s)
+    nbody = DirectNBody(combine((w0_pert, w0)), [pert, None],
+                        external_potential=mw)
+    orbits_nbody = nbody.integrate_orbit(dt=1., n_steps=1000)
+
+    H = Hamiltonian(CCompositePotential(mw=mw, pert=moving))
+    orbit_cy = H.integrate_orbit(w0, dt=1., n_steps=1000,
+                                 Integrator=DOPRI853Integrator)
+    assert u.allclose(orbit_cy.xyz, orbits_nbody.xyz[:, :, 1],
+                      atol=1E-2*u.kpc)
+
+    orbit_cy = H.integrate_orbit(w0, dt=1., n_steps=1000,
+                                 Integrator=LeapfrogIntegrator)
+    orbit_py = H.integrate_orbit(w0, dt=1., n_steps=1000,
+                                 Integrator=LeapfrogIntegrator,
+                                 cython_if_possible=False)
+    assert u.allclose(orbit_cy.xyz, orbit_py.xyz)
+
+    # the trajectory is preserved by pickling, replacing the unit system, and
+    # adding parameter tracks
+    t = 333.3 * u.Myr
+    E = moving.energy(xyz, t=t)
+    assert u.allclose(pickle.loads(pickle.dumps(moving)).energy(xyz, t=t), E)
+    usys = UnitSystem([u.pc, u.Myr, u.Msun, u.radian])
+    assert u.allclose(moving.replace_units(usys).energy(xyz*u.kpc, t=t), E)
+    tracked = moving.with_parameter_tracks([0, 1.] * u.Gyr,
+                                           m=[1E11, 1E11] * u.Msun)
+    assert u.allclose(tracked.energy(xyz, t=t), E)
+
+    with pytest.raises(TypeError):
+        pert.with_origin_trajectory(orbit.xyz)
+
+    with pytest.raises(ValueError):
+        pert.with_origin_trajectory(combine((orbit, orbit)))
+
+    with pytest.raises(NotImplementedError):
+        H.potential.with_origin_trajectory(orbit)
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'),
+                    reason="builtin C functions are not exported on Windows")
+def test_custom_c_potential():
+    import ctypes
+    from ..builtin import cybuiltin
+    from ..cpotential import CustomCPotential
+    from ....units import galactic
+
+    # use the C functions of a builtin potential
+    lib = ctypes.CDLL(cybuiltin.__file__)
+    hessian = ctypes.cast(lib.hernquist_hessian, ctypes.c_void_p).value
+    pot = CustomCPotential([1E10, 1.], value=lib.hernquist_value,
+                           gradient=lib.hernquist_gradient,
+                           density=lib.hernquist_density, hessian=hessian,
+                           units=galactic)
+    builtin = HernquistPotential(m=1E10, c=1., units=galactic)
+
+    xyz = np.random.default_rng(42).uniform(-5, 5, size=(3, 16))
+    for name in ['energy', 'gradient', 'density', 'hessian']:
+        assert u.allclose(getattr(pot, name)(xyz),
+                          getattr(builtin, name)(xyz))
+
+    w0 = [5., 0, 0, 0, 0.1, 0.02]
+    orbit = pot.integrate_orbit(w0, dt=0.5, n_steps=1000)
+    orbit_builtin = builtin.integrate_orbit(w0, dt=0.5, n_steps=1000)
+    assert u.allclose(orbit.xyz, orbit_builtin.xyz)
+
+    # the parameter array supports parameter tracks
+    tracked = pot.with_parameter_tracks([0, 1000.],
+                                        pars=[[1E10, 1.], [2E10, 1.]])
+    assert u.allclose(
+        tracked.energy(xyz, t=500.),
+        HernquistPotential(m=1.5E10, c=1., units=galactic).energy(xyz))
+
+    # ...and composite potentials
+    assert u.allclose((pot + builtin).energy(xyz), 2 * builtin.energy(xyz))
+
+    with pytest.raises(TypeError):
+        pickle.dumps(pot)
+
+    with pytest.raises(TypeError):
+        CustomCPotential(value='derp', gradient=lib.hernquist_gradient)
+
+
+def test_custom_c_potential_lifetime():
+    import ctypes
+    import gc
+    from .. import cpotential
+    from ..cpotential import CustomCPotential
+    from ....units import galactic, solarsystem
+
+    c_double_p = ctypes.POINTER(ctypes.c_double)
+    value_type = ctypes.CFUNCTYPE(ctypes.c_double, ctypes.c_double,
+                                  c_double_p, c_double_p, ctypes.c_int)
+    gradient_type = ctypes.CFUNCTYPE(None, ctypes.c_double, c_double_p,
+                                     c_double_p, ctypes.c_int, c_double_p)
+
+    def _value(t, pars, q, n_dim):
+        return 0.5 * pars[1] * (q[0]**2 + q[1]**2 + q[2]**2)
+
+    def _gradient(t, pars, q, n_dim, grad):
+        for i in range(3):
+            grad[i] += pars[1] * q[i]
+
+    value = value_type(_value)
+    gradient = gradient_type(_gradient)
+    n_registered = len(cpotential._custom_functions)
+
+    pot = CustomCPotential([2.], value=value, gradient=gradient,
+                           units=galactic)
+    pot2 = pot.replace_units(solarsystem)
+    pot3 = pot.with_parameter_tracks([0, 1.], pars=[[2.], [4.]])
+    assert len(cpotential._custom_functions) == n_registered + 2
+
+    # the functions are kept alive by the potentials
+    del value, gradient, _value, _gradient, pot
+    gc.collect()
+
+    xyz = [1., 2, 3]
+    assert u.allclose(pot2.energy(xyz * u.au), 14 * u.au**2 / u.yr**2)
+    assert u.allclose(pot3.energy(xyz * u.kpc, t=0.5 * u.Myr),
+                      21 * u.kpc**2 / u.Myr**2)
+
+    # ...and removed from the registry with the potentials
+    del pot2, pot3
+    gc.collect()
+    assert len(cpotential._custom_functions) == n_registered
+
+
+def test_custom_c_potential_numba():
+    numba = pytest.importorskip('numba')
+    from numba import types
+    from ..cpotential import CustomCPotential
+    from ..builtin import KeplerPotential
+    from ....units import galactic
+
+    sig = types.double(types.double, types.CPointer(types.double),
+                       types.CPointer(types.double), types.intc)
+
+    @numba.cfunc(sig)
+    def value(t, pars, q, n_dim):
+        r = np.sqrt(q[0]**2 + q[1]**2 + q[2]**2)
+        return -pars[0] * pars[1] / r
+
+    sig = types.void(types.double, types.CPointer(types.double),
+                     types.CPointer(types.double), types.intc,
+                     types.CPointer(types.double))
+
+    @numba.cfunc(sig)
+    def gradient(t, pars, q, n_dim, grad):
+        r = np.sqrt(q[0]**2 + q[1]**2 + q[2]**2)
+        for i in range(3):
+            grad[i] += pars[0] * pars[1] * q[i] / r**3
+
+    pot = CustomCPotential([1E10], value=value, gradient=gradient,
+                           units=galactic)
+    builtin = KeplerPotential(m=1E10, units=galactic)
+
+    xyz = np.random.default_rng(42).uniform(-5, 5, size=(3, 16))
+    assert u.allclose(pot.energy(xyz), builtin.energy(xyz))
+    assert u.allclose(pot.gradient(xyz), builtin.gradient(xyz))
+
+
+def test_radial_profile():
+    from ..builtin import (KeplerPotential, IsochronePotential,
+                           PlummerPotential, JaffePotential, StonePotential,
+                           NFWPotential, MiyamotoNagaiPotential)
+    from ..builtin.special import MilkyWayPotential
+    from ..ccompositepotential import CCompositePotential
+    from ..core import PotentialBase
+    from ....units import galactic
+
+    R = np.array([[0., 1, 0], [-1, 0, 0], [0, 0, 1]])
+    pots = [KeplerPotential(m=1E10, units=galactic),
+            IsochronePotential(m=1E10, b=1., units=galactic),
+            HernquistPotential(m=1E10, c=1., units=galactic),
+            PlummerPotential(m=1E10, b=1., units=galactic),
+            JaffePotential(m=1E10, c=1., units=galactic),
+            StonePotential(m=1E10, r_c=0.5, r_h=5., units=galactic),
+            NFWPotential(m=1E11, r_s=10., units=galactic),
+            HernquistPotential(m=1E10, c=1., units=galactic, R=R),
+            HernquistPotential(m=1E10, c=1., units=galactic,
+                               origin=[1., 0.5, 0]),
+            NFWPotential(m=1E11, r_s=10., c=0.8, units=galactic),
+            MiyamotoNagaiPotential(m=1E10, a=3., b=0.3, units=galactic),
+            MilkyWayPotential()]
+
+    r = np.geomspace(0.1, 200, 16)
+    direction = np.array([1., 2., 0.5])
+    direction = direction / np.linalg.norm(direction)
+    xyz = r[None] * direction[:, None]
+
+    for pot in pots:
+        prof = pot.radial_profile(r * u.kpc, direction=direction)
+        assert u.allclose(prof['Phi'], pot.energy(xyz))
+
+        grad = pot.gradient(xyz)
+        dPhi_dr = np.sum(grad * direction[:, None], axis=0)
+        assert u.allclose(prof['dPhi_dr'], dPhi_dr)
+
+        # compare to a central difference of the radial gradient
+        h = 1E-4 * r
+        grad1 = pot.gradient(xyz + h * direction[:, None])
+        grad2 = pot.gradient(xyz - h * direction[:, None])
+        d2Phi_dr2 = np.sum((grad1 - grad2) * direction[:, None],
+                           axis=0) / (2*h*u.kpc)
+        assert u.allclose(prof['d2Phi_dr2'], d2Phi_dr2, rtol=1E-4)
+
+        assert u.allclose(prof['v_circ'],
+                          PotentialBase.circular_velocity(pot, xyz))
+        assert u.allclose(pot.circular_velocity(xyz),
+                          PotentialBase.circular_velocity(pot, xyz))
+        assert u.allclose(prof['m_enc'], pot.mass_enclosed(xyz))
+        # the Python implementation uses a (less accurate) finite difference
+        assert u.allclose(pot.mass_enclosed(xyz),
+                          PotentialBase.mass_enclosed(pot, xyz), rtol=1E-3)
+
+    # a shifted component of a composite potential uses the gradient, while
+    # the other component uses its radial kernel
+    pot = CCompositePotential(
+        a=HernquistPotential(m=1E10, c=1., units=galactic, origin=[2., 0, 0]),
+        b=HernquistPotential(m=1E10, c=1., units=galactic))
+    prof = pot.radial_profile(r * u.kpc, direction=direction)
+    prof_a = pot['a'].radial_profile(r * u.kpc, direction=direction)
+    prof_b = pot['b'].radial_profile(r * u.kpc, direction=direction)
+    for name in ['Phi', 'dPhi_dr', 'd2Phi_dr2']:
+        assert u.allclose(prof[name], prof_a[name] + prof_b[name])
+
+    with pytest.raises(ValueError):
+        pots[0].radial_profile(np.ones((2, 2)))
+
+    with pytest.raises(ValueError):
+        pots[0].radial_profile(r, direction=[1., 0])
+
+
+def test_evaluate_on_grid(tmpdir):
+    from ..builtin.special import MilkyWayPotential
+    from ..core import PotentialBase
+    from ..cpotential import get_num_threads, set_num_threads
+
+    pot = MilkyWayPotential()
+    x = np.linspace(-20, 20, 33) * u.kpc
+    y = np.linspace(-15, 15, 21) * u.kpc
+    z = np.linspace(-5, 5, 11) * u.kpc
+
+    X, Y, Z = np.meshgrid(x, y, z, indexing='ij')
+    xyz = np.stack((X, Y, Z))
+
+    E = pot.evaluate_on_grid((x, y, z))
+    assert E.shape == (33, 21, 11)
+    assert u.allclose(E, pot.energy(xyz), equal_nan=True)
+
+    # same as the Python implementation, for a slice through the grid
+    dens = pot.evaluate_on_grid((x, 1.5*u.kpc, z), quantity='density')
+    dens_py = PotentialBase.evaluate_on_grid(pot, (x, 1.5*u.kpc, z),
+                                             quantity='density')
+    assert dens.shape == (33, 11)
+    assert u.allclose(dens, dens_py)
+
+    # multithreaded evaluation gives identical results
+    n_threads = get_num_threads()
+    set_num_threads(4)
+    try:
+        assert np.array_equal(pot.evaluate_on_grid((x, y, z)).value,
+                              E.value, equal_nan=True)
+    finally:
+        set_num_threads(n_threads)
+
+    # writing to a memory-mapped file
+    filename = str(tmpdir / 'grid.npy')
+    E2 = pot.evaluate_on_grid((x, y, z), filename=filename)
+    assert np.array_equal(np.load(filename, mmap_mode='r'), E.value,
+                          equal_nan=True)
+
+    out = np.zeros((33, 21, 11))
+    E2 = pot.evaluate_on_grid((x, y, z), out=out)
+    assert np.shares_memory(E2.value, out)
+
+    with pytest.raises(ValueError):
+        pot.evaluate_on_grid((x, y, z), out=np.zeros((33, 21)))
+
+    with pytest.raises(ValueError):
+        pot.evaluate_on_grid((x, y, z), t=[0., 1.])
+
+
+def test_set_parameters():
+    from ..builtin import NFWPotential, InterpolatedPotential
+    from ..builtin.special import MilkyWayPotential
+    from ....units import galactic
+
+    xyz = np.random.default_rng(42).uniform(-10, 10, size=(3, 16))
+
+    pot = HernquistPotential(m=1E10, c=1., units=galactic)
+    copy = pickle.loads(pickle.dumps(pot))
+    assert np.allclose(pot.get_parameters_raw(), [1E10, 1.])
+
+    pot.set_parameters_raw([2E10, 1.5])
+    expected = HernquistPotential(m=2E10, c=1.5, units=galactic)
+    assert u.allclose(pot.energy(xyz), expected.energy(xyz))
+    assert u.allclose(pot.gradient(xyz), expected.gradient(xyz))
+    assert u.allclose(pot.parameters['m'], 2E10*u.Msun)
+    assert u.allclose(copy.energy(xyz),
+                      HernquistPotential(m=1E10, c=1.,
+                                         units=galactic).energy(xyz))
+
+    pot.set_parameters(c=500*u.pc)
+    expected = HernquistPotential(m=2E10, c=0.5, units=galactic)
+    assert u.allclose(pot.energy(xyz), expected.energy(xyz))
+
+    # orbits use the updated parameters
+    w0 = [8., 0, 0, 0, 0.15, 0.01]
+    assert u.allclose(pot.integrate_orbit(w0, dt=1., n_steps=100).xyz,
+                      expected.integrate_orbit(w0, dt=1., n_steps=100).xyz)
+
+    # composite potentials update their components
+    mw = MilkyWayPotential()
+    raw = mw.get_parameters_raw()
+    assert len(raw) == sum([len(p.get_parameters_raw())
+                            for p in mw.values()])
+    mw.set_parameters(halo=dict(m=6E11*u.Msun), disk=dict(a=3.5*u.kpc))
+    expected = MilkyWayPotential(halo=dict(m=6E11*u.Msun),
+                                 disk=dict(a=3.5*u.kpc))
+    assert u.allclose(mw.energy(xyz), expected.energy(xyz))
+    assert u.allclose(mw.gradient(xyz), expected.gradient(xyz))
+    assert u.allclose(mw['halo'].parameters['m'], 6E11*u.Msun)
+
+    mw.set_parameters_raw(raw)
+    assert u.allclose(mw.energy(xyz), MilkyWayPotential().energy(xyz))
+
+    with pytest.raises(ValueError):
+        mw.set_parameters_raw(raw[:3])
+
+    with pytest.raises(ValueError):
+        mw.set_parameters(derp=dict(m=1.))
+
+    with pytest.raises(ValueError):
+        pot.set_parameters_raw([1E10])
+
+    with pytest.raises(ValueError):
+        pot.set_parameters(derp=1E10)
+
+    with pytest.raises(ValueError):
+        pot.set_parameters(m=[1E10, 2E10])
+
+    # the C implementation of the NFW potential depends on the axis ratios
+    nfw = NFWPotential(m=1E11, r_s=10., units=galactic)
+    nfw.set_parameters(m=2E11)
+    with pytest.raises(ValueError):
+        nfw.set_parameters(c=0.8)
+
+    with pytest.raises(ValueError):
+        nfw.tabulate_radial_profile().set_parameters(m=1E11)
+
+    interp = InterpolatedPotential.from_potential(
+        pot, grid=(np.geomspace(0.1, 10, 16), 5, 4), coordinates='spherical')
+    with pytest.raises(NotImplementedError):
+        interp.set_parameters_raw(interp.get_parameters_raw())
+
+    with pytest.raises(NotImplementedError):
+        interp.set_parameters(values=interp.parameters['values'])
+
+    with pytest.raises(ValueError):
+        interp.with_parameter_tracks(
+            [0, 1.], values=[interp.parameters['values']] * 2)
@@ -0,0 +1,135 @@
+# Third party
+import astropy.units as u
+import numpy as np
+import pytest
+
+# This project
+from ..builtin import HernquistPotential, NFWPotential, KeplerPotential
+from ..builtin.special import MilkyWayPotential
+from ..ccompositepotential import CCompositePotential
+from ..cpotential import set_num_threads, get_num_threads
+from ..ensemble import PotentialEnsemble, evaluate_over_parameters
+from ....units import galactic
+
+
+def test_ensemble():
+    rng = np.random.default_rng(42)
+    xyz = rng.uniform(-10, 10, size=(3, 16))
+
+    pot = HernquistPotential(m=1E10, c=1., units=galactic)
+    m = [1E10, 2E10, 4E10] * u.Msun
+    c = [1000., 2000., 500.] * u.pc
+
+    ens = PotentialEnsemble(pot, dict(m=m, c=c))
+    assert len(ens) == 3
+    assert np.allclose(ens.parameters_raw, [[1E10, 1.], [2E10, 2.],
+                                            [4E10, 0.5]])
+
+    # the same as raw parameter values
+    ens2 = PotentialEnsemble(pot, ens.parameters_raw)
+    assert np.array_equal(ens.energy(xyz).value, ens2.energy(xyz).value)
+
+    E = ens.energy(xyz)
+    grad = ens.gradient(xyz)
+    dens = ens.density(xyz)
+    assert E.shape == (3, 16)
+    assert grad.shape == (3, 3, 16)
+    assert dens.shape == (3, 16)
+
+    for i in range(len(ens)):
+        p = HernquistPotential(m=m[i], c=c[i], units=galactic)
+        assert u.allclose(E[i], p.energy(xyz))
+        assert u.allclose(grad[i], p.gradient(xyz))
+        assert u.allclose(dens[i], p.density(xyz))
+        assert u.allclose(ens[i].energy(xyz), p.energy(xyz))
+
+    # the template potential is not modified
+    assert u.allclose(pot.parameters['m'], 1E10*u.Msun)
+
+    # multithreaded evaluation gives identical results
+    n_threads = get_num_threads()
+    set_num_threads(4)
+    try:
+        assert np.array_equal(ens.energy(xyz).value, E.value)
+    finally:
+        set_num_threads(n_threads)
+
+    E = evaluate_over_parameters(pot, [[1E10, 1.], [2E10, 1.]],
+                                 [1., 0, 0] * u.kpc)
+    assert u.allclose(E[1], 2 * E[0])
+
+    # orbits are integrated in each member of the ensemble
+    w0 = [8., 0, 0, 0, 0.15, 0.01]
+    orbits = ens.integrate_orbit(w0, dt=1., n_steps=100)
+    assert len(orbits) == 3
+    for i in range(len(ens)):
+        p = HernquistPotential(m=m[i], c=c[i], units=galactic)
+        orbit = p.integrate_orbit(w0, dt=1., n_steps=100)
+        assert u.allclose(orbits[i].xyz, orbit.xyz)
+
+
+def test_ensemble_composite():
+    rng = np.random.default_rng(42)
+    xyz = rng.uniform(-10, 10, size=(3, 16))
+
+    mw = MilkyWayPotential()
+    halo_m = rng.uniform(4E11, 8E11, size=8) * u.Msun
+    disk_a = rng.uniform(2., 4., size=8) * u.kpc
+    ens = PotentialEnsemble(mw, dict(halo=dict(m=halo_m),
+                                     disk=dict(a=disk_a)))
+
+    E = ens.energy(xyz)
+    grad = ens.gradient(xyz)
+    for i in range(len(ens)):
+        p = MilkyWayPotential(halo=dict(m=halo_m[i]),
+                              disk=dict(a=disk_a[i]))
+        assert u.allclose(E[i], p.energy(xyz))
+        assert u.allclose(grad[i], p.gradient(xyz))
+
+    # shifted components
+    pot = CCompositePotential(
+        a=KeplerPotential(m=1E10, units=galactic, origin=[1., 0, 0]),
+        b=HernquistPotential(m=1E10, c=1., units=galactic))
+    ens = PotentialEnsemble(pot, dict(a=dict(m=[1E10, 2E10])))
+    E = ens.energy(xyz)
+    pot['a'].set_parameters_raw([2E10])
+    assert u.allclose(E[1], pot.energy(xyz))
+
+
+def test_ensemble_failures():
+    pot = HernquistPotential(m=1E10, c=1., units=galactic)
+
+    with pytest.raises(ValueError):
+        PotentialEnsemble(pot, [1E10, 1.])
+
+    with pytest.raises(ValueError):
+        PotentialEnsemble(pot, np.ones((4, 3)))
+
+    with pytest.raises(ValueError):
+        PotentialEnsemble(pot, dict(derp=[1., 2.]))
+
+    with pytest.raises(ValueError):
+        PotentialEnsemble(pot, dict(m=[1E10, 2E10], c=[1., 2., 3.]))
+
+    with pytest.raises(ValueError):
+        PotentialEnsemble(MilkyWayPotential(), dict(derp=dict(m=[1., 2.])))
+
+    ens = PotentialEnsemble(pot, dict(m=[1E10, 2E10]))
+    with pytest.raises(ValueError):
+        ens.energy(np.zeros((3, 4)), t=np.arange(4.))
+
+    with pytest.raises(ValueError):
+        evaluate_over_parameters(pot, dict(m=[1E10]), [1., 0, 0],
+                                 quantity='derp')
+
+    # the C implementation of the NFW potential depends on the axis ratios
+    nfw = NFWPotential(m=1E11, r_s=10., units=galactic)
+    PotentialEnsemble(nfw, dict(m=[1E11, 2E11]))
+    with pytest.raises(ValueError):
+        PotentialEnsemble(nfw, dict(c=[1., 0.8]))
+
+    with pytest.raises(ValueError):
+        PotentialEnsemble(nfw.tabulate_radial_profile(), dict(m=[1E11]))
+
+    with pytest.raises(TypeError):
+        PotentialEnsemble(object(), dict(m=[1E11]))
@@ -1,8 +1,17 @@
+import pickle
+
+import astropy.units as u
+import numpy as np
 import pytest
 
 # This project
 from ..util import from_equation
+from ..cpotential import CPotentialBase
+from ..builtin import PlummerPotential
 from .helpers import PotentialTestBase
+from ...hamiltonian import Hamiltonian
+from ....integrate import DOPRI853Integrator
+from ....units import galactic
 from gala.tests.optional_deps import HAS_SYMPY
 
 
@@ -36,6 +45,58 @@ if HAS_SYMPY:
         def test_against_sympy(self):
             pass
 
+    class TestHarmonicOscillatorFromEquationCompiled(EquationBase):
+        Potential = from_equation("1/2*k*x**2", vars="x", pars="k",
+                                  name='HarmonicOscillator',
+                                  hessian=True, compile=True)
+        potential = Potential(k=1.)
+        w0 = [1., 0.]
+
+        test_pickle = PotentialTestBase.test_pickle
+
+        @pytest.mark.skip(reason="to_sympy() not implemented")
+        def test_against_sympy(self):
+            pass
+
+
+@pytest.mark.skipif(not HAS_SYMPY, reason="requires sympy to run this test")
+def test_compiled_equation():
+    Potential = from_equation("-G*m/sqrt(x**2+y**2+z**2+b**2)",
+                              vars=["x", "y", "z"], pars=["G", "m", "b"],
+                              name='Plummer', hessian=True, compile=True)
+    assert issubclass(Potential, CPotentialBase)
+
+    # the compiled class is cached
+    assert Potential is from_equation("-G*m/sqrt(x**2+y**2+z**2+b**2)",
+                                      vars=["x", "y", "z"],
+                                      pars=["G", "m", "b"], name='Plummer',
+                                      hessian=True, compile=True)
+
+    G = 4.498502151469554e-12  # kpc^3 / Msun / Myr^2
+    pot = Potential(G=G, m=1E10, b=1.)
+    builtin = PlummerPotential(m=1E10, b=1., units=galactic)
+
+    xyz = np.random.default_rng(42).uniform(-5, 5, size=(3, 16))
+    assert np.allclose(pot.energy(xyz).value, builtin.energy(xyz).value)
+    assert np.allclose(pot.gradient(xyz).value, builtin.gradient(xyz).value)
+    assert np.allclose(pot.hessian(xyz).value, builtin.hessian(xyz).value)
+
+    # orbits are integrated with the C integrators
+    w0 = [5., 0, 0, 0, 0.1, 0.02]
+    orbit = Hamiltonian(pot).integrate_orbit(w0, dt=0.5, n_steps=1000,
+                                             Integrator=DOPRI853Integrator)
+    orbit_builtin = Hamiltonian(builtin).integrate_orbit(
+        w0, dt=0.5, n_steps=1000, Integrator=DOPRI853Integrator)
+    assert np.allclose(orbit.xyz.value, orbit_builtin.xyz.value)
+
+    # compiled potentials are pickle-able, including time-dependent
+    # parameters
+    pot = pot.with_parameter_tracks([0, 1000.], m=[1E10, 2E10])
+    pot2 = pickle.loads(pickle.dumps(pot))
+    assert type(pot2) is type(pot)
+    assert u.allclose(pot2.energy(xyz, t=500.), pot.energy(xyz, t=500.))
+    assert not u.allclose(pot2.energy(xyz, t=500.), pot.energy(xyz, t=0.))
+
 
 # class TestHarmonicOscillatorFromEquationUnits(EquationBase):
 #     Potential = from_equation("1/2*k*x**2", vars="x", pars="k",
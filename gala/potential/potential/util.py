@@ -1,7 +1,13 @@
 """ Utilities for Potential classes """
 
 # Standard library
+import ctypes
 from functools import wraps
+import hashlib
+import os
+import platform
+import sys
+import tempfile
 
 # Third-party
 import numpy as np
@@ -9,12 +15,13 @@ import numpy as np
 # Project
 from ..common import PotentialParameter
 from .core import PotentialBase
+from .cpotential import CPotentialBase, CFunctionPointerWrapper
 
 __all__ = ['from_equation']
 __doctest_requires__ = {('from_equation', ): ['sympy']}
 
 
-def from_equation(expr, vars, pars, name=None, hessian=False):
+def from_equation(expr, vars, pars, name=None, hessian=False, compile=False):
     r"""
     Create a potential class from an expression for the potential.
 
@@ -24,8 +31,18 @@ def from_equation(expr, vars, pars, name=None, hessian=False):
 
     .. warning::
 
-        These potentials are *not* pickle-able and cannot be written
-        out to YAML files (using `~gala.potential.PotentialBase.save()`)
+        These potentials cannot be written out to YAML files (using
+        `~gala.potential.PotentialBase.save()`), and are only pickle-able if
+        ``compile=True``.
+
+    With ``compile=True``, C code for the value, gradient, and (optionally)
+    Hessian of the potential is generated with Sympy, compiled into a shared
+    library, and loaded at runtime. The returned class is then a subclass of
+    `~gala.potential.CPotentialBase`, so it is as fast to evaluate as the
+    builtin potentials and can be used with the C integrators. This requires a
+    C compiler. The compiled libraries are cached on disk (in the ``gala``
+    cache directory, see `astropy.config.get_cache_dir`), so each expression
+    is only compiled once.
 
     Parameters
     ----------
@@ -40,6 +57,8 @@ def from_equation(expr, vars, pars, name=None, hessian=False):
         The name of the potential class returned.
     hessian : bool (optional)
         Generate a function to compute the Hessian.
+    compile : bool (optional)
+        Generate and compile C code for the potential.
 
     Returns
     -------
@@ -66,6 +85,15 @@ def from_equation(expr, vars, pars, name=None, hessian=False):
         >>> H = Hamiltonian(p1)
         >>> orbit = H.integrate_orbit([1., 0], dt=0.01, n_steps=1000)
 
+    To instead compile the potential to C, so that orbits are integrated with
+    the C integrators:
+
+        >>> Potential = from_equation("1/2*k*x**2", vars="x", pars="k",
+        ...                           name='HarmonicOscillator',
+        ...                           compile=True) # doctest: +SKIP
+        >>> orbit = Potential(k=1.).integrate_orbit(
+        ...     [1., 0], dt=0.01, n_steps=1000) # doctest: +SKIP
+
     """
     try:
         import sympy
@@ -82,6 +110,14 @@ def from_equation(expr, vars, pars, name=None, hessian=False):
     par_names = [p.name for p in pars]
     ndim = len(vars)
 
+    if compile:
+        key = (str(expr), tuple(var_names), tuple(par_names), name,
+               bool(hessian))
+        if key not in _compiled_classes:
+            _compiled_classes[key] = _compiled_equation_class(
+                expr, vars, pars, name, hessian, key)
+        return _compiled_classes[key]
+
     # Energy / value
     energyfunc = lambdify(vars + pars, expr, dummify=False,
                           modules=['numpy', 'sympy'])
@@ -165,6 +201,211 @@ def from_equation(expr, vars, pars, name=None, hessian=False):
     return CustomPotential
 
 
+# compiled potential classes created by from_equation(), by input arguments
+_compiled_classes = dict()
+
+# shared libraries loaded by _load_compiled_functions(), by hash of the source
+_compiled_libraries = dict()
+
+
+def _CPotentialCodePrinter():
+    from sympy.printing.c import C99CodePrinter
+    from sympy.printing.precedence import precedence
+
+    class CPotentialCodePrinter(C99CodePrinter):
+        """
+        Prints small integer and half-integer powers as products (and square
+        roots), which are much faster than calls to pow().
+        """
+
+        def _print_Pow(self, expr):
+            base, exp = expr.as_base_exp()
+            if ((exp.is_Integer or (exp.is_Rational and exp.q == 2)) and
+                    1 < abs(exp) <= 4):
+                b = self.parenthesize(base, precedence(expr))
+                factors = [b] * int(abs(exp))
+                if not exp.is_Integer:
+                    factors.append(f'sqrt({self._print(base)})')
+                prod = '*'.join(factors)
+                return f'(1.0/({prod}))' if exp < 0 else f'({prod})'
+
+            return super()._print_Pow(expr)
+
+    return CPotentialCodePrinter()
+
+
+def _equation_to_c(expr, vars, pars, hessian=False):
+    """
+    Generate C code for the value, gradient, and (optionally) Hessian of a
+    potential expression, with the signatures of the builtin potential
+    functions (see ``src/funcdefs.h``).
+    """
+    import sympy
+
+    ndim = len(vars)
+
+    # rename the variables and parameters to avoid clashing with C names
+    q = sympy.symbols(f'gala_q:{ndim}', real=True)
+    p = sympy.symbols(f'gala_p:{len(pars)}', real=True)
+    expr = expr.subs(dict(zip(vars + pars, q + p)), simultaneous=True)
+
+    header = []
+    for i in range(ndim):
+        header.append(f'    double gala_q{i} = q[{i}];')
+    for i in range(len(pars)):
+        # the first parameter is always G
+        header.append(f'    double gala_p{i} = pars[{i+1}];')
+
+    printer = _CPotentialCodePrinter()
+
+    def body(exprs):
+        tmps, exprs = sympy.cse(exprs, symbols=sympy.numbered_symbols('tmp_'))
+        lines = list(header)
+        for tmp, tmp_expr in tmps:
+            lines.append(f'    double {tmp} = {printer.doprint(tmp_expr)};')
+        return lines, [printer.doprint(e) for e in exprs]
+
+    lines, (value, ) = body([expr])
+    src = ['#include <math.h>', '',
+           'double potential_value(double t, double *pars, double *q, '
+           'int n_dim) {'] + lines + [f'    return {value};', '}', '']
+
+    grad = [sympy.diff(expr, v) for v in q]
+    lines, grad = body(grad)
+    src += ['void potential_gradient(double t, double *pars, double *q, '
+            'int n_dim, double *grad) {'] + lines
+    for i, g in enumerate(grad):
+        src.append(f'    grad[{i}] = grad[{i}] + {g};')
+    src += ['}', '']
+
+    if hessian:
+        hess = [sympy.diff(expr, v1, v2) for v1 in q for v2 in q]
+        lines, hess = body(hess)
+        src += ['void potential_hessian(double t, double *pars, double *q, '
+                'int n_dim, double *hess) {'] + lines
+        for i, h in enumerate(hess):
+            src.append(f'    hess[{i}] = hess[{i}] + {h};')
+        src += ['}', '']
+
+    return '\n'.join(src)
+
+
+def _compiled_cache_dir():
+    from astropy.config import get_cache_dir
+    path = os.path.join(get_cache_dir('gala'), 'compiled_potentials')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _load_compiled_functions(src, names):
+    """
+    Compile the C source code into a shared library (or load it from the
+    cache, if it was compiled previously) and return a dict with the addresses
+    of the functions in ``names``.
+    """
+    import setuptools  # noqa: provides distutils with Python >= 3.12
+    from distutils.ccompiler import new_compiler
+    from distutils.sysconfig import customize_compiler
+
+    compiler = new_compiler()
+    customize_compiler(compiler)
+
+    key = '\n'.join([src, sys.platform, platform.machine(),
+                     compiler.compiler_type])
+    key = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+    if key not in _compiled_libraries:
+        libname = compiler.library_filename(f'gala_potential_{key}',
+                                            lib_type='shared')
+        libpath = os.path.join(_compiled_cache_dir(), libname)
+
+        if not os.path.exists(libpath):
+            if compiler.compiler_type == 'msvc':
+                cflags, libraries = ['/O2'], []
+            else:
+                cflags, libraries = ['-O3'], ['m']
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                src_file = os.path.join(tmpdir, f'gala_potential_{key}.c')
+                with open(src_file, 'w') as f:
+                    f.write(src)
+
+                objects = compiler.compile([src_file], output_dir=tmpdir,
+                                           extra_postargs=cflags)
+                tmp_libpath = os.path.join(tmpdir, libname)
+                compiler.link_shared_object(objects, tmp_libpath,
+                                            libraries=libraries)
+
+                # move into place atomically, in case another process is
+                # compiling the same potential
+                os.replace(tmp_libpath, libpath)
+
+        _compiled_libraries[key] = ctypes.CDLL(libpath)
+
+    lib = _compiled_libraries[key]
+    return {name: ctypes.cast(getattr(lib, f'potential_{name}'),
+                              ctypes.c_void_p).value
+            for name in names}
+
+
+def _compiled_equation_class(expr, vars, pars, name, hessian, key):
+    """
+    Create a C-enabled potential class for an expression: see
+    `from_equation()`.
+    """
+    names = ['value', 'gradient']
+    if hessian:
+        names.append('hessian')
+
+    src = _equation_to_c(expr, vars, pars, hessian=hessian)
+    addresses = _load_compiled_functions(src, names)
+
+    Wrapper = type('CustomWrapper', (CFunctionPointerWrapper, ),
+                   {'_function_addresses': addresses})
+
+    parameters = {}
+    for par in pars:
+        parameters[par.name] = PotentialParameter(
+            par.name, physical_type='dimensionless')
+
+    class CustomPotential(CPotentialBase, parameters=parameters):
+        ndim = len(vars)
+
+        def __reduce__(self):
+            # the classes are created dynamically, so pickling re-creates the
+            # class from the equation (which loads the cached library)
+            state = self.__dict__.copy()
+            del state['c_instance']
+            return (_unpickle_compiled_potential, (key, state))
+
+    CustomPotential.Wrapper = Wrapper
+
+    if name is not None:
+        if "potential" not in name.lower():
+            name = name + "Potential"
+        CustomPotential.__name__ = str(name)
+
+    CustomPotential.save = None
+    return CustomPotential
+
+
+def _unpickle_compiled_potential(key, state):
+    expr, var_names, par_names, name, hessian = key
+    cls = from_equation(expr, var_names, par_names, name=name,
+                        hessian=hessian, compile=True)
+
+    pot = cls.__new__(cls)
+    pot.__dict__.update(state)
+    pot._setup_wrapper()
+
+    if getattr(pot, '_parameter_tracks', None):
+        pot.c_instance.set_parameter_tracks(pot._pack_parameter_tracks())
+    if getattr(pot, '_origin_trajectory', None) is not None:
+        pot.c_instance.set_origin_trajectory(pot._pack_origin_trajectory())
+
+    return pot
+
+
 def format_doc(*args, **kwargs):
     """
     Replaces the docstring of the decorated object and then formats it.
@@ -4,6 +4,18 @@
     typedef double (*energyfunc)(double t, double *pars, double *q, int n_dim);
     typedef void (*gradientfunc)(double t, double *pars, double *q, int n_dim, double *grad);
     typedef void (*hessianfunc)(double t, double *pars, double *q, int n_dim, double *hess);
+
+    // fused kernel: returns the value and adds the gradient into grad
+    typedef double (*valuegradientfunc)(double t, double *pars, double *q, int n_dim, double *grad);
+
+    // batched kernels: evaluate a contiguous block of n_points positions with
+    // shape (n_points, n_dim), adding the results into the output array
+    typedef void (*batchenergyfunc)(double t, double *pars, double *q, int n_dim, int n_points, double *pot);
+    typedef void (*batchgradientfunc)(double t, double *pars, double *q, int n_dim, int n_points, double *grad);
+
+    // radial kernel for spherical potentials: returns the value at radius r
+    // and stores the first and second radial derivatives
+    typedef double (*radialfunc)(double t, double *pars, double r, double *dPhi_dr, double *d2Phi_dr2);
 #endif
 
 
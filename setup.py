@@ -154,7 +154,25 @@ else:
 
 print("-" * 79)
 
+# ----------------------------------------------------------------------------
+# OpenMP support
+#
+# The C potential evaluation loops and the integration of independent orbits
+# with DOP853 can be multithreaded with OpenMP. To build
+# without OpenMP, set the environment variable GALA_NOOPENMP=1
+noopenmp = bool(int(os.environ.get('GALA_NOOPENMP', 0)))
+openmp_extensions = ['gala.potential.potential.cpotential',
+                      'gala.integrate.cyintegrators.dop853']
+
 extensions = get_extensions()
+
+openmp_enabled = False
+if not noopenmp:
+    from extension_helpers import add_openmp_flags_if_available
+    for ext in extensions:
+        if ext.name in openmp_extensions:
+            openmp_enabled = add_openmp_flags_if_available(ext)
+
 for ext in extensions:
     if 'potential.potential' in ext.name or 'scf' in ext.name:
         if gsl_version is not None:
@@ -168,9 +186,14 @@ for ext in extensions:
 
 with open(extra_compile_macros_file, 'w') as f:
     if gsl_version is not None:
-        f.writelines(['#define USE_GSL 1'])
+        f.writelines(['#define USE_GSL 1\n'])
+    else:
+        f.writelines(['#define USE_GSL 0\n'])
+
+    if openmp_enabled:
+        f.writelines(['#define USE_OPENMP 1\n'])
     else:
-        f.writelines(['#define USE_GSL 0'])
+        f.writelines(['#define USE_OPENMP 0\n'])
 
 
 setup(use_scm_version={'write_to': os.path.join('gala', 'version.py'),